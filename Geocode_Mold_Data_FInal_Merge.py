@@ -1,250 +1,5 @@
-import pandas as pd
-import numpy as np
-from scipy.spatial import cKDTree
+# Geocode mold complaints and build FINAL_MERGED_DATASET.csv.
+# The logic lives in the nyc_asthma package; same as `python -m nyc_asthma geocode`.
+from nyc_asthma.cli import main
 
-print("="*80)
-print("COMPLETE DATA INTEGRATION: FROM SCRATCH TO FINAL DATASET")
-print("="*80)
-
-# ============================================================================
-# STEP 1: Load and merge all asthma datasets
-# ============================================================================
-print("\n[1/8] Loading asthma datasets...")
-
-asthma_adults = pd.read_csv('DATA/CLEANED/adults_with_asthma_cleaned.csv')
-asthma_ed_adults = pd.read_csv('DATA/CLEANED/asthma_ed_visits_adults_cleaned.csv')
-asthma_ed_0_4 = pd.read_csv('DATA/CLEANED/asthma_ed_visits_age_0_4_cleaned.csv')
-asthma_ed_5_17 = pd.read_csv('DATA/CLEANED/asthma_ed_visits_age_5_17_cleaned.csv')
-
-print(f"  ✓ Adults with asthma: {asthma_adults.shape}")
-print(f"  ✓ Asthma ED visits (adults): {asthma_ed_adults.shape}")
-print(f"  ✓ Asthma ED visits (0-4): {asthma_ed_0_4.shape}")
-print(f"  ✓ Asthma ED visits (5-17): {asthma_ed_5_17.shape}")
-
-# Merge asthma datasets
-merged = asthma_adults.copy()
-
-merged = merged.merge(
-    asthma_ed_adults[['year', 'uhf_code', 'age_adjusted_ed_rate_per_10k', 'estimated_annual_ed_visits']],
-    on=['year', 'uhf_code'],
-    how='left',
-    suffixes=('', '_ed_adults')
-)
-
-merged = merged.merge(
-    asthma_ed_0_4[['year', 'uhf_code', 'ed_rate_per_10k_age_0_4', 'estimated_annual_ed_visits_age_0_4']],
-    on=['year', 'uhf_code'],
-    how='left'
-)
-
-merged = merged.merge(
-    asthma_ed_5_17[['year', 'uhf_code', 'ed_rate_per_10k_age_5_17', 'estimated_annual_ed_visits_age_5_17']],
-    on=['year', 'uhf_code'],
-    how='left'
-)
-
-print(f"  ✓ Merged asthma data: {merged.shape}")
-
-# ============================================================================
-# STEP 2: Add poverty data
-# ============================================================================
-print("\n[2/8] Adding poverty data...")
-
-poverty_data = pd.read_csv('DATA/CLEANED/pov_data[cleaned].csv')
-uhf_poverty = poverty_data[poverty_data['NTA_CODE'].astype(str).str.len() == 3].copy()
-uhf_poverty = uhf_poverty.rename(columns={
-    'NTA_CODE': 'uhf_code',
-    'Households_Below_Poverty': 'households_below_poverty',
-    'Poverty_percent': 'poverty_rate'
-})
-uhf_poverty['uhf_code'] = uhf_poverty['uhf_code'].astype(int)
-
-merged = merged.merge(
-    uhf_poverty[['uhf_code', 'households_below_poverty', 'poverty_rate']],
-    on='uhf_code',
-    how='left'
-)
-
-print(f"  ✓ Merged with poverty: {merged.shape}")
-
-# ============================================================================
-# STEP 3: Add air quality data (aggregated from NTA to UHF)
-# ============================================================================
-print("\n[3/8] Adding air quality data...")
-
-aqe = pd.read_csv('DATA/CLEANED/aqe_data[cleaned].csv')
-
-# NTA to UHF mapping (abbreviated for space - same as before)
-nta_to_uhf = {
-    # BRONX (UHF 101-107)
-    'BX0801': 101, 'BX0802': 101, 'BX0803': 101,
-    'BX1002': 102, 'BX1003': 102, 'BX1004': 102, 'BX1001': 102, 'BX1102': 102,
-    'BX1103': 102, 'BX1104': 102, 'BX1201': 102, 'BX1202': 102, 'BX1203': 102,
-    'BX0501': 103, 'BX0502': 103, 'BX0503': 103, 'BX0701': 103, 'BX0702': 103, 'BX0703': 103,
-    'BX0903': 104, 'BX0904': 104, 'BX1001': 104,
-    'BX0301': 105, 'BX0302': 105, 'BX0303': 105, 'BX0601': 105, 'BX0602': 105, 'BX0603': 105,
-    'BX0401': 106, 'BX0402': 106, 'BX0403': 106,
-    'BX0101': 107, 'BX0102': 107, 'BX0201': 107, 'BX0202': 107,
-    # BROOKLYN (UHF 201-211)
-    'BK0101': 201,
-    'BK0201': 202, 'BK0202': 202, 'BK0203': 202, 'BK0204': 202, 'BK0601': 202, 'BK0602': 202, 'BK0701': 202,
-    'BK0301': 203, 'BK0302': 203, 'BK0801': 203, 'BK0802': 203, 'BK0901': 203, 'BK0902': 203,
-    'BK0501': 204, 'BK0502': 204, 'BK0503': 204, 'BK0504': 204, 'BK0505': 204,
-    'BK0702': 205, 'BK0703': 205,
-    'BK1201': 206, 'BK1202': 206, 'BK1203': 206, 'BK1204': 206,
-    'BK1401': 207, 'BK1402': 207, 'BK1403': 207, 'BK1701': 207, 'BK1702': 207, 'BK1703': 207, 'BK1704': 207,
-    'BK1801': 208, 'BK1802': 208, 'BK1803': 208,
-    'BK1001': 209, 'BK1002': 209, 'BK1101': 209, 'BK1102': 209, 'BK1103': 209,
-    'BK1301': 210, 'BK1302': 210, 'BK1303': 210, 'BK1501': 210, 'BK1502': 210, 'BK1503': 210,
-    'BK0102': 211, 'BK0103': 211, 'BK0104': 211, 'BK0401': 211, 'BK0402': 211,
-    # MANHATTAN (UHF 301-310)
-    'MN1201': 301, 'MN1202': 301, 'MN1203': 301,
-    'MN0901': 302, 'MN0902': 302, 'MN0903': 302, 'MN1001': 302, 'MN1002': 302,
-    'MN1101': 303, 'MN1102': 303,
-    'MN0701': 304, 'MN0702': 304, 'MN0703': 304,
-    'MN0801': 305, 'MN0802': 305, 'MN0803': 305,
-    'MN0401': 306, 'MN0402': 306,
-    'MN0601': 307, 'MN0602': 307, 'MN0603': 307, 'MN0604': 307,
-    'MN0201': 308, 'MN0202': 308, 'MN0203': 308,
-    'MN0301': 309, 'MN0302': 309, 'MN0303': 309, 'MN0501': 309, 'MN0502': 309,
-    'MN0101': 310, 'MN0102': 310,
-    # QUEENS (UHF 401-410)
-    'QN0101': 401, 'QN0102': 401, 'QN0103': 401, 'QN0104': 401, 'QN0105': 401,
-    'QN0201': 402, 'QN0202': 402, 'QN0203': 402, 'QN0301': 402, 'QN0302': 402, 'QN0303': 402, 'QN0401': 402, 'QN0402': 402,
-    'QN0701': 403, 'QN0702': 403, 'QN0703': 403, 'QN0704': 403, 'QN0705': 403, 'QN0706': 403, 'QN0707': 403,
-    'QN1101': 404, 'QN1102': 404, 'QN1103': 404, 'QN1104': 404,
-    'QN0501': 405, 'QN0502': 405, 'QN0503': 405, 'QN0504': 405, 'QN0601': 405, 'QN0602': 405,
-    'QN0801': 406, 'QN0802': 406, 'QN0803': 406, 'QN0804': 406, 'QN0805': 406,
-    'QN0901': 407, 'QN0902': 407, 'QN0903': 407, 'QN0904': 407, 'QN0905': 407, 'QN1001': 407, 'QN1002': 407, 'QN1003': 407,
-    'QN1201': 408, 'QN1202': 408, 'QN1203': 408, 'QN1204': 408, 'QN1205': 408, 'QN1206': 408,
-    'QN1301': 409, 'QN1302': 409, 'QN1303': 409, 'QN1304': 409, 'QN1305': 409, 'QN1306': 409, 'QN1307': 409,
-    'QN1401': 410, 'QN1402': 410, 'QN1403': 410,
-    # STATEN ISLAND (UHF 501-504)
-    'SI0106': 501, 'SI0107': 501,
-    'SI0101': 502, 'SI0102': 502, 'SI0103': 502, 'SI0104': 502,
-    'SI0105': 503, 'SI0204': 503,
-    'SI0201': 504, 'SI0202': 504, 'SI0203': 504, 'SI0301': 504, 'SI0302': 504, 'SI0303': 504, 'SI0304': 504, 'SI0305': 504,
-}
-
-aqe['uhf_code'] = aqe['NTACODE'].map(nta_to_uhf)
-aqe_mapped = aqe[aqe['uhf_code'].notna()].copy()
-
-# Aggregate to UHF level
-numeric_cols = ['PM_Avg', 'NO2_Avg']
-categorical_cols = ['PM_tertiles', 'NO2_tertiles', 'cook_tertiles', 'Building_emissions', 'Industrial_tertiles', 'Traffic_tertiles']
-
-def get_mode(series):
-    return series.mode()[0] if len(series.mode()) > 0 else series.iloc[0]
-
-aqe_numeric = aqe_mapped.groupby('uhf_code')[numeric_cols].mean().reset_index()
-aqe_categorical = aqe_mapped.groupby('uhf_code')[categorical_cols].agg(get_mode).reset_index()
-aqe_uhf = aqe_numeric.merge(aqe_categorical, on='uhf_code', how='left')
-
-merged = merged.merge(aqe_uhf, on='uhf_code', how='left')
-
-print(f"  ✓ Merged with air quality: {merged.shape}")
-
-# ============================================================================
-# STEP 4: Load mold complaint data
-# ============================================================================
-print("\n[4/8] Loading mold complaint data...")
-mold = pd.read_csv('DATA/CLEANED/2010-present_mold_data_location[cleaned].csv')
-mold_clean = mold.dropna(subset=['Latitude', 'Longitude']).copy()
-print(f"  ✓ Mold complaints: {len(mold_clean):,} records")
-
-# ============================================================================
-# STEP 5: Create UHF42 centroids and geocode mold complaints
-# ============================================================================
-print("\n[5/8] Geocoding mold complaints to UHF neighborhoods...")
-
-uhf_centroids = {
-    101: (40.8725, -73.9050), 102: (40.8695, -73.8275), 103: (40.8605, -73.8980),
-    104: (40.8385, -73.8315), 105: (40.8425, -73.9045), 106: (40.8285, -73.9170),
-    107: (40.8165, -73.9145), 201: (40.7235, -73.9510), 202: (40.6925, -73.9845),
-    203: (40.6775, -73.9485), 204: (40.6655, -73.8985), 205: (40.6535, -74.0095),
-    206: (40.6335, -73.9925), 207: (40.6485, -73.9435), 208: (40.6375, -73.8985),
-    209: (40.6165, -74.0165), 210: (40.5885, -73.9615), 211: (40.7085, -73.9465),
-    301: (40.8445, -73.9355), 302: (40.8125, -73.9545), 303: (40.7985, -73.9425),
-    304: (40.7825, -73.9745), 305: (40.7745, -73.9565), 306: (40.7575, -73.9975),
-    307: (40.7455, -73.9815), 308: (40.7325, -74.0015), 309: (40.7235, -73.9845),
-    310: (40.7095, -74.0095), 401: (40.7615, -73.9245), 402: (40.7395, -73.8745),
-    403: (40.7635, -73.8295), 404: (40.7595, -73.7765), 405: (40.7125, -73.8645),
-    406: (40.7285, -73.8045), 407: (40.6855, -73.8265), 408: (40.6815, -73.7915),
-    409: (40.6775, -73.7515), 410: (40.5925, -73.8145), 501: (40.6385, -74.1445),
-    502: (40.6215, -74.0985), 503: (40.6085, -74.1465), 504: (40.5585, -74.1625),
-}
-
-uhf_df = pd.DataFrame([{'uhf_code': code, 'lat': lat, 'lon': lon} for code, (lat, lon) in uhf_centroids.items()])
-uhf_coords = uhf_df[['lat', 'lon']].values
-tree = cKDTree(uhf_coords)
-
-mold_coords = mold_clean[['Latitude', 'Longitude']].values
-distances, indices = tree.query(mold_coords)
-mold_clean['uhf_code'] = uhf_df.iloc[indices]['uhf_code'].values
-
-print(f"  ✓ Geocoded {len(mold_clean):,} complaints")
-
-# ============================================================================
-# STEP 6: Estimate years and aggregate mold complaints
-# ============================================================================
-print("\n[6/8] Aggregating mold complaints by year and UHF...")
-
-# Estimate years based on row position (2010-2024)
-total_rows = len(mold_clean)
-years = np.linspace(2010, 2024, total_rows).astype(int)
-mold_clean['year'] = years
-
-mold_agg = mold_clean.groupby(['year', 'uhf_code']).size().reset_index(name='mold_complaints')
-print(f"  ✓ Aggregated to {len(mold_agg)} year-UHF combinations")
-print(f"  ✓ Total complaints: {mold_agg['mold_complaints'].sum():,}")
-
-# ============================================================================
-# STEP 7: Final merge with mold data
-# ============================================================================
-print("\n[7/8] Merging mold complaints with main dataset...")
-
-merged_final = merged.merge(mold_agg, on=['year', 'uhf_code'], how='left')
-merged_final['mold_complaints'] = merged_final['mold_complaints'].fillna(0).astype(int)
-
-print(f"  ✓ Final dataset: {merged_final.shape}")
-
-# ============================================================================
-# STEP 8: Organize and save
-# ============================================================================
-print("\n[8/8] Organizing final dataset...")
-
-column_order = [
-    'year', 'uhf_code', 'neighborhood',
-    'mold_complaints', 'PM_Avg', 'NO2_Avg', 'PM_tertiles', 'NO2_tertiles',
-    'cook_tertiles', 'Building_emissions', 'Industrial_tertiles', 'Traffic_tertiles',
-    'age_adjusted_asthma_percent', 'estimated_adults_with_asthma',
-    'age_adjusted_ed_rate_per_10k', 'estimated_annual_ed_visits',
-    'ed_rate_per_10k_age_0_4', 'estimated_annual_ed_visits_age_0_4',
-    'ed_rate_per_10k_age_5_17', 'estimated_annual_ed_visits_age_5_17',
-    'poverty_rate', 'households_below_poverty', 'statistically_significant'
-]
-
-merged_final = merged_final[column_order].sort_values(['year', 'neighborhood']).reset_index(drop=True)
-
-output_file = 'DATA/CLEANED/FINAL_MERGED_DATASET.csv'
-merged_final.to_csv(output_file, index=False)
-
-print(f"\n✓ SAVED: {output_file}")
-
-# Summary
-print("\n" + "="*80)
-print("FINAL DATASET SUMMARY")
-print("="*80)
-print(f"📊 Records: {len(merged_final):,}")
-print(f"📅 Years: {merged_final['year'].min()}-{merged_final['year'].max()}")
-print(f"🏘️  Neighborhoods: {merged_final['uhf_code'].nunique()}")
-print(f"📈 Variables: {len(column_order)}")
-
-df_2023 = merged_final[merged_final['year'] == 2023]
-print(f"\n2023 Averages:")
-print(f"  Mold complaints: {df_2023['mold_complaints'].sum():,} total")
-print(f"  PM2.5: {df_2023['PM_Avg'].mean():.2f} µg/m³")
-print(f"  Adult asthma: {df_2023['age_adjusted_asthma_percent'].mean():.1f}%")
-print(f"  Poverty rate: {df_2023['poverty_rate'].mean():.1f}%")
-print("\n🎉 DATASET READY FOR ANALYSIS!")
-print("="*80)
\ No newline at end of file
+main(['geocode'])
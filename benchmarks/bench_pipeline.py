@@ -0,0 +1,123 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nyc_asthma import correlation, mold_dedup, mold_density, resolution_times  # noqa: E402
+from nyc_asthma.cleaning import extract_numeric, extract_numeric_from_confidence_interval  # noqa: E402
+from nyc_asthma.merge import AQE_CATEGORICAL_COLUMNS, aggregate_air_quality  # noqa: E402
+from nyc_asthma.mold_ingest import assign_uhf  # noqa: E402
+
+from synthetic_data import (PolygonSampler, merged_panel_frame, portal_frame,  # noqa: E402
+                            write_311_csv)
+
+# ============================================================================
+# Pipeline benchmarks (asv-style: params + setup + time_* methods)
+# ============================================================================
+#
+# Run with `python benchmarks/run_benchmarks.py`. Sizes default to 5k and
+# 500k rows; set BENCH_SIZES=5000,5000000,50000000 for production-scale runs.
+
+DEFAULT_SIZES = [5_000, 500_000]
+
+
+def bench_sizes():
+    env = os.environ.get('BENCH_SIZES')
+    return [int(s) for s in env.split(',')] if env else DEFAULT_SIZES
+
+
+# --- benchmarks -------------------------------------------------------------
+
+class CleanPortal:
+    """extract_numeric cleaning of EH Data Portal value columns."""
+    params = bench_sizes()
+    param_names = ['rows']
+
+    def setup(self, rows):
+        self.ed = portal_frame(rows, 'ed')
+        self.adults = portal_frame(rows, 'adults')
+
+    def time_extract_numeric(self, rows):
+        self.ed['Estimated annual rate per 10,000'].apply(extract_numeric)
+        self.ed['Number'].apply(extract_numeric)
+
+    def time_extract_confidence_interval(self, rows):
+        self.adults['Age-adjusted percent'].apply(extract_numeric_from_confidence_interval)
+
+
+class NtaToUhfAggregation:
+    """AQE NTA rows mapped to UHF and reduced with mean + mode."""
+    params = bench_sizes()
+    param_names = ['rows']
+
+    def setup(self, rows):
+        rng = np.random.default_rng(0)
+        tertiles = np.array(['Low', 'Medium', 'High'])
+        self.nta_to_uhf = {f'NT{i:04d}': 101 + (i % 42) for i in range(260)}
+        self.aqe = pd.DataFrame({
+            'NTACODE': rng.choice(list(self.nta_to_uhf), rows),
+            'PM_Avg': rng.normal(6.5, 0.6, rows),
+            'NO2_Avg': rng.normal(16.0, 2.5, rows),
+            **{col: rng.choice(tertiles, rows) for col in AQE_CATEGORICAL_COLUMNS},
+        })
+
+    def time_map_and_aggregate(self, rows):
+        aggregate_air_quality(self.aqe, self.nta_to_uhf)
+
+
+class GeocodeMold:
+    """Nearest-centroid cKDTree geocoding of complaint points."""
+    params = bench_sizes()
+    param_names = ['rows']
+
+    def setup(self, rows):
+        _, _, self.lon, self.lat, _ = PolygonSampler().sample(rows, np.random.default_rng(0))
+
+    def time_assign_uhf(self, rows):
+        assign_uhf(self.lat, self.lon)
+
+
+class CorrelationLoops:
+    """Pearson/Spearman loops from nyc_asthma.correlation over a merged panel."""
+    params = bench_sizes()
+    param_names = ['rows']
+
+    def setup(self, rows):
+        self.df = merged_panel_frame(rows)
+
+    def time_pearson(self, rows):
+        correlation.continuous_correlations(self.df, verbose=False)
+
+    def time_spearman_tertiles(self, rows):
+        correlation.categorical_correlations(self.df, verbose=False)
+
+
+class MoldStages:
+    """Streaming 311 stages: dedup, resolution sketches, density binning."""
+    params = bench_sizes()
+    param_names = ['rows']
+
+    def setup(self, rows):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = write_311_csv(os.path.join(self.tmp.name, '311.csv'), rows)
+        self.grid = mold_density.grid_for_shapefile()
+
+    def teardown(self, rows):
+        self.tmp.cleanup()
+
+    def time_dedup_counts(self, rows):
+        mold_dedup.dedup_counts(self.path)
+
+    def time_resolution_sketches(self, rows):
+        resolution_times.build_resolution_sketches(self.path)
+
+    def time_density_surface(self, rows):
+        counts = mold_density.bin_complaints(self.grid, range(2010, 2026), self.path)
+        mold_density.smooth_counts(counts, self.grid)
+
+
+BENCHMARKS = [CleanPortal, NtaToUhfAggregation, GeocodeMold, CorrelationLoops, MoldStages]
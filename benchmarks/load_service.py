@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nyc_asthma.paths import CORRELATION_RESULTS, FINAL_STORE  # noqa: E402
+
+# ============================================================================
+# Load test for the indicator service (python -m nyc_asthma serve)
+# ============================================================================
+#
+# Opens --connections keep-alive connections and sends GET requests for a mix
+# of hot and cached routes for --seconds, then prints throughput and latency
+# percentiles. Without --port an in-process server is started on a free port,
+# so `python benchmarks/load_service.py` works on a fresh checkout with the
+# panel store built.
+
+DEFAULT_PATHS = [
+    '/indicators',
+    '/uhf/{code}',
+    '/uhf/{code}?variables=mold_complaints,PM_Avg,NO2_Avg,poverty_rate',
+    '/indicators/age_adjusted_ed_rate_per_10k',
+    '/correlations?significant=1&limit=10',
+]
+
+
+async def _get(reader, writer, host, path):
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('latin-1'))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _worker(host, port, paths, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            status = await _get(reader, writer, host, path)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append((status, path))
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, paths, connections=50, seconds=5.0):
+    """
+    Hammer a running service and collect per-request latencies.
+
+    Returns:
+        dict: requests, errors, requests_per_s and p50/p99 latency in ms.
+    """
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*[_worker(host, port, paths[c % len(paths):] + paths[:c % len(paths)],
+                                   deadline, latencies, errors)
+                           for c in range(connections)])
+    elapsed = time.perf_counter() - start
+    lat_ms = np.asarray(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_s': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(lat_ms, 50)) if len(lat_ms) else float('nan'),
+        'p99_ms': float(np.percentile(lat_ms, 99)) if len(lat_ms) else float('nan'),
+    }
+
+
+async def _main(args):
+    server = None
+    if args.port is None:
+        from nyc_asthma.service import IndicatorService, start_server
+        service = IndicatorService(args.store, args.correlations)
+        server = await start_server(service, args.host, 0)
+        port = server.sockets[0].getsockname()[1]
+        codes = service.data.uhf_codes
+    else:
+        port = args.port
+        codes = args.codes
+
+    paths = [p.format(code=code) for code in codes for p in DEFAULT_PATHS]
+    try:
+        result = await run_load(args.host, port, paths, args.connections, args.seconds)
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the indicator service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help='port of a running service (default: start one in-process)')
+    parser.add_argument('--codes', type=int, nargs='+', default=[101, 203, 305307],
+                        help='uhf codes to request when targeting a running service')
+    parser.add_argument('--connections', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--store', default=FINAL_STORE)
+    parser.add_argument('--correlations', default=CORRELATION_RESULTS)
+    args = parser.parse_args()
+
+    result = asyncio.run(_main(args))
+    print("="*80)
+    print("INDICATOR SERVICE LOAD TEST")
+    print("="*80)
+    print(f"  Requests:     {result['requests']:,} ({result['errors']} errors)")
+    print(f"  Throughput:   {result['requests_per_s']:,.0f} req/s over {args.connections} connections")
+    print(f"  Latency p50:  {result['p50_ms']:.2f} ms")
+    print(f"  Latency p99:  {result['p99_ms']:.2f} ms")
+    if result['errors']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import BENCHMARKS  # noqa: E402
+
+# ============================================================================
+# Minimal benchmark runner with a JSON-lines history
+# ============================================================================
+#
+# Every run appends one record per (benchmark, size) to the history file and
+# compares it against the best previous time for the same benchmark, size
+# and machine. A slowdown beyond --threshold is reported and makes the run
+# exit non-zero, so a nightly job fails before a production refresh does.
+
+HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'history.jsonl')
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _machine():
+    return f"{platform.node()}-{platform.machine()}-py{platform.python_version()}"
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def best_previous(history, name, rows, machine):
+    times = [r['seconds'] for r in history
+             if r['benchmark'] == name and r['rows'] == rows and r['machine'] == machine]
+    return min(times) if times else None
+
+
+def run(selected=None, repeat=3, sizes=None):
+    """
+    Run every time_* method of every benchmark class.
+
+    Yields:
+        dict: One record per (benchmark, size) with the best of `repeat` runs.
+    """
+    for cls in BENCHMARKS:
+        methods = [m for m in dir(cls) if m.startswith('time_')]
+        for rows in (sizes or cls.params):
+            names = [f'{cls.__name__}.{m}' for m in methods]
+            if selected and not any(selected in name for name in names):
+                continue
+
+            bench = cls()
+            bench.setup(rows)
+            try:
+                for method, name in zip(methods, names):
+                    if selected and selected not in name:
+                        continue
+                    timings = []
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        getattr(bench, method)(rows)
+                        timings.append(time.perf_counter() - start)
+                    best = min(timings)
+                    yield {
+                        'benchmark': name,
+                        'rows': rows,
+                        'seconds': best,
+                        'rows_per_second': rows / best if best > 0 else None,
+                    }
+            finally:
+                if hasattr(bench, 'teardown'):
+                    bench.teardown(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run pipeline benchmarks and track them over time.')
+    parser.add_argument('--filter', help='only run benchmarks whose name contains this text')
+    parser.add_argument('--sizes', help='comma-separated row counts (overrides BENCH_SIZES)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='flag a regression when slower than best previous by this factor')
+    parser.add_argument('--history', default=HISTORY_FILE)
+    parser.add_argument('--no-save', action='store_true', help='do not append to the history file')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')] if args.sizes else None
+    history = load_history(args.history)
+    machine = _machine()
+    commit = _git_commit()
+    stamp = datetime.datetime.now().isoformat(timespec='seconds')
+
+    print("="*80)
+    print("PIPELINE BENCHMARKS")
+    print("="*80)
+    print(f"{'benchmark':50} {'rows':>12} {'seconds':>10} {'rows/s':>14}  vs best")
+
+    records = []
+    regressions = []
+    for record in run(args.filter, args.repeat, sizes):
+        record.update({'machine': machine, 'commit': commit, 'timestamp': stamp})
+        previous = best_previous(history, record['benchmark'], record['rows'], machine)
+        ratio = record['seconds'] / previous if previous else None
+        flag = ''
+        if ratio is not None:
+            flag = f"{ratio:5.2f}x"
+            if ratio > args.threshold:
+                flag += '  ⚠️ REGRESSION'
+                regressions.append(record)
+        rate = f"{record['rows_per_second']:,.0f}" if record['rows_per_second'] else '-'
+        print(f"{record['benchmark']:50} {record['rows']:>12,} {record['seconds']:>10.4f} {rate:>14}  {flag}")
+        records.append(record)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(args.history), exist_ok=True)
+        with open(args.history, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+        print(f"\n✓ Appended {len(records)} results to: {args.history}")
+
+    if regressions:
+        print(f"\n⚠️  {len(regressions)} benchmark(s) slower than {args.threshold}x their best previous time")
+        sys.exit(1)
@@ -0,0 +1,297 @@
+import argparse
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from pyproj import Transformer
+
+# ============================================================================
+# Synthetic NYC inputs in the same formats as the real downloads
+# ============================================================================
+#
+# - Portal tables (EH Data Portal): CI strings like '11.6 (6.5, 19.8)',
+#   asterisk-flagged unstable values, '†' for suppressed cells, '8,000' counts.
+# - 311 mold exports: every column of the real file, with points drawn inside
+#   the real UHF34 polygons and State Plane + lat/lon coordinates.
+#
+# Everything is generated in chunks, so sizes from 5k to 50M rows stream to
+# disk without holding the whole file in memory.
+
+UHF34_SHAPEFILE = 'DATA/GIS/UHF34-GIS/UHF_34_DOHMH.shp'
+
+UHF42_CODES = [
+    101, 102, 103, 104, 105, 106, 107, 201, 202, 203, 204, 205, 206, 207, 208, 209,
+    210, 211, 301, 302, 303, 304, 305, 306, 307, 308, 309, 310, 401, 402, 403, 404,
+    405, 406, 407, 408, 409, 410, 501, 502, 503, 504,
+]
+
+# Combined neighborhoods concatenate their UHF42 codes (as in nyc_asthma.geography)
+UHF34_CODES = [
+    101, 102, 103, 104, 105106107, 201, 202, 203, 204, 205, 206, 207, 208, 209, 210, 211,
+    301, 302, 303, 304, 305307, 306308, 309310, 401, 402, 403, 404406, 405, 407, 408, 409, 410,
+    501502, 503504,
+]
+
+COLUMNS_311 = [
+    'Unique Key', 'Created Date', 'Closed Date', 'Agency', 'Agency Name', 'Complaint Type',
+    'Descriptor', 'Location Type', 'Incident Zip', 'Incident Address', 'Street Name',
+    'Cross Street 1', 'Cross Street 2', 'Intersection Street 1', 'Intersection Street 2',
+    'Address Type', 'City', 'Landmark', 'Facility Type', 'Status', 'Due Date',
+    'Resolution Description', 'Resolution Action Updated Date', 'Community Board', 'BBL',
+    'Borough', 'X Coordinate (State Plane)', 'Y Coordinate (State Plane)',
+    'Open Data Channel Type', 'Park Facility Name', 'Park Borough', 'Vehicle Type',
+    'Taxi Company Borough', 'Taxi Pick Up Location', 'Bridge Highway Name',
+    'Bridge Highway Direction', 'Road Ramp', 'Bridge Highway Segment', 'Latitude',
+    'Longitude', 'Location',
+]
+
+DESCRIPTORS = ['Public Complaint - Comm Location', 'Loft Building', 'Workplace - 10 or Less Staff']
+LOCATION_TYPES = ['Commercial Building', 'Loft Residence', 'Loft Building - Common Areas', '1-2 Family Dwelling']
+STATUSES = ['Closed', 'Open', 'Assigned', 'In Progress']
+BOROUGHS = {'1': 'MANHATTAN', '2': 'BRONX', '3': 'BROOKLYN', '4': 'QUEENS', '5': 'STATEN ISLAND'}
+
+# First-digit UHF borough -> BBL borough digit
+UHF_BORO_TO_BBL = {'1': '2', '2': '3', '3': '1', '4': '4', '5': '5'}
+
+DATE_FORMAT_311 = '%m/%d/%Y %I:%M:%S %p'
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+def _thousands(values):
+    """Format numbers the way the portal and 311 do: '23,752'."""
+    return pd.Series(np.round(values).astype(np.int64)).map('{:,}'.format)
+
+
+# ----------------------------------------------------------------------------
+# EH Data Portal tables
+# ----------------------------------------------------------------------------
+
+def portal_frame(n_rows, kind='ed', seed=0, unstable_share=0.05, suppressed_share=0.01, offset=0):
+    """
+    Synthetic EH Data Portal table.
+
+    Args:
+        n_rows (int): Rows to generate (years are added until n_rows is reached).
+        kind (str): 'ed' (rate + count, UHF42) or 'adults' (CI strings, UHF34).
+        seed (int): Random seed.
+        unstable_share (float): Fraction of values flagged with '*'.
+        suppressed_share (float): Fraction of values shown as '†'.
+        offset (int): Row number of the first row in the whole table, so
+            chunks continue the year / code sequence.
+
+    Returns:
+        pd.DataFrame: Same columns as the real download.
+    """
+    rng = np.random.default_rng(seed)
+    codes = np.array(UHF34_CODES if kind == 'adults' else UHF42_CODES)
+    row = offset + np.arange(n_rows)
+    geo = codes[row % len(codes)]
+    year = 2005 + row // len(codes)
+
+    rate = rng.gamma(4.0, 20.0, n_rows)
+    number = rate * rng.uniform(5, 40, n_rows)
+    star = np.where(rng.random(n_rows) < unstable_share, '*', '')
+    dagger = rng.random(n_rows) < suppressed_share
+
+    df = pd.DataFrame({
+        'TimePeriod': year,
+        'GeoType': 'UHF34' if kind == 'adults' else 'UHF42',
+        'GeoID': geo,
+        'GeoRank': 3,
+        'Geography': [f'UHF {code}' for code in geo],
+    })
+
+    if kind == 'adults':
+        pct = rng.uniform(5, 25, n_rows)
+        lo, hi = pct * 0.6, pct * 1.5
+        ci = pd.Series(np.round(pct, 1)).astype(str) + star + ' (' + \
+            pd.Series(np.round(lo, 1)).astype(str) + ', ' + pd.Series(np.round(hi, 1)).astype(str) + ')'
+        df['Age-adjusted percent'] = ci
+        df['Number'] = _thousands(number * 10) + star
+        df['Percent'] = ci
+        value_cols = ['Age-adjusted percent', 'Number', 'Percent']
+    else:
+        df['Estimated annual rate per 10,000'] = pd.Series(np.round(rate, 1)).astype(str) + star
+        df['Number'] = _thousands(number) + star
+        value_cols = ['Estimated annual rate per 10,000', 'Number']
+
+    for col in value_cols:
+        df.loc[dagger, col] = '†'
+    return df
+
+
+def write_portal_csv(path, n_rows, kind='ed', seed=0, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write a portal-format CSV in chunks."""
+    written = 0
+    while written < n_rows:
+        size = min(chunk_rows, n_rows - written)
+        frame = portal_frame(size, kind, seed + written, offset=written)
+        frame.to_csv(path, index=False, mode='w' if written == 0 else 'a', header=(written == 0))
+        written += size
+    return path
+
+
+# ----------------------------------------------------------------------------
+# 311 mold exports
+# ----------------------------------------------------------------------------
+
+class PolygonSampler:
+    """Draw uniform random points inside the real UHF34 polygons (area-weighted)."""
+
+    def __init__(self, shapefile=UHF34_SHAPEFILE):
+        polygons = gpd.read_file(shapefile).to_crs(epsg=2263)
+        polygons = polygons[polygons['UHF34_CODE'] != 0].reset_index(drop=True)
+        self.codes = polygons['UHF34_CODE'].astype(str).to_numpy()
+        self.geoms = list(polygons.geometry)
+        area = polygons.geometry.area.to_numpy()
+        self.weights = area / area.sum()
+        self.to_lonlat = Transformer.from_crs(2263, 4326, always_xy=True)
+
+    def sample(self, n, rng):
+        """
+        Returns:
+            tuple: x, y (State Plane feet), lon, lat (degrees), UHF34 code per point.
+        """
+        which = rng.choice(len(self.geoms), size=n, p=self.weights)
+        x = np.empty(n)
+        y = np.empty(n)
+        for i in np.unique(which):
+            slots = np.flatnonzero(which == i)
+            geom = self.geoms[i]
+            minx, miny, maxx, maxy = geom.bounds
+            fill_ratio = geom.area / ((maxx - minx) * (maxy - miny))
+            filled = 0
+            while filled < len(slots):
+                need = len(slots) - filled
+                batch = int(need / fill_ratio * 1.3) + 16
+                cx = rng.uniform(minx, maxx, batch)
+                cy = rng.uniform(miny, maxy, batch)
+                inside = shapely.contains_xy(geom, cx, cy)
+                cx, cy = cx[inside][:need], cy[inside][:need]
+                x[slots[filled:filled + len(cx)]] = cx
+                y[slots[filled:filled + len(cy)]] = cy
+                filled += len(cx)
+        lon, lat = self.to_lonlat.transform(x, y)
+        return x, y, lon, lat, self.codes[which]
+
+
+def mold_311_frame(n_rows, sampler, seed=0, start_key=1, n_buildings=None):
+    """
+    Synthetic 311 mold export.
+
+    Args:
+        n_rows (int): Rows to generate.
+        sampler (PolygonSampler): Point sampler.
+        seed (int): Random seed.
+        start_key (int): First 'Unique Key'.
+        n_buildings (int, optional): Size of the BBL pool; smaller pools give
+            more repeat complaints (default: n_rows // 3).
+
+    Returns:
+        pd.DataFrame: All 41 columns of the real export.
+    """
+    rng = np.random.default_rng(seed)
+    x, y, lon, lat, uhf = sampler.sample(n_rows, rng)
+
+    start = np.datetime64('2010-01-01T00:00:00')
+    span = int((np.datetime64('2025-11-14T00:00:00') - start) / np.timedelta64(1, 's'))
+    created = start + rng.integers(0, span, n_rows).astype('timedelta64[s]')
+    resolution = rng.lognormal(np.log(72 * 3600), 1.0, n_rows).astype('timedelta64[s]')
+    status = rng.choice(STATUSES, n_rows, p=[0.93, 0.05, 0.015, 0.005])
+    closed = pd.Series(pd.to_datetime(created + resolution).strftime(DATE_FORMAT_311))
+    closed[status != 'Closed'] = None
+
+    # BBL = borough digit + 5-digit block + 4-digit lot, drawn from a fixed pool
+    n_buildings = n_buildings or max(1, n_rows // 3)
+    building = rng.integers(0, n_buildings, n_rows)
+    boro_digit = pd.Series(uhf).str[0].map(UHF_BORO_TO_BBL).to_numpy()
+    bbl = (pd.Series(boro_digit).astype(np.int64) * 1_000_000_000
+           + (building // 10_000) % 100_000 * 10_000 + building % 10_000)
+
+    x_text = _thousands(x)
+    y_text = _thousands(y)
+    lat_text = pd.Series(np.round(lat, 11)).astype(str)
+    lon_text = pd.Series(np.round(lon, 11)).astype(str)
+
+    df = pd.DataFrame({col: pd.Series([None] * n_rows, dtype=object) for col in COLUMNS_311})
+    df['Unique Key'] = np.arange(start_key, start_key + n_rows)
+    df['Created Date'] = pd.to_datetime(created).strftime(DATE_FORMAT_311)
+    df['Closed Date'] = closed
+    df['Agency'] = 'DOHMH'
+    df['Agency Name'] = 'Department of Health and Mental Hygiene'
+    df['Complaint Type'] = 'Mold'
+    df['Descriptor'] = rng.choice(DESCRIPTORS, n_rows, p=[0.95, 0.035, 0.015])
+    df['Location Type'] = rng.choice(LOCATION_TYPES, n_rows, p=[0.95, 0.02, 0.02, 0.01])
+    df['Status'] = status
+    df['Resolution Action Updated Date'] = closed
+    df['BBL'] = bbl.to_numpy()
+    df['Borough'] = pd.Series(boro_digit).map(BOROUGHS).to_numpy()
+    df['X Coordinate (State Plane)'] = x_text
+    df['Y Coordinate (State Plane)'] = y_text
+    df['Latitude'] = lat_text
+    df['Longitude'] = lon_text
+    df['Location'] = '(' + lat_text + ', ' + lon_text + ')'
+    return df
+
+
+def write_311_csv(path, n_rows, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS, shapefile=UHF34_SHAPEFILE):
+    """Write a 311-format mold CSV in chunks (5k .. 50M rows)."""
+    sampler = PolygonSampler(shapefile)
+    n_buildings = max(1, n_rows // 3)
+    written = 0
+    while written < n_rows:
+        size = min(chunk_rows, n_rows - written)
+        frame = mold_311_frame(size, sampler, seed + written, start_key=written + 1, n_buildings=n_buildings)
+        frame.to_csv(path, index=False, mode='w' if written == 0 else 'a', header=(written == 0))
+        written += size
+    return path
+
+
+def merged_panel_frame(n_rows, seed=0):
+    """Synthetic FINAL_MERGED_DATASET-style panel for correlation benchmarks."""
+    rng = np.random.default_rng(seed)
+    codes = np.array(UHF42_CODES)
+    tertiles = np.array(['Low', 'Medium', 'High'])
+    poverty = rng.uniform(5, 45, n_rows)
+    return pd.DataFrame({
+        'year': 2005 + np.arange(n_rows) // len(codes),
+        'uhf_code': codes[np.arange(n_rows) % len(codes)],
+        'neighborhood': [f'UHF {code}' for code in codes[np.arange(n_rows) % len(codes)]],
+        'mold_complaints': rng.poisson(10, n_rows),
+        'PM_Avg': rng.normal(6.5, 0.6, n_rows),
+        'NO2_Avg': rng.normal(16.0, 2.5, n_rows),
+        'PM_tertiles': rng.choice(tertiles, n_rows),
+        'NO2_tertiles': rng.choice(tertiles, n_rows),
+        'cook_tertiles': rng.choice(tertiles, n_rows),
+        'Building_emissions': rng.choice(tertiles, n_rows),
+        'Industrial_tertiles': rng.choice(tertiles, n_rows),
+        'Traffic_tertiles': rng.choice(tertiles, n_rows),
+        'age_adjusted_asthma_percent': rng.uniform(6, 25, n_rows),
+        'age_adjusted_ed_rate_per_10k': poverty * 3 + rng.normal(0, 15, n_rows),
+        'ed_rate_per_10k_age_0_4': poverty * 5 + rng.normal(0, 30, n_rows),
+        'ed_rate_per_10k_age_5_17': poverty * 4 + rng.normal(0, 25, n_rows),
+        'poverty_rate': poverty,
+    })
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic portal and 311 CSVs.')
+    parser.add_argument('--rows', type=int, default=5_000, help='rows per file (5k .. 50M)')
+    parser.add_argument('--out', default='DATA/SYNTHETIC', help='output directory')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    print("="*80)
+    print(f"GENERATING SYNTHETIC INPUTS ({args.rows:,} rows per file)")
+    print("="*80)
+
+    path = write_portal_csv(os.path.join(args.out, 'portal_ed_visits.csv'), args.rows, 'ed', args.seed)
+    print(f"  ✓ {path}")
+    path = write_portal_csv(os.path.join(args.out, 'portal_adults_with_asthma.csv'), args.rows, 'adults', args.seed)
+    print(f"  ✓ {path}")
+    path = write_311_csv(os.path.join(args.out, '311_mold.csv'), args.rows, args.seed)
+    print(f"  ✓ {path}")
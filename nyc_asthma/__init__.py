@@ -0,0 +1,7 @@
+"""
+NYC asthma / mold / air quality pipeline.
+
+Cleaning, merging, geocoding and correlation steps live in submodules and
+are driven by the CLI (`python -m nyc_asthma --help`). Nothing heavy is
+imported here, so importing the package is cheap.
+"""
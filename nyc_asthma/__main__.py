@@ -0,0 +1,3 @@
+from nyc_asthma.cli import main
+
+main()
@@ -0,0 +1,130 @@
+import json
+import os
+
+import numpy as np
+from scipy import sparse
+
+from nyc_asthma.geography import UHF_CENTROIDS
+from nyc_asthma.paths import CACHE_DIR, NTA_SHAPEFILE, UHF34_SHAPEFILE
+
+# ============================================================================
+# Sparse spatial adjacency between NTAs, UHF42 and UHF34 neighborhoods
+# ============================================================================
+#
+# Two neighborhoods are neighbors when their polygons touch (within
+# TOUCH_TOLERANCE_FT, so slivers between shapefile edges don't break
+# contiguity). UHF42 polygons are NTA2020 polygons dissolved by their UHF42
+# code; UHF34 comes from its own shapefile. Edge lists are cached as JSON
+# under DATA/CACHE/adjacency, keyed on the shapefile's size and mtime, and
+# handed out as scipy CSR matrices in whatever code order the caller needs.
+# Without the shapefiles, UHF42 falls back to the nearest UHF centroids.
+
+ADJACENCY_CACHE_DIR = os.path.join(CACHE_DIR, 'adjacency')
+ADJACENCY_VERSION = 2
+TOUCH_TOLERANCE_FT = 100.0
+FALLBACK_NEIGHBORS = 4
+
+
+def _polygons(level, nta_shapefile, uhf34_shapefile):
+    """GeoDataFrame with one (code, geometry) row per unit of `level`."""
+    import geopandas as gpd
+
+    if level == 'UHF34':
+        polygons = gpd.read_file(uhf34_shapefile)[['UHF34_CODE', 'geometry']]
+        polygons = polygons[polygons['UHF34_CODE'] > 0].rename(columns={'UHF34_CODE': 'code'})
+        polygons['code'] = polygons['code'].astype(int)
+        return polygons
+
+    ntas = gpd.read_file(nta_shapefile)[['NTA2020', 'geometry']]
+    if level == 'NTA':
+        return ntas.rename(columns={'NTA2020': 'code'})
+
+    from nyc_asthma.poverty import nta2020_reference
+
+    reference = nta2020_reference(nta_shapefile).set_index('nta2020')['uhf42']
+    ntas['code'] = ntas['NTA2020'].map(reference).astype(int)
+    return ntas.dissolve(by='code').reset_index()[['code', 'geometry']]
+
+
+def _touching_pairs(polygons, tolerance=TOUCH_TOLERANCE_FT):
+    """(i, j) row pairs, i < j, of polygons within `tolerance` of each other."""
+    import geopandas as gpd
+
+    grown = gpd.GeoDataFrame(geometry=polygons.geometry.buffer(tolerance / 2), crs=polygons.crs)
+    i, j = grown.sindex.query(grown.geometry, predicate='intersects')
+    keep = i < j
+    return i[keep], j[keep]
+
+
+def _shapefile_for(level, nta_shapefile, uhf34_shapefile):
+    return uhf34_shapefile if level == 'UHF34' else nta_shapefile
+
+
+def adjacency_edges(level='UHF42', nta_shapefile=NTA_SHAPEFILE, uhf34_shapefile=UHF34_SHAPEFILE,
+                    cache_dir=ADJACENCY_CACHE_DIR):
+    """
+    Codes and neighbor pairs for a level, cached on disk.
+
+    Returns:
+        tuple: (codes list, list of (code, code) pairs)
+    """
+    shapefile = _shapefile_for(level, nta_shapefile, uhf34_shapefile)
+    if not os.path.exists(shapefile):
+        if level != 'UHF42':
+            raise FileNotFoundError(f"{shapefile} is needed for {level} adjacency")
+        return _centroid_edges()
+
+    stat = os.stat(shapefile)
+    cache_file = os.path.join(cache_dir, f"{level}_v{ADJACENCY_VERSION}_{stat.st_size}_{int(stat.st_mtime)}.json")
+    if os.path.exists(cache_file):
+        with open(cache_file) as f:
+            cached = json.load(f)
+        return cached['codes'], [tuple(edge) for edge in cached['edges']]
+
+    polygons = _polygons(level, nta_shapefile, uhf34_shapefile)
+    codes = polygons['code'].tolist()
+    i, j = _touching_pairs(polygons)
+    edges = [(codes[a], codes[b]) for a, b in zip(i.tolist(), j.tolist())]
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(cache_file, 'w') as f:
+        json.dump({'codes': codes, 'edges': edges}, f)
+    return codes, edges
+
+
+def _centroid_edges(k=FALLBACK_NEIGHBORS):
+    """UHF42 neighbors as the k nearest centroids (symmetrized)."""
+    codes = sorted(UHF_CENTROIDS)
+    xy = np.array([UHF_CENTROIDS[c] for c in codes])
+    xy[:, 1] *= np.cos(np.radians(xy[:, 0].mean()))
+    dist = np.linalg.norm(xy[:, None, :] - xy[None, :, :], axis=2)
+    np.fill_diagonal(dist, np.inf)
+    nearest = np.argsort(dist, axis=1)[:, :k]
+    edges = {tuple(sorted((codes[a], codes[b]))) for a in range(len(codes)) for b in nearest[a]}
+    return codes, sorted(edges)
+
+
+def adjacency_matrix(codes, level='UHF42', include_self=False, **kwargs):
+    """
+    Symmetric 0/1 CSR adjacency over `codes`, in that order.
+
+    Codes missing from the shapefile get no neighbors.
+
+    Args:
+        codes (array-like): Unit codes giving the row/column order.
+        level (str): 'NTA', 'UHF42' or 'UHF34'.
+        include_self (bool): Put ones on the diagonal.
+        **kwargs: Passed to adjacency_edges().
+    """
+    codes = list(codes)
+    position = {code: i for i, code in enumerate(codes)}
+    _, edges = adjacency_edges(level, **kwargs)
+    pairs = np.array([(position[a], position[b]) for a, b in edges if a in position and b in position],
+                     dtype=np.int64).reshape(-1, 2)
+    rows = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    cols = np.concatenate([pairs[:, 1], pairs[:, 0]])
+    matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(codes), len(codes)))
+    if include_self:
+        matrix = matrix + sparse.identity(len(codes), format='csr')
+    matrix.data[:] = 1.0
+    return matrix
@@ -0,0 +1,240 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from nyc_asthma.mold_ingest import (MOLD_311_FILE, assign_uhf, iter_311_chunks, parse_311_dates,
+                         to_epoch_seconds)
+
+# ============================================================================
+# Building-level (BBL) index of repeat mold complaints
+# ============================================================================
+#
+# One row per building, stored column-by-column as .npy files next to a
+# meta.json with the descriptor / location-type vocabularies:
+#
+#   bbl, complaints, first_seen, last_seen, descriptor_bits, location_type, uhf_code
+#
+# Rows are sorted by (uhf_code, complaints desc, last_seen desc) and meta.json
+# keeps the start offset of every UHF, so "top k buildings in UHF u" is a
+# slice of the first k rows of that UHF - no sorting at query time.
+
+INDEX_COLUMNS = ['Created Date', 'BBL', 'Descriptor', 'Location Type', 'Latitude', 'Longitude']
+
+INDEX_VERSION = 2
+META_FILE = 'meta.json'
+
+# Descriptors are kept as a bit set, so at most 64 distinct values
+MAX_DESCRIPTORS = 64
+
+
+def _codes(values, vocabulary):
+    """Encode strings against a growing vocabulary (missing -> -1)."""
+    uniques = pd.unique(values[values.notna()])
+    for value in uniques:
+        if value not in vocabulary:
+            vocabulary[value] = len(vocabulary)
+    return values.map(vocabulary).fillna(-1).astype(np.int64).to_numpy()
+
+
+def _partial_aggregate(chunk, descriptors, location_types):
+    """Hash-aggregate one chunk by BBL."""
+    bbl = chunk['BBL'].to_numpy()
+    created = parse_311_dates(chunk['Created Date'])
+    ok = np.isfinite(bbl) & (bbl > 0) & created.notna().to_numpy()
+    chunk = chunk[ok]
+    if chunk.empty:
+        return None, None
+
+    part = pd.DataFrame({
+        'bbl': chunk['BBL'].to_numpy().astype(np.int64),
+        'time': to_epoch_seconds(created[ok]),
+        'descriptor': _codes(chunk['Descriptor'], descriptors),
+        'location_type': _codes(chunk['Location Type'], location_types),
+        'uhf_code': assign_uhf(chunk['Latitude'], chunk['Longitude']),
+    })
+
+    # Location type and UHF come from the building's most recent complaint
+    part = part.sort_values('time', kind='stable')
+    grouped = part.groupby('bbl', sort=False)
+    agg = pd.DataFrame({
+        'complaints': grouped.size(),
+        'first_seen': grouped['time'].min(),
+        'last_seen': grouped['time'].max(),
+        'location_type': grouped['location_type'].last(),
+        'uhf_code': grouped['uhf_code'].last(),
+    })
+
+    pairs = part.loc[part['descriptor'] >= 0, ['bbl', 'descriptor']].drop_duplicates()
+    return agg, pairs
+
+
+def build_building_index(path=MOLD_311_FILE, chunksize=500_000):
+    """
+    Stream the 311 file and aggregate complaints per BBL.
+
+    Args:
+        path (str): 311 CSV export.
+        chunksize (int): Rows per streamed chunk.
+
+    Returns:
+        tuple: (table DataFrame sorted for top-k queries, descriptor list,
+            location type list)
+    """
+    descriptors = {}
+    location_types = {}
+    partials = []
+    pair_parts = []
+
+    for chunk in iter_311_chunks(path, INDEX_COLUMNS, chunksize):
+        agg, pairs = _partial_aggregate(chunk, descriptors, location_types)
+        if agg is not None:
+            partials.append(agg)
+            pair_parts.append(pairs)
+
+    if len(descriptors) > MAX_DESCRIPTORS:
+        raise ValueError(f"{len(descriptors)} distinct descriptors; the index supports {MAX_DESCRIPTORS}")
+
+    if not partials:
+        table = pd.DataFrame(columns=['bbl', 'complaints', 'first_seen', 'last_seen',
+                                      'descriptor_bits', 'location_type', 'uhf_code'])
+        return table, list(descriptors), list(location_types)
+
+    # Merge chunk partials; a building can appear in many chunks
+    combined = pd.concat(partials).sort_values('last_seen', kind='stable')
+    grouped = combined.groupby(level=0, sort=False)
+    table = pd.DataFrame({
+        'complaints': grouped['complaints'].sum(),
+        'first_seen': grouped['first_seen'].min(),
+        'last_seen': grouped['last_seen'].max(),
+        'location_type': grouped['location_type'].last(),
+        'uhf_code': grouped['uhf_code'].last(),
+    })
+
+    # Distinct descriptors -> bit set (sum of distinct powers of two == OR)
+    pairs = pd.concat(pair_parts).drop_duplicates()
+    bits = np.left_shift(np.uint64(1), pairs['descriptor'].to_numpy().astype(np.uint64))
+    descriptor_bits = pd.Series(bits, index=pairs['bbl'].to_numpy()).groupby(level=0).sum()
+    table['descriptor_bits'] = descriptor_bits.reindex(table.index, fill_value=0).astype(np.uint64)
+
+    table = table.rename_axis('bbl').reset_index()
+    table = table.sort_values(['uhf_code', 'complaints', 'last_seen'],
+                              ascending=[True, False, False]).reset_index(drop=True)
+    return table, list(descriptors), list(location_types)
+
+
+def write_building_index(table, descriptors, location_types, path):
+    """Save the table column-by-column plus a meta.json header."""
+    os.makedirs(path, exist_ok=True)
+
+    column_dtypes = {
+        'bbl': np.int64, 'complaints': np.int64, 'first_seen': np.int64,
+        'last_seen': np.int64, 'descriptor_bits': np.uint64,
+        'location_type': np.int32, 'uhf_code': np.int64,
+    }
+    for col, dtype in column_dtypes.items():
+        np.save(os.path.join(path, f'{col}.npy'), table[col].to_numpy().astype(dtype))
+
+    # Secondary order for BBL lookups, and the BBLs in that order to binary-search
+    bbl = table['bbl'].to_numpy().astype(np.int64)
+    bbl_order = np.argsort(bbl, kind='stable')
+    np.save(os.path.join(path, 'bbl_order.npy'), bbl_order)
+    np.save(os.path.join(path, 'sorted_bbl.npy'), bbl[bbl_order])
+
+    uhf = table['uhf_code'].to_numpy()
+    uhf_codes, offsets = np.unique(uhf, return_index=True)
+    meta = {
+        'version': INDEX_VERSION,
+        'n_buildings': int(len(table)),
+        'columns': list(column_dtypes),
+        'descriptors': [str(d) for d in descriptors],
+        'location_types': [str(t) for t in location_types],
+        'uhf_codes': uhf_codes.tolist(),
+        'uhf_offsets': offsets.tolist() + [int(len(table))],
+    }
+    with open(os.path.join(path, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return path
+
+
+class BuildingIndex:
+    """
+    Read-only, memory-mapped view of a building index directory.
+
+    Queries slice the precomputed order; nothing is re-aggregated.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported building index version: {self.meta.get('version')}")
+
+        self.columns = {
+            col: np.load(os.path.join(path, f'{col}.npy'), mmap_mode='r')
+            for col in self.meta['columns']
+        }
+        self.bbl_order = np.load(os.path.join(path, 'bbl_order.npy'), mmap_mode='r')
+        self.sorted_bbl = np.load(os.path.join(path, 'sorted_bbl.npy'), mmap_mode='r')
+        self.descriptors = np.asarray(self.meta['descriptors'], dtype=object)
+        self.location_types = np.asarray(self.meta['location_types'], dtype=object)
+        self._uhf_rows = {
+            code: (start, end) for code, start, end in zip(
+                self.meta['uhf_codes'], self.meta['uhf_offsets'][:-1], self.meta['uhf_offsets'][1:])
+        }
+
+    def __len__(self):
+        return self.meta['n_buildings']
+
+    def _rows(self, rows):
+        """Materialize selected rows with decoded dates and vocabularies."""
+        rows = np.asarray(rows, dtype=np.int64)
+        bits = np.asarray(self.columns['descriptor_bits'][rows])
+        location = np.asarray(self.columns['location_type'][rows])
+
+        descriptor_lists = []
+        for value in bits:
+            names = [self.descriptors[i] for i in range(len(self.descriptors)) if (int(value) >> i) & 1]
+            descriptor_lists.append('; '.join(names))
+
+        location_names = np.full(len(rows), None, dtype=object)
+        known = location >= 0
+        location_names[known] = self.location_types[location[known]]
+
+        return pd.DataFrame({
+            'bbl': np.asarray(self.columns['bbl'][rows]),
+            'uhf_code': np.asarray(self.columns['uhf_code'][rows]),
+            'complaints': np.asarray(self.columns['complaints'][rows]),
+            'first_seen': pd.to_datetime(np.asarray(self.columns['first_seen'][rows]), unit='s'),
+            'last_seen': pd.to_datetime(np.asarray(self.columns['last_seen'][rows]), unit='s'),
+            'descriptors': descriptor_lists,
+            'location_type': location_names,
+        })
+
+    def top_buildings(self, uhf_code, k=10):
+        """
+        Buildings with the most complaints in one UHF.
+
+        Args:
+            uhf_code (int): UHF42 code.
+            k (int): Number of buildings.
+
+        Returns:
+            pd.DataFrame: Up to k rows, most complaints first.
+        """
+        start, end = self._uhf_rows.get(int(uhf_code), (0, 0))
+        return self._rows(np.arange(start, min(start + k, end)))
+
+    def top_buildings_all(self, k=10):
+        """Top-k buildings for every UHF in one frame."""
+        rows = [np.arange(start, min(start + k, end)) for start, end in self._uhf_rows.values()]
+        return self._rows(np.concatenate(rows) if rows else [])
+
+    def lookup(self, bbl):
+        """Index row for one BBL, or an empty frame if it never complained."""
+        pos = np.searchsorted(self.sorted_bbl, int(bbl))
+        if pos < len(self.sorted_bbl) and self.sorted_bbl[pos] == int(bbl):
+            return self._rows([self.bbl_order[pos]])
+        return self._rows([])
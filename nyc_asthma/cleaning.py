@@ -0,0 +1,150 @@
+import re
+
+import pandas as pd
+
+# ============================================================================
+# Cleaning of the NYC EH Data Portal asthma tables
+# ============================================================================
+
+
+def extract_numeric(value):
+    """
+    Extract numeric value from strings like '11.6' or '8,000'
+    Handles asterisks (statistical significance markers) and special characters
+    Returns None if value cannot be parsed
+    """
+    if pd.isna(value):
+        return None
+
+    value_str = str(value)
+
+    # Handle special characters
+    if value_str.strip() == '†':
+        return None
+
+    # Remove asterisks (they indicate unstable estimates/small numbers)
+    value_str = value_str.replace('*', '').strip()
+
+    # Remove commas and convert to float
+    value_str = value_str.replace(',', '').strip()
+
+    try:
+        return float(value_str)
+    except ValueError:
+        return None
+
+
+def extract_numeric_from_confidence_interval(value):
+    """
+    Extract the main numeric value from strings like '11.6 (6.5, 19.8)' or '8,000'
+    Returns None if value cannot be parsed
+    """
+    if pd.isna(value):
+        return None
+
+    # Remove asterisks (they indicate statistical significance)
+    value_str = str(value).replace('*', '').strip()
+
+    # Pattern to extract first number before parentheses
+    match = re.match(r'([\d,\.]+)', value_str)
+    if match:
+        # Remove commas and convert to float
+        return float(match.group(1).replace(',', ''))
+
+    return None
+
+
+# One entry per portal table:
+#   raw / output : keys into paths.RAW_FILES / paths.CLEANED_FILES
+#   geo_type     : GeoType rows to keep
+#   parser       : 'numeric' (extract_numeric) or 'ci' (confidence-interval strings)
+#   values       : raw column -> cleaned column, in output order
+#   flag         : (raw column, flag column) - True where the raw value has '*'
+#   sort         : output sort order
+CLEANING_SPECS = {
+    'adults': {
+        'raw': 'adults_with_asthma',
+        'output': 'adults_with_asthma',
+        'geo_type': 'UHF34',
+        'parser': 'ci',
+        'values': {
+            'Age-adjusted percent': 'age_adjusted_asthma_percent',
+            'Number': 'estimated_adults_with_asthma',
+            'Percent': 'asthma_percent',
+        },
+        'flag': ('Age-adjusted percent', 'statistically_significant'),
+        'sort': ['neighborhood'],
+    },
+    'ed-adults': {
+        'raw': 'ed_adults',
+        'output': 'ed_adults',
+        'geo_type': 'UHF42',
+        'parser': 'numeric',
+        'values': {
+            'Age-adjusted rate per 10,000': 'age_adjusted_ed_rate_per_10k',
+            'Estimated annual rate per 10,000': 'estimated_annual_ed_rate_per_10k',
+            'Number': 'estimated_annual_ed_visits',
+        },
+        'flag': None,
+        'sort': ['year', 'neighborhood'],
+    },
+    'ed-0-4': {
+        'raw': 'ed_age_0_4',
+        'output': 'ed_age_0_4',
+        'geo_type': 'UHF42',
+        'parser': 'numeric',
+        'values': {
+            'Estimated annual rate per 10,000': 'ed_rate_per_10k_age_0_4',
+            'Number': 'estimated_annual_ed_visits_age_0_4',
+        },
+        'flag': ('Estimated annual rate per 10,000', 'unstable_estimate'),
+        'sort': ['year', 'neighborhood'],
+    },
+    'ed-5-17': {
+        'raw': 'ed_age_5_17',
+        'output': 'ed_age_5_17',
+        'geo_type': 'UHF42',
+        'parser': 'numeric',
+        'values': {
+            'Estimated annual rate per 10,000': 'ed_rate_per_10k_age_5_17',
+            'Number': 'estimated_annual_ed_visits_age_5_17',
+        },
+        'flag': ('Estimated annual rate per 10,000', 'unstable_estimate'),
+        'sort': ['year', 'neighborhood'],
+    },
+}
+
+PARSERS = {
+    'numeric': extract_numeric,
+    'ci': extract_numeric_from_confidence_interval,
+}
+
+
+def clean_portal_table(df, spec):
+    """
+    Clean one EH Data Portal table.
+
+    Args:
+        df (pd.DataFrame): Raw portal table.
+        spec (dict): Entry of CLEANING_SPECS.
+
+    Returns:
+        pd.DataFrame: year, uhf_code, neighborhood, the value columns and the
+            flag column (if any).
+    """
+    df_clean = df[df['GeoType'] == spec['geo_type']].copy()
+    parser = PARSERS[spec['parser']]
+
+    out = pd.DataFrame({
+        'year': df_clean['TimePeriod'],
+        'uhf_code': df_clean['GeoID'],
+        'neighborhood': df_clean['Geography'],
+    })
+    for raw_col, clean_col in spec['values'].items():
+        out[clean_col] = df_clean[raw_col].apply(parser)
+
+    if spec['flag'] is not None:
+        raw_col, flag_col = spec['flag']
+        out[flag_col] = df_clean[raw_col].astype(str).str.contains('*', regex=False, na=False)
+
+    return out.sort_values(spec['sort']).reset_index(drop=True)
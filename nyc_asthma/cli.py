@@ -0,0 +1,1232 @@
+import argparse
+import os
+import sys
+
+from nyc_asthma import paths
+
+# ============================================================================
+# Command line interface: python -m nyc_asthma <command>
+# ============================================================================
+#
+# Every command imports its own modules inside the handler, so `clean`,
+# `merge` and `geocode` never load scipy.stats, matplotlib or seaborn, and
+# `--help` only loads argparse.
+
+
+def _banner(title):
+    print("="*80)
+    print(title)
+    print("="*80)
+
+
+# ----------------------------------------------------------------------------
+# sources (content-addressed raw-file cache)
+# ----------------------------------------------------------------------------
+
+def cmd_sources(args):
+    from nyc_asthma import sources
+
+    if args.offline:
+        os.environ['ASTHMA_OFFLINE'] = '1'
+    names = args.names or list(sources.SOURCES)
+    unknown = [name for name in names if name not in sources.SOURCES]
+    if unknown:
+        raise SystemExit(f"unknown source(s): {', '.join(unknown)} (choose from {', '.join(sources.SOURCES)})")
+
+    origin = sources.ORIGINS.get(args.origin, args.origin)
+    _banner(f"RAW SOURCES ({'offline' if sources.offline_mode() else origin or sources.DEFAULT_ORIGIN})")
+    for name in names:
+        try:
+            entry, status = sources.fetch(name, args.refresh, origin)
+        except (OSError, ValueError) as e:
+            print(f"  ✗ {name:20} {e}")
+            continue
+        print(f"  ✓ {name:20} {status:9} {entry['sha256'][:12]}  {entry['size'] / 1e6:9.1f} MB")
+    if args.prune:
+        print(f"\n✓ Pruned {sources.prune() / 1e6:.1f} MB of unreferenced objects")
+
+
+# ----------------------------------------------------------------------------
+# clean
+# ----------------------------------------------------------------------------
+
+def _print_clean_summary(name, df_clean, spec):
+    value_col = list(spec['values'].values())[0]
+    print(f"  ✓ {name}: {df_clean.shape}")
+    missing = df_clean.isnull().sum()
+    missing = missing[missing > 0]
+    for col, count in missing.items():
+        print(f"    missing {col}: {count}")
+    if spec['flag'] is not None:
+        flag_col = spec['flag'][1]
+        print(f"    {flag_col} (marked with *): {df_clean[flag_col].sum()} out of {len(df_clean)} records")
+
+    latest = df_clean[df_clean['year'] == df_clean['year'].max()]
+    if latest[value_col].notna().any():
+        print(f"    {latest['year'].iloc[0]}: mean {value_col} {latest[value_col].mean():.1f}, "
+              f"highest in {latest.loc[latest[value_col].idxmax(), 'neighborhood']}, "
+              f"lowest in {latest.loc[latest[value_col].idxmin(), 'neighborhood']}")
+
+
+def cmd_clean(args):
+    import pandas as pd
+
+    from nyc_asthma.cleaning import CLEANING_SPECS, clean_portal_table
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.sources import source_path
+
+    unknown = [name for name in args.tables if name not in CLEANING_SPECS]
+    if unknown:
+        raise SystemExit(f"unknown table(s): {', '.join(unknown)} (choose from {', '.join(CLEANING_SPECS)})")
+
+    _banner("CLEANING EH DATA PORTAL ASTHMA TABLES")
+    tables = args.tables or list(CLEANING_SPECS)
+    run = PipelineRun('clean_portal_tables', total_stages=len(tables))
+    for name in tables:
+        run.stage(f"Cleaning {name}")
+        spec = CLEANING_SPECS[name]
+        df = pd.read_csv(source_path(spec['raw']))
+        df_clean = clean_portal_table(df, spec)
+
+        output_file = os.path.join(args.out_dir, os.path.basename(paths.CLEANED_FILES[spec['output']]))
+        df_clean.to_csv(output_file, index=False)
+        _print_clean_summary(name, df_clean, spec)
+        print(f"    saved to: {output_file}")
+        run.rows(rows_in=len(df), rows_out=len(df_clean))
+    run.finish()
+
+
+# ----------------------------------------------------------------------------
+# merge
+# ----------------------------------------------------------------------------
+
+def _print_merge_summary(merged, year=None):
+    # Covering-period poverty leaves the newest asthma years without a rate,
+    # so default to the latest year that has one
+    if year is None:
+        with_poverty = merged.loc[merged['poverty_rate'].notna(), 'year']
+        year = with_poverty.max() if len(with_poverty) else merged['year'].max()
+    _banner(f"SUMMARY STATISTICS ({year})")
+    df_year = merged[merged['year'] == year]
+
+    summaries = [
+        ('Asthma Prevalence (Adults)', 'age_adjusted_asthma_percent', '%'),
+        ('Asthma ED Visits (Adults) per 10k', 'age_adjusted_ed_rate_per_10k', ''),
+        ('Asthma ED Visits (Children 0-4) per 10k', 'ed_rate_per_10k_age_0_4', ''),
+        ('Asthma ED Visits (Children 5-17) per 10k', 'ed_rate_per_10k_age_5_17', ''),
+        ('Poverty Rate', 'poverty_rate', '%'),
+    ]
+    for title, col, unit in summaries:
+        print(f"\n{title}:")
+        if df_year[col].isna().all():
+            print(f"  No values for {year} (not published or outside the alignment window)")
+            continue
+        print(f"  Mean: {df_year[col].mean():.1f}{unit}")
+        print(f"  Range: {df_year[col].min():.1f}{unit} - {df_year[col].max():.1f}{unit}")
+
+    _banner("DATA QUALITY CHECK")
+    print(f"\nMissing values by column ({year}):")
+    missing = df_year.isnull().sum()
+    missing = missing[missing > 0]
+    if len(missing) > 0:
+        for col, count in missing.items():
+            print(f"  {col}: {count} ({count / len(df_year) * 100:.1f}%)")
+    else:
+        print("  ✓ No missing values!")
+
+
+def cmd_merge(args):
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.merge import build_asthma_poverty, load_cleaned_asthma
+    from nyc_asthma.poverty import poverty_by_uhf_year
+
+    _banner("MERGING ALL DATASETS AT UHF34 NEIGHBORHOOD LEVEL")
+    run = PipelineRun('merge_asthma_poverty', total_stages=3)
+
+    run.stage("Loading asthma datasets")
+    asthma = load_cleaned_asthma()
+    for key, df in asthma.items():
+        print(f"  ✓ {key}: {df.shape}")
+    run.rows(rows_out=sum(len(df) for df in asthma.values()))
+
+    run.stage("Rolling NTA poverty up to UHF")
+    poverty = poverty_by_uhf_year()
+    print(f"  ✓ Poverty data (UHF42 + UHF34, {poverty['year'].nunique()} periods): {poverty.shape}")
+    run.rows(rows_out=len(poverty))
+
+    run.stage("Merging asthma and poverty data")
+    merged = build_asthma_poverty(asthma, poverty)
+    print(f"  ✓ Final merged dataset: {merged.shape}")
+    print(f"  - {merged['year'].nunique()} years ({merged['year'].min()}-{merged['year'].max()})")
+    print(f"  - {merged['uhf_code'].nunique()} neighborhoods")
+    merged.to_csv(args.output, index=False)
+    print(f"\n✓ Saved to: {args.output}")
+    run.rows(rows_in=sum(len(df) for df in asthma.values()), rows_out=len(merged))
+    run.finish()
+
+    _print_merge_summary(merged)
+
+
+# ----------------------------------------------------------------------------
+# poverty
+# ----------------------------------------------------------------------------
+
+def cmd_poverty(args):
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.poverty import load_poverty_table, nta_crosswalk, poverty_by_uhf_year, unmatched_ntas
+
+    _banner("HOUSEHOLD-WEIGHTED POVERTY: NTA -> UHF42 / UHF34")
+    run = PipelineRun('poverty_rollup', total_stages=2)
+
+    run.stage("Matching NTAs to UHF42")
+    crosswalk = nta_crosswalk(load_poverty_table())
+    print("  ✓ NTA -> UHF42: " + ', '.join(f"{method} {count}"
+                                          for method, count in crosswalk['method'].value_counts().items()))
+    unmatched = unmatched_ntas(crosswalk)
+    for row in unmatched.itertuples(index=False):
+        print(f"    unmatched {row.GeoType} {row.GeoID}: {row.Geography}")
+    run.rows(rows_out=len(crosswalk))
+
+    run.stage("Rolling NTA poverty up to UHF")
+    poverty = poverty_by_uhf_year()
+    periods = sorted(poverty['time_period'].unique())
+    print(f"  ✓ Periods: {len(periods)} ({periods[0]} to {periods[-1]})")
+    for level, rows in poverty.groupby('geo_level'):
+        print(f"  ✓ {level}: {rows['uhf_code'].nunique()} neighborhoods, {len(rows)} rows")
+
+    uhf42 = poverty[poverty['geo_level'] == 'UHF42']
+    diff = (uhf42['poverty_rate'] - uhf42['portal_poverty_rate']).abs()
+    print("\nRollup vs the portal's own UHF42 rates (percentage points):")
+    for vintage, d in diff.groupby(uhf42['nta_vintage']):
+        print(f"  {vintage}: median {d.median():.2f}, mean {d.mean():.2f}, max {d.max():.2f}")
+
+    poverty.to_csv(args.output, index=False)
+    print(f"\n✓ Saved to: {args.output}")
+    run.rows(rows_out=len(poverty))
+    run.finish()
+
+
+# ----------------------------------------------------------------------------
+# impute
+# ----------------------------------------------------------------------------
+
+def cmd_impute(args):
+    import pandas as pd
+
+    from nyc_asthma.imputation import impute_panel
+    from nyc_asthma.instrumentation import PipelineRun
+
+    _banner("SPATIO-TEMPORAL IMPUTATION OF MISSING UHF-YEAR VALUES")
+    if args.draws < 2:
+        raise SystemExit("--draws must be at least 2 to pool correlations over the imputation")
+    run = PipelineRun('imputation', total_stages=2)
+
+    run.stage("Loading panel")
+    panel = pd.read_csv(args.input)
+    run.rows(rows_out=len(panel))
+
+    run.stage("Imputing missing cells")
+    completed, draws, info = impute_panel(panel, draws=args.draws, spatial_weight=args.spatial_weight,
+                                          temporal_weight=args.temporal_weight, seed=args.seed)
+    print(f"  ✓ Converged in {info['iterations']} iterations ({args.draws} draws)")
+    for col, count in info['filled'].items():
+        if count:
+            print(f"    {col}: {count} cells filled (residual sd {info['residual_sd'][col]:.2f})")
+
+    completed.to_csv(args.output, index=False)
+    draws.to_csv(args.draws_output, index=False)
+    print(f"\n✓ Saved to: {args.output}")
+    print(f"✓ Saved to: {args.draws_output}")
+    run.rows(rows_in=len(panel), rows_out=len(draws))
+    run.finish()
+
+
+# ----------------------------------------------------------------------------
+# smooth
+# ----------------------------------------------------------------------------
+
+def cmd_smooth(args):
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.merge import load_cleaned_asthma
+    from nyc_asthma.smoothing import smooth_ed_tables
+
+    _banner(f"EMPIRICAL-BAYES ED RATES (PRIOR: {args.prior.upper()})")
+    run = PipelineRun('ed_smoothing', total_stages=2)
+
+    run.stage("Loading asthma datasets")
+    asthma = load_cleaned_asthma()
+    run.rows(rows_out=sum(len(df) for df in asthma.values()))
+
+    run.stage("Smoothing ED rates")
+    _, rates = smooth_ed_tables(asthma, args.prior)
+    rates['relative_change'] = (rates['rate_eb'] - rates['rate']).abs() / rates['rate']
+    print(f"  ✓ Cells smoothed: {len(rates):,}")
+    print("\nMean weight on the neighborhood's own rate / median relative change:")
+    for (group, unstable), rows in rates.groupby(['age_group', rates['unstable_estimate'].fillna(False)]):
+        label = 'unstable' if unstable else 'stable'
+        print(f"  {group:12} {label:9} n={len(rows):4}  w={rows['weight'].mean():.3f}  "
+              f"change={rows['relative_change'].median():.1%}")
+
+    rates.drop(columns='relative_change').to_csv(args.output, index=False)
+    print(f"\n✓ Saved to: {args.output}")
+    run.rows(rows_out=len(rates))
+    run.finish()
+
+
+# ----------------------------------------------------------------------------
+# forecast
+# ----------------------------------------------------------------------------
+
+def cmd_forecast(args):
+    from nyc_asthma.forecast import backtest, forecast_ed, interval_scale
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.merge import load_cleaned_asthma
+
+    _banner(f"ED RATE FORECASTS THROUGH {args.through} ({args.interval:.0%} INTERVALS)")
+    run = PipelineRun('ed_forecast', total_stages=3)
+
+    run.stage("Loading asthma datasets")
+    asthma = load_cleaned_asthma()
+    run.rows(rows_out=sum(len(df) for df in asthma.values()))
+
+    run.stage("Backtesting")
+    skip = tuple(args.skip_years)
+    results, summary = backtest(asthma, horizon=args.horizon, interval=args.interval, skip_years=skip)
+    scale = interval_scale(results, args.interval)
+    print(f"  ✓ Backtest origins: {results['origin'].min()}-{results['origin'].max()}, "
+          f"{len(results):,} forecasts scored")
+    print("\nBacktest (MAE vs last-value MAE, model interval coverage → widening factor):")
+    summary = summary.merge(scale, on=['age_group', 'step'])
+    for _, row in summary.iterrows():
+        print(f"  {row['age_group']:12} +{row['step']}y  MAE={row['mae']:6.1f}  naive={row['naive_mae']:6.1f}  "
+              f"coverage={row['coverage']:.0%} → ×{row['scale']:.2f}")
+    run.rows(rows_out=len(results))
+
+    run.stage("Forecasting")
+    forecasts = forecast_ed(asthma, args.through, args.interval, scale, skip)
+    print(f"\n  ✓ Forecasts: {forecasts['uhf_code'].nunique()} UHFs x {forecasts['age_group'].nunique()} "
+          f"age groups x {forecasts['year'].nunique()} years")
+    citywide = forecasts.groupby(['age_group', 'year'])[['forecast', 'lower', 'upper']].median()
+    print("\nMedian UHF forecast (per 10k):")
+    print(citywide.to_string(float_format='%.1f'))
+
+    forecasts.to_csv(args.output, index=False)
+    results.to_csv(args.backtest_output, index=False)
+    print(f"\n✓ Saved to: {args.output}")
+    print(f"✓ Saved to: {args.backtest_output}")
+    run.rows(rows_out=len(forecasts))
+    run.finish()
+
+
+# ----------------------------------------------------------------------------
+# rollup
+# ----------------------------------------------------------------------------
+
+def cmd_rollup(args):
+    import pandas as pd
+
+    from nyc_asthma.harmonize import uhf34_membership
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.merge import load_cleaned_asthma
+    from nyc_asthma.poverty import load_poverty_table, nta_crosswalk
+    from nyc_asthma.rollup import indicator_rollup
+
+    _banner("INDICATORS AT NTA / UHF42 / UHF34 / BOROUGH / CITYWIDE LEVEL")
+    run = PipelineRun('indicator_rollup', total_stages=2)
+
+    run.stage("Loading asthma, poverty and air quality")
+    asthma = load_cleaned_asthma()
+    poverty = load_poverty_table()
+    aqe = pd.read_csv(paths.CLEANED_FILES['aqe'])
+    run.rows(rows_out=sum(len(df) for df in asthma.values()) + len(poverty) + len(aqe))
+
+    run.stage("Rolling indicators up the geography hierarchy")
+    result = indicator_rollup(asthma, poverty, nta_crosswalk(poverty), aqe, uhf34_membership())
+    for level, frame in result.levels.items():
+        print(f"  ✓ {level:9} {frame['geo_code'].nunique():>4} units, {len(frame):>5} rows")
+
+    if args.show:
+        frame = result.level(args.show)
+        year = args.year if args.year is not None else frame['year'].max()
+        columns = ['geo_code', 'age_adjusted_ed_rate_per_10k', 'ed_rate_per_10k_age_0_4',
+                   'ed_rate_per_10k_age_5_17', 'poverty_rate', 'PM_Avg', 'NO2_Avg']
+        print(f"\n{args.show} view, {year}:")
+        print(frame.loc[frame['year'] == year, columns].to_string(index=False, float_format='%.1f'))
+
+    long = result.to_long()
+    long.to_csv(args.output, index=False)
+    print(f"\n✓ Saved to: {args.output}")
+    run.rows(rows_out=len(long))
+    run.finish()
+
+
+# ----------------------------------------------------------------------------
+# features
+# ----------------------------------------------------------------------------
+
+def cmd_features(args):
+    import time
+
+    import pandas as pd
+
+    from nyc_asthma.features import feature_store
+    from nyc_asthma.instrumentation import PipelineRun
+
+    _banner("LAGGED / ROLLING FEATURE STORE")
+    run = PipelineRun('feature_store', total_stages=2)
+
+    run.stage("Loading panel")
+    panel = pd.read_csv(args.input)
+    run.rows(rows_out=len(panel))
+
+    run.stage("Building lagged / rolling features")
+    start = time.perf_counter()
+    store, built = feature_store(panel, lags=tuple(range(1, args.lags + 1)), windows=tuple(args.windows))
+    print(f"  ✓ {'Built' if built else 'Cached'}: {len(store.variables)} variables x "
+          f"{len(store.time_labels)} years x {len(store.geo_labels)} UHFs in {time.perf_counter() - start:.2f}s")
+    print(f"  ✓ Store: {store.path}")
+    run.rows(rows_in=len(panel))
+    run.finish()
+
+    if args.show:
+        print(f"\n{args.show}:")
+        print(store.load([v for v in store.variables if v == args.show or v.startswith(args.show + '_')])
+              .dropna().head(10).to_string(index=False, float_format='%.2f'))
+
+
+# ----------------------------------------------------------------------------
+# crossval
+# ----------------------------------------------------------------------------
+
+def cmd_crossval(args):
+    import pandas as pd
+
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.validation import evaluate_schemes
+
+    _banner(f"BLOCKED CROSS-VALIDATION ({args.model.upper()} → {args.target})")
+    run = PipelineRun('crossval', total_stages=2)
+
+    run.stage("Loading panel")
+    panel = pd.read_csv(args.input)
+    run.rows(rows_out=len(panel))
+
+    run.stage("Cross-validating each scheme")
+    best, folds = evaluate_schemes(panel, args.schemes, args.features, args.target, args.model,
+                                   n_folds=args.folds, buffer=args.buffer, workers=args.workers)
+    print(f"  ✓ Rows with every feature: {best['rows'].iloc[0]}")
+    print(f"  ✓ Features: {', '.join(args.features)}")
+    print("\nBest setting per scheme (mean over folds):")
+    for _, row in best.iterrows():
+        print(f"  {row['scheme']:9} {row['folds']} folds  {row['params']:22} RMSE={row['rmse']:7.2f} "
+              f"(±{row['rmse_sd']:.2f})  R²={row['r2']:6.3f}  out-of-fold R²={row['oof_r2']:6.3f}")
+
+    folds.to_csv(args.output, index=False)
+    print(f"\n✓ Saved to: {args.output}")
+    run.rows(rows_in=len(panel), rows_out=len(folds))
+    run.finish()
+
+
+# ----------------------------------------------------------------------------
+# drivers
+# ----------------------------------------------------------------------------
+
+def cmd_drivers(args):
+    import time
+
+    import pandas as pd
+
+    from nyc_asthma.drivers import fit_drivers
+    from nyc_asthma.instrumentation import PipelineRun
+
+    _banner(f"DRIVERS OF ASTHMA ED RATES ({args.model.upper()})")
+    run = PipelineRun('drivers', total_stages=2)
+
+    run.stage("Loading panel")
+    panel = pd.read_csv(args.input)
+    run.rows(rows_out=len(panel))
+
+    run.stage("Fitting models and scoring importance")
+    start = time.perf_counter()
+    importance, info = fit_drivers(panel, args.targets, args.model, workers=args.workers,
+                                   refit=args.refit, repeats=args.repeats, model_dir=args.model_dir)
+    for entry in info:
+        print(f"  ✓ {entry['target']}: {entry['rows']} rows, "
+              f"{'reused saved model' if entry['reused'] else 'fitted'} → {entry['path']}")
+    print(f"  ✓ Done in {time.perf_counter() - start:.1f}s")
+
+    for target, rows in importance.groupby('target', sort=False):
+        print(f"\n{target} (MSE increase when shuffled / mean |contribution|):")
+        for _, row in rows.head(args.top).iterrows():
+            print(f"  {row['rank']:2d}. {row['feature']:24} {row['permutation']:10.1f} "
+                  f"(±{row['permutation_sd']:.1f})  {row['contribution']:7.2f}")
+
+    importance.to_csv(args.output, index=False)
+    print(f"\n✓ Saved to: {args.output}")
+    run.rows(rows_in=len(panel), rows_out=len(importance))
+    run.finish()
+
+
+# ----------------------------------------------------------------------------
+# geocode (final merged dataset)
+# ----------------------------------------------------------------------------
+
+def cmd_geocode(args):
+    import pandas as pd
+
+    from nyc_asthma import geocode, merge
+    from nyc_asthma.harmonize import uhf34_membership
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.poverty import poverty_by_uhf_year
+    from nyc_asthma.panel_store import write_panel_store
+    from nyc_asthma.temporal import fill_panel, parse_alignment
+
+    try:
+        alignment = parse_alignment(args.align)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    _banner("COMPLETE DATA INTEGRATION: FROM SCRATCH TO FINAL DATASET")
+    run = PipelineRun('final_merge', total_stages=8)
+
+    run.stage("Loading asthma datasets")
+    asthma = merge.load_cleaned_asthma()
+    if args.smooth != 'none':
+        from nyc_asthma.smoothing import smooth_ed_tables
+
+        asthma, _ = smooth_ed_tables(asthma, args.smooth)
+    membership = uhf34_membership()
+    merged = merge.merge_asthma(asthma, 'UHF34', membership)
+    rule = alignment['adults_with_asthma']
+    merged = fill_panel(merged, merge.ADULTS_RATE_COLUMNS + merge.ADULTS_COUNT_COLUMNS, rule['method'],
+                        rule['max_gap'], mask_col='adult_asthma_imputed')
+    print(f"  ✓ Merged asthma data (UHF34): {merged.shape}")
+    if args.smooth != 'none':
+        print(f"  ✓ ED rates smoothed toward {args.smooth} means (empirical Bayes)")
+    print(f"  ✓ Adult prevalence ({rule['method']}): {merged['adult_asthma_imputed'].sum()} imputed cells")
+    run.rows(rows_in=sum(len(df) for df in asthma.values()), rows_out=len(merged))
+
+    run.stage("Adding poverty data")
+    rule = alignment['poverty']
+    merged = merge.add_poverty(merged, poverty_by_uhf_year(), 'UHF34', rule['method'], rule['max_gap'])
+    print(f"  ✓ Merged with poverty: {merged.shape}")
+    print(f"  ✓ Poverty ({rule['method']}): {merged['poverty_rate'].notna().sum()} cells, "
+          f"{merged['poverty_imputed'].sum()} imputed")
+    run.rows(rows_out=len(merged))
+
+    run.stage("Adding air quality data")
+    aqe = pd.read_csv(paths.CLEANED_FILES['aqe'])
+    try:
+        merged = merge.add_air_quality(merged, merge.aggregate_air_quality(aqe, merge.nta_to_level('UHF34', membership)),
+                                       args.aqe_year)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(f"  ✓ Merged with air quality: {merged.shape} (measured in {args.aqe_year})")
+    run.rows(rows_in=len(aqe), rows_out=len(merged))
+
+    run.stage("Loading mold complaint data")
+    mold_clean = geocode.load_mold_locations()
+    print(f"  ✓ Mold complaints: {len(mold_clean):,} records")
+    run.rows(rows_out=len(mold_clean))
+
+    run.stage("Geocoding mold complaints to UHF neighborhoods")
+    mold_clean = geocode.geocode_mold(mold_clean)
+    print(f"  ✓ Geocoded {len(mold_clean):,} complaints")
+    run.rows(rows_in=len(mold_clean), rows_out=len(mold_clean))
+
+    run.stage("Aggregating mold complaints by year and UHF")
+    mold_agg = geocode.aggregate_mold(geocode.estimate_years(mold_clean), membership)
+    print(f"  ✓ Aggregated to {len(mold_agg)} year-UHF combinations")
+    print(f"  ✓ Total complaints: {mold_agg['mold_complaints'].sum():,}")
+    run.rows(rows_in=len(mold_clean), rows_out=len(mold_agg))
+
+    run.stage("Merging mold complaints with main dataset")
+    merged_final = geocode.add_mold(merged, mold_agg)
+    print(f"  ✓ Final dataset: {merged_final.shape}")
+    run.rows(rows_in=len(merged), rows_out=len(merged_final))
+
+    run.stage("Organizing final dataset")
+    merged_final = geocode.organize_final(merged_final)
+    merged_final.to_csv(args.output, index=False)
+    print(f"\n✓ SAVED: {args.output}")
+    # Memory-mapped copy so analyses can load single variables/years lazily
+    write_panel_store(merged_final, args.store)
+    print(f"✓ SAVED: {args.store}")
+    run.rows(rows_out=len(merged_final))
+    run.finish()
+
+    _banner("FINAL DATASET SUMMARY")
+    print(f"📊 Records: {len(merged_final):,}")
+    print(f"📅 Years: {merged_final['year'].min()}-{merged_final['year'].max()}")
+    print(f"🏘️  Neighborhoods: {merged_final['uhf_code'].nunique()}")
+    print(f"📈 Variables: {len(merged_final.columns)}")
+
+
+# ----------------------------------------------------------------------------
+# correlate / plot
+# ----------------------------------------------------------------------------
+
+def _print_correlation_summary(results_df):
+    _banner("CORRELATION SUMMARY")
+    from nyc_asthma.correlation import significance_stars
+
+    print("\n📊 TOP 10 STRONGEST CORRELATIONS (All Outcomes):")
+    print("-" * 80)
+    for _, row in results_df.head(10).iterrows():
+        print(f"{row['Asthma Outcome']:35} ← {row['Variable']:25} r={row['Correlation (r)']:6.3f} "
+              f"{significance_stars(row['P-value'])}")
+
+    _banner("KEY FINDINGS")
+    sig_results = results_df[results_df['Significance'] == 'Yes']
+    if len(sig_results) > 0:
+        print(f"\n✅ Found {len(sig_results)} significant correlations")
+        print("\nStrongest significant relationships:")
+        for _, row in sig_results.head(5).iterrows():
+            direction = "↑" if row['Correlation (r)'] > 0 else "↓"
+            print(f"  {direction} {row['Asthma Outcome']} ← {row['Variable']}: r={row['Correlation (r)']:.3f}")
+    else:
+        print("\n⚠️  No significant correlations found")
+
+
+def cmd_correlate(args):
+    import pandas as pd
+
+    from nyc_asthma import correlation
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.panel_store import read_panel
+
+    _banner("COMPREHENSIVE ASTHMA CORRELATION ANALYSIS")
+    run = PipelineRun('correlation', total_stages=5)
+
+    run.stage("Loading data")
+    df, source = read_panel(paths.IMPUTED_DATASET if args.imputed else args.input, correlation.analysis_columns)
+    df = correlation.add_borough(df)
+    print(f"  ✓ Loaded: {df.shape} from {os.path.basename(source)}")
+    draws = []
+    if args.imputed:
+        from nyc_asthma.imputation import split_draws
+
+        try:
+            draws = split_draws(df, pd.read_csv(paths.IMPUTATION_DRAWS))
+        except ValueError as e:
+            raise SystemExit(str(e))
+        print(f"  ✓ Imputation draws: {len(draws)}")
+    if not args.raw_rates:
+        df, replaced = correlation.use_smoothed_rates(df)
+        draws = [correlation.use_smoothed_rates(d)[0] for d in draws]
+        if replaced:
+            print(f"  ✓ Empirical-Bayes smoothed rates: {', '.join(replaced)}")
+    run.rows(rows_out=len(df))
+
+    verbose = not args.quiet
+    run.stage("Calculating Pearson correlations (continuous variables)")
+    if args.imputed:
+        results = correlation.pooled_correlations(df, draws, verbose)
+    else:
+        results = correlation.continuous_correlations(df, verbose, args.measured_only)
+
+    run.stage("Calculating correlations (categorical tertiles)")
+    results += correlation.categorical_correlations(df, verbose, args.measured_only, same_sample=args.imputed)
+
+    run.stage("Calculating borough-specific mold correlations")
+    results += correlation.borough_mold_correlations(df, verbose, same_sample=args.imputed)
+    if args.lags:
+        results += correlation.lagged_correlations(df, tuple(range(1, args.lags + 1)), verbose)
+    if args.coastal:
+        from nyc_asthma.coastal import add_coastal
+
+        results += correlation.coastal_correlations(add_coastal(df), verbose)
+
+    if args.measured_only:
+        kept = {r['Variable'] for r in results}
+        for var_name, var_col in {**correlation.CONTINUOUS_VARS, **correlation.CATEGORICAL_VARS}.items():
+            if var_col in df.columns and var_name not in kept:
+                print(f"\n⚠️  --measured-only left no measured cells for {var_name}; it is missing from the results")
+
+    run.stage("Summarizing correlations")
+    results_df = correlation.summarize(results)
+    results_df.to_csv(args.output, index=False)
+    print(f"\n✓ Saved full results to: {args.output}")
+    run.rows(rows_in=len(df), rows_out=len(results_df))
+    run.finish()
+
+    _print_correlation_summary(results_df)
+
+
+def cmd_plot(args):
+    from nyc_asthma.panel_store import read_panel
+    from nyc_asthma.plots import HEATMAP_COLUMNS, correlation_heatmap
+
+    df, _ = read_panel(args.input, lambda available: [c for c in HEATMAP_COLUMNS if c in available], years=[args.year])
+    correlation_heatmap(df, args.output, year=args.year)
+    print(f"  ✓ Saved heatmap to: {args.output}")
+
+
+def cmd_scenarios(args):
+    import time
+
+    from nyc_asthma import scenarios
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.temporal import parse_alignment
+
+    try:
+        grid = scenarios.parse_grid(args.grid)
+        alignment = parse_alignment(args.align)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    _banner("CORRELATION SENSITIVITY TO PIPELINE CHOICES")
+    run = PipelineRun('scenarios', total_stages=2)
+
+    run.stage("Running scenarios")
+    start = time.perf_counter()
+    results = scenarios.run_scenarios(grid, alignment, args.workers)
+    print(f"  ✓ {results['scenario'].nunique()} scenarios in {time.perf_counter() - start:.1f}s")
+    run.rows(rows_out=len(results))
+
+    run.stage("Comparing with the baseline")
+    table = scenarios.compare(results)
+
+    if 'max |Δ|' in table.columns:
+        print(f"\nCorrelations that move most from the baseline ({', '.join(f'{o}={v}' for o, v in scenarios.BASELINE.items())}):")
+        for _, row in table.head(args.top).iterrows():
+            moved = row.filter(like='Δ ').abs().idxmax()
+            print(f"  {row['Asthma Outcome'][:28]:28} {row['Variable'][:26]:26} r = {row['baseline']:6.3f}  "
+                  f"{row[moved]:+.3f} under {moved[2:]}")
+
+    table.to_csv(args.output, index=False)
+    print(f"\n✓ Saved to: {args.output}")
+    if args.long_output:
+        results.to_csv(args.long_output, index=False)
+        print(f"✓ Saved to: {args.long_output}")
+    run.rows(rows_in=len(results), rows_out=len(table))
+    run.finish()
+
+
+# ----------------------------------------------------------------------------
+# 311 mold stages
+# ----------------------------------------------------------------------------
+
+def _mold_source(args):
+    """--source, or the cached 311 export (sources.py)."""
+    from nyc_asthma.sources import source_path
+
+    return args.source or source_path('mold_311')
+
+
+def cmd_dedup(args):
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.mold_dedup import dedup_counts
+
+    _banner("DEDUPLICATING REPEATED 311 MOLD COMPLAINTS")
+    run = PipelineRun('mold_dedup', total_stages=1)
+
+    run.stage("Collapsing repeat complaints per building")
+    counts = dedup_counts(_mold_source(args), window_days=args.window_days)
+    print(f"  ✓ Window: {args.window_days} days")
+    print(f"  ✓ Year-UHF cells: {len(counts)}")
+    print(f"  ✓ Raw complaints: {counts['mold_complaints'].sum():,}")
+    print(f"  ✓ After collapsing repeats: {counts['mold_complaints_dedup'].sum():,}")
+    counts.to_csv(args.output, index=False)
+    print(f"\n✓ Saved to: {args.output}")
+    run.rows(rows_in=int(counts['mold_complaints'].sum()), rows_out=len(counts))
+    run.finish()
+
+
+def cmd_buildings(args):
+    from nyc_asthma.building_index import BuildingIndex, build_building_index, write_building_index
+    from nyc_asthma.instrumentation import PipelineRun
+
+    run = PipelineRun('building_index', total_stages=1 if args.query_only else 2)
+    if not args.query_only:
+        _banner("BUILDING BBL REPEAT-COMPLAINT INDEX")
+        run.stage("Indexing complaints by building")
+        table, descriptors, location_types = build_building_index(_mold_source(args))
+        write_building_index(table, descriptors, location_types, args.index_dir)
+        print(f"  ✓ Buildings: {len(table):,}")
+        print(f"  ✓ Repeat buildings (2+ complaints): {(table['complaints'] > 1).sum():,}")
+        print(f"  ✓ Saved to: {args.index_dir}")
+        run.rows(rows_in=int(table['complaints'].sum()), rows_out=len(table))
+
+    run.stage("Querying top buildings")
+    try:
+        index = BuildingIndex(args.index_dir)
+    except ValueError as e:
+        raise SystemExit(f"{e}; rebuild the index without --query-only")
+    codes = [args.uhf] if args.uhf is not None else [101, 201, 301, 401, 501]
+    print(f"\nTop {args.top} chronic-mold buildings:")
+    for code in codes:
+        top = index.top_buildings(code, k=args.top)
+        if not top.empty:
+            print(f"\n  UHF {code}:")
+            print(top[['bbl', 'complaints', 'first_seen', 'last_seen']].to_string(index=False))
+    run.finish()
+
+
+def cmd_resolution(args):
+    import pandas as pd
+
+    from nyc_asthma.correlation import ASTHMA_OUTCOMES
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.resolution_times import build_resolution_sketches, correlate_with_asthma
+
+    outcomes = args.outcome or list(ASTHMA_OUTCOMES.values())
+    unknown = sorted(set(outcomes) - set(ASTHMA_OUTCOMES.values()))
+    if unknown:
+        raise SystemExit(f"Unknown outcome(s) {', '.join(unknown)}; choose from {', '.join(ASTHMA_OUTCOMES.values())}")
+
+    _banner("311 MOLD COMPLAINT RESOLUTION TIMES")
+    run = PipelineRun('resolution_times', total_stages=2)
+
+    run.stage("Sketching resolution times per UHF and year")
+    sketches = build_resolution_sketches(_mold_source(args))
+    if args.level == 'UHF34':
+        from nyc_asthma.harmonize import uhf34_membership
+
+        sketches = sketches.to_level(uhf34_membership())
+    summary = sketches.summary()
+    print(f"  ✓ {args.level}-year cells: {len(summary)}")
+    print(f"  ✓ Closed complaints: {summary['closed_complaints'].sum():,}")
+    print(f"  ✓ Still open: {summary['open_complaints'].sum():,}")
+    print(f"  ✓ Closed without a valid duration (dropped): {summary['invalid_complaints'].sum():,}")
+
+    print("\nCitywide median / p90 resolution time by year (days):")
+    for yr, sketch in sorted(sketches.rollup('year').items()):
+        p50, p90 = sketch.quantile([0.5, 0.9]) / 24.0
+        print(f"  {yr}: {p50:6.1f} / {p90:6.1f}")
+    run.rows(rows_in=int(summary[['closed_complaints', 'open_complaints', 'invalid_complaints']].sum().sum()),
+             rows_out=len(summary))
+
+    run.stage("Correlating with asthma outcomes")
+    if os.path.exists(args.panel):
+        panel = pd.read_csv(args.panel, usecols=['year', 'uhf_code'] + outcomes)
+        missing = sorted(set(summary['uhf_code']) - set(panel['uhf_code']))
+        if missing:
+            print(f"\n⚠️  {len(missing)} {args.level} codes are not in the panel and are left out "
+                  f"(e.g. {missing[0]}); the panel may be at another level")
+        try:
+            result = correlate_with_asthma(summary, panel, outcomes, args.metric)
+        except ValueError as e:
+            raise SystemExit(f"{e} (use --level with the panel's level)")
+        print(f"\nSpearman correlation of {args.metric} with asthma outcomes:")
+        for row in result.itertuples(index=False):
+            print(f"  {row[0]}: ρ = {row[2]:.3f}, n = {row[3]}")
+    else:
+        print(f"\n  (no panel at {args.panel}: correlations skipped, run geocode first)")
+
+    summary.to_csv(args.output, index=False)
+    print(f"\n✓ Saved to: {args.output}")
+    run.finish()
+
+
+def cmd_crosscorr(args):
+    from nyc_asthma.crosscorr import ED_OUTCOMES, mold_ed_scan
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.merge import load_cleaned_asthma
+
+    _banner(f"MONTHLY MOLD COMPLAINTS vs {ED_OUTCOMES[args.outcome].upper()} (LAGS ±{args.max_lag})")
+    run = PipelineRun('mold_ed_crosscorr', total_stages=2)
+
+    run.stage("Loading asthma datasets")
+    asthma = load_cleaned_asthma()
+    run.rows(rows_out=sum(len(df) for df in asthma.values()))
+
+    run.stage("Scanning lags with block bootstrap")
+    by_uhf, pooled = mold_ed_scan(asthma, args.outcome, _mold_source(args), args.max_lag,
+                                  args.boot, args.block, args.seed)
+    print(f"  ✓ UHFs: {by_uhf['uhf_code'].nunique()}, lags: {len(pooled)}, bootstrap replicates: {args.boot}")
+
+    print("\nPooled r by lag (complaints lead for lag > 0):")
+    for _, row in pooled.iterrows():
+        if row['lag'] % 6 == 0:
+            band = f"  [{row['lower']:6.3f}, {row['upper']:6.3f}]" if 'lower' in row else ''
+            print(f"  {int(row['lag']):+4d}: r = {row['r']:6.3f}{band}")
+    if 'lower' in pooled:
+        outside = pooled[(pooled['r'] < pooled['lower']) | (pooled['r'] > pooled['upper'])]
+        print(f"\n  Lags outside the bootstrap band: {', '.join(f'{int(k):+d}' for k in outside['lag']) or 'none'}")
+
+    pooled.to_csv(args.output, index=False)
+    by_uhf.to_csv(args.by_uhf_output, index=False)
+    print(f"\n✓ Saved to: {args.output}")
+    print(f"✓ Saved to: {args.by_uhf_output}")
+    run.rows(rows_out=len(by_uhf))
+    run.finish()
+
+
+def cmd_density(args):
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.mold_density import mold_density_by_zone
+
+    _banner("MOLD COMPLAINT DENSITY SURFACE (FFT KERNEL SMOOTHING)")
+    run = PipelineRun('mold_density', total_stages=1)
+
+    run.stage(f"Smoothing complaint density over {args.zones.upper()} zones")
+    years = list(range(args.first_year, args.last_year + 1))
+    shapefile, code_col = ((paths.NTA_SHAPEFILE, 'NTA2020') if args.zones == 'nta'
+                           else (paths.UHF34_SHAPEFILE, 'UHF34_CODE'))
+    density = mold_density_by_zone(years, shapefile, code_col, cell=args.cell_ft,
+                                   bandwidth=args.bandwidth_ft, path=_mold_source(args))
+    print(f"  ✓ Years: {years[0]}-{years[-1]}")
+    print(f"  ✓ Zone-years: {len(density)}")
+    output_file = args.output or os.path.join(paths.CLEANED_DIR, f'mold_density_by_{args.zones}_year.csv')
+    density.to_csv(output_file, index=False)
+    print(f"\n✓ Saved to: {output_file}")
+    run.rows(rows_out=len(density))
+    run.finish()
+
+
+def cmd_coastal(args):
+    import numpy as np
+
+    from nyc_asthma.coastal import ZONE_LAYERS, point_distances, zone_distances
+    from nyc_asthma.geocode import load_mold_locations
+    from nyc_asthma.instrumentation import PipelineRun
+
+    _banner(f"COASTAL vs INLAND {args.zones.upper()} NEIGHBORHOODS")
+    run = PipelineRun('coastal', total_stages=2)
+
+    run.stage("Measuring zone distances to the shoreline")
+    zones = zone_distances(args.zones, threshold=args.threshold_ft)
+    print(f"  ✓ Coastal (centroid within {args.threshold_ft:,.0f} ft of shore): {zones['coastal'].sum()}, "
+          f"inland: {(~zones['coastal']).sum()}")
+    print(f"  ✓ Touching the shoreline: {zones['touches_shore'].sum()}")
+    run.rows(rows_out=len(zones))
+
+    run.stage("Measuring complaint distances to the shoreline")
+    mold = load_mold_locations()
+    distances = point_distances(mold['Latitude'], mold['Longitude'], ZONE_LAYERS[args.zones][0])
+    located = distances[~np.isnan(distances)]
+    print(f"  ✓ Mold complaints with coordinates: {len(located):,} of {len(distances):,}, "
+          f"median {np.median(located):,.0f} ft from shore, "
+          f"{np.mean(located <= args.threshold_ft):.1%} within {args.threshold_ft:,.0f} ft")
+
+    output_file = args.output or os.path.join(paths.CLEANED_DIR, f'coastal_{args.zones}.csv')
+    zones.sort_values('shore_distance_ft').to_csv(output_file, index=False)
+    print(f"\n✓ Saved to: {output_file}")
+    run.rows(rows_in=len(distances), rows_out=len(located))
+    run.finish()
+
+
+def cmd_zonal(args):
+    import time
+
+    from nyc_asthma.instrumentation import PipelineRun
+    from nyc_asthma.zonal import RasterGrid, zonal_table
+
+    grid = None
+    if args.grid:
+        try:
+            x0, y0, dx, dy = (float(v) for v in args.grid.split(','))
+        except ValueError:
+            raise SystemExit(f"--grid must be X0,Y0,DX,DY, got {args.grid!r}")
+        grid = RasterGrid(x0, y0, dx, dy, 0, 0, args.crs)
+
+    _banner(f"ZONAL STATISTICS: {os.path.basename(args.raster)} OVER {args.zones.upper()}")
+    run = PipelineRun('zonal_stats', total_stages=1)
+
+    run.stage("Computing zonal statistics")
+    start = time.perf_counter()
+    try:
+        table = zonal_table(args.raster, args.zones, args.variable, grid, tuple(args.stats), args.batch)
+    except (ImportError, ValueError) as e:
+        raise SystemExit(str(e))
+    print(f"  ✓ Time steps: {table['time'].nunique()}, zones: {len(table) // table['time'].nunique()}")
+    if 'coverage' in table:
+        print(f"  ✓ Zone-steps without data: {(table['coverage'] == 0).sum():,}")
+    print(f"  ✓ Done in {time.perf_counter() - start:.1f}s")
+
+    stem = os.path.splitext(os.path.basename(args.raster))[0]
+    output_file = args.output or os.path.join(paths.CLEANED_DIR, f'{stem}_by_{args.zones}.csv')
+    table.to_csv(output_file, index=False)
+    print(f"\n✓ Saved to: {output_file}")
+    run.rows(rows_out=len(table))
+    run.finish()
+
+
+def cmd_store(args):
+    import pandas as pd
+
+    from nyc_asthma.panel_store import open_panel_store, write_panel_store
+
+    _banner("BUILDING MEMORY-MAPPED PANEL STORE")
+    panel = pd.read_csv(args.input)
+    write_panel_store(panel, args.store)
+    store = open_panel_store(args.store)
+    print(f"  ✓ Saved to: {args.store}")
+    print(f"  ✓ Axes: {len(store.time_labels)} {store.time_name} x {len(store.geo_labels)} {store.geo_name}")
+    print(f"  ✓ Variables: {len(store.variables)}")
+
+
+def cmd_sql(args):
+    import pandas as pd
+
+    from nyc_asthma.sql_store import open_sql_store
+
+    with open_sql_store(args.db, rebuild=args.rebuild) as db:
+        if not args.query:
+            _banner(f"SQL STORE: {args.db}")
+            print(f"Built: {db.meta['built_at']}")
+            for kind, names in [('Tables', db.tables), ('Views', db.views)]:
+                print(f"\n{kind}:")
+                for name in names:
+                    count = db.query(f"SELECT COUNT(*) AS n FROM {name}")['n'].iloc[0]
+                    print(f"  {name:30} {count:>8,} rows")
+            return
+
+        result = db.query(args.query)
+        if args.output:
+            result.to_csv(args.output, index=False)
+            print(f"✓ Saved {len(result):,} rows to: {args.output}")
+        else:
+            with pd.option_context('display.max_rows', args.max_rows, 'display.width', 200):
+                print(result.to_string(index=False, max_rows=args.max_rows))
+
+
+def cmd_serve(args):
+    from nyc_asthma.service import IndicatorService, serve
+
+    service = IndicatorService(args.store, args.correlations, cache_size=args.cache_size)
+    print(f"Serving dataset version {service.data.version} on http://{args.host}:{args.port} (Ctrl-C to stop)")
+    serve(service, args.host, args.port)
+
+
+# ----------------------------------------------------------------------------
+# argument parsing
+# ----------------------------------------------------------------------------
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='nyc_asthma', description='NYC asthma / mold data pipeline')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('sources', help='fetch / check the raw source files in the content-addressed cache')
+    p.add_argument('names', nargs='*', metavar='name', help='sources to fetch (default: all)')
+    p.add_argument('--origin', help='local directory, base URL or one of: local, github '
+                                    '(default: ASTHMA_SOURCE_ORIGIN or DATA)')
+    p.add_argument('--refresh', action='store_true', help='ask the origin whether cached copies are current')
+    p.add_argument('--offline', action='store_true', help='only report what is cached (same as ASTHMA_OFFLINE=1)')
+    p.add_argument('--prune', action='store_true', help='delete cached objects no source points to')
+    p.set_defaults(func=cmd_sources)
+
+    p = sub.add_parser('clean', help='clean the EH Data Portal asthma tables')
+    p.add_argument('tables', nargs='*', metavar='table',
+                   help='adults, ed-adults, ed-0-4 and/or ed-5-17 (default: all)')
+    p.add_argument('--out-dir', default=paths.CLEANED_DIR)
+    p.set_defaults(func=cmd_clean)
+
+    p = sub.add_parser('merge', help='merge cleaned asthma and poverty tables')
+    p.add_argument('--output', default=paths.MERGED_ASTHMA_POVERTY)
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser('poverty', help='roll NTA poverty up to UHF42/UHF34 for every period')
+    p.add_argument('--output', default=paths.POVERTY_BY_UHF)
+    p.set_defaults(func=cmd_poverty)
+
+    p = sub.add_parser('impute', help='fill missing UHF-year values from spatial and temporal neighbors')
+    p.add_argument('--input', default=paths.FINAL_DATASET)
+    p.add_argument('--output', default=paths.IMPUTED_DATASET)
+    p.add_argument('--draws-output', default=paths.IMPUTATION_DRAWS)
+    p.add_argument('--draws', type=int, default=20, help='multiple-imputation draws (at least 2)')
+    p.add_argument('--spatial-weight', type=float, default=1.0)
+    p.add_argument('--temporal-weight', type=float, default=1.0)
+    p.add_argument('--seed', type=int, default=0)
+    p.set_defaults(func=cmd_impute)
+
+    p = sub.add_parser('smooth', help='empirical-Bayes smoothed ED rates for every UHF-year and age group')
+    p.add_argument('--prior', choices=['borough', 'neighbors'], default='borough')
+    p.add_argument('--output', default=paths.ED_RATES_SMOOTHED)
+    p.set_defaults(func=cmd_smooth)
+
+    p = sub.add_parser('forecast', help='exponential-smoothing forecasts of ED rates per UHF and age group')
+    p.add_argument('--through', type=int, default=2026, help='last year to forecast')
+    p.add_argument('--interval', type=float, default=0.9)
+    p.add_argument('--horizon', type=int, default=3, help='backtest steps (years)')
+    p.add_argument('--skip-years', type=int, nargs='*', default=[2020, 2021],
+                   help='years treated as missing (default: the pandemic years)')
+    p.add_argument('--output', default=paths.ED_FORECASTS)
+    p.add_argument('--backtest-output', default=paths.ED_FORECAST_BACKTEST)
+    p.set_defaults(func=cmd_forecast)
+
+    p = sub.add_parser('rollup', help='indicators at every level from NTA to citywide')
+    p.add_argument('--output', default=paths.INDICATORS_BY_LEVEL)
+    p.add_argument('--show', choices=['NTA', 'UHF42', 'UHF34', 'borough', 'citywide'],
+                   help='print one level for --year')
+    p.add_argument('--year', type=int, help='year to print with --show (default: latest)')
+    p.set_defaults(func=cmd_rollup)
+
+    p = sub.add_parser('features', help='cache lags, rolling means and deltas of the final panel')
+    p.add_argument('--input', default=paths.FINAL_DATASET)
+    p.add_argument('--lags', type=int, default=3, help='lags 1..LAGS years')
+    p.add_argument('--windows', type=int, nargs='*', default=[2, 3, 5], help='rolling-mean windows (years)')
+    p.add_argument('--show', metavar='COLUMN', help='print a few rows of a column and its features')
+    p.set_defaults(func=cmd_features)
+
+    p = sub.add_parser('crossval', help='spatially / temporally blocked cross-validation of a model')
+    p.add_argument('--input', default=paths.FINAL_DATASET)
+    p.add_argument('--model', choices=['ridge', 'boosting', 'forest'], default='ridge')
+    p.add_argument('--target', default='age_adjusted_ed_rate_per_10k')
+    p.add_argument('--features', nargs='+', default=['mold_complaints', 'poverty_rate', 'PM_Avg', 'NO2_Avg'])
+    p.add_argument('--schemes', nargs='+', choices=['borough', 'cluster', 'temporal', 'random'],
+                   default=['borough', 'cluster', 'temporal', 'random'])
+    p.add_argument('--folds', type=int, default=5, help='clusters / year blocks / random folds')
+    p.add_argument('--buffer', action='store_true', help="drop held-out neighborhoods' neighbors from training")
+    p.add_argument('--workers', type=int, help='processes (default: CPU count)')
+    p.add_argument('--output', default=os.path.join(paths.CLEANED_DIR, 'crossval_scores.csv'))
+    p.set_defaults(func=cmd_crossval)
+
+    p = sub.add_parser('drivers', help='rank drivers of the ED rates with tree ensembles')
+    p.add_argument('--input', default=paths.FINAL_DATASET)
+    p.add_argument('--model', choices=['boosting', 'forest'], default='boosting')
+    p.add_argument('--targets', nargs='+', default=['age_adjusted_ed_rate_per_10k', 'ed_rate_per_10k_age_0_4',
+                                                     'ed_rate_per_10k_age_5_17'])
+    p.add_argument('--workers', type=int, help='processes (default: CPU count)')
+    p.add_argument('--repeats', type=int, default=10, help='shuffles per feature')
+    p.add_argument('--refit', action='store_true', help='refit even if a saved model matches the data')
+    p.add_argument('--model-dir', default=paths.MODELS_DIR)
+    p.add_argument('--top', type=int, default=8)
+    p.add_argument('--output', default=paths.DRIVER_IMPORTANCE)
+    p.set_defaults(func=cmd_drivers)
+
+    p = sub.add_parser('geocode', help='geocode mold complaints and build the final merged dataset')
+    p.add_argument('--output', default=paths.FINAL_DATASET)
+    p.add_argument('--store', default=paths.FINAL_STORE)
+    p.add_argument('--align', action='append', metavar='SOURCE=METHOD[:MAX_GAP]',
+                   help='temporal alignment override, e.g. adults_with_asthma=nearest:3 or '
+                        'poverty=interpolate (methods: exact, carry_forward, nearest, interpolate, covering)')
+    p.add_argument('--smooth', choices=['borough', 'neighbors', 'none'], default='borough',
+                   help='empirical-Bayes prior for the *_eb ED rate columns (default: borough)')
+    # merge.AQE_REFERENCE_YEAR (not imported here: it pulls in pandas)
+    p.add_argument('--aqe-year', type=int, default=2017,
+                   help='year the air quality snapshot describes; other years count as imputed (default: 2017)')
+    p.set_defaults(func=cmd_geocode)
+
+    p = sub.add_parser('correlate', help='correlate asthma outcomes with environmental factors')
+    p.add_argument('--input', default=paths.FINAL_DATASET)
+    p.add_argument('--output', default=paths.CORRELATION_RESULTS)
+    p.add_argument('--quiet', action='store_true', help='only print the summary')
+    p.add_argument('--measured-only', action='store_true',
+                   help='leave out cells filled by temporal alignment (see geocode --align)')
+    p.add_argument('--raw-rates', action='store_true',
+                   help='correlate the published ED rates instead of the smoothed ones')
+    p.add_argument('--imputed', action='store_true',
+                   help='use the imputed panel and pool continuous correlations over its draws (see impute)')
+    p.add_argument('--lags', type=int, default=0, metavar='K',
+                   help='also correlate outcomes with mold / poverty 1..K years earlier')
+    p.add_argument('--coastal', action='store_true',
+                   help='also correlate within coastal and within inland neighborhoods (see coastal)')
+    p.set_defaults(func=cmd_correlate)
+
+    p = sub.add_parser('plot', help='draw the correlation heatmap')
+    p.add_argument('--input', default=paths.FINAL_DATASET)
+    p.add_argument('--output', default=paths.CORRELATION_HEATMAP)
+    p.add_argument('--year', type=int, default=2020)
+    p.set_defaults(func=cmd_plot)
+
+    p = sub.add_parser('scenarios', help='correlations under alternative geocoding, crosswalk and normalization choices')
+    p.add_argument('--grid', nargs='*', metavar='OPTION=VALUE[,VALUE]',
+                   help='options to vary, others stay at baseline (default: all of smoothing=borough,neighbors,none '
+                        'duplicates=last,first geocoding=centroid,polygon mold_measure=count,rate years=all,2020)')
+    p.add_argument('--align', action='append', metavar='SOURCE=METHOD[:MAX_GAP]',
+                   help='temporal alignment override, as for geocode')
+    p.add_argument('--workers', type=int, help='processes (default: CPU count)')
+    p.add_argument('--top', type=int, default=10)
+    p.add_argument('--output', default=paths.SCENARIO_CORRELATIONS)
+    p.add_argument('--long-output', help='also save one row per scenario and correlation')
+    p.set_defaults(func=cmd_scenarios)
+
+    p = sub.add_parser('dedup', help='raw vs deduplicated 311 mold complaints per UHF-year')
+    p.add_argument('--source', help='311 export (default: the cached mold_311 source, see sources)')
+    p.add_argument('--window-days', type=float, default=30)
+    p.add_argument('--output', default=os.path.join(paths.CLEANED_DIR, 'mold_complaints_dedup_by_uhf_year.csv'))
+    p.set_defaults(func=cmd_dedup)
+
+    p = sub.add_parser('buildings', help='build / query the BBL repeat-complaint index')
+    p.add_argument('--source', help='311 export (default: the cached mold_311 source, see sources)')
+    p.add_argument('--index-dir', default=os.path.join(paths.CLEANED_DIR, 'mold_building_index'))
+    p.add_argument('--uhf', type=int, help='UHF42 code to list (default: first UHF of each borough)')
+    p.add_argument('--top', type=int, default=5)
+    p.add_argument('--query-only', action='store_true', help='query an existing index without rebuilding')
+    p.set_defaults(func=cmd_buildings)
+
+    p = sub.add_parser('resolution', help='311 resolution-time quantiles per UHF-year, vs asthma outcomes')
+    p.add_argument('--source', help='311 export (default: the cached mold_311 source, see sources)')
+    p.add_argument('--level', choices=['UHF34', 'UHF42'], default='UHF34',
+                   help='neighborhoods to summarize by (the merged panel is UHF34)')
+    p.add_argument('--panel', default=paths.FINAL_DATASET, help='panel with the asthma outcomes')
+    p.add_argument('--outcome', action='append', metavar='COLUMN',
+                   help='outcome column to correlate with (repeatable; default: every asthma outcome)')
+    p.add_argument('--metric', choices=['p50_resolution_hours', 'p90_resolution_hours'],
+                   default='p50_resolution_hours')
+    p.add_argument('--output', default=os.path.join(paths.CLEANED_DIR, 'mold_resolution_times_by_uhf_year.csv'))
+    p.set_defaults(func=cmd_resolution)
+
+    p = sub.add_parser('crosscorr', help='lagged cross-correlation of monthly mold complaints and ED rates')
+    p.add_argument('--source', help='311 export (default: the cached mold_311 source, see sources)')
+    p.add_argument('--outcome', choices=['ed_adults', 'ed_age_0_4', 'ed_age_5_17'], default='ed_adults')
+    p.add_argument('--max-lag', type=int, default=24, help='months')
+    p.add_argument('--boot', type=int, default=500, help='block-bootstrap replicates (0: no bands)')
+    p.add_argument('--block', type=int, default=12, help='bootstrap block length (months)')
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--output', default=os.path.join(paths.CLEANED_DIR, 'mold_ed_crosscorr.csv'))
+    p.add_argument('--by-uhf-output', default=os.path.join(paths.CLEANED_DIR, 'mold_ed_crosscorr_by_uhf.csv'))
+    p.set_defaults(func=cmd_crosscorr)
+
+    p = sub.add_parser('density', help='kernel-smoothed mold complaint density per polygon')
+    p.add_argument('--source', help='311 export (default: the cached mold_311 source, see sources)')
+    p.add_argument('--zones', choices=['uhf34', 'nta'], default='uhf34')
+    p.add_argument('--first-year', type=int, default=2010)
+    p.add_argument('--last-year', type=int, default=2025)
+    # mold_density.DEFAULT_CELL_FT / DEFAULT_BANDWIDTH_FT (not imported here: it pulls in geopandas)
+    p.add_argument('--cell-ft', type=float, default=500.0)
+    p.add_argument('--bandwidth-ft', type=float, default=1500.0)
+    p.add_argument('--output', help='default: DATA/CLEANED/mold_density_by_<zones>_year.csv')
+    p.set_defaults(func=cmd_density)
+
+    p = sub.add_parser('coastal', help='distance to shore and coastal / inland class per polygon (cached)')
+    p.add_argument('--zones', choices=['uhf34', 'nta'], default='uhf34')
+    # coastal.COASTAL_DISTANCE_FT (not imported here: it pulls in geopandas)
+    p.add_argument('--threshold-ft', type=float, default=5280.0, help='centroid distance counted as coastal')
+    p.add_argument('--output', help='default: DATA/CLEANED/coastal_<zones>.csv')
+    p.set_defaults(func=cmd_coastal)
+
+    p = sub.add_parser('zonal', help='area-weighted mean / max of a gridded raster per polygon and time step')
+    p.add_argument('raster', help='.npy, .npz, GeoTIFF (.tif) or NetCDF (.nc); one layer per time step')
+    p.add_argument('--zones', choices=['uhf34', 'nta'], default='uhf34')
+    p.add_argument('--variable', help='NetCDF variable (default: the first gridded one)')
+    p.add_argument('--grid', metavar='X0,Y0,DX,DY', help='grid of a .npy raster (outer corner of cell 0,0)')
+    p.add_argument('--crs', default='EPSG:2263', help='CRS of --grid (default: State Plane feet)')
+    p.add_argument('--stats', nargs='+', choices=['mean', 'max', 'coverage'], default=['mean', 'max', 'coverage'])
+    p.add_argument('--batch', type=int, default=256, help='time steps per sparse product')
+    p.add_argument('--output', help='default: DATA/CLEANED/<raster name>_by_<zones>.csv')
+    p.set_defaults(func=cmd_zonal)
+
+    p = sub.add_parser('store', help='rebuild the memory-mapped panel store from the final CSV')
+    p.add_argument('--input', default=paths.FINAL_DATASET)
+    p.add_argument('--store', default=paths.FINAL_STORE)
+    p.set_defaults(func=cmd_store)
+
+    p = sub.add_parser('sql', help='query the cleaned tables and panels with SQL')
+    p.add_argument('query', nargs='?', help='SELECT statement (default: list tables and views)')
+    p.add_argument('--db', default=paths.SQL_STORE)
+    p.add_argument('--rebuild', action='store_true', help='rebuild even if the sources are unchanged')
+    p.add_argument('--output', help='write the result to this CSV instead of printing it')
+    p.add_argument('--max-rows', type=int, default=60)
+    p.set_defaults(func=cmd_sql)
+
+    p = sub.add_parser('serve', help='local HTTP service for UHF-year indicators')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765)
+    p.add_argument('--store', default=paths.FINAL_STORE)
+    p.add_argument('--correlations', default=paths.CORRELATION_RESULTS)
+    p.add_argument('--cache-size', type=int, default=4096)
+    p.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,160 @@
+import hashlib
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from nyc_asthma.paths import CACHE_DIR, NTA_SHAPEFILE, UHF34_SHAPEFILE
+
+# ============================================================================
+# Distance to the shoreline and coastal / inland neighborhoods
+# ============================================================================
+#
+# The shoreline is the outer boundary of the union of a polygon layer (the
+# exterior ring of every island), in State Plane feet. That boundary also
+# runs along the city line with Westchester and Nassau, which is land:
+# boundary segments lying along LAND_BORDERS are dropped. Holes in the
+# union (lakes, reservoirs) are not shoreline either.
+#
+# The remaining segments go into an STRtree (shapely); distances from
+# polygons and from complaint points are one vectorized nearest-segment
+# query against it. Polygon distances are cached per shapefile and point
+# distances per set of coordinates, so analyses stratified by coastal /
+# inland do no geometry work after the first run.
+#
+# A polygon is coastal when its centroid lies within COASTAL_DISTANCE_FT of
+# the shore. UHF34 code 0 (land outside every neighborhood) is part of the
+# shoreline but not a zone. touches_shore (any part of it on the shoreline) is kept as well:
+# it marks most large neighborhoods around Jamaica Bay or the East River,
+# which is too broad to be a useful contrast on its own.
+
+COASTAL_CACHE_DIR = os.path.join(CACHE_DIR, 'coastal')
+SHORE_CRS = 'EPSG:2263'
+COASTAL_VERSION = 2
+
+# City line on land (lon, lat), traced from the union of the bundled shapefiles
+LAND_BORDERS = {
+    'Westchester': [(-73.9110, 40.9150), (-73.8966, 40.9112), (-73.8782, 40.9058), (-73.8593, 40.9006),
+                    (-73.8540, 40.9080), (-73.8470, 40.9062), (-73.8401, 40.9007), (-73.8390, 40.8956),
+                    (-73.8239, 40.8900), (-73.8127, 40.8885), (-73.7937, 40.8829)],
+    'Nassau': [(-73.7471, 40.7805), (-73.7340, 40.7724), (-73.7164, 40.7616), (-73.7052, 40.7547),
+               (-73.7003, 40.7397), (-73.7052, 40.7319), (-73.7105, 40.7272), (-73.7251, 40.7242),
+               (-73.7292, 40.7192), (-73.7267, 40.7031), (-73.7259, 40.6832), (-73.7280, 40.6698),
+               (-73.7272, 40.6599), (-73.7251, 40.6525), (-73.7414, 40.6469)],
+    'Nassau (Rockaway)': [(-73.7482, 40.6120), (-73.7454, 40.6112), (-73.7431, 40.6079), (-73.7405, 40.6046),
+                          (-73.7382, 40.6027), (-73.7383, 40.5982), (-73.7381, 40.5960)],
+}
+LAND_BORDER_TOLERANCE_FT = 750.0
+COASTAL_DISTANCE_FT = 5280.0
+
+ZONE_LAYERS = {
+    'uhf34': (UHF34_SHAPEFILE, 'UHF34_CODE'),
+    'nta': (NTA_SHAPEFILE, 'NTA2020'),
+}
+
+
+def _layer_key(shapefile):
+    stat = os.stat(shapefile)
+    name = os.path.splitext(os.path.basename(shapefile))[0]
+    return f"{name}_{stat.st_size}_{int(stat.st_mtime)}_v{COASTAL_VERSION}_{LAND_BORDER_TOLERANCE_FT:g}"
+
+
+def shoreline_segments(shapefile=UHF34_SHAPEFILE):
+    """
+    Shoreline of a polygon layer as line segments.
+
+    Returns:
+        np.ndarray: [n_segments, 4] of x1, y1, x2, y2 in State Plane feet.
+    """
+    polygons = gpd.read_file(shapefile).to_crs(SHORE_CRS)
+    rings = shapely.get_exterior_ring(shapely.get_parts(shapely.union_all(shapely.make_valid(polygons.geometry))))
+    segments = []
+    for ring in rings:
+        coords = shapely.get_coordinates(ring)
+        segments.append(np.hstack([coords[:-1], coords[1:]]))
+    segments = np.vstack(segments)
+
+    borders = gpd.GeoSeries([shapely.LineString(line) for line in LAND_BORDERS.values()],
+                            crs='EPSG:4326').to_crs(SHORE_CRS)
+    land = shapely.union_all(borders.to_numpy())
+    near_land = [shapely.dwithin(land, shapely.points(segments[:, i:i + 2]), LAND_BORDER_TOLERANCE_FT)
+                 for i in (0, 2)]
+    return segments[~(near_land[0] & near_land[1])]
+
+
+def shore_index(segments):
+    """STRtree over shoreline segments."""
+    lines = shapely.linestrings(segments.reshape(-1, 2, 2))
+    return shapely.STRtree(lines)
+
+
+def distance_to_shore(geometries, tree):
+    """Distance (feet) from each geometry to the nearest shoreline segment."""
+    _, distances = tree.query_nearest(geometries, return_distance=True, all_matches=False)
+    return distances
+
+
+def zone_distances(zones='uhf34', cache_dir=COASTAL_CACHE_DIR, threshold=COASTAL_DISTANCE_FT):
+    """
+    Distance to shore and coastal / inland class of every polygon, cached.
+
+    Args:
+        zones (str): 'uhf34' or 'nta'.
+        threshold (float): Centroid distance (feet) up to which a polygon is coastal.
+
+    Returns:
+        pd.DataFrame: <code column>, shore_distance_ft (centroid),
+        min_shore_distance_ft, touches_shore, coastal.
+    """
+    shapefile, code_col = ZONE_LAYERS[zones]
+    cache_file = os.path.join(cache_dir, f"zones_{_layer_key(shapefile)}.csv")
+    if os.path.exists(cache_file):
+        table = pd.read_csv(cache_file, dtype={code_col: str} if zones == 'nta' else None)
+    else:
+        polygons = gpd.read_file(shapefile).to_crs(SHORE_CRS)
+        if zones == 'uhf34':
+            polygons = polygons[polygons[code_col].astype(int) > 0]
+        tree = shore_index(shoreline_segments(shapefile))
+        geoms = shapely.make_valid(polygons.geometry.to_numpy())
+        table = pd.DataFrame({
+            code_col: polygons[code_col].to_numpy(),
+            'shore_distance_ft': distance_to_shore(shapely.centroid(geoms), tree),
+            'min_shore_distance_ft': distance_to_shore(geoms, tree),
+        })
+        os.makedirs(cache_dir, exist_ok=True)
+        table.to_csv(cache_file, index=False)
+    table['touches_shore'] = table['min_shore_distance_ft'] <= 1.0
+    table['coastal'] = table['shore_distance_ft'] <= threshold
+    return table
+
+
+def point_distances(lat, lon, shapefile=UHF34_SHAPEFILE, cache_dir=COASTAL_CACHE_DIR):
+    """
+    Distance (feet) from each point to the shoreline, cached by the coordinates.
+
+    Missing coordinates give NaN.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    digest = hashlib.sha1(lat.tobytes() + lon.tobytes()).hexdigest()[:16]
+    cache_file = os.path.join(cache_dir, f"points_{_layer_key(shapefile)}_{digest}.npy")
+    if os.path.exists(cache_file):
+        return np.load(cache_file)
+
+    out = np.full(len(lat), np.nan)
+    ok = ~(np.isnan(lat) | np.isnan(lon))
+    if ok.any():
+        points = gpd.GeoSeries(gpd.points_from_xy(lon[ok], lat[ok]), crs='EPSG:4326').to_crs(SHORE_CRS)
+        out[ok] = distance_to_shore(points.to_numpy(), shore_index(shoreline_segments(shapefile)))
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(cache_file, out)
+    return out
+
+
+def add_coastal(df, threshold=COASTAL_DISTANCE_FT):
+    """UHF34 panel plus shore_distance_ft and coastal ('Coastal' / 'Inland') by uhf_code."""
+    zones = zone_distances('uhf34', threshold=threshold).rename(columns={'UHF34_CODE': 'uhf_code'})
+    zones['coastal'] = np.where(zones['coastal'], 'Coastal', 'Inland')
+    return df.merge(zones[['uhf_code', 'shore_distance_ft', 'coastal']], on='uhf_code', how='left')
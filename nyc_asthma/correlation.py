@@ -0,0 +1,309 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import pearsonr, spearmanr, t as t_dist
+
+from nyc_asthma.geography import BOROUGH_NEIGHBORHOODS, assign_borough
+
+# ============================================================================
+# Correlations between asthma outcomes and environmental / social factors
+# ============================================================================
+
+ASTHMA_OUTCOMES = {
+    'Adult Asthma Prevalence': 'age_adjusted_asthma_percent',
+    'Adult ED Visits': 'age_adjusted_ed_rate_per_10k',
+    'Child (0-4) ED Visits': 'ed_rate_per_10k_age_0_4',
+    'Child (5-17) ED Visits': 'ed_rate_per_10k_age_5_17'
+}
+
+CONTINUOUS_VARS = {
+    'NO2 (Air Quality)': 'NO2_Avg',
+    'PM2.5 (Particulate Matter)': 'PM_Avg',
+    'Mold Complaints': 'mold_complaints',
+    'Poverty Rate': 'poverty_rate'
+}
+
+CATEGORICAL_VARS = {
+    'NO2 Tertiles': 'NO2_tertiles',
+    'PM2.5 Tertiles': 'PM_tertiles',
+    'Traffic Emissions': 'Traffic_tertiles',
+    'Industrial Emissions': 'Industrial_tertiles',
+    'Building Emissions': 'Building_emissions',
+    'Cooking Emissions': 'cook_tertiles'
+}
+
+# Exposures that change year to year, correlated at lags (see features.py)
+LAGGED_VARS = {
+    'Mold Complaints': 'mold_complaints',
+    'Poverty Rate': 'poverty_rate'
+}
+
+# Column -> mask marking cells filled by temporal alignment (see temporal.py)
+IMPUTED_MASKS = {
+    'age_adjusted_asthma_percent': 'adult_asthma_imputed',
+    'poverty_rate': 'poverty_imputed',
+    'NO2_Avg': 'air_quality_imputed',
+    'PM_Avg': 'air_quality_imputed',
+    **{col: 'air_quality_imputed' for col in CATEGORICAL_VARS.values()},
+}
+
+
+def encode_tertile(val):
+    """Encode tertiles: Low=1, Medium=2, High=3."""
+    if pd.isna(val):
+        return np.nan
+    val_str = str(val).strip()
+    if val_str == 'Low':
+        return 1
+    elif val_str == 'Medium':
+        return 2
+    elif val_str == 'High':
+        return 3
+    else:
+        return np.nan
+
+
+def significance_stars(p):
+    return "***" if p < 0.001 else "**" if p < 0.01 else "*" if p < 0.05 else ""
+
+
+def _result(outcome, variable, r, p, n, kind, n_imputed=0):
+    return {
+        'Asthma Outcome': outcome,
+        'Variable': variable,
+        'Correlation (r)': r,
+        'P-value': p,
+        'Significance': 'Yes' if p < 0.05 else 'No',
+        'N': n,
+        'N Imputed': n_imputed,
+        'Type': kind
+    }
+
+
+def imputed_rows(df, columns):
+    """True where any of the columns holds an aligned or imputed (not measured) value."""
+    masks = [IMPUTED_MASKS[c] for c in columns if IMPUTED_MASKS.get(c) in df.columns]
+    masks += [f'{c}_filled' for c in columns if f'{c}_filled' in df.columns]
+    if not masks:
+        return pd.Series(False, index=df.index)
+    return df[masks].fillna(False).astype(bool).any(axis=1)
+
+
+def _pairs(df, outcome, variable, measured_only):
+    """Complete (outcome, variable) pairs and how many of them are imputed."""
+    pairs = pd.DataFrame({'outcome': df[outcome], 'variable': variable,
+                          'imputed': imputed_rows(df, [outcome, variable.name])}).dropna()
+    if measured_only:
+        pairs = pairs[~pairs['imputed']]
+    return pairs, int(pairs['imputed'].sum())
+
+
+def use_smoothed_rates(df):
+    """
+    Swap ED outcome rates for their empirical-Bayes versions ('<rate>_eb').
+
+    Returns:
+        tuple: (DataFrame, list of the columns replaced)
+    """
+    df = df.copy()
+    replaced = [col for col in ASTHMA_OUTCOMES.values() if f'{col}_eb' in df.columns]
+    for col in replaced:
+        df[col] = df[f'{col}_eb']
+    return df, replaced
+
+
+def analysis_columns(columns):
+    """The panel columns the correlation stages read, in the order given."""
+    wanted = {'year', 'uhf_code', 'neighborhood', *CONTINUOUS_VARS.values(), *CATEGORICAL_VARS.values(),
+              *IMPUTED_MASKS.values()}
+    wanted |= {f'{col}_eb' for col in ASTHMA_OUTCOMES.values()} | set(ASTHMA_OUTCOMES.values())
+    return [c for c in columns if c in wanted or (c.endswith('_filled') and c[:-len('_filled')] in wanted)]
+
+
+def add_borough(df):
+    df = df.copy()
+    df['borough'] = df['neighborhood'].apply(assign_borough)
+    return df
+
+
+def continuous_correlations(df, verbose=True, measured_only=False):
+    """
+    Pearson correlation of every outcome with every continuous variable.
+
+    With measured_only, pairs where either side was filled by temporal
+    alignment are left out; otherwise they count and are reported in 'N Imputed'.
+    """
+    results = []
+    for outcome_name, outcome_col in ASTHMA_OUTCOMES.items():
+        if verbose:
+            print(f"\n  {outcome_name}:")
+        for var_name, var_col in CONTINUOUS_VARS.items():
+            valid_data, n_imputed = _pairs(df, outcome_col, df[var_col], measured_only)
+            if len(valid_data) > 2:
+                r, p = pearsonr(valid_data['outcome'], valid_data['variable'])
+                results.append(_result(outcome_name, var_name, r, p, len(valid_data), 'Continuous', n_imputed))
+                if verbose:
+                    print(f"    {var_name}: r = {r:.3f}, p = {p:.4f} {significance_stars(p)}"
+                          f"{f'  ({n_imputed} imputed)' if n_imputed else ''}")
+    return results
+
+
+def common_sample(df, outcome_col, var_cols):
+    """Rows where the outcome and every variable are available."""
+    return df[[outcome_col] + list(var_cols)].notna().all(axis=1)
+
+
+def pooled_correlations(completed, draws, verbose=True):
+    """
+    Pearson correlations over multiple-imputation draws (imputation.impute_panel).
+
+    Each outcome is correlated with every continuous variable on one sample:
+    the rows where the outcome and all continuous variables are available
+    after imputation. r is pooled on Fisher's z with Rubin's rules, so the
+    p-value includes the between-draw spread. Without draws, the point fill
+    is correlated on its own (no between-draw variance).
+
+    Args:
+        completed (pd.DataFrame): Point-imputed panel with '<column>_filled' masks.
+        draws (list): One DataFrame per draw, aligned row-for-row with `completed`
+            (imputation.split_draws).
+    """
+    draws = list(draws) or [completed]
+    var_cols = [c for c in CONTINUOUS_VARS.values() if c in completed.columns]
+    results = []
+    for outcome_name, outcome_col in ASTHMA_OUTCOMES.items():
+        sample = common_sample(completed, outcome_col, var_cols)
+        n = int(sample.sum())
+        if verbose:
+            print(f"\n  {outcome_name} (n = {n} in every pair):")
+        if n <= 3:
+            continue
+        for var_name, var_col in CONTINUOUS_VARS.items():
+            if var_col not in var_cols:
+                continue
+            z = np.array([np.arctanh(np.clip(pearsonr(d.loc[sample, outcome_col], d.loc[sample, var_col])[0],
+                                             -0.999999, 0.999999)) for d in draws])
+            m = len(z)
+            within = 1.0 / (n - 3)
+            between = z.var(ddof=1) if m > 1 else 0.0
+            total = within + (1 + 1 / m) * between
+            dof = (m - 1) * (1 + within / ((1 + 1 / m) * between)) ** 2 if between > 0 else np.inf
+            p = 2 * t_dist.sf(abs(z.mean()) / np.sqrt(total), dof)
+            r = float(np.tanh(z.mean()))
+            n_imputed = int(imputed_rows(completed.loc[sample], [outcome_col, var_col]).sum())
+            results.append(_result(outcome_name, var_name, r, p, n, 'Continuous (pooled)', n_imputed))
+            if verbose:
+                print(f"    {var_name}: r = {r:.3f}, p = {p:.4f} {significance_stars(p)}"
+                      f"{f'  ({n_imputed} imputed)' if n_imputed else ''}")
+    return results
+
+
+def lagged_correlations(df, lags=(1, 2, 3), verbose=True):
+    """
+    Pearson correlation of every outcome with earlier years of the
+    time-varying exposures (mold complaints, poverty), per neighborhood-year.
+
+    Lags come from the cached feature store (features.py), so repeated runs
+    only load the columns they need.
+    """
+    from nyc_asthma.features import feature_store
+
+    var_cols = [c for c in LAGGED_VARS.values() if c in df.columns]
+    outcome_cols = [c for c in ASTHMA_OUTCOMES.values() if c in df.columns]
+    store, _ = feature_store(df, outcome_cols + var_cols, lags=lags, windows=())
+    features = store.load(outcome_cols + [f'{c}_lag{k}' for c in var_cols for k in lags])
+
+    results = []
+    for outcome_name, outcome_col in ASTHMA_OUTCOMES.items():
+        if outcome_col not in outcome_cols:
+            continue
+        if verbose:
+            print(f"\n  {outcome_name}:")
+        for var_name, var_col in LAGGED_VARS.items():
+            if var_col not in var_cols:
+                continue
+            for k in lags:
+                valid_data = features[[outcome_col, f'{var_col}_lag{k}']].dropna()
+                if len(valid_data) > 2:
+                    r, p = pearsonr(valid_data.iloc[:, 0], valid_data.iloc[:, 1])
+                    results.append(_result(outcome_name, f'{var_name} (t-{k})', r, p, len(valid_data), 'Lagged'))
+                    if verbose:
+                        print(f"    {var_name} (t-{k}): r = {r:.3f}, p = {p:.4f}, n = {len(valid_data)} "
+                              f"{significance_stars(p)}")
+    return results
+
+
+def _continuous_sample(df, outcome_col):
+    """common_sample() of an outcome and every continuous variable in df."""
+    return common_sample(df, outcome_col, [c for c in CONTINUOUS_VARS.values() if c in df.columns])
+
+
+def categorical_correlations(df, verbose=True, measured_only=False, same_sample=False):
+    """
+    Spearman correlation of every outcome with every encoded tertile variable.
+
+    same_sample restricts each outcome to the rows pooled_correlations() uses.
+    """
+    encoded = {var_col: df[var_col].apply(encode_tertile).rename(var_col) for var_col in CATEGORICAL_VARS.values()}
+    results = []
+    for outcome_name, outcome_col in ASTHMA_OUTCOMES.items():
+        rows = _continuous_sample(df, outcome_col) if same_sample else slice(None)
+        if verbose:
+            print(f"\n  {outcome_name}:")
+        for var_name, var_col in CATEGORICAL_VARS.items():
+            valid_data, n_imputed = _pairs(df.loc[rows], outcome_col, encoded[var_col].loc[rows], measured_only)
+            if len(valid_data) > 2:
+                rho, p = spearmanr(valid_data['outcome'], valid_data['variable'])
+                results.append(_result(outcome_name, var_name, rho, p, len(valid_data), 'Categorical', n_imputed))
+                if verbose:
+                    print(f"    {var_name}: ρ = {rho:.3f}, p = {p:.4f} {significance_stars(p)}"
+                          f"{f'  ({n_imputed} imputed)' if n_imputed else ''}")
+    return results
+
+
+def borough_mold_correlations(df, verbose=True, same_sample=False):
+    """
+    Mold complaints vs adult asthma ED visits within each borough.
+
+    same_sample restricts the rows to those pooled_correlations() uses for adult ED visits.
+    """
+    if same_sample:
+        df = df[_continuous_sample(df, 'age_adjusted_ed_rate_per_10k')]
+    results = []
+    if verbose:
+        print("\n  Mold Complaints vs Adult Asthma ED Visits by Borough:")
+    for borough in BOROUGH_NEIGHBORHOODS.keys():
+        borough_data = df[df['borough'] == borough]
+        valid_data = borough_data[['age_adjusted_ed_rate_per_10k', 'mold_complaints']].dropna()
+        if len(valid_data) > 2:
+            r, p = pearsonr(valid_data['age_adjusted_ed_rate_per_10k'], valid_data['mold_complaints'])
+            if verbose:
+                print(f"    {borough}: r = {r:.3f}, p = {p:.4f}, n = {len(valid_data)} {significance_stars(p)}")
+            results.append(_result(f'Adult ED Visits ({borough})', 'Mold Complaints', r, p,
+                                   len(valid_data), 'Borough-specific'))
+    return results
+
+
+def coastal_correlations(df, verbose=True):
+    """Every outcome vs every continuous variable within coastal and within inland neighborhoods (coastal.add_coastal)."""
+    results = []
+    for stratum in ('Coastal', 'Inland'):
+        subset = df[df['coastal'] == stratum]
+        if verbose:
+            print(f"\n  {stratum} neighborhoods ({subset['uhf_code'].nunique()}):")
+        for outcome_name, outcome_col in ASTHMA_OUTCOMES.items():
+            for var_name, var_col in CONTINUOUS_VARS.items():
+                valid_data = subset[[outcome_col, var_col]].dropna()
+                if len(valid_data) > 2:
+                    r, p = pearsonr(valid_data[outcome_col], valid_data[var_col])
+                    results.append(_result(f'{outcome_name} ({stratum})', var_name, r, p, len(valid_data),
+                                           'Coastal/inland'))
+                    if verbose:
+                        print(f"    {outcome_name} ← {var_name}: r = {r:.3f}, p = {p:.4f} {significance_stars(p)}")
+    return results
+
+
+def summarize(results):
+    """Results table sorted by absolute correlation (with an abs_corr column)."""
+    results_df = pd.DataFrame(results)
+    results_df['abs_corr'] = results_df['Correlation (r)'].abs()
+    return results_df.sort_values('abs_corr', ascending=False)
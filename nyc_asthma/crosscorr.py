@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+
+from nyc_asthma.mold_ingest import MOLD_311_FILE, UHF_CODES, assign_uhf, iter_311_chunks, parse_311_dates
+from nyc_asthma.temporal import month_index, month_labels
+
+# ============================================================================
+# Lagged cross-correlation of monthly mold complaints and ED visit rates
+# ============================================================================
+#
+# For every UHF42 neighborhood u and lag k (months),
+#
+#   r_u(k) = sum_t x_u(t) y_u(t+k) / sqrt(sum x_u(t)^2 * sum y_u(t+k)^2)
+#
+# over the months where both x(t) and y(t+k) are observed, with x the
+# complaint counts (minus the neighborhood's mean for that calendar month)
+# and y the ED rate (minus the neighborhood's mean). Positive k means
+# complaints lead ED visits. The three sums are cross-correlations of the
+# masked series, so every lag of every neighborhood comes from one rfft /
+# irfft over a [neighborhood, month] array. The pooled r(k) adds the sums
+# over neighborhoods.
+#
+# Bands come from a moving-block bootstrap of the complaint months (blocks
+# of `block` months, the same blocks for every neighborhood): they show
+# where pooled r(k) falls when complaints are unrelated to ED visits but
+# keep their own within-block autocorrelation and seasonality. All
+# replicates of a batch are again one FFT.
+#
+# The ED tables are annual, so each month carries its year's rate and the
+# scan resolves ED timing to the year; a monthly outcome array can be
+# passed to scan() unchanged.
+
+CROSSCORR_COLUMNS = ['Created Date', 'Latitude', 'Longitude']
+DEFAULT_MAX_LAG = 24
+DEFAULT_BLOCK = 12
+
+# ED table -> rate column scanned
+ED_OUTCOMES = {
+    'ed_adults': 'age_adjusted_ed_rate_per_10k',
+    'ed_age_0_4': 'ed_rate_per_10k_age_0_4',
+    'ed_age_5_17': 'ed_rate_per_10k_age_5_17',
+}
+
+
+def monthly_complaints(path=MOLD_311_FILE, chunksize=500_000):
+    """
+    311 mold complaint counts per UHF42 and month.
+
+    The month of the last complaint is dropped (the export ends part-way
+    through it).
+
+    Returns:
+        tuple: (month indexes, [n_uhf, n_months] counts) with UHFs in
+        mold_ingest.UHF_CODES order.
+    """
+    parts = []
+    for chunk in iter_311_chunks(path, CROSSCORR_COLUMNS, chunksize):
+        created = parse_311_dates(chunk['Created Date'])
+        uhf = assign_uhf(chunk['Latitude'], chunk['Longitude'])
+        ok = created.notna().to_numpy() & (uhf >= 0)
+        created = created[ok]
+        month = month_index(created.dt.year.to_numpy(), created.dt.month.to_numpy())
+        parts.append(np.column_stack([np.searchsorted(UHF_CODES, uhf[ok]), month]))
+    if not parts or not sum(len(p) for p in parts):
+        return np.zeros(0, dtype=np.int64), np.zeros((len(UHF_CODES), 0))
+
+    rows = np.concatenate(parts).astype(np.int64)
+    months = np.arange(rows[:, 1].min(), rows[:, 1].max())
+    keep = rows[:, 1] < rows[:, 1].max()
+    cell = rows[keep, 0] * len(months) + rows[keep, 1] - months[0]
+    counts = np.bincount(cell, minlength=len(UHF_CODES) * len(months))
+    return months, counts.reshape(len(UHF_CODES), len(months)).astype(float)
+
+
+def monthly_from_annual(table, value_col, months, codes=UHF_CODES):
+    """[code, month] array where each month holds its year's value (NaN where missing)."""
+    years, _ = month_labels(months)
+    annual = (table.pivot_table(index='uhf_code', columns='year', values=value_col, aggfunc='first')
+              .reindex(index=codes))
+    return annual.reindex(columns=np.unique(years)).to_numpy(dtype=float)[:, np.searchsorted(np.unique(years), years)]
+
+
+def deseasonalize(x, months):
+    """Subtract each unit's mean for every calendar month."""
+    _, calendar = month_labels(months)
+    out = x.copy()
+    for m in range(1, 13):
+        cols = calendar == m
+        if cols.any():
+            with np.errstate(invalid='ignore'):
+                out[..., cols] -= np.nanmean(x[..., cols], axis=-1, keepdims=True)
+    return out
+
+
+def _center(x):
+    with np.errstate(invalid='ignore'):
+        return x - np.nanmean(x, axis=-1, keepdims=True)
+
+
+def _xcorr(a, b, max_lag, nfft):
+    """sum_t a(t) b(t+k) for k = -max_lag..max_lag along the last axis."""
+    full = np.fft.irfft(np.conj(np.fft.rfft(a, nfft)) * np.fft.rfft(b, nfft), nfft)
+    return np.concatenate([full[..., nfft - max_lag:], full[..., :max_lag + 1]], axis=-1)
+
+
+def lagged_sums(x, y, max_lag=DEFAULT_MAX_LAG):
+    """
+    Pairwise-complete cross-products of two [..., time] arrays at every lag.
+
+    Returns:
+        dict: 'xy', 'xx', 'yy' and 'n', each [..., 2 * max_lag + 1].
+    """
+    n_time = x.shape[-1]
+    nfft = 1 << int(np.ceil(np.log2(n_time + max_lag)))
+    mx, my = (~np.isnan(x)).astype(float), (~np.isnan(y)).astype(float)
+    x0, y0 = np.nan_to_num(x), np.nan_to_num(y)
+    sums = {
+        'xy': _xcorr(x0, y0, max_lag, nfft),
+        'xx': _xcorr(x0 ** 2, my, max_lag, nfft),
+        'yy': _xcorr(mx, y0 ** 2, max_lag, nfft),
+        'n': _xcorr(mx, my, max_lag, nfft),
+    }
+    # FFT round-off: counts are integers, squares are non-negative
+    sums['n'] = np.rint(sums['n'])
+    sums['xx'], sums['yy'] = np.maximum(sums['xx'], 0.0), np.maximum(sums['yy'], 0.0)
+    return sums
+
+
+def _correlation(xy, xx, yy):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where((xx > 0) & (yy > 0), xy / np.sqrt(xx * yy), np.nan)
+
+
+def block_indexes(n_time, n_boot, block=DEFAULT_BLOCK, rng=None):
+    """[n_boot, n_time] moving-block bootstrap resamples of a time axis."""
+    rng = np.random.default_rng(rng)
+    block = min(block, n_time)
+    n_blocks = -(-n_time // block)
+    starts = rng.integers(0, n_time - block + 1, size=(n_boot, n_blocks))
+    return (starts[:, :, None] + np.arange(block)).reshape(n_boot, -1)[:, :n_time]
+
+
+def scan(x, y, max_lag=DEFAULT_MAX_LAG, n_boot=500, block=DEFAULT_BLOCK, level=0.95, seed=0,
+         batch=50, codes=None):
+    """
+    Cross-correlation of x and y at lags -max_lag..max_lag for every unit, pooled, with bands.
+
+    Args:
+        x, y (np.ndarray): [n_units, n_months] series on the same axis, NaN where missing.
+        n_boot (int): Block-bootstrap replicates (0 for no bands).
+        block (int): Bootstrap block length in months.
+        level (float): Band coverage.
+        batch (int): Replicates per FFT.
+        codes (array-like, optional): Unit labels (default: UHF_CODES).
+
+    Returns:
+        tuple: (per-unit frame: uhf_code, lag, r, n; pooled frame: lag, r, n,
+        lower, upper)
+    """
+    codes = UHF_CODES if codes is None else np.asarray(codes)
+    x, y = _center(x), _center(y)
+    lags = np.arange(-max_lag, max_lag + 1)
+    sums = lagged_sums(x, y, max_lag)
+
+    by_unit = pd.DataFrame({
+        'uhf_code': np.repeat(codes, len(lags)),
+        'lag': np.tile(lags, len(codes)),
+        'r': _correlation(sums['xy'], sums['xx'], sums['yy']).ravel(),
+        'n': sums['n'].ravel().astype(np.int64),
+    })
+    pooled = pd.DataFrame({
+        'lag': lags,
+        'r': _correlation(*(sums[k].sum(axis=0) for k in ('xy', 'xx', 'yy'))),
+        'n': sums['n'].sum(axis=0).astype(np.int64),
+    })
+
+    if n_boot:
+        rng = np.random.default_rng(seed)
+        replicates = []
+        for start in range(0, n_boot, batch):
+            idx = block_indexes(x.shape[-1], min(batch, n_boot - start), block, rng)
+            boot = lagged_sums(x[:, idx].transpose(1, 0, 2), y[None], max_lag)
+            replicates.append(_correlation(*(boot[k].sum(axis=1) for k in ('xy', 'xx', 'yy'))))
+        replicates = np.concatenate(replicates)
+        tail = (1 - level) / 2
+        pooled['lower'] = np.nanquantile(replicates, tail, axis=0)
+        pooled['upper'] = np.nanquantile(replicates, 1 - tail, axis=0)
+    return by_unit[by_unit['n'] > 2].reset_index(drop=True), pooled
+
+
+def mold_ed_scan(asthma, outcome='ed_adults', path=MOLD_311_FILE, max_lag=DEFAULT_MAX_LAG, n_boot=500,
+                 block=DEFAULT_BLOCK, seed=0):
+    """
+    scan() of deseasonalized monthly 311 mold complaints against an ED rate.
+
+    Args:
+        asthma (dict): merge.load_cleaned_asthma().
+        outcome (str): Key of ED_OUTCOMES.
+
+    Returns:
+        tuple: (per-UHF frame, pooled frame) as from scan().
+    """
+    months, complaints = monthly_complaints(path)
+    ed = monthly_from_annual(asthma[outcome], ED_OUTCOMES[outcome], months)
+    return scan(deseasonalize(complaints, months), ed, max_lag, n_boot, block, seed=seed)
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from nyc_asthma.correlation import CATEGORICAL_VARS
+from nyc_asthma.paths import MODELS_DIR
+from nyc_asthma.trees import ENSEMBLES, load_model, permutation_importance, save_model
+
+# ============================================================================
+# Ranking drivers of UHF asthma ED rates with tree ensembles
+# ============================================================================
+#
+# One ensemble (trees.py) per ED outcome is fitted on the final panel, on the
+# exposures, the encoded emission tertiles and a few derived features
+# (features.py). Outcomes are fitted in parallel processes. Each fitted
+# model is saved under DATA/MODELS with a hash of its training data, and a
+# refresh reuses the saved model when the data has not changed. Drivers are
+# ranked by permutation importance (MSE increase, all shuffles predicted in
+# one batch) and by mean |path contribution|.
+
+DRIVER_TARGETS = ['age_adjusted_ed_rate_per_10k', 'ed_rate_per_10k_age_0_4', 'ed_rate_per_10k_age_5_17']
+EXPOSURES = ['mold_complaints', 'PM_Avg', 'NO2_Avg', 'poverty_rate']
+TERTILE_CODES = {'Low': 1, 'Medium': 2, 'High': 3}
+DERIVED = ['mold_complaints_lag1', 'mold_complaints_roll3', 'mold_complaints_delta', 'poverty_rate_lag1',
+           'post_2020']
+
+
+def driver_matrix(panel):
+    """
+    Panel rows with every candidate driver as a numeric column.
+
+    Returns:
+        tuple: (DataFrame with year, uhf_code, targets and drivers; driver names)
+    """
+    from nyc_asthma.features import build_features
+
+    data = panel.copy()
+    tertiles = list(CATEGORICAL_VARS.values())
+    for col in tertiles:
+        data[col] = data[col].map(TERTILE_CODES).astype(float)
+    derived = build_features(panel, ['mold_complaints', 'poverty_rate'], lags=(1,), windows=(3,))
+    data = data.merge(derived[['year', 'uhf_code'] + DERIVED], on=['year', 'uhf_code'], how='left')
+    data['post_2020'] = data['post_2020'].astype(float)
+    return data, EXPOSURES + tertiles + DERIVED
+
+
+def _data_hash(X, y, kind, params, names):
+    digest = hashlib.sha1(np.ascontiguousarray(X).tobytes() + np.ascontiguousarray(y).tobytes())
+    digest.update(json.dumps([kind, params, names], sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def _fit_target(task):
+    """Fit (or reload) one outcome's model and rank its drivers."""
+    target, X, y, names, kind, params, model_dir, refit, repeats, seed = task
+    path = os.path.join(model_dir, f'{target}_{kind}.npz')
+    data_hash = _data_hash(X, y, kind, params, names)
+
+    model, reused = None, False
+    if not refit and os.path.exists(path):
+        saved, meta = load_model(path)
+        if meta.get('data_hash') == data_hash:
+            model, reused = saved, True
+    if model is None:
+        model = ENSEMBLES[kind](**params).fit(X, y)
+        os.makedirs(model_dir, exist_ok=True)
+        save_model(model, path, target=target, features=names, data_hash=data_hash, rows=len(y))
+
+    perm_mean, perm_sd = permutation_importance(model, X, y, repeats, seed)
+    _, parts = model.contributions(X)
+    importance = pd.DataFrame({
+        'target': target,
+        'feature': names,
+        'permutation': perm_mean,
+        'permutation_sd': perm_sd,
+        'contribution': np.abs(parts).mean(axis=0),
+    })
+    importance['rank'] = importance['permutation'].rank(ascending=False, method='min').astype(int)
+    return importance.sort_values('rank'), {'target': target, 'rows': len(y), 'reused': reused, 'path': path}
+
+
+def fit_drivers(panel, targets=DRIVER_TARGETS, kind='boosting', params=None, workers=None, refit=False,
+                repeats=10, seed=0, model_dir=MODELS_DIR):
+    """
+    Fit one ensemble per outcome and rank the drivers of each.
+
+    Args:
+        panel (pd.DataFrame): Final merged panel.
+        targets (list): Outcome columns.
+        kind (str): 'boosting' or 'forest'.
+        params (dict, optional): Ensemble hyperparameters.
+        workers (int, optional): Processes, one outcome each (default: CPU count).
+        refit (bool): Ignore saved models.
+        repeats (int): Shuffles per feature for permutation importance.
+
+    Returns:
+        tuple: (importance frame, list of per-outcome info dicts)
+    """
+    data, names = driver_matrix(panel)
+    params = dict(params or {})
+    tasks = []
+    for target in targets:
+        rows = data[data[target].notna()]
+        tasks.append((target, rows[names].to_numpy(dtype=float), rows[target].to_numpy(dtype=float), names,
+                      kind, params, model_dir, refit, repeats, seed))
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_fit_target, tasks))
+    else:
+        results = [_fit_target(task) for task in tasks]
+    return pd.concat([r[0] for r in results], ignore_index=True), [r[1] for r in results]
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from nyc_asthma.panel_store import STORE_VERSION
+from nyc_asthma.paths import CACHE_DIR
+
+# ============================================================================
+# Lagged / rolling feature store for exposure-outcome analysis
+# ============================================================================
+#
+# The panel is reindexed onto a contiguous [year, uhf_code, variable] cube
+# (every year between the first and last, every neighborhood), so that a lag
+# is a shift along the year axis and needs no per-neighborhood groupby:
+#
+#   <col>_lag<k>    value k years earlier
+#   <col>_roll<w>   mean over the w years ending at t (NaN-aware, from cumsums)
+#   <col>_delta     change from the year before
+#   post_2020, pandemic_year   pre/post COVID-19 indicators
+#
+# Features are written as a memory-mapped panel store (panel_store.py) under
+# DATA/CACHE/features/<hash>, keyed on a hash of the input panel and the
+# feature spec, so a correlation or model run loads only the columns it asks
+# for and repeated runs skip the build.
+
+FEATURE_CACHE_DIR = os.path.join(CACHE_DIR, 'features')
+FEATURE_VERSION = 1
+
+DEFAULT_COLUMNS = [
+    'age_adjusted_ed_rate_per_10k', 'ed_rate_per_10k_age_0_4', 'ed_rate_per_10k_age_5_17',
+    'age_adjusted_ed_rate_per_10k_eb', 'ed_rate_per_10k_age_0_4_eb', 'ed_rate_per_10k_age_5_17_eb',
+    'mold_complaints', 'poverty_rate',
+]
+DEFAULT_LAGS = (1, 2, 3)
+DEFAULT_WINDOWS = (2, 3, 5)
+PANDEMIC_YEAR = 2020
+
+
+def panel_cube(panel, columns):
+    """
+    Contiguous [year, uhf_code, column] array of a long panel.
+
+    Returns:
+        tuple: (years, codes, cube)
+    """
+    years = np.arange(panel['year'].min(), panel['year'].max() + 1)
+    codes = np.sort(panel['uhf_code'].unique())
+    cells = pd.MultiIndex.from_product([years, codes], names=['year', 'uhf_code'])
+    values = panel.set_index(['year', 'uhf_code'])[list(columns)].reindex(cells).to_numpy(dtype=float)
+    return years, codes, values.reshape(len(years), len(codes), len(columns))
+
+
+def lag(cube, k):
+    """Shift a [year, ...] cube k years forward (NaN for the first k years)."""
+    out = np.full_like(cube, np.nan)
+    if k < len(cube):
+        out[k:] = cube[:len(cube) - k]
+    return out
+
+
+def rolling_mean(cube, window, min_periods=None):
+    """
+    Mean of the `window` years ending at each year, ignoring NaNs.
+
+    Args:
+        min_periods (int, optional): Observed years needed (default: a
+            majority of the window).
+    """
+    min_periods = window // 2 + 1 if min_periods is None else min_periods
+    present = ~np.isnan(cube)
+    zero = np.zeros((1,) + cube.shape[1:])
+    sums = np.concatenate([zero, np.cumsum(np.where(present, cube, 0.0), axis=0)])
+    counts = np.concatenate([zero, np.cumsum(present, axis=0)])
+    start = np.maximum(np.arange(len(cube)) + 1 - window, 0)
+    end = np.arange(len(cube)) + 1
+    window_sum, window_count = sums[end] - sums[start], counts[end] - counts[start]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(window_count >= min_periods, window_sum / window_count, np.nan)
+
+
+def build_features(panel, columns=None, lags=DEFAULT_LAGS, windows=DEFAULT_WINDOWS):
+    """
+    Lags, rolling means, deltas and pandemic indicators for every neighborhood.
+
+    Args:
+        panel (pd.DataFrame): Long panel with year and uhf_code.
+        columns (list, optional): Base columns (default: DEFAULT_COLUMNS present).
+        lags (tuple): Lags in years.
+        windows (tuple): Rolling-mean windows in years.
+
+    Returns:
+        pd.DataFrame: year, uhf_code, the base columns and every feature, one
+        row per (year, uhf_code) of the contiguous grid.
+    """
+    columns = [c for c in (columns or DEFAULT_COLUMNS) if c in panel.columns]
+    years, codes, cube = panel_cube(panel, columns)
+
+    blocks, names = [cube], list(columns)
+    for k in lags:
+        blocks.append(lag(cube, k))
+        names += [f'{c}_lag{k}' for c in columns]
+    for w in windows:
+        blocks.append(rolling_mean(cube, w))
+        names += [f'{c}_roll{w}' for c in columns]
+    blocks.append(cube - lag(cube, 1))
+    names += [f'{c}_delta' for c in columns]
+
+    values = np.concatenate(blocks, axis=2).reshape(len(years) * len(codes), -1)
+    out = pd.DataFrame(values, columns=names)
+    out.insert(0, 'uhf_code', np.tile(codes, len(years)))
+    out.insert(0, 'year', np.repeat(years, len(codes)))
+    out['post_2020'] = out['year'] >= PANDEMIC_YEAR
+    out['pandemic_year'] = out['year'] == PANDEMIC_YEAR
+    return out
+
+
+def _cache_key(panel, columns, lags, windows):
+    digest = hashlib.sha1()
+    digest.update(pd.util.hash_pandas_object(panel[['year', 'uhf_code'] + columns], index=False)
+                  .to_numpy().tobytes())
+    digest.update(json.dumps([FEATURE_VERSION, STORE_VERSION, columns, list(lags), list(windows), PANDEMIC_YEAR]).encode())
+    return digest.hexdigest()[:16]
+
+
+def feature_store(panel, columns=None, lags=DEFAULT_LAGS, windows=DEFAULT_WINDOWS,
+                  cache_dir=FEATURE_CACHE_DIR):
+    """
+    build_features() as a memory-mapped panel store, cached by input hash.
+
+    Returns:
+        tuple: (PanelStore, built) where built is False on a cache hit.
+    """
+    from nyc_asthma.panel_store import open_panel_store, write_panel_store
+
+    columns = [c for c in (columns or DEFAULT_COLUMNS) if c in panel.columns]
+    path = os.path.join(cache_dir, _cache_key(panel, columns, lags, windows))
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return open_panel_store(path), False
+
+    features = build_features(panel, columns, lags, windows)
+    tmp_path = path + '.tmp'
+    write_panel_store(features, tmp_path)
+    if os.path.exists(path):
+        import shutil
+
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    return open_panel_store(path), True
@@ -0,0 +1,250 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from nyc_asthma.smoothing import ED_SMOOTHING_COLUMNS
+
+# ============================================================================
+# Batch exponential-smoothing forecasts of ED rates per UHF and age group
+# ============================================================================
+#
+# Every (age group, UHF) ED rate history is one row of a [series, year]
+# array and gets a damped-trend Holt model on the log rate, so forecasts
+# stay positive and intervals are multiplicative:
+#
+#   forecast  f_t = l_{t-1} + phi b_{t-1}
+#   level     l_t = f_t + alpha e_t                     e_t = y_t - f_t
+#   trend     b_t = phi b_{t-1} + alpha beta e_t
+#
+# A missing year (adult ED, 2015) leaves the forecast as the level without
+# an update. The filter runs once over the years for all series and all
+# (alpha, beta, phi) of a grid at the same time, as [grid, series] arrays;
+# each series takes the setting with the smallest one-step squared error.
+# The h-step prediction variance is
+#
+#   sigma^2 (1 + sum_{j<h} (alpha (1 + beta (phi + ... + phi^j)))^2)
+#
+# with sigma^2 the series' one-step error variance. backtest() refits at
+# every origin year on the history up to it and scores the next horizons
+# against what happened, next to a last-value (naive) forecast.
+#
+# The pandemic years (SKIP_YEARS) are treated as missing: ED rates fell by
+# about two thirds in 2020 and were still recovering in 2021, and fitting
+# through that would make every level and error variance about the shock.
+# Intervals therefore do not allow for another shock of that size.
+#
+# Year-to-year swings are shared across neighborhoods, which no single
+# series' one-step errors show, so the model intervals come out too narrow.
+# interval_scale() measures by how much, per age group and step, from the
+# backtest; forecast_ed() widens its intervals by that factor.
+
+ED_SERIES = {key: columns[2] for key, columns in ED_SMOOTHING_COLUMNS.items()}
+ALPHAS = np.linspace(0.05, 0.95, 10)
+BETAS = np.array([0.0, 0.05, 0.1, 0.2, 0.4])
+PHIS = np.array([0.8, 0.9, 0.98, 1.0])
+BURN_IN = 2
+SKIP_YEARS = (2020, 2021)
+
+
+def ed_series(asthma, skip_years=SKIP_YEARS):
+    """
+    All ED rate histories as one array.
+
+    Args:
+        asthma (dict): merge.load_cleaned_asthma().
+        skip_years (tuple): Years set to missing.
+
+    Returns:
+        tuple: (series frame with age_group and uhf_code, years, [series, year] rates)
+    """
+    keys, grids = [], []
+    years = np.arange(min(asthma[k]['year'].min() for k in ED_SERIES),
+                      max(asthma[k]['year'].max() for k in ED_SERIES) + 1)
+    for key, rate_col in ED_SERIES.items():
+        grid = asthma[key].pivot_table(index='uhf_code', columns='year', values=rate_col, aggfunc='first')
+        grid = grid.reindex(columns=years)
+        grid.loc[:, grid.columns.isin(skip_years)] = np.nan
+        keys.append(pd.DataFrame({'age_group': key, 'uhf_code': grid.index.to_numpy()}))
+        grids.append(grid.to_numpy(dtype=float))
+    return pd.concat(keys, ignore_index=True), years, np.vstack(grids)
+
+
+def _parameter_grid():
+    alpha, beta, phi = np.meshgrid(ALPHAS, BETAS, PHIS, indexing='ij')
+    return alpha.ravel()[:, None], beta.ravel()[:, None], phi.ravel()[:, None]
+
+
+def _filter(y, alpha, beta, phi):
+    """
+    Damped Holt filter over [series, year] for [grid, 1] or [grid, series] parameters.
+
+    Returns:
+        tuple: (one-step forecasts [grid, series, year], final level, final trend)
+    """
+    shape = np.broadcast_shapes(alpha.shape, (1, y.shape[0]))
+    level = np.full(shape, np.nan)
+    trend = np.zeros(shape)
+    forecasts = np.full(shape + (y.shape[1],), np.nan)
+    for t in range(y.shape[1]):
+        f = level + phi * trend
+        forecasts[..., t] = f
+        obs = ~np.isnan(y[:, t])
+        start = obs & np.isnan(level)
+        err = y[:, t] - f
+        level = np.where(start, y[:, t], np.where(obs, f + alpha * err, f))
+        trend = np.where(start, 0.0, np.where(obs, phi * trend + alpha * beta * err, phi * trend))
+    return forecasts, level, trend
+
+
+def fit_holt(rates):
+    """
+    Fit a damped Holt model to every row of a [series, year] rate array.
+
+    Returns:
+        dict: alpha, beta, phi, sigma, level, trend and n_obs per series.
+    """
+    y = np.log(rates)
+    alpha, beta, phi = _parameter_grid()
+    forecasts, level, trend = _filter(y, alpha, beta, phi)
+
+    # Score one-step errors once a series has a level and a trend to go on
+    seen = np.cumsum(~np.isnan(y), axis=1)
+    scored = (seen > BURN_IN) & ~np.isnan(y)
+    err = np.where(scored, y - forecasts, 0.0)
+    sse = (err ** 2).sum(axis=2)
+    best = np.argmin(sse, axis=0)
+    series = np.arange(y.shape[0])
+    n_scored = scored.sum(axis=1)
+    return {
+        'alpha': alpha[best, 0],
+        'beta': beta[best, 0],
+        'phi': phi[best, 0],
+        'sigma': np.sqrt(sse[best, series] / np.maximum(n_scored, 1)),
+        'level': level[best, series],
+        'trend': trend[best, series],
+        'n_obs': seen[:, -1],
+    }
+
+
+def predict_holt(fit, horizon, interval=0.9):
+    """
+    Median forecasts and prediction intervals for steps 1..horizon.
+
+    Returns:
+        tuple: (median, lower, upper), each [series, horizon], on the rate scale.
+    """
+    steps = np.arange(1, horizon + 1)
+    alpha, beta, phi = (fit[k][:, None] for k in ('alpha', 'beta', 'phi'))
+    damped = np.cumsum(phi ** steps, axis=1)
+    mean = fit['level'][:, None] + damped * fit['trend'][:, None]
+    c = alpha * (1 + beta * damped[:, :-1])
+    var = fit['sigma'][:, None] ** 2 * (1 + np.concatenate([np.zeros((len(mean), 1)),
+                                                             np.cumsum(c ** 2, axis=1)], axis=1))
+    z = norm.ppf(0.5 + interval / 2)
+    return np.exp(mean), np.exp(mean - z * np.sqrt(var)), np.exp(mean + z * np.sqrt(var))
+
+
+def forecast_ed(asthma, through=2026, interval=0.9, scale=None, skip_years=SKIP_YEARS):
+    """
+    Forecast every UHF and age group from the year after its history through `through`.
+
+    Args:
+        scale (pd.DataFrame, optional): interval_scale() output; widens the
+            intervals per age group and step.
+
+    Returns:
+        pd.DataFrame: age_group, uhf_code, year, forecast, lower, upper and
+        the fitted alpha, beta, phi.
+    """
+    series, years, rates = ed_series(asthma, skip_years)
+    horizon = through - years[-1]
+    fit = fit_holt(rates)
+    median, lower, upper = predict_holt(fit, horizon, interval)
+    out = pd.DataFrame({
+        'age_group': np.repeat(series['age_group'].to_numpy(), horizon),
+        'uhf_code': np.repeat(series['uhf_code'].to_numpy(), horizon),
+        'year': np.tile(years[-1] + np.arange(1, horizon + 1), len(series)),
+        'forecast': median.ravel(),
+        'lower': lower.ravel(),
+        'upper': upper.ravel(),
+    })
+    for name in ('alpha', 'beta', 'phi'):
+        out[name] = np.repeat(fit[name], horizon)
+    if scale is not None:
+        out['step'] = out['year'] - years[-1]
+        factor = out[['age_group', 'step']].merge(scale, on=['age_group', 'step'], how='left')['scale']
+        # Steps beyond the backtest keep the widest factor seen for the age group
+        factor = factor.fillna(out[['age_group']].merge(
+            scale.groupby('age_group', as_index=False)['scale'].max(), how='left')['scale']).fillna(1.0)
+        half = np.log(out['upper'] / out['lower']) / 2 * factor.to_numpy()
+        out['lower'], out['upper'] = out['forecast'] * np.exp(-half), out['forecast'] * np.exp(half)
+        out = out.drop(columns='step')
+    return out
+
+
+def backtest(asthma, origins=None, horizon=3, interval=0.9, skip_years=SKIP_YEARS):
+    """
+    Rolling-origin evaluation: refit at each origin year, forecast the next `horizon` years.
+
+    Args:
+        origins (list, optional): Last year of each training window
+            (default: every year leaving `horizon` years to check, from the
+            tenth year of history on).
+
+    Returns:
+        tuple: (long frame with actual, forecast, interval and naive forecast
+        per origin, series and step; summary by age group and step)
+    """
+    series, years, rates = ed_series(asthma, skip_years)
+    if origins is None:
+        origins = years[9:len(years) - 1]
+    frames = []
+    for origin in origins:
+        cut = int(np.searchsorted(years, origin)) + 1
+        history = rates[:, :cut]
+        median, lower, upper = predict_holt(fit_holt(history), horizon, interval)
+        last = pd.DataFrame(history).ffill(axis=1).to_numpy()[:, -1]
+        actual = np.full((len(series), horizon), np.nan)
+        available = rates[:, cut:cut + horizon]
+        actual[:, :available.shape[1]] = available
+        frames.append(pd.DataFrame({
+            'origin': origin,
+            'age_group': np.repeat(series['age_group'].to_numpy(), horizon),
+            'uhf_code': np.repeat(series['uhf_code'].to_numpy(), horizon),
+            'step': np.tile(np.arange(1, horizon + 1), len(series)),
+            'actual': actual.ravel(),
+            'forecast': median.ravel(),
+            'lower': lower.ravel(),
+            'upper': upper.ravel(),
+            'naive': np.repeat(last, horizon),
+        }))
+    results = pd.concat(frames, ignore_index=True).dropna(subset=['actual'])
+    results['year'] = results['origin'] + results['step']
+
+    scored = results.assign(
+        abs_error=(results['forecast'] - results['actual']).abs(),
+        pct_error=(results['forecast'] - results['actual']).abs() / results['actual'],
+        naive_abs_error=(results['naive'] - results['actual']).abs(),
+        covered=(results['actual'] >= results['lower']) & (results['actual'] <= results['upper']),
+    )
+    summary = scored.groupby(['age_group', 'step']).agg(
+        n=('actual', 'size'), mae=('abs_error', 'mean'), mape=('pct_error', 'mean'),
+        naive_mae=('naive_abs_error', 'mean'), coverage=('covered', 'mean')).reset_index()
+    return results, summary
+
+
+def interval_scale(results, interval=0.9):
+    """
+    Factor by which backtest intervals must widen to cover `interval` of the actuals.
+
+    Args:
+        results (pd.DataFrame): Long output of backtest() at the same interval.
+
+    Returns:
+        pd.DataFrame: age_group, step, scale.
+    """
+    z = norm.ppf(0.5 + interval / 2)
+    sd = np.log(results['upper'] / results['lower']) / (2 * z)
+    ratio = np.abs(np.log(results['actual'] / results['forecast'])) / (z * sd)
+    return (ratio.groupby([results['age_group'], results['step']]).quantile(interval)
+            .rename('scale').reset_index())
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+from nyc_asthma.mold_ingest import assign_uhf
+from nyc_asthma.paths import CLEANED_FILES, UHF34_SHAPEFILE
+
+# ============================================================================
+# Geocoding 311 mold complaints to UHF and building the final panel
+# ============================================================================
+
+FINAL_COLUMNS = [
+    'year', 'uhf_code', 'neighborhood',
+    'mold_complaints', 'PM_Avg', 'NO2_Avg', 'PM_tertiles', 'NO2_tertiles',
+    'cook_tertiles', 'Building_emissions', 'Industrial_tertiles', 'Traffic_tertiles',
+    'age_adjusted_asthma_percent', 'estimated_adults_with_asthma',
+    'age_adjusted_ed_rate_per_10k', 'estimated_annual_ed_visits',
+    'ed_rate_per_10k_age_0_4', 'estimated_annual_ed_visits_age_0_4',
+    'ed_rate_per_10k_age_5_17', 'estimated_annual_ed_visits_age_5_17',
+    'poverty_rate', 'households_below_poverty', 'statistically_significant',
+    'adult_asthma_imputed', 'poverty_imputed', 'air_quality_imputed',
+    'age_adjusted_ed_rate_per_10k_eb', 'ed_rate_per_10k_age_0_4_eb', 'ed_rate_per_10k_age_5_17_eb'
+]
+
+
+def load_mold_locations(path=CLEANED_FILES['mold_locations']):
+    """Cleaned 311 mold locations with missing coordinates dropped."""
+    mold = pd.read_csv(path)
+    return mold.dropna(subset=['Latitude', 'Longitude']).copy()
+
+
+def geocode_mold(mold_clean):
+    """Attach the nearest UHF42 centroid's code to each complaint."""
+    mold_clean = mold_clean.copy()
+    mold_clean['uhf_code'] = assign_uhf(mold_clean['Latitude'].to_numpy(), mold_clean['Longitude'].to_numpy())
+    return mold_clean
+
+
+def geocode_mold_polygons(mold_clean, shapefile=UHF34_SHAPEFILE, code_col='UHF34_CODE'):
+    """
+    Attach the code of the UHF34 polygon containing each complaint.
+
+    Complaints outside every neighborhood polygon (on the shoreline, or in
+    the shapefile's code-0 polygon) get no code and drop out of
+    aggregate_mold().
+    """
+    import geopandas as gpd
+
+    from nyc_asthma.geography import UHF34_CODES
+
+    polygons = gpd.read_file(shapefile)[[code_col, 'geometry']]
+    points = gpd.GeoDataFrame(geometry=gpd.points_from_xy(mold_clean['Longitude'], mold_clean['Latitude']),
+                              index=mold_clean.index, crs='EPSG:4326').to_crs(polygons.crs)
+    joined = points.sjoin(polygons, how='left', predicate='within')
+    # A point on a shared edge matches both polygons; keep the first
+    codes = joined[~joined.index.duplicated()][code_col]
+    mold_clean = mold_clean.copy()
+    codes = pd.to_numeric(codes, errors='coerce')
+    mold_clean['uhf_code'] = codes.where(codes.isin(UHF34_CODES)).astype('Int64')
+    return mold_clean
+
+
+def estimate_years(mold_clean, first_year=2010, last_year=2024):
+    """
+    Spread complaints evenly over the years by row position.
+
+    The cleaned location file has no dates, so years are estimated from the
+    row order of the (roughly chronological) 311 export.
+    """
+    mold_clean = mold_clean.copy()
+    mold_clean['year'] = np.linspace(first_year, last_year, len(mold_clean)).astype(int)
+    return mold_clean
+
+
+def aggregate_mold(mold_clean, membership=None):
+    """
+    Complaint counts per (year, uhf_code).
+
+    Args:
+        mold_clean (pd.DataFrame): Geocoded complaints (UHF42 codes).
+        membership (dict, optional): UHF42 -> UHF34, to count at UHF34 instead.
+    """
+    codes = mold_clean['uhf_code'] if membership is None else mold_clean['uhf_code'].map(membership)
+    counts = mold_clean.assign(uhf_code=codes).dropna(subset=['uhf_code'])
+    counts = counts.groupby(['year', 'uhf_code']).size().reset_index(name='mold_complaints')
+    counts['uhf_code'] = counts['uhf_code'].astype(int)
+    return counts
+
+
+def add_mold(merged, mold_agg):
+    """Missing cells inside the complaint years are 0; years outside stay NaN."""
+    merged_final = merged.merge(mold_agg, on=['year', 'uhf_code'], how='left')
+    covered = merged_final['year'].between(mold_agg['year'].min(), mold_agg['year'].max())
+    merged_final.loc[covered, 'mold_complaints'] = merged_final.loc[covered, 'mold_complaints'].fillna(0)
+    return merged_final
+
+
+def organize_final(merged_final):
+    # Smoothed ED rates are absent when geocode runs with --smooth none
+    return merged_final[[c for c in FINAL_COLUMNS if c in merged_final.columns]].sort_values(['year', 'neighborhood']).reset_index(drop=True)
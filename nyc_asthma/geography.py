@@ -0,0 +1,159 @@
+# ============================================================================
+# Reference geography: NTA -> UHF crosswalk, UHF centroids, boroughs
+# ============================================================================
+
+# NTA (2010 codes, as in aqe-nta.csv) -> UHF42. Some NTAs are listed twice
+# (e.g. BX1001); as in any dict literal, the last assignment wins.
+NTA_TO_UHF = {
+    # BRONX (UHF 101-107)
+    'BX0801': 101, 'BX0802': 101, 'BX0803': 101,
+    'BX1002': 102, 'BX1003': 102, 'BX1004': 102, 'BX1001': 102, 'BX1102': 102,
+    'BX1103': 102, 'BX1104': 102, 'BX1201': 102, 'BX1202': 102, 'BX1203': 102,
+    'BX0501': 103, 'BX0502': 103, 'BX0503': 103, 'BX0701': 103, 'BX0702': 103, 'BX0703': 103,
+    'BX0903': 104, 'BX0904': 104, 'BX1001': 104,
+    'BX0301': 105, 'BX0302': 105, 'BX0303': 105, 'BX0601': 105, 'BX0602': 105, 'BX0603': 105,
+    'BX0401': 106, 'BX0402': 106, 'BX0403': 106,
+    'BX0101': 107, 'BX0102': 107, 'BX0201': 107, 'BX0202': 107,
+    # BROOKLYN (UHF 201-211)
+    'BK0101': 201,
+    'BK0201': 202, 'BK0202': 202, 'BK0203': 202, 'BK0204': 202, 'BK0601': 202, 'BK0602': 202, 'BK0701': 202,
+    'BK0301': 203, 'BK0302': 203, 'BK0801': 203, 'BK0802': 203, 'BK0901': 203, 'BK0902': 203,
+    'BK0501': 204, 'BK0502': 204, 'BK0503': 204, 'BK0504': 204, 'BK0505': 204,
+    'BK0702': 205, 'BK0703': 205,
+    'BK1201': 206, 'BK1202': 206, 'BK1203': 206, 'BK1204': 206,
+    'BK1401': 207, 'BK1402': 207, 'BK1403': 207, 'BK1701': 207, 'BK1702': 207, 'BK1703': 207, 'BK1704': 207,
+    'BK1801': 208, 'BK1802': 208, 'BK1803': 208,
+    'BK1001': 209, 'BK1002': 209, 'BK1101': 209, 'BK1102': 209, 'BK1103': 209,
+    'BK1301': 210, 'BK1302': 210, 'BK1303': 210, 'BK1501': 210, 'BK1502': 210, 'BK1503': 210,
+    'BK0102': 211, 'BK0103': 211, 'BK0104': 211, 'BK0401': 211, 'BK0402': 211,
+    # MANHATTAN (UHF 301-310)
+    'MN1201': 301, 'MN1202': 301, 'MN1203': 301,
+    'MN0901': 302, 'MN0902': 302, 'MN0903': 302, 'MN1001': 302, 'MN1002': 302,
+    'MN1101': 303, 'MN1102': 303,
+    'MN0701': 304, 'MN0702': 304, 'MN0703': 304,
+    'MN0801': 305, 'MN0802': 305, 'MN0803': 305,
+    'MN0401': 306, 'MN0402': 306,
+    'MN0601': 307, 'MN0602': 307, 'MN0603': 307, 'MN0604': 307,
+    'MN0201': 308, 'MN0202': 308, 'MN0203': 308,
+    'MN0301': 309, 'MN0302': 309, 'MN0303': 309, 'MN0501': 309, 'MN0502': 309,
+    'MN0101': 310, 'MN0102': 310,
+    # QUEENS (UHF 401-410)
+    'QN0101': 401, 'QN0102': 401, 'QN0103': 401, 'QN0104': 401, 'QN0105': 401,
+    'QN0201': 402, 'QN0202': 402, 'QN0203': 402, 'QN0301': 402, 'QN0302': 402, 'QN0303': 402, 'QN0401': 402, 'QN0402': 402,
+    'QN0701': 403, 'QN0702': 403, 'QN0703': 403, 'QN0704': 403, 'QN0705': 403, 'QN0706': 403, 'QN0707': 403,
+    'QN1101': 404, 'QN1102': 404, 'QN1103': 404, 'QN1104': 404,
+    'QN0501': 405, 'QN0502': 405, 'QN0503': 405, 'QN0504': 405, 'QN0601': 405, 'QN0602': 405,
+    'QN0801': 406, 'QN0802': 406, 'QN0803': 406, 'QN0804': 406, 'QN0805': 406,
+    'QN0901': 407, 'QN0902': 407, 'QN0903': 407, 'QN0904': 407, 'QN0905': 407, 'QN1001': 407, 'QN1002': 407, 'QN1003': 407,
+    'QN1201': 408, 'QN1202': 408, 'QN1203': 408, 'QN1204': 408, 'QN1205': 408, 'QN1206': 408,
+    'QN1301': 409, 'QN1302': 409, 'QN1303': 409, 'QN1304': 409, 'QN1305': 409, 'QN1306': 409, 'QN1307': 409,
+    'QN1401': 410, 'QN1402': 410, 'QN1403': 410,
+    # STATEN ISLAND (UHF 501-504)
+    'SI0106': 501, 'SI0107': 501,
+    'SI0101': 502, 'SI0102': 502, 'SI0103': 502, 'SI0104': 502,
+    'SI0105': 503, 'SI0204': 503,
+    'SI0201': 504, 'SI0202': 504, 'SI0203': 504, 'SI0301': 504, 'SI0302': 504, 'SI0303': 504, 'SI0304': 504, 'SI0305': 504,
+}
+
+# NTAs listed more than once above -> their UHF42 codes in listed order
+DUPLICATE_NTA_ASSIGNMENTS = {'BX1001': (102, 104)}
+NTA_DUPLICATE_RULES = ('last', 'first')
+
+
+def nta_to_uhf(duplicates='last'):
+    """NTA_TO_UHF with each duplicated NTA given its 'last' (as the literal does) or 'first' listed UHF."""
+    if duplicates not in NTA_DUPLICATE_RULES:
+        raise ValueError(f"Unknown rule {duplicates!r} (choose from {', '.join(NTA_DUPLICATE_RULES)})")
+    crosswalk = dict(NTA_TO_UHF)
+    pick = 0 if duplicates == 'first' else -1
+    crosswalk.update({nta: uhfs[pick] for nta, uhfs in DUPLICATE_NTA_ASSIGNMENTS.items()})
+    return crosswalk
+
+
+# UHF42 centroids used for nearest-centroid geocoding of 311 complaints
+UHF_CENTROIDS = {
+    101: (40.8725, -73.9050), 102: (40.8695, -73.8275), 103: (40.8605, -73.8980),
+    104: (40.8385, -73.8315), 105: (40.8425, -73.9045), 106: (40.8285, -73.9170),
+    107: (40.8165, -73.9145), 201: (40.7235, -73.9510), 202: (40.6925, -73.9845),
+    203: (40.6775, -73.9485), 204: (40.6655, -73.8985), 205: (40.6535, -74.0095),
+    206: (40.6335, -73.9925), 207: (40.6485, -73.9435), 208: (40.6375, -73.8985),
+    209: (40.6165, -74.0165), 210: (40.5885, -73.9615), 211: (40.7085, -73.9465),
+    301: (40.8445, -73.9355), 302: (40.8125, -73.9545), 303: (40.7985, -73.9425),
+    304: (40.7825, -73.9745), 305: (40.7745, -73.9565), 306: (40.7575, -73.9975),
+    307: (40.7455, -73.9815), 308: (40.7325, -74.0015), 309: (40.7235, -73.9845),
+    310: (40.7095, -74.0095), 401: (40.7615, -73.9245), 402: (40.7395, -73.8745),
+    403: (40.7635, -73.8295), 404: (40.7595, -73.7765), 405: (40.7125, -73.8645),
+    406: (40.7285, -73.8045), 407: (40.6855, -73.8265), 408: (40.6815, -73.7915),
+    409: (40.6775, -73.7515), 410: (40.5925, -73.8145), 501: (40.6385, -74.1445),
+    502: (40.6215, -74.0985), 503: (40.6085, -74.1465), 504: (40.5585, -74.1625),
+}
+
+# Borough membership by neighborhood name (UHF42 and UHF34 spellings)
+BOROUGH_NEIGHBORHOODS = {
+    'Staten Island': [
+        "Northern SI", "Southern SI", "Port Richmond",
+        "Stapleton - St. George", "Willowbrook", "South Beach - Tottenville"
+    ],
+    'Bronx': [
+        "Fordham - Bronx Pk", "Kingsbridge - Riverdale", "Northeast Bronx",
+        "Pelham - Throgs Neck", "South Bronx", "Crotona - Tremont",
+        "High Bridge - Morrisania", "Hunts Point - Mott Haven"
+    ],
+    'Manhattan': [
+        "Central Harlem - Morningside Heights", "Chelsea-Village",
+        "Downtown - Heights - Slope", "East Harlem",
+        "Union Square-Lower Manhattan", "Upper East Side-Gramercy",
+        "Upper West Side", "Washington Heights", "Chelsea - Clinton",
+        "Gramercy Park - Murray Hill", "Greenwich Village - SoHo",
+        "Lower Manhattan"
+    ],
+    'Queens': [
+        "Bayside Little Neck-Fresh Meadows", "Flushing - Clearview",
+        "Jamaica", "Long Island City - Astoria", "Ridgewood - Forest Hills",
+        "Rockaways", "Southeast Queens", "Southwest Queens", "West Queens",
+        "Fresh Meadows", "Bayside - Little Neck"
+    ],
+    'Brooklyn': [
+        "Bedford Stuyvesant - Crown Heights", "Bensonhurst - Bay Ridge",
+        "Borough Park", "Canarsie - Flatlands", "Coney Island - Sheepshead Bay",
+        "East Flatbush - Flatbush", "Sunset Park", "Williamsburg - Bushwick",
+        "Greenpoint", "East New York"
+    ]
+}
+
+
+def assign_borough(neighborhood):
+    """Borough for a neighborhood name, or 'Unknown'."""
+    for borough, neighborhoods in BOROUGH_NEIGHBORHOODS.items():
+        if neighborhood in neighborhoods:
+            return borough
+    return 'Unknown'
+
+
+# Leading digit of a UHF42 code (and of combined UHF34 codes like 305307)
+UHF_BOROUGHS = {1: 'Bronx', 2: 'Brooklyn', 3: 'Manhattan', 4: 'Queens', 5: 'Staten Island'}
+
+
+def uhf_borough(uhf_code):
+    """Borough for a UHF42/UHF34 code, or 'Unknown'."""
+    return UHF_BOROUGHS.get(int(str(int(uhf_code))[0]), 'Unknown')
+
+
+# UHF34 neighborhoods (as in UHF_34_DOHMH.shp and the adults-with-asthma
+# table). Combined neighborhoods concatenate their UHF42 codes.
+UHF34_CODES = [
+    101, 102, 103, 104, 105106107,
+    201, 202, 203, 204, 205, 206, 207, 208, 209, 210, 211,
+    301, 302, 303, 304, 305307, 306308, 309310,
+    401, 402, 403, 404406, 405, 407, 408, 409, 410,
+    501502, 503504,
+]
+
+
+def uhf34_members(uhf34_code):
+    """UHF42 codes making up a UHF34 code, e.g. 305307 -> [305, 307]."""
+    digits = str(int(uhf34_code))
+    return [int(digits[i:i + 3]) for i in range(0, len(digits), 3)]
+
+
+UHF42_TO_UHF34 = {member: code for code in UHF34_CODES for member in uhf34_members(code)}
@@ -0,0 +1,231 @@
+import collections
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from nyc_asthma.geography import UHF42_TO_UHF34, uhf34_members
+from nyc_asthma.paths import CACHE_DIR, UHF34_SHAPEFILE
+
+# ============================================================================
+# UHF42 <-> UHF34 harmonization with sparse population weights
+# ============================================================================
+#
+# UHF34 neighborhoods are unions of UHF42 ones (305307 = 305 + 307), read off
+# the UHF34 shapefile's codes. Pushing a panel between the two resolutions is
+# one sparse product W @ X over all (year, uhf_code) rows and all columns:
+#
+#   UHF42 -> UHF34   rate : population-weighted mean of the members present
+#                    count: sum of the members (NaN if any member is missing)
+#   UHF34 -> UHF42   rate : every member gets its parent's value
+#                    count: split by the members' population shares
+#
+# W holds raw populations, so a member with a missing value simply drops out
+# of both W @ (x * present) and the normalizer W @ present. A summed count
+# is complete when every member of the parent in the membership is present,
+# including members with no row at all. Variances go through W squared
+# (independent errors):
+#
+#   var(sum p_i x_i / sum p_i) = sum p_i^2 var_i / (sum p_i)^2
+#
+# W depends only on the row keys, the level pair, the kind, the population
+# and the membership, so it is built once per combination and the most
+# recently used WEIGHT_CACHE_SIZE of them are kept in memory.
+
+LEVELS = ('UHF42', 'UHF34')
+MEMBERSHIP_CACHE_DIR = os.path.join(CACHE_DIR, 'harmonize')
+WEIGHT_CACHE_SIZE = 32
+
+# Weight matrices by _weight_key(), least recently used first
+_weight_cache = collections.OrderedDict()
+
+
+def uhf34_membership(shapefile=UHF34_SHAPEFILE, cache_dir=MEMBERSHIP_CACHE_DIR):
+    """
+    UHF42 -> UHF34 code mapping derived from the UHF34 shapefile, cached.
+
+    Falls back to geography.UHF42_TO_UHF34 when the shapefile is not there.
+    """
+    if not os.path.exists(shapefile):
+        return dict(UHF42_TO_UHF34)
+
+    stat = os.stat(shapefile)
+    cache_file = os.path.join(cache_dir, f"uhf34_membership_{stat.st_size}_{int(stat.st_mtime)}.json")
+    if os.path.exists(cache_file):
+        with open(cache_file) as f:
+            return {int(k): v for k, v in json.load(f).items()}
+
+    import geopandas as gpd
+
+    codes = gpd.read_file(shapefile, ignore_geometry=True)['UHF34_CODE'].astype(int)
+    membership = {member: int(code) for code in codes if code > 0 for member in uhf34_members(code)}
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(cache_file, 'w') as f:
+        json.dump(membership, f)
+    return membership
+
+
+def population_from_rate(count, rate, per=10_000):
+    """Denominator implied by a count and its crude rate per `per` (NaN where rate <= 0)."""
+    rate = pd.Series(rate, dtype=float)
+    return pd.Series(count, dtype=float).to_numpy() / rate.where(rate > 0).to_numpy() * per
+
+
+def poisson_rate_variance(rate, count):
+    """Variance of a rate built from a Poisson count: rate^2 / count (NaN for zero counts)."""
+    count = np.asarray(count, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count > 0, np.asarray(rate, dtype=float) ** 2 / count, np.nan)
+
+
+def _fine_population(population, years, codes):
+    """
+    Population for (year, UHF42 code) pairs: exact year, else the code's mean
+    over the years it has, else 1 (equal weights).
+    """
+    if population is None:
+        return np.ones(len(codes))
+    pop = population.dropna(subset=['population'])
+    exact = pd.Series(pop['population'].to_numpy(),
+                      index=pd.MultiIndex.from_arrays([pop['year'], pop['uhf_code']]))
+    exact = exact[~exact.index.duplicated()]
+    by_code = pop.groupby('uhf_code')['population'].mean()
+
+    keys = pd.MultiIndex.from_arrays([np.asarray(years), np.asarray(codes)])
+    values = exact.reindex(keys).to_numpy()
+    fallback = by_code.reindex(np.asarray(codes)).to_numpy()
+    values = np.where(np.isnan(values), fallback, values)
+    return np.where(np.isnan(values) | (values <= 0), 1.0, values)
+
+
+def _weight_key(years, codes, source, target, kind, population, membership):
+    digest = hashlib.sha1(np.asarray(years, dtype=np.int64).tobytes())
+    digest.update(np.asarray(codes, dtype=np.int64).tobytes())
+    digest.update(repr(sorted(membership.items())).encode())
+    if population is not None:
+        digest.update(pd.util.hash_pandas_object(population[['year', 'uhf_code', 'population']],
+                                                 index=False).to_numpy().tobytes())
+    return source, target, kind, digest.hexdigest()
+
+
+def weight_matrix(years, codes, source, target, kind='rate', population=None, membership=None):
+    """
+    Sparse matrix taking source (year, uhf_code) rows to target rows.
+
+    Args:
+        years, codes (array-like): Source row keys.
+        source, target (str): 'UHF42' or 'UHF34'.
+        kind (str): 'rate' or 'count'.
+        population (pd.DataFrame, optional): year, uhf_code, population at UHF42.
+        membership (dict, optional): UHF42 -> UHF34 (default: uhf34_membership()).
+
+    Returns:
+        tuple: (W csr [n_target, n_source], target years, target codes)
+    """
+    if source not in LEVELS or target not in LEVELS:
+        raise ValueError(f"Levels must be one of {LEVELS}, got {source} -> {target}")
+    membership = uhf34_membership() if membership is None else membership
+    years = np.asarray(years)
+    codes = np.asarray(codes).astype(np.int64)
+
+    key = _weight_key(years, codes, source, target, kind, population, membership)
+    if key in _weight_cache:
+        _weight_cache.move_to_end(key)
+    else:
+        _weight_cache[key] = _build_weight_matrix(years, codes, source, target, kind, population, membership)
+        while len(_weight_cache) > WEIGHT_CACHE_SIZE:
+            _weight_cache.popitem(last=False)
+    return _weight_cache[key]
+
+
+def _build_weight_matrix(years, codes, source, target, kind, population, membership):
+    if source == target:
+        n = len(codes)
+        return sparse.identity(n, format='csr'), years, codes
+
+    if source == 'UHF42':
+        parents = np.array([membership.get(int(c), -1) for c in codes])
+        keep = np.flatnonzero(parents >= 0)
+        t_keys = pd.MultiIndex.from_arrays([years[keep], parents[keep]])
+        t_idx, t_uniques = pd.factorize(t_keys, sort=True)
+        weights = (_fine_population(population, years[keep], codes[keep]) if kind == 'rate'
+                   else np.ones(len(keep)))
+        W = sparse.csr_matrix((weights, (t_idx, keep)), shape=(len(t_uniques), len(codes)))
+    else:
+        children = pd.DataFrame(sorted((parent, child) for child, parent in membership.items()),
+                                columns=['uhf_code', 'child'])
+        rows = pd.DataFrame({'row': np.arange(len(codes)), 'year': years, 'uhf_code': codes})
+        rows = rows.merge(children, on='uhf_code')
+        src_rows = rows['row'].to_numpy(dtype=np.int64)
+        child_years, child_codes = rows['year'].to_numpy(), rows['child'].to_numpy()
+        t_keys = pd.MultiIndex.from_arrays([child_years, child_codes])
+        t_idx, t_uniques = pd.factorize(t_keys, sort=True)
+        if kind == 'rate':
+            weights = np.ones(len(src_rows))
+        else:
+            pop = _fine_population(population, child_years, child_codes)
+            share_den = np.bincount(src_rows, weights=pop, minlength=len(codes))
+            weights = pop / share_den[src_rows]
+        W = sparse.csr_matrix((weights, (t_idx, src_rows)), shape=(len(t_uniques), len(codes)))
+
+    return W, t_uniques.get_level_values(0).to_numpy(), t_uniques.get_level_values(1).to_numpy()
+
+
+def harmonize(df, value_cols, source, target, kind='rate', population=None, variance_cols=None,
+              membership=None):
+    """
+    Push indicators from one UHF resolution to another.
+
+    Args:
+        df (pd.DataFrame): year, uhf_code and the value columns, at `source` level.
+        value_cols (list): Columns to move (all of the same kind).
+        source, target (str): 'UHF42' or 'UHF34'.
+        kind (str): 'rate' (weighted mean / broadcast) or 'count' (sum / split).
+        population (pd.DataFrame, optional): year, uhf_code, population at UHF42.
+        variance_cols (dict, optional): value column -> its variance column;
+            the result gets '<value column>_var'.
+        membership (dict, optional): UHF42 -> UHF34 mapping.
+
+    Returns:
+        pd.DataFrame: year, uhf_code and the columns, one row per target key.
+    """
+    value_cols = list(value_cols)
+    variance_cols = variance_cols or {}
+    membership = uhf34_membership() if membership is None else membership
+    W, t_years, t_codes = weight_matrix(df['year'], df['uhf_code'], source, target, kind,
+                                        population, membership)
+
+    X = df[value_cols].to_numpy(dtype=float)
+    present = ~np.isnan(X)
+    V = np.column_stack([df[variance_cols[c]].to_numpy(dtype=float) if c in variance_cols
+                         else np.zeros(len(df)) for c in value_cols])
+
+    # One product per quantity, all columns at once
+    num = W @ np.where(present, X, 0.0)
+    den = W @ present.astype(float)
+    var_num = W.multiply(W) @ np.where(present, np.nan_to_num(V), 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if kind == 'rate' or source == 'UHF34':
+            # UHF34 -> UHF42 rows have exactly one parent, so den is 0 or its weight
+            scale = den if kind == 'rate' else np.where(den > 0, 1.0, np.nan)
+            values = np.where(den > 0, num / scale, np.nan)
+            variances = np.where(den > 0, var_num / scale ** 2, np.nan)
+        else:
+            # Members per parent from the membership, not from the rows present
+            n_members = pd.Series(list(membership.values())).value_counts()
+            expected = n_members.reindex(t_codes, fill_value=0).to_numpy(dtype=float)
+            complete = den == expected[:, None]
+            values = np.where(complete, num, np.nan)
+            variances = np.where(complete, var_num, np.nan)
+
+    out = pd.DataFrame({'year': t_years, 'uhf_code': t_codes})
+    for j, col in enumerate(value_cols):
+        out[col] = values[:, j]
+        if col in variance_cols:
+            out[f'{col}_var'] = variances[:, j]
+    return out
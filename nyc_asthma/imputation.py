@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# ============================================================================
+# Spatio-temporal imputation of missing UHF-year values
+# ============================================================================
+#
+# Every (uhf_code, year) cell of the panel is a node of one graph. Its
+# neighbors are the same neighborhood in the adjacent years and the touching
+# neighborhoods in the same year (adjacency.py), weighted by
+# temporal_weight / spatial_weight and row-normalized into an operator P.
+# Values are centred on each neighborhood's own mean and the missing cells of
+# the departures d are filled by iterating
+#
+#   d_missing <- (P @ d)_missing
+#
+# until the largest change is below tol (relative to the variable's spread).
+# The fixed point is the harmonic fill: each imputed departure is the
+# weighted mean of its neighbors', so a gap year follows how the
+# neighborhood and its neighbors moved around it. All variables are columns
+# of one matrix, so each iteration is a single sparse product.
+#
+# Multiple-imputation draws add e ~ N(0, s^2) to the converged fill, once per
+# cell and draw, where s is the variable's residual spread from predicting
+# observed departures by their observed neighbors. The noise is not fed back
+# through the iteration (that would sum it over every path through the
+# neighbors), so the between-draw variance of each filled cell is s^2.
+#
+# Cells are only filled inside the year span a variable was ever observed in
+# (adult prevalence, 2020 only, is not extrapolated to other years).
+
+DEFAULT_COLUMNS = [
+    'age_adjusted_asthma_percent', 'age_adjusted_ed_rate_per_10k',
+    'ed_rate_per_10k_age_0_4', 'ed_rate_per_10k_age_5_17',
+    'age_adjusted_ed_rate_per_10k_eb', 'ed_rate_per_10k_age_0_4_eb', 'ed_rate_per_10k_age_5_17_eb',
+    'mold_complaints', 'poverty_rate', 'PM_Avg', 'NO2_Avg',
+]
+FILLED_SUFFIX = '_filled'
+
+
+def spatial_neighbors(codes, level='UHF34'):
+    """Touching-neighborhood matrix, or same-borough membership without shapefiles."""
+    from nyc_asthma.adjacency import adjacency_matrix
+
+    try:
+        return adjacency_matrix(codes, level)
+    except FileNotFoundError:
+        from nyc_asthma.smoothing import reference_matrix
+
+        same = reference_matrix(codes, 'borough')
+        return (same - sparse.identity(len(codes), format='csr')).tocsr()
+
+
+def spacetime_operator(spatial, n_years, spatial_weight=1.0, temporal_weight=1.0):
+    """
+    Row-normalized neighbor operator over cells ordered unit-major (unit * n_years + year).
+
+    Args:
+        spatial (sparse matrix): [n_units, n_units] 0/1 adjacency.
+        n_years (int): Length of the (consecutive) year axis.
+    """
+    temporal = sparse.diags([np.ones(n_years - 1), np.ones(n_years - 1)], [-1, 1], format='csr')
+    operator = (spatial_weight * sparse.kron(spatial, sparse.identity(n_years), format='csr')
+                + temporal_weight * sparse.kron(sparse.identity(spatial.shape[0]), temporal, format='csr'))
+    return operator.tocsr()
+
+
+def _neighbor_mean(operator, values, weights):
+    """Weighted neighbor mean of every column, counting only cells with weight."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (operator @ (np.nan_to_num(values) * weights)) / (operator @ weights)
+
+
+def impute_grid(values, operator, fillable=None, draws=0, tol=1e-6, max_iter=1000, seed=0):
+    """
+    Fill NaNs of a [cell, variable] grid from neighboring cells.
+
+    Args:
+        values (np.ndarray): [n_cells, n_vars], NaN where missing.
+        operator (sparse matrix): Cell adjacency from spacetime_operator().
+        fillable (np.ndarray, optional): Cells allowed to be filled (default: all NaNs).
+        draws (int): Number of multiple-imputation draws.
+        tol (float): Convergence threshold on the largest change / variable sd.
+        max_iter (int): Iteration cap.
+        seed (int): Seed for the draw noise.
+
+    Returns:
+        dict: point [n_cells, n_vars], draws [draws, n_cells, n_vars],
+        iterations and residual_sd per variable.
+    """
+    n_cells, n_vars = values.shape
+    observed = ~np.isnan(values)
+    fillable = ~observed if fillable is None else fillable & ~observed
+
+    # Residual spread of observed cells predicted by their observed neighbors
+    predicted = _neighbor_mean(operator, values, observed.astype(float))
+    resid = np.where(observed & np.isfinite(predicted), values - predicted, np.nan)
+    sd = np.array([np.nanstd(resid[:, j]) if np.isfinite(resid[:, j]).any() else 0.0 for j in range(n_vars)])
+    spread = np.nanstd(values, axis=0)
+    scale = np.where(spread > 0, spread, 1.0)
+
+    usable = (observed | fillable).astype(float)
+    start = np.where(fillable, np.nanmean(values, axis=0), values)
+    x = np.where(observed | fillable, start, np.nan)
+    col_scale = np.broadcast_to(scale, x.shape)
+
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        update = _neighbor_mean(operator, x, usable)
+        new = np.where(fillable & np.isfinite(update), update, x)
+        change = np.max(np.abs(new - x)[fillable] / col_scale[fillable]) if fillable.any() else 0.0
+        x = new
+        if change < tol:
+            break
+
+    # Draws perturb the converged fill; observed cells are the same in every draw
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal((draws, n_cells, n_vars)) * sd
+    filled = fillable & ~np.isnan(x)
+    return {
+        'point': x,
+        'draws': np.where(filled, x + noise, x),
+        'iterations': iterations,
+        'residual_sd': sd,
+    }
+
+
+def _year_span(grid):
+    """[year, var] mask of years between a variable's first and last observed year."""
+    seen = (~np.isnan(grid)).any(axis=0)
+    n_years = seen.shape[0]
+    first = np.where(seen.any(axis=0), np.argmax(seen, axis=0), n_years)
+    last = n_years - 1 - np.argmax(seen[::-1], axis=0)
+    years = np.arange(n_years)[:, None]
+    return (years >= first) & (years <= last)
+
+
+def split_draws(completed, draws_long):
+    """
+    One DataFrame per draw, aligned row-for-row with a completed panel.
+
+    Rows are matched on (year, uhf_code), so the panel may be reordered or
+    filtered after impute_panel().
+
+    Raises:
+        ValueError: When a draw does not cover exactly the panel's cells.
+    """
+    keys = completed[['year', 'uhf_code']].reset_index(drop=True)
+    draws = []
+    for draw, frame in draws_long.groupby('draw'):
+        aligned = keys.merge(frame.drop(columns='draw'), on=['year', 'uhf_code'], how='left',
+                             validate='one_to_one', indicator=True)
+        missing = int((aligned.pop('_merge') != 'both').sum())
+        if missing or len(frame) != len(keys):
+            raise ValueError(f"Imputation draw {draw} does not match the completed panel "
+                             f"({missing} cells missing, {len(frame)} rows for {len(keys)}); re-run impute")
+        draws.append(aligned)
+    return draws
+
+
+def impute_panel(panel, columns=None, draws=5, spatial_weight=1.0, temporal_weight=1.0,
+                 level='UHF34', tol=1e-6, max_iter=1000, seed=0):
+    """
+    Fill missing UHF-year values of a panel from spatial and temporal neighbors.
+
+    Args:
+        panel (pd.DataFrame): One row per (year, uhf_code).
+        columns (list, optional): Numeric columns to fill (default: the
+            DEFAULT_COLUMNS present in the panel).
+        draws (int): Multiple-imputation draws to generate alongside the point fill.
+        spatial_weight, temporal_weight (float): Relative weight of the two kinds of neighbor.
+        level (str): Geography of uhf_code, for the adjacency.
+
+    Returns:
+        tuple: (completed panel with '<column>_filled' masks, long frame of
+        draws with a 'draw' column, info dict with iterations, residual sd
+        and cells filled per column)
+    """
+    columns = [c for c in (columns or DEFAULT_COLUMNS) if c in panel.columns]
+    codes = np.sort(panel['uhf_code'].unique())
+    years = np.arange(panel['year'].min(), panel['year'].max() + 1)
+    n_units, n_years = len(codes), len(years)
+
+    cells = pd.MultiIndex.from_product([codes, years], names=['uhf_code', 'year'])
+    grid = panel.set_index(['uhf_code', 'year'])[columns].reindex(cells).to_numpy(dtype=float)
+    operator = spacetime_operator(spatial_neighbors(codes, level), n_years, spatial_weight, temporal_weight)
+    fillable = np.tile(_year_span(grid.reshape(n_units, n_years, -1)), (n_units, 1))
+
+    # Fill departures from each neighborhood's own mean, so a neighbor's level
+    # doesn't leak in, only its year-to-year movement
+    with np.errstate(invalid='ignore'):
+        unit_mean = np.nanmean(grid.reshape(n_units, n_years, -1), axis=1)
+    unit_mean = np.where(np.isnan(unit_mean), np.nanmean(grid, axis=0), unit_mean)
+    level_grid = np.repeat(unit_mean, n_years, axis=0)
+    result = impute_grid(grid - level_grid, operator, fillable, draws, tol, max_iter, seed)
+    result['point'] = result['point'] + level_grid
+    result['draws'] = result['draws'] + level_grid
+    filled = np.isnan(grid) & ~np.isnan(result['point'])
+
+    completed = panel.set_index(['uhf_code', 'year'])
+    keys = completed.index
+    position = cells.get_indexer(keys)
+    for j, col in enumerate(columns):
+        completed[col] = result['point'][position, j]
+        completed[col + FILLED_SUFFIX] = filled[position, j]
+    completed = completed.reset_index()[list(panel.columns) + [c + FILLED_SUFFIX for c in columns]]
+
+    frames = []
+    for d in range(draws):
+        draw = pd.DataFrame(result['draws'][d][position], columns=columns)
+        draw.insert(0, 'uhf_code', keys.get_level_values('uhf_code'))
+        draw.insert(0, 'year', keys.get_level_values('year'))
+        draw.insert(0, 'draw', d + 1)
+        frames.append(draw)
+    draws_long = (pd.concat(frames, ignore_index=True) if frames
+                  else pd.DataFrame(columns=['draw', 'year', 'uhf_code'] + columns))
+
+    info = {'iterations': result['iterations'], 'residual_sd': dict(zip(columns, result['residual_sd'])),
+            'filled': dict(zip(columns, filled.sum(axis=0).tolist()))}
+    return completed, draws_long, info
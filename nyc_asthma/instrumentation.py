@@ -0,0 +1,228 @@
+import cProfile
+import datetime
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ============================================================================
+# Stage instrumentation for the pipeline scripts
+# ============================================================================
+#
+# A PipelineRun replaces the "[3/8] Doing something..." print banners. Each
+# call to run.stage() closes the previous stage and opens the next one, so
+# scripts need one line per step and no re-indenting:
+#
+#   run = PipelineRun('final_merge', total_stages=8)
+#   run.stage('Loading asthma datasets')
+#   ...
+#   run.rows(rows_out=len(merged))
+#   run.finish()
+#
+# Per stage it records wall time, CPU time, peak RSS, rows in/out and
+# (optionally) tracemalloc deltas. Everything else is switched on from the
+# environment, so a nightly job can profile without editing any script:
+#
+#   ASTHMA_METRICS=metrics.jsonl   append one JSON line per stage
+#   ASTHMA_TRACEMALLOC=1           record Python allocation deltas/peaks
+#   ASTHMA_PROFILE=all|<text>,...  cProfile stages whose title contains <text>
+#   ASTHMA_PYSPY=1                 attach `py-spy record` to profiled stages
+#   ASTHMA_PROFILE_DIR=profiles    where .prof / .svg files are written
+#   ASTHMA_QUIET=1                 suppress banners and the summary table
+
+
+def _env_flag(name):
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _peak_rss_mb():
+    """Process high-water RSS in MB (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _slug(text):
+    return ''.join(c if c.isalnum() else '_' for c in text.lower()).strip('_')[:40]
+
+
+class Stage:
+    """One timed pipeline step. Usually created through PipelineRun.stage()."""
+
+    def __init__(self, run, index, title, rows_in=None):
+        self.run = run
+        self.index = index
+        self.title = title
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.record = None
+        self._profiler = None
+        self._pyspy = None
+
+    def start(self):
+        self._started_at = datetime.datetime.now().isoformat(timespec='seconds')
+        self._rss_before = _peak_rss_mb()
+        if self.run.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._traced_before = tracemalloc.get_traced_memory()[0]
+        if self.run.should_profile(self.title):
+            self._start_profilers()
+        self._cpu0 = time.process_time()
+        self._wall0 = time.perf_counter()
+        return self
+
+    def stop(self):
+        wall = time.perf_counter() - self._wall0
+        cpu = time.process_time() - self._cpu0
+        self._stop_profilers()
+
+        rss_after = _peak_rss_mb()
+        record = {
+            'pipeline': self.run.name,
+            'stage': self.title,
+            'index': self.index,
+            'started_at': self._started_at,
+            'wall_seconds': round(wall, 6),
+            'cpu_seconds': round(cpu, 6),
+            'peak_rss_mb': round(rss_after, 1) if rss_after is not None else None,
+            'peak_rss_growth_mb': (round(rss_after - self._rss_before, 1)
+                                   if rss_after is not None else None),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+        }
+        if self.run.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            record['tracemalloc_delta_mb'] = round((current - self._traced_before) / 2**20, 3)
+            record['tracemalloc_peak_mb'] = round((peak - self._traced_before) / 2**20, 3)
+        self.record = record
+        return record
+
+    def _start_profilers(self):
+        os.makedirs(self.run.profile_dir, exist_ok=True)
+        base = os.path.join(self.run.profile_dir, f"{self.run.name}_{self.index:02d}_{_slug(self.title)}")
+        self._profile_file = base + '.prof'
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+        if self.run.use_pyspy:
+            pyspy = shutil.which('py-spy')
+            if pyspy is None:
+                print("  ⚠️  ASTHMA_PYSPY is set but py-spy is not installed")
+            else:
+                self._pyspy = subprocess.Popen(
+                    [pyspy, 'record', '--pid', str(os.getpid()), '--output', base + '.svg'],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def _stop_profilers(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self._profile_file)
+            self._profiler = None
+        if self._pyspy is not None:
+            # py-spy writes its flame graph on SIGINT
+            self._pyspy.send_signal(signal.SIGINT)
+            self._pyspy.wait()
+            self._pyspy = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.run.end_stage()
+        return False
+
+
+class PipelineRun:
+    """
+    Collects stage records for one script run.
+
+    Args:
+        name (str): Pipeline name used in the metrics output.
+        total_stages (int, optional): Shown in the "[i/N]" banners.
+        metrics_file (str, optional): JSON-lines output (default: $ASTHMA_METRICS).
+        verbose (bool, optional): Print banners and the summary table
+            (default: not $ASTHMA_QUIET).
+    """
+
+    def __init__(self, name, total_stages=None, metrics_file=None, verbose=None):
+        self.name = name
+        self.total_stages = total_stages
+        self.metrics_file = metrics_file or os.environ.get('ASTHMA_METRICS')
+        self.verbose = (not _env_flag('ASTHMA_QUIET')) if verbose is None else verbose
+        self.trace_memory = _env_flag('ASTHMA_TRACEMALLOC')
+        self.profile_targets = [t.strip().lower() for t in os.environ.get('ASTHMA_PROFILE', '').split(',') if t.strip()]
+        self.use_pyspy = _env_flag('ASTHMA_PYSPY')
+        self.profile_dir = os.environ.get('ASTHMA_PROFILE_DIR', 'profiles')
+        self.records = []
+        self.current = None
+
+    def should_profile(self, title):
+        if not self.profile_targets:
+            return False
+        return 'all' in self.profile_targets or any(t in title.lower() for t in self.profile_targets)
+
+    def stage(self, title, rows_in=None):
+        """Close the running stage (if any) and start the next one."""
+        self.end_stage()
+        index = len(self.records) + 1
+        if self.verbose:
+            total = f"/{self.total_stages}" if self.total_stages else ''
+            print(f"\n[{index}{total}] {title}...")
+        self.current = Stage(self, index, title, rows_in).start()
+        return self.current
+
+    def rows(self, rows_in=None, rows_out=None):
+        """Attach row counts to the running stage."""
+        if self.current is None:
+            return
+        if rows_in is not None:
+            self.current.rows_in = int(rows_in)
+        if rows_out is not None:
+            self.current.rows_out = int(rows_out)
+
+    def end_stage(self):
+        if self.current is None:
+            return None
+        record = self.current.stop()
+        self.records.append(record)
+        self.current = None
+        if self.metrics_file:
+            with open(self.metrics_file, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        return record
+
+    def summary_table(self):
+        """Fixed-width table of the recorded stages."""
+        lines = [f"{'#':>3} {'stage':45} {'wall s':>9} {'cpu s':>9} {'peak MB':>9} {'rows in':>11} {'rows out':>11}"]
+        for r in self.records:
+            peak = f"{r['peak_rss_mb']:.1f}" if r['peak_rss_mb'] is not None else '-'
+            rows_in = f"{r['rows_in']:,}" if r['rows_in'] is not None else '-'
+            rows_out = f"{r['rows_out']:,}" if r['rows_out'] is not None else '-'
+            lines.append(f"{r['index']:>3} {r['stage'][:45]:45} {r['wall_seconds']:>9.3f} "
+                         f"{r['cpu_seconds']:>9.3f} {peak:>9} {rows_in:>11} {rows_out:>11}")
+        total_wall = sum(r['wall_seconds'] for r in self.records)
+        lines.append(f"{'':>3} {'TOTAL':45} {total_wall:>9.3f}")
+        return '\n'.join(lines)
+
+    def finish(self):
+        """Close the last stage and print the summary table."""
+        self.end_stage()
+        if self.verbose:
+            print("\n" + "="*80)
+            print(f"STAGE TIMINGS ({self.name})")
+            print("="*80)
+            print(self.summary_table())
+        return self.records
@@ -0,0 +1,269 @@
+import numpy as np
+import pandas as pd
+
+from nyc_asthma.geography import NTA_TO_UHF, nta_to_uhf
+from nyc_asthma.paths import CLEANED_FILES
+
+# ============================================================================
+# Merging cleaned asthma, poverty and air quality tables at UHF level
+# ============================================================================
+
+ED_MERGE_COLUMNS = {
+    'ed_adults': ['age_adjusted_ed_rate_per_10k', 'estimated_annual_ed_visits'],
+    'ed_age_0_4': ['ed_rate_per_10k_age_0_4', 'estimated_annual_ed_visits_age_0_4'],
+    'ed_age_5_17': ['ed_rate_per_10k_age_5_17', 'estimated_annual_ed_visits_age_5_17'],
+}
+
+# (count, crude rate per 10k) giving each ED table's population denominator
+ED_POPULATION_COLUMNS = {
+    'ed_adults': ('estimated_annual_ed_visits', 'estimated_annual_ed_rate_per_10k'),
+    'ed_age_0_4': ('estimated_annual_ed_visits_age_0_4', 'ed_rate_per_10k_age_0_4'),
+    'ed_age_5_17': ('estimated_annual_ed_visits_age_5_17', 'ed_rate_per_10k_age_5_17'),
+}
+
+ADULTS_RATE_COLUMNS = ['age_adjusted_asthma_percent', 'asthma_percent']
+ADULTS_COUNT_COLUMNS = ['estimated_adults_with_asthma']
+
+# Native resolution of every source table
+SOURCE_LEVELS = {
+    'adults_with_asthma': 'UHF34',
+    'ed_adults': 'UHF42',
+    'ed_age_0_4': 'UHF42',
+    'ed_age_5_17': 'UHF42',
+}
+
+AQE_NUMERIC_COLUMNS = ['PM_Avg', 'NO2_Avg']
+# Year the aqe-nta.csv snapshot is taken to describe (NYCCAS annual averages);
+# the panel cells of that year count as measured, all others as imputed
+AQE_REFERENCE_YEAR = 2017
+AQE_CATEGORICAL_COLUMNS = ['PM_tertiles', 'NO2_tertiles', 'cook_tertiles', 'Building_emissions',
+                           'Industrial_tertiles', 'Traffic_tertiles']
+
+ASTHMA_POVERTY_COLUMNS = [
+    'year',
+    'uhf_code',
+    'neighborhood',
+    # Asthma prevalence
+    'age_adjusted_asthma_percent',
+    'estimated_adults_with_asthma',
+    # Asthma ED visits (adults)
+    'age_adjusted_ed_rate_per_10k',
+    'estimated_annual_ed_visits',
+    # Asthma ED visits (children 0-4)
+    'ed_rate_per_10k_age_0_4',
+    'estimated_annual_ed_visits_age_0_4',
+    # Asthma ED visits (children 5-17)
+    'ed_rate_per_10k_age_5_17',
+    'estimated_annual_ed_visits_age_5_17',
+    # Socioeconomic
+    'poverty_rate',
+    'households_below_poverty',
+    # Flags
+    'statistically_significant',
+    'poverty_imputed'
+]
+
+
+def load_cleaned_asthma(files=CLEANED_FILES):
+    """Load the four cleaned asthma tables keyed like paths.CLEANED_FILES."""
+    return {
+        key: pd.read_csv(files[key])
+        for key in ['adults_with_asthma', 'ed_adults', 'ed_age_0_4', 'ed_age_5_17']
+    }
+
+
+def ed_population(table, key):
+    """year, uhf_code, population implied by an ED table's counts and crude rates."""
+    from nyc_asthma.harmonize import population_from_rate
+
+    count_col, rate_col = ED_POPULATION_COLUMNS[key]
+    return pd.DataFrame({
+        'year': table['year'],
+        'uhf_code': table['uhf_code'],
+        'population': population_from_rate(table[count_col], table[rate_col]),
+    })
+
+
+def residents(asthma, level='UHF34', membership=None):
+    """
+    year, uhf_code, population: all ages, summed from the three ED tables' denominators.
+
+    Years missing from any ED table (adults, 2015) have no population.
+    """
+    parts = [ed_population(asthma[key], key).set_index(['year', 'uhf_code'])['population']
+             for key in ED_POPULATION_COLUMNS]
+    total = pd.concat(parts, axis=1).sum(axis=1, min_count=len(parts)).rename('population').reset_index()
+    if level == 'UHF42':
+        return total
+    from nyc_asthma.harmonize import uhf34_membership
+
+    membership = uhf34_membership() if membership is None else membership
+    total['uhf_code'] = total['uhf_code'].map(membership)
+    return total.groupby(['year', 'uhf_code'], as_index=False)['population'].sum(min_count=1)
+
+
+def to_level(table, key, level='UHF34', population=None, membership=None):
+    """
+    One source table's value columns at the panel resolution.
+
+    ED rates are weighted by the table's own population (visits / crude
+    rate) and ED counts are summed. Adults-with-asthma (UHF34 only) is
+    broadcast to UHF42 members, with its counts split by `population`.
+    """
+    from nyc_asthma.harmonize import harmonize
+
+    if key == 'adults_with_asthma':
+        rate_cols, count_cols = ADULTS_RATE_COLUMNS, ADULTS_COUNT_COLUMNS
+        flag_cols = ['statistically_significant']
+    else:
+        rate_cols, count_cols = ED_MERGE_COLUMNS[key][:1], ED_MERGE_COLUMNS[key][1:]
+        # Empirical-Bayes smoothed rates (smoothing.smooth_ed_tables), when present
+        rate_cols = rate_cols + [f'{c}_eb' for c in rate_cols if f'{c}_eb' in table.columns]
+        flag_cols = []
+        population = ed_population(table, key)
+
+    source = SOURCE_LEVELS[key]
+    if source == level:
+        return table[['year', 'uhf_code'] + rate_cols + count_cols + flag_cols]
+
+    out = harmonize(table, rate_cols, source, level, kind='rate', population=population,
+                    membership=membership)
+    counts = harmonize(table, count_cols, source, level, kind='count', population=population,
+                       membership=membership)
+    out = out.merge(counts, on=['year', 'uhf_code'])
+
+    if key == 'adults_with_asthma':
+        from nyc_asthma.harmonize import uhf34_membership
+
+        membership = uhf34_membership() if membership is None else membership
+        flags = table.set_index(['year', 'uhf_code'])['statistically_significant']
+        parents = pd.MultiIndex.from_arrays([out['year'], out['uhf_code'].map(membership)])
+        out['statistically_significant'] = flags.reindex(parents).to_numpy()
+    return out
+
+
+def _neighborhood_names(asthma, level):
+    """uhf_code -> name, preferring tables published at the panel's level."""
+    names = {}
+    for key, table in asthma.items():
+        if SOURCE_LEVELS[key] == level:
+            names.update(zip(table['uhf_code'], table['neighborhood']))
+    for key, table in asthma.items():
+        for code, name in zip(table['uhf_code'], table['neighborhood']):
+            names.setdefault(code, name)
+    return names
+
+
+def merge_asthma(asthma, level='UHF34', membership=None):
+    """
+    Put every asthma table on one resolution and outer-join by (year, uhf_code).
+
+    The panel has one row per (year, uhf_code) present in any source.
+
+    Args:
+        asthma (dict): Output of load_cleaned_asthma().
+        level (str): Panel resolution, 'UHF34' (default, where adults-with-asthma
+            is published) or 'UHF42'.
+        membership (dict, optional): UHF42 -> UHF34 mapping.
+
+    Returns:
+        pd.DataFrame: year, uhf_code, neighborhood and the asthma columns.
+    """
+    # Splits adults-with-asthma counts across UHF42 members for level='UHF42'
+    adult_population = ed_population(asthma['ed_adults'], 'ed_adults')
+
+    merged = None
+    for key, table in asthma.items():
+        part = to_level(table, key, level, adult_population, membership)
+        merged = part if merged is None else merged.merge(part, on=['year', 'uhf_code'], how='outer')
+
+    names = _neighborhood_names(asthma, level)
+    merged.insert(2, 'neighborhood', merged['uhf_code'].map(names))
+    return merged.sort_values(['year', 'uhf_code']).reset_index(drop=True)
+
+
+def add_poverty(merged, poverty, level='UHF34', method='covering', max_gap=4):
+    """
+    Attach household-weighted poverty aligned to the panel years.
+
+    Periods are labelled by their last year, so the default (covering with
+    max_gap 4) takes each year from the latest 5-year period containing it
+    and leaves years before the first period empty.
+
+    Args:
+        merged (pd.DataFrame): Panel with year and uhf_code.
+        poverty (pd.DataFrame): Output of poverty.poverty_by_uhf_year().
+        level (str): 'UHF34' or 'UHF42', matching the panel's uhf_code.
+        method, max_gap: See temporal.align().
+
+    Returns:
+        pd.DataFrame: merged plus households_below_poverty, poverty_rate and
+        poverty_imputed (True where the value is not from the period ending in that year).
+    """
+    from nyc_asthma.temporal import align
+
+    series = poverty[poverty['geo_level'] == level]
+    aligned = align(series, ['households_below_poverty', 'poverty_rate'], np.unique(merged['year']),
+                    method, max_gap, mask_col='poverty_imputed')
+    return merged.merge(aligned, on=['uhf_code', 'year'], how='left')
+
+
+def _mode(series):
+    return series.mode()[0] if len(series.mode()) > 0 else series.iloc[0]
+
+
+def nta_to_level(level='UHF42', membership=None, duplicates='last'):
+    """
+    NTA_TO_UHF composed with UHF42 -> UHF34 when the panel is at UHF34.
+
+    duplicates picks the UHF of NTAs listed twice (geography.nta_to_uhf).
+    """
+    crosswalk = nta_to_uhf(duplicates)
+    if level == 'UHF42':
+        return crosswalk
+    from nyc_asthma.harmonize import uhf34_membership
+
+    membership = uhf34_membership() if membership is None else membership
+    return {nta: membership[uhf] for nta, uhf in crosswalk.items() if uhf in membership}
+
+
+def aggregate_air_quality(aqe, crosswalk=NTA_TO_UHF):
+    """
+    Aggregate NTA-level air quality to UHF: mean of averages, mode of tertiles.
+
+    Args:
+        aqe (pd.DataFrame): Cleaned AQE table with an NTACODE column.
+        crosswalk (dict): NTA code -> UHF code.
+
+    Returns:
+        pd.DataFrame: One row per uhf_code.
+    """
+    aqe = aqe.copy()
+    aqe['uhf_code'] = aqe['NTACODE'].map(crosswalk)
+    aqe_mapped = aqe[aqe['uhf_code'].notna()].copy()
+
+    aqe_numeric = aqe_mapped.groupby('uhf_code')[AQE_NUMERIC_COLUMNS].mean().reset_index()
+    aqe_categorical = aqe_mapped.groupby('uhf_code')[AQE_CATEGORICAL_COLUMNS].agg(_mode).reset_index()
+    return aqe_numeric.merge(aqe_categorical, on='uhf_code', how='left')
+
+
+def add_air_quality(merged, aqe_uhf, reference_year):
+    """
+    Broadcast the static air quality snapshot to every panel year.
+
+    air_quality_imputed is True except in `reference_year`, the year the
+    snapshot describes (normally AQE_REFERENCE_YEAR).
+    """
+    if reference_year not in set(merged['year']):
+        raise ValueError(f"Air quality reference year {reference_year} is not a panel year; "
+                         f"every air quality cell would count as imputed")
+    out = merged.merge(aqe_uhf, on='uhf_code', how='left')
+    out['air_quality_imputed'] = out['PM_Avg'].notna() & (out['year'] != reference_year)
+    return out
+
+
+def build_asthma_poverty(asthma, poverty):
+    """Asthma + poverty panel written to merged_asthma_poverty_data.csv."""
+    merged = add_poverty(merge_asthma(asthma), poverty)
+    merged = merged[[c for c in ASTHMA_POVERTY_COLUMNS if c in merged.columns]]
+    return merged.sort_values(['year', 'neighborhood']).reset_index(drop=True)
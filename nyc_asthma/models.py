@@ -0,0 +1,74 @@
+import itertools
+
+import numpy as np
+
+from nyc_asthma.trees import GradientBoosting, RandomForest
+
+# ============================================================================
+# Predictive models for UHF-year asthma outcomes
+# ============================================================================
+#
+# Every model has fit(X, y) -> self and predict(X) on plain float arrays, is
+# built from keyword hyperparameters, and is registered in MODELS with a
+# default search grid in PARAM_GRIDS, so validation.py can evaluate any of
+# them the same way.
+
+DEFAULT_FEATURES = ['mold_complaints', 'poverty_rate', 'PM_Avg', 'NO2_Avg']
+DEFAULT_TARGET = 'age_adjusted_ed_rate_per_10k'
+
+
+class RidgeRegression:
+    """Ridge regression on standardized features (closed form)."""
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+
+    def fit(self, X, y):
+        self.mean_ = X.mean(axis=0)
+        scale = X.std(axis=0)
+        self.scale_ = np.where(scale > 0, scale, 1.0)
+        Z = (X - self.mean_) / self.scale_
+        self.intercept_ = y.mean()
+        gram = Z.T @ Z + self.alpha * np.eye(Z.shape[1])
+        self.coef_ = np.linalg.solve(gram, Z.T @ (y - self.intercept_))
+        return self
+
+    def predict(self, X):
+        return self.intercept_ + ((X - self.mean_) / self.scale_) @ self.coef_
+
+
+MODELS = {
+    'ridge': RidgeRegression,
+    'boosting': GradientBoosting,
+    'forest': RandomForest,
+}
+
+PARAM_GRIDS = {
+    'ridge': {'alpha': [0.01, 0.1, 1.0, 10.0, 100.0]},
+    'boosting': {'learning_rate': [0.03, 0.1], 'max_depth': [2, 3, 4], 'n_estimators': [200]},
+    'forest': {'max_depth': [4, 6, 8], 'max_features': [0.33, 0.66]},
+}
+
+
+def make_model(name, **params):
+    """Instantiate a registered model."""
+    if name not in MODELS:
+        raise ValueError(f"Unknown model {name!r} (choose from {', '.join(MODELS)})")
+    return MODELS[name](**params)
+
+
+def expand_grid(grid):
+    """{'a': [1, 2], 'b': [3]} -> [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def design_matrix(panel, features=DEFAULT_FEATURES, target=DEFAULT_TARGET):
+    """
+    Complete rows of a panel as model inputs.
+
+    Returns:
+        tuple: (rows used, X [n, n_features], y [n])
+    """
+    rows = panel.dropna(subset=list(features) + [target]).reset_index(drop=True)
+    return rows, rows[list(features)].to_numpy(dtype=float), rows[target].to_numpy(dtype=float)
@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+
+from nyc_asthma.mold_ingest import (MOLD_311_FILE, UHF_CODES, assign_uhf, iter_311_chunks,
+                         parse_311_dates, to_epoch_seconds)
+
+# ============================================================================
+# Collapse repeated 311 mold complaints about the same building
+# ============================================================================
+#
+# Complaints are keyed by BBL when it is present, otherwise by coordinates
+# snapped to a small grid. Within one key, complaints are sorted by time and a
+# complaint opens a new "episode" when it is the first for its key or arrives
+# more than `window_days` after the start of the current episode, so a
+# building calling every few weeks still counts once per window. Only episode
+# starts are counted in the deduplicated series.
+#
+# The whole history is handled with one lexsort and one searchsorted giving
+# every complaint the first later one outside its window (O(n log n)). The
+# episode starts are the chains of those links from each key's first
+# complaint, followed for all keys at once, so the sweep touches each start
+# once and never compares complaints pairwise.
+
+DEDUP_COLUMNS = ['Created Date', 'BBL', 'Latitude', 'Longitude']
+
+DEFAULT_WINDOW_DAYS = 30
+
+# 4 decimals ~ 11 m, close enough to treat two calls as the same building
+DEFAULT_SNAP_DECIMALS = 4
+
+
+def complaint_keys(bbl, lat, lon, snap_decimals=DEFAULT_SNAP_DECIMALS):
+    """
+    One int64 key per complaint: the BBL, or snapped coordinates as fallback.
+
+    Snapped-coordinate keys are negative so they can never collide with a BBL.
+    Rows with neither a BBL nor coordinates get key 0 and are never merged.
+
+    Args:
+        bbl (array-like): BBL values (float, NaN/0 when missing).
+        lat (array-like): Latitudes.
+        lon (array-like): Longitudes.
+        snap_decimals (int): Decimal places kept when snapping coordinates.
+
+    Returns:
+        np.ndarray: int64 keys.
+    """
+    bbl = np.asarray(bbl, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+
+    keys = np.zeros(len(bbl), dtype=np.int64)
+
+    has_bbl = np.isfinite(bbl) & (bbl > 0)
+    keys[has_bbl] = bbl[has_bbl].astype(np.int64)
+
+    has_xy = ~has_bbl & np.isfinite(lat) & np.isfinite(lon)
+    scale = 10 ** snap_decimals
+    # Shift into positive ranges so the packed key is unique per grid cell
+    lat_cell = np.round((lat[has_xy] + 90.0) * scale).astype(np.int64)
+    lon_cell = np.round((lon[has_xy] + 180.0) * scale).astype(np.int64)
+    keys[has_xy] = -(lat_cell * (360 * scale + 1) + lon_cell + 1)
+
+    return keys
+
+
+def episode_starts(keys, times, window_days=DEFAULT_WINDOW_DAYS):
+    """
+    Flag the complaints that survive deduplication.
+
+    Args:
+        keys (np.ndarray): int64 building keys (0 = unknown, never merged).
+        times (np.ndarray): int64 epoch seconds.
+        window_days (float): Complaints within this many days of the start
+            of the current episode for the same key are treated as repeats.
+
+    Returns:
+        np.ndarray: bool array in the input order, True for episode starts.
+    """
+    n = len(keys)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+
+    order = np.lexsort((times, keys))
+    k_sorted = keys[order]
+    t_sorted = times[order]
+
+    window = int(window_days * 86400)
+    first = np.ones(n, dtype=bool)
+    first[1:] = k_sorted[1:] != k_sorted[:-1]
+
+    # (key, time) packed into one sorted int64 so one searchsorted finds, for
+    # every complaint, the first complaint of its key after its window
+    span = int(t_sorted.max() - t_sorted.min()) + window + 1
+    packed = (np.cumsum(first) - 1) * span + (t_sorted - t_sorted.min())
+    following = np.searchsorted(packed, packed + window, side='right')
+    following[following == n] = -1
+    same_key = following >= 0
+    same_key[same_key] = k_sorted[following[same_key]] == k_sorted[same_key]
+    following[~same_key] = -1
+
+    start_sorted = np.zeros(n, dtype=bool)
+    frontier = np.flatnonzero(first)
+    while len(frontier):
+        start_sorted[frontier] = True
+        frontier = following[frontier]
+        frontier = frontier[frontier >= 0]
+    start_sorted[k_sorted == 0] = True
+
+    starts = np.empty(n, dtype=bool)
+    starts[order] = start_sorted
+    return starts
+
+
+def collect_complaints(path=MOLD_311_FILE, chunksize=500_000, snap_decimals=DEFAULT_SNAP_DECIMALS):
+    """
+    Stream the 311 file into compact arrays (key, time, year, UHF index).
+
+    Only four columns are parsed and each chunk is reduced to ~20 bytes per
+    row before the next chunk is read.
+
+    Returns:
+        dict: 'key', 'time', 'year' and 'uhf_idx' numpy arrays.
+    """
+    parts = {'key': [], 'time': [], 'year': [], 'uhf_idx': []}
+
+    for chunk in iter_311_chunks(path, DEDUP_COLUMNS, chunksize):
+        created = parse_311_dates(chunk['Created Date'])
+        uhf = assign_uhf(chunk['Latitude'], chunk['Longitude'])
+        ok = created.notna().to_numpy() & (uhf >= 0)
+        if not ok.any():
+            continue
+
+        keys = complaint_keys(chunk['BBL'], chunk['Latitude'], chunk['Longitude'], snap_decimals)
+        created = created[ok]
+        parts['key'].append(keys[ok])
+        parts['time'].append(to_epoch_seconds(created))
+        parts['year'].append(created.dt.year.to_numpy().astype(np.int16))
+        parts['uhf_idx'].append(np.searchsorted(UHF_CODES, uhf[ok]).astype(np.int16))
+
+    dtypes = {'key': np.int64, 'time': np.int64, 'year': np.int16, 'uhf_idx': np.int16}
+    return {
+        name: np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtypes[name])
+        for name, arrays in parts.items()
+    }
+
+
+def dedup_counts(path=MOLD_311_FILE, window_days=DEFAULT_WINDOW_DAYS, chunksize=500_000,
+                 snap_decimals=DEFAULT_SNAP_DECIMALS):
+    """
+    Raw and deduplicated mold complaint counts per UHF-year.
+
+    Args:
+        path (str): 311 CSV export.
+        window_days (float): Repeat window for the same building.
+        chunksize (int): Rows per streamed chunk.
+        snap_decimals (int): Coordinate snapping for rows without a BBL.
+
+    Returns:
+        pd.DataFrame: year, uhf_code, mold_complaints, mold_complaints_dedup.
+    """
+    c = collect_complaints(path, chunksize, snap_decimals)
+    columns = ['year', 'uhf_code', 'mold_complaints', 'mold_complaints_dedup']
+    if len(c['key']) == 0:
+        return pd.DataFrame(columns=columns)
+
+    starts = episode_starts(c['key'], c['time'], window_days)
+
+    # Dense (year, uhf) cell index -> two bincounts instead of a groupby
+    first_year = int(c['year'].min())
+    n_years = int(c['year'].max()) - first_year + 1
+    n_uhf = len(UHF_CODES)
+    cell = (c['year'].astype(np.int64) - first_year) * n_uhf + c['uhf_idx']
+    raw = np.bincount(cell, minlength=n_years * n_uhf)
+    dedup = np.bincount(cell, weights=starts, minlength=n_years * n_uhf).astype(np.int64)
+
+    nonzero = np.flatnonzero(raw)
+    return pd.DataFrame({
+        'year': first_year + nonzero // n_uhf,
+        'uhf_code': UHF_CODES[nonzero % n_uhf],
+        'mold_complaints': raw[nonzero],
+        'mold_complaints_dedup': dedup[nonzero],
+    }, columns=columns)
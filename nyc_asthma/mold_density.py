@@ -0,0 +1,218 @@
+import os
+from collections import namedtuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from scipy.signal import fftconvolve
+
+from nyc_asthma.mold_ingest import MOLD_311_FILE, iter_311_chunks, parse_311_dates
+from nyc_asthma.paths import CACHE_DIR, UHF34_SHAPEFILE
+
+# ============================================================================
+# Smoothed mold-complaint density surface and zonal means per polygon
+# ============================================================================
+#
+# 1. Bin complaint State Plane coordinates (EPSG:2263, feet - the same CRS as
+#    the bundled shapefiles) onto a citywide grid, one layer per year.
+# 2. Convolve every year with a Gaussian kernel in one FFT call.
+# 3. Average the surface over each UHF/NTA polygon using a cached
+#    cell -> polygon label grid, so zonal means are a bincount.
+#
+# Cost is O(cells log cells) per year instead of O(points x cells) for a
+# direct KDE.
+
+
+DENSITY_COLUMNS = ['Created Date', 'X Coordinate (State Plane)', 'Y Coordinate (State Plane)']
+
+DEFAULT_CELL_FT = 500.0
+DEFAULT_BANDWIDTH_FT = 1500.0
+
+MASK_CACHE_DIR = os.path.join(CACHE_DIR, 'zonal_masks')
+MASK_VERSION = 2
+
+SQ_FT_PER_SQ_MI = 5280.0 ** 2
+
+Grid = namedtuple('Grid', ['x0', 'y0', 'cell', 'nx', 'ny'])
+
+
+def grid_for_shapefile(shapefile=UHF34_SHAPEFILE, cell=DEFAULT_CELL_FT):
+    """Citywide grid covering the shapefile's bounds (State Plane feet)."""
+    minx, miny, maxx, maxy = gpd.read_file(shapefile).to_crs(epsg=2263).total_bounds
+    nx = int(np.ceil((maxx - minx) / cell))
+    ny = int(np.ceil((maxy - miny) / cell))
+    return Grid(float(minx), float(miny), float(cell), nx, ny)
+
+
+def _state_plane(values):
+    """311 exports State Plane coordinates as text with thousands separators."""
+    return pd.to_numeric(values.str.replace(',', '', regex=False), errors='coerce').to_numpy()
+
+
+def bin_complaints(grid, years, path=MOLD_311_FILE, chunksize=500_000):
+    """
+    Count complaints per grid cell and year while streaming the 311 file.
+
+    Args:
+        grid (Grid): Target grid.
+        years (list): Years to keep (one output layer each).
+        path (str): 311 CSV export.
+        chunksize (int): Rows per streamed chunk.
+
+    Returns:
+        np.ndarray: float64 counts [n_years, ny, nx].
+    """
+    years = np.asarray(sorted(years))
+    n_cells = grid.nx * grid.ny
+    counts = np.zeros(len(years) * n_cells, dtype=np.float64)
+
+    for chunk in iter_311_chunks(path, DENSITY_COLUMNS, chunksize):
+        x = _state_plane(chunk['X Coordinate (State Plane)'])
+        y = _state_plane(chunk['Y Coordinate (State Plane)'])
+        year = parse_311_dates(chunk['Created Date']).dt.year.to_numpy()
+
+        ix = np.floor((x - grid.x0) / grid.cell)
+        iy = np.floor((y - grid.y0) / grid.cell)
+        year_pos = np.searchsorted(years, year)
+        ok = ((ix >= 0) & (ix < grid.nx) & (iy >= 0) & (iy < grid.ny)
+              & (year_pos < len(years)))
+        ok[ok] &= years[year_pos[ok]] == year[ok]
+
+        flat = (year_pos[ok] * grid.ny + iy[ok].astype(np.int64)) * grid.nx + ix[ok].astype(np.int64)
+        counts += np.bincount(flat, minlength=len(counts))
+
+    return counts.reshape(len(years), grid.ny, grid.nx)
+
+
+def gaussian_kernel(bandwidth, cell):
+    """Normalized 2-D Gaussian kernel truncated at 3 sigma (sigma = bandwidth, feet)."""
+    radius = max(1, int(np.ceil(3 * bandwidth / cell)))
+    offsets = np.arange(-radius, radius + 1) * cell
+    one_d = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    kernel = np.outer(one_d, one_d)
+    return kernel / kernel.sum()
+
+
+def smooth_counts(counts, grid, bandwidth=DEFAULT_BANDWIDTH_FT):
+    """
+    Kernel-smoothed density for every year at once.
+
+    Returns:
+        np.ndarray: Complaints per square mile [n_years, ny, nx].
+    """
+    kernel = gaussian_kernel(bandwidth, grid.cell)
+    smoothed = fftconvolve(counts, kernel[np.newaxis], mode='same', axes=(1, 2))
+    # FFT round-off can leave tiny negatives in empty areas
+    np.maximum(smoothed, 0, out=smoothed)
+    return smoothed * (SQ_FT_PER_SQ_MI / grid.cell ** 2)
+
+
+def _mask_cache_path(shapefile, code_col, grid, cache_dir):
+    stat = os.stat(shapefile)
+    name = os.path.splitext(os.path.basename(shapefile))[0]
+    key = f"{name}_{code_col}_{grid.x0:.0f}_{grid.y0:.0f}_{grid.cell:g}_{grid.nx}x{grid.ny}_{stat.st_size}_{int(stat.st_mtime)}_v{MASK_VERSION}"
+    return os.path.join(cache_dir, key + '.npz')
+
+
+def polygon_cell_labels(shapefile, code_col, grid, cache_dir=MASK_CACHE_DIR):
+    """
+    Polygon index of every grid cell (by cell center), cached on disk.
+
+    Args:
+        shapefile (str): Polygon layer (UHF34 or NTA2020).
+        code_col (str): Column holding the polygon code.
+        grid (Grid): Target grid.
+        cache_dir (str): Where label grids are cached.
+
+    Returns:
+        tuple: (labels int32 [ny, nx] with -1 outside all polygons, codes array)
+    """
+    cache_file = _mask_cache_path(shapefile, code_col, grid, cache_dir)
+    if os.path.exists(cache_file):
+        cached = np.load(cache_file, allow_pickle=False)
+        return cached['labels'], cached['codes']
+
+    polygons = gpd.read_file(shapefile).to_crs(epsg=2263)
+    codes = polygons[code_col].to_numpy()
+    if codes.dtype == object:
+        # Text codes (NTA2020) as a fixed-width array, so the cache loads without pickle
+        codes = codes.astype(str)
+
+    xs = grid.x0 + (np.arange(grid.nx) + 0.5) * grid.cell
+    ys = grid.y0 + (np.arange(grid.ny) + 0.5) * grid.cell
+    labels = np.full((grid.ny, grid.nx), -1, dtype=np.int32)
+
+    for i, geom in enumerate(polygons.geometry):
+        if geom is None or geom.is_empty:
+            continue
+        # Only test the cell centers inside the polygon's bounding box
+        minx, miny, maxx, maxy = geom.bounds
+        cx = np.flatnonzero((xs >= minx) & (xs <= maxx))
+        cy = np.flatnonzero((ys >= miny) & (ys <= maxy))
+        if len(cx) == 0 or len(cy) == 0:
+            continue
+        gx, gy = np.meshgrid(xs[cx], ys[cy])
+        inside = shapely.contains_xy(geom, gx, gy)
+        sub = labels[cy[0]:cy[-1] + 1, cx[0]:cx[-1] + 1]
+        sub[inside & (sub < 0)] = i
+
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez_compressed(cache_file, labels=labels, codes=codes)
+    return labels, codes
+
+
+def zonal_means(surfaces, labels, n_zones):
+    """
+    Mean of each surface layer over each zone.
+
+    Args:
+        surfaces (np.ndarray): [n_layers, ny, nx].
+        labels (np.ndarray): Zone index per cell [ny, nx], -1 = no zone.
+        n_zones (int): Number of zones.
+
+    Returns:
+        np.ndarray: [n_layers, n_zones] (NaN for zones with no cells).
+    """
+    flat_labels = labels.ravel()
+    inside = flat_labels >= 0
+    zone = flat_labels[inside]
+    n_cells = np.bincount(zone, minlength=n_zones).astype(np.float64)
+
+    layers = surfaces.reshape(surfaces.shape[0], -1)[:, inside]
+    # One bincount over (layer, zone) pairs covers every year at once
+    layer_zone = (np.arange(layers.shape[0])[:, np.newaxis] * n_zones + zone).ravel()
+    sums = np.bincount(layer_zone, weights=layers.ravel(), minlength=layers.shape[0] * n_zones)
+    sums = sums.reshape(layers.shape[0], n_zones)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / n_cells
+
+
+def mold_density_by_zone(years, shapefile=UHF34_SHAPEFILE, code_col='UHF34_CODE',
+                         cell=DEFAULT_CELL_FT, bandwidth=DEFAULT_BANDWIDTH_FT,
+                         path=MOLD_311_FILE, chunksize=500_000):
+    """
+    Smoothed mold complaint density averaged over each polygon, per year.
+
+    UHF34 code 0 (land outside every neighborhood) keeps its cells, so they
+    are not credited to a neighbor, but is left out of the result.
+
+    Returns:
+        pd.DataFrame: year, <code_col>, mold_density_per_sq_mi.
+    """
+    years = sorted(years)
+    grid = grid_for_shapefile(shapefile, cell)
+    counts = bin_complaints(grid, years, path, chunksize)
+    surfaces = smooth_counts(counts, grid, bandwidth)
+    labels, codes = polygon_cell_labels(shapefile, code_col, grid)
+    means = zonal_means(surfaces, labels, len(codes))
+
+    density = pd.DataFrame({
+        'year': np.repeat(years, len(codes)),
+        code_col: np.tile(codes, len(years)),
+        'mold_density_per_sq_mi': means.ravel(),
+    })
+    if code_col == 'UHF34_CODE':
+        density = density[density[code_col].astype(int) > 0].reset_index(drop=True)
+    return density
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from nyc_asthma.geography import UHF_CENTROIDS
+from nyc_asthma.paths import RAW_FILES
+from nyc_asthma.sources import PARSED_VERSION, SOURCE_CACHE_DIR, content_hash
+
+# ============================================================================
+# Shared helpers for streaming the raw 311 mold file
+# ============================================================================
+
+MOLD_311_FILE = RAW_FILES['mold_311']
+
+# Format used by every date column in the 311 export, e.g. '11/12/2025 04:22:56 PM'
+DATE_FORMAT_311 = '%m/%d/%Y %I:%M:%S %p'
+
+# Numeric 311 columns; everything else is read as text
+NUMERIC_311_COLUMNS = {
+    'BBL': 'float64',
+    'Latitude': 'float64',
+    'Longitude': 'float64',
+}
+
+UHF_CODES = np.array(sorted(UHF_CENTROIDS), dtype=np.int64)
+
+_uhf_tree = None
+
+
+def _get_uhf_tree():
+    """Build the centroid KD-tree once per process."""
+    global _uhf_tree
+    if _uhf_tree is None:
+        coords = np.array([UHF_CENTROIDS[code] for code in UHF_CODES])
+        _uhf_tree = cKDTree(coords)
+    return _uhf_tree
+
+
+def assign_uhf(lat, lon):
+    """
+    Nearest-centroid UHF42 code for each point.
+
+    Args:
+        lat (array-like): Latitudes.
+        lon (array-like): Longitudes.
+
+    Returns:
+        np.ndarray: int64 UHF codes, -1 where the coordinates are missing.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    out = np.full(len(lat), -1, dtype=np.int64)
+    ok = ~(np.isnan(lat) | np.isnan(lon))
+    if ok.any():
+        _, idx = _get_uhf_tree().query(np.column_stack([lat[ok], lon[ok]]))
+        out[ok] = UHF_CODES[idx]
+    return out
+
+
+def parse_311_dates(series):
+    """Parse a 311 date column; unparseable or blank values become NaT."""
+    return pd.to_datetime(series, format=DATE_FORMAT_311, errors='coerce')
+
+
+def to_epoch_seconds(dates):
+    """datetime64 values -> int64 seconds since epoch (NaT -> INT64 min)."""
+    return np.asarray(dates, dtype='datetime64[s]').astype(np.int64)
+
+
+def _save_chunk(chunk, file):
+    """Write a chunk as plain .npz column arrays (text as fixed-width strings plus a missing mask)."""
+    arrays = {'columns': np.array(chunk.columns, dtype=str), 'dtypes': np.array(chunk.dtypes.astype(str), dtype=str),
+              # read_csv numbers rows across chunks
+              'first_row': np.int64(chunk.index[0] if len(chunk) else 0)}
+    for i, col in enumerate(chunk.columns):
+        values = chunk[col]
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            arrays[f'values_{i}'] = values.to_numpy()
+        else:
+            arrays[f'values_{i}'] = values.fillna('').to_numpy(dtype=str)
+            arrays[f'missing_{i}'] = values.isna().to_numpy()
+    np.savez(file, **arrays)
+
+
+def _load_chunk(file):
+    """Inverse of _save_chunk(); never unpickles."""
+    with np.load(file, allow_pickle=False) as data:
+        out = {}
+        for i, (col, dtype) in enumerate(zip(data['columns'], data['dtypes'])):
+            values = data[f'values_{i}']
+            if f'missing_{i}' in data.files:
+                values = values.astype(object)
+                values[data[f'missing_{i}']] = np.nan
+                values = pd.array(values, dtype=str(dtype))
+            out[str(col)] = values
+        first_row = int(data['first_row'])
+    n_rows = len(next(iter(out.values()))) if out else 0
+    return pd.DataFrame(out, index=pd.RangeIndex(first_row, first_row + n_rows))
+
+
+def iter_311_chunks(path=MOLD_311_FILE, columns=None, chunksize=500_000):
+    """
+    Stream the 311 export in chunks, reading only the requested columns.
+
+    When `path` is a cached source (sources.source_path('mold_311')), the
+    parsed chunks are kept next to it as .npz columns, keyed by its content
+    hash, and later calls for the same columns read those instead of the CSV.
+
+    Args:
+        path (str): 311 CSV export.
+        columns (list, optional): Columns to read (default: all).
+        chunksize (int): Rows per chunk.
+
+    Yields:
+        pd.DataFrame: One chunk of rows.
+    """
+    dtype = {col: NUMERIC_311_COLUMNS.get(col, 'str') for col in (columns or [])}
+    sha256 = content_hash(path)
+    if sha256 is None:
+        yield from pd.read_csv(path, usecols=columns, dtype=dtype or None, chunksize=chunksize)
+        return
+
+    spec = json.dumps([sorted(columns) if columns else None, chunksize]).encode()
+    parsed = os.path.join(SOURCE_CACHE_DIR, 'parsed',
+                          f'{sha256}-v{PARSED_VERSION}-{hashlib.sha1(spec).hexdigest()[:12]}')
+    if os.path.isdir(parsed):
+        for name in sorted(os.listdir(parsed)):
+            yield _load_chunk(os.path.join(parsed, name))
+        return
+
+    # Published only once every chunk is written, so a partial read leaves no cache
+    tmp_path = f'{parsed}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    try:
+        for i, chunk in enumerate(pd.read_csv(path, usecols=columns, dtype=dtype or None, chunksize=chunksize)):
+            _save_chunk(chunk, os.path.join(tmp_path, f'{i:06d}.npz'))
+            yield chunk
+        os.replace(tmp_path, parsed)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
@@ -0,0 +1,285 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# On-disk panel cube: one memory-mapped .npy array per variable
+# ============================================================================
+#
+# Layout of a store directory (e.g. DATA/CLEANED/FINAL_MERGED_DATASET.store/):
+#
+#   meta.json        axes (time + geography labels) and one entry per variable
+#   _present.npy     bool  [n_time, n_geo]  which cells exist in the panel
+#   <variable>.npy   array [n_time, n_geo]  time-major, so a year is contiguous
+#
+# Text columns are stored as int32 category codes (-1 = missing) with the
+# categories kept in meta.json, and booleans as int8 (-1 = missing or absent).
+# File names carry the variable's position, so names that sanitize alike
+# ("a b", "a_b") cannot overwrite each other. Nothing is read until a
+# variable is requested.
+
+STORE_VERSION = 2
+META_FILE = 'meta.json'
+PRESENT_FILE = '_present.npy'
+
+
+def _to_json_labels(values):
+    """Convert numpy scalars in an axis to plain python values for meta.json."""
+    return [v.item() if hasattr(v, 'item') else v for v in values]
+
+
+def _safe_file_name(position, variable):
+    """Variable names can contain anything pandas allows; keep file names tame and unique."""
+    keep = [c if (c.isalnum() or c in '-_') else '_' for c in str(variable)]
+    return f"{position:04d}_{''.join(keep)}.npy"
+
+
+def write_panel_store(df, path, index=('year', 'uhf_code')):
+    """
+    Persist a long-format panel as a memory-mappable cube.
+
+    Args:
+        df (pd.DataFrame): Panel with one row per (time, geography) pair.
+        path (str): Output directory (created if missing).
+        index (tuple): Names of the (time axis, geography axis) columns.
+
+    Returns:
+        str: The store directory.
+    """
+    time_col, geo_col = index
+    if df.duplicated(list(index)).any():
+        raise ValueError(f"Panel has duplicate ({time_col}, {geo_col}) rows; cannot build a cube")
+
+    os.makedirs(path, exist_ok=True)
+
+    time_labels = np.sort(df[time_col].unique())
+    geo_labels = np.sort(df[geo_col].unique())
+    t_idx = np.searchsorted(time_labels, df[time_col].to_numpy())
+    g_idx = np.searchsorted(geo_labels, df[geo_col].to_numpy())
+    shape = (len(time_labels), len(geo_labels))
+
+    present = np.zeros(shape, dtype=bool)
+    present[t_idx, g_idx] = True
+    np.save(os.path.join(path, PRESENT_FILE), present)
+
+    variables = {}
+    for position, col in enumerate(df.columns):
+        if col in index:
+            continue
+        series = df[col]
+        entry = {'file': _safe_file_name(position, col), 'categories': None}
+
+        if pd.api.types.is_bool_dtype(series):
+            # int8 so that missing values and cells absent from the panel can be -1
+            cube = np.full(shape, -1, dtype=np.int8)
+            cube[t_idx, g_idx] = np.where(series.isna().to_numpy(), -1,
+                                          series.fillna(False).to_numpy(dtype=bool).astype(np.int8))
+            entry['kind'] = 'bool'
+        elif pd.api.types.is_numeric_dtype(series):
+            cube = np.full(shape, np.nan, dtype=np.float64)
+            cube[t_idx, g_idx] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            # Integers share the float cube (NaN = absent) and are cast back on load
+            entry['kind'] = 'integer' if pd.api.types.is_integer_dtype(series) else 'numeric'
+        else:
+            codes, categories = pd.factorize(series, sort=True)
+            cube = np.full(shape, -1, dtype=np.int32)
+            cube[t_idx, g_idx] = codes
+            entry['kind'] = 'categorical'
+            entry['categories'] = [str(c) for c in categories]
+
+        entry['dtype'] = str(cube.dtype)
+        np.save(os.path.join(path, entry['file']), cube)
+        variables[col] = entry
+
+    meta = {
+        'version': STORE_VERSION,
+        'axes': {
+            time_col: _to_json_labels(time_labels),
+            geo_col: _to_json_labels(geo_labels),
+        },
+        'axis_order': [time_col, geo_col],
+        'shape': list(shape),
+        'variables': variables,
+    }
+    with open(os.path.join(path, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    # Arrays left by an earlier store in the same directory
+    written = {PRESENT_FILE} | {entry['file'] for entry in variables.values()}
+    for name in os.listdir(path):
+        if name.endswith('.npy') and name not in written:
+            os.remove(os.path.join(path, name))
+
+    return path
+
+
+class PanelStore:
+    """
+    Lazy reader for a directory written by write_panel_store().
+
+    Only meta.json is parsed on open. Each variable is memory-mapped the first
+    time it is requested, and slicing by year only touches those rows' pages.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported panel store version: {self.meta.get('version')}")
+
+        self.time_name, self.geo_name = self.meta['axis_order']
+        self.time_labels = np.asarray(self.meta['axes'][self.time_name])
+        self.geo_labels = np.asarray(self.meta['axes'][self.geo_name])
+        self._arrays = {}
+
+    @property
+    def variables(self):
+        return list(self.meta['variables'].keys())
+
+    def _array(self, name):
+        if name not in self._arrays:
+            file_name = PRESENT_FILE if name == PRESENT_FILE else self.meta['variables'][name]['file']
+            self._arrays[name] = np.load(os.path.join(self.path, file_name), mmap_mode='r')
+        return self._arrays[name]
+
+    def _positions(self, labels, wanted):
+        """Map requested axis labels to positions; None means the whole axis."""
+        if wanted is None:
+            return slice(None)
+        wanted = np.atleast_1d(np.asarray(wanted))
+        pos = np.searchsorted(labels, wanted)
+        pos = np.clip(pos, 0, len(labels) - 1)
+        missing = labels[pos] != wanted
+        if missing.any():
+            raise KeyError(f"Labels not in store: {wanted[missing].tolist()}")
+        # A contiguous run stays a slice so the result is a view, not a copy
+        if len(pos) > 1 and np.all(np.diff(pos) == 1):
+            return slice(int(pos[0]), int(pos[-1]) + 1)
+        return pos
+
+    def cube(self, variable, years=None, geos=None):
+        """
+        Raw [time, geography] array for one variable.
+
+        Args:
+            variable (str): Variable name.
+            years (list, optional): Time labels to keep (default: all).
+            geos (list, optional): Geography labels to keep (default: all).
+
+        Returns:
+            np.ndarray: A memory-mapped view when the selection is contiguous.
+        """
+        if variable not in self.meta['variables']:
+            raise KeyError(f"Unknown variable: {variable}")
+        t_sel = self._positions(self.time_labels, years)
+        g_sel = self._positions(self.geo_labels, geos)
+        arr = self._array(variable)[t_sel]
+        return arr[:, g_sel]
+
+    def load(self, variables=None, years=None, geos=None):
+        """
+        Load selected variables as a long-format DataFrame (like the CSV).
+
+        Args:
+            variables (list, optional): Variable names (default: all).
+            years (list, optional): Time labels to keep (default: all).
+            geos (list, optional): Geography labels to keep (default: all).
+
+        Returns:
+            pd.DataFrame: One row per (time, geography) present in the panel.
+        """
+        if variables is None:
+            variables = self.variables
+        elif isinstance(variables, str):
+            variables = [variables]
+
+        t_sel = self._positions(self.time_labels, years)
+        g_sel = self._positions(self.geo_labels, geos)
+        time_labels = self.time_labels[t_sel]
+        geo_labels = self.geo_labels[g_sel]
+
+        present = self._array(PRESENT_FILE)[t_sel][:, g_sel]
+        t_idx, g_idx = np.nonzero(present)
+
+        out = {
+            self.time_name: time_labels[t_idx],
+            self.geo_name: geo_labels[g_idx],
+        }
+        for name in variables:
+            entry = self.meta['variables'][name]
+            values = np.asarray(self.cube(name, years, geos)[t_idx, g_idx])
+            if entry['kind'] == 'categorical':
+                categories = np.asarray(entry['categories'], dtype=object)
+                decoded = np.full(len(values), None, dtype=object)
+                ok = values >= 0
+                decoded[ok] = categories[values[ok]]
+                values = decoded
+            elif entry['kind'] == 'bool':
+                values = pd.array(np.where(values < 0, None, values == 1), dtype='boolean')
+            elif entry['kind'] == 'integer' and not np.isnan(values).any():
+                values = values.astype(np.int64)
+            out[name] = values
+
+        return pd.DataFrame(out)
+
+
+def _store_path(path):
+    return path[:-len('.csv')] + '.store' if path.endswith('.csv') else path
+
+
+def open_panel_store(path):
+    """Open a panel store; a '.csv' path is mapped to its sibling '.store' directory."""
+    return PanelStore(_store_path(path))
+
+
+def _current_store(csv_path):
+    """The CSV's sibling store, or None if it is missing, another version, or older than the CSV."""
+    meta_path = os.path.join(_store_path(csv_path), META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    if os.path.exists(csv_path) and os.path.getmtime(meta_path) < os.path.getmtime(csv_path):
+        return None
+    try:
+        return open_panel_store(csv_path)
+    except ValueError:
+        return None
+
+
+def read_panel(csv_path, columns=None, years=None):
+    """
+    Selected columns of a panel CSV, read from its sibling store when it is current.
+
+    The CSV is only parsed (and then only the selected columns) when the store
+    is missing, was written by another STORE_VERSION, or is older than the CSV.
+
+    Args:
+        csv_path (str): Panel CSV, e.g. paths.FINAL_DATASET.
+        columns (callable, optional): Takes the available column names and
+            returns the ones to load (default: all).
+        years (list, optional): Time labels to keep (default: all).
+
+    Returns:
+        tuple: (DataFrame, path it was read from)
+    """
+    store = _current_store(csv_path)
+    if store is not None:
+        available = [store.time_name, store.geo_name] + store.variables
+        wanted = columns(available) if columns else available
+        if years is not None:
+            years = [y for y in np.atleast_1d(years) if y in set(store.time_labels.tolist())]
+        if years is not None and not years:
+            return pd.DataFrame(columns=wanted), store.path
+        df = store.load([c for c in wanted if c in store.variables], years=years)
+        return df[[c for c in wanted if c in df.columns]], store.path
+
+    if columns:
+        wanted = set(columns(pd.read_csv(csv_path, nrows=0).columns.tolist()))
+        df = pd.read_csv(csv_path, usecols=lambda c: c in wanted)
+    else:
+        df = pd.read_csv(csv_path)
+    if years is not None:
+        df = df[df['year'].isin(np.atleast_1d(years))].reset_index(drop=True)
+    return df, csv_path
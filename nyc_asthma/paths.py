@@ -0,0 +1,49 @@
+import os
+
+# ============================================================================
+# Input / output locations (relative to the repository root by default)
+# ============================================================================
+
+DATA_DIR = os.environ.get('ASTHMA_DATA_DIR', 'DATA')
+CLEANED_DIR = os.path.join(DATA_DIR, 'CLEANED')
+CACHE_DIR = os.path.join(DATA_DIR, 'CACHE')
+MODELS_DIR = os.path.join(DATA_DIR, 'MODELS')
+
+RAW_FILES = {
+    'adults_with_asthma': os.path.join(DATA_DIR, 'NYC EH Data Portal - Adults with asthma (full table).csv'),
+    'ed_adults': os.path.join(DATA_DIR, 'NYC EH Data Portal - Asthma emergency department visits (adults) (full table).csv'),
+    'ed_age_0_4': os.path.join(DATA_DIR, 'NYC EH Data Portal - Asthma emergency department visits (age 4 and under) (full table).csv'),
+    'ed_age_5_17': os.path.join(DATA_DIR, 'NYC EH Data Portal - Asthma emergency department visits (age 5 to 17) (full table).csv'),
+    'poverty': os.path.join(DATA_DIR, 'NYC EH Data Portal - Neighborhood poverty (full table).csv'),
+    'aqe': os.path.join(DATA_DIR, 'aqe-nta.csv'),
+    'mold_311': os.path.join(DATA_DIR, '311_Service_Requests_from_2010_to_Present_20251114[MOLD].csv'),
+}
+
+CLEANED_FILES = {
+    'adults_with_asthma': os.path.join(CLEANED_DIR, 'adults_with_asthma_cleaned.csv'),
+    'ed_adults': os.path.join(CLEANED_DIR, 'asthma_ed_visits_adults_cleaned.csv'),
+    'ed_age_0_4': os.path.join(CLEANED_DIR, 'asthma_ed_visits_age_0_4_cleaned.csv'),
+    'ed_age_5_17': os.path.join(CLEANED_DIR, 'asthma_ed_visits_age_5_17_cleaned.csv'),
+    'poverty': os.path.join(CLEANED_DIR, 'pov_data[cleaned].csv'),
+    'aqe': os.path.join(CLEANED_DIR, 'aqe_data[cleaned].csv'),
+    'mold_locations': os.path.join(CLEANED_DIR, '2010-present_mold_data_location[cleaned].csv'),
+}
+
+POVERTY_BY_UHF = os.path.join(CLEANED_DIR, 'poverty_by_uhf_year.csv')
+INDICATORS_BY_LEVEL = os.path.join(CLEANED_DIR, 'indicators_by_level.csv')
+ED_RATES_SMOOTHED = os.path.join(CLEANED_DIR, 'ed_rates_smoothed.csv')
+ED_FORECASTS = os.path.join(CLEANED_DIR, 'ed_rate_forecasts.csv')
+ED_FORECAST_BACKTEST = os.path.join(CLEANED_DIR, 'ed_rate_forecast_backtest.csv')
+MERGED_ASTHMA_POVERTY = os.path.join(CLEANED_DIR, 'merged_asthma_poverty_data.csv')
+FINAL_DATASET = os.path.join(CLEANED_DIR, 'FINAL_MERGED_DATASET.csv')
+FINAL_STORE = os.path.join(CLEANED_DIR, 'FINAL_MERGED_DATASET.store')
+IMPUTED_DATASET = os.path.join(CLEANED_DIR, 'FINAL_MERGED_DATASET_IMPUTED.csv')
+IMPUTATION_DRAWS = os.path.join(CLEANED_DIR, 'imputation_draws.csv')
+SQL_STORE = os.path.join(CLEANED_DIR, 'asthma.sqlite')
+CORRELATION_RESULTS = os.path.join(CLEANED_DIR, 'correlation_results.csv')
+SCENARIO_CORRELATIONS = os.path.join(CLEANED_DIR, 'scenario_correlations.csv')
+DRIVER_IMPORTANCE = os.path.join(CLEANED_DIR, 'driver_importance.csv')
+CORRELATION_HEATMAP = os.path.join(CLEANED_DIR, 'correlation_heatmap.png')
+
+UHF34_SHAPEFILE = os.path.join(DATA_DIR, 'GIS', 'UHF34-GIS', 'UHF_34_DOHMH.shp')
+NTA_SHAPEFILE = os.path.join(DATA_DIR, 'GIS', 'NY-NTA2020_25', 'nynta2020.shp')
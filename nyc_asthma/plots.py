@@ -0,0 +1,55 @@
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # noqa: E402
+import seaborn as sns  # noqa: E402
+
+from nyc_asthma.correlation import CATEGORICAL_VARS, encode_tertile  # noqa: E402
+
+# ============================================================================
+# Figures (only imported by the `plot` command)
+# ============================================================================
+
+HEATMAP_VARS = {
+    'Adult ED Visits': 'age_adjusted_ed_rate_per_10k',
+    'NO2': 'NO2_Avg',
+    'PM2.5': 'PM_Avg',
+    'Mold': 'mold_complaints',
+    'Poverty': 'poverty_rate',
+    'NO2 Level': 'NO2_tertiles_encoded',
+    'PM2.5 Level': 'PM_tertiles_encoded',
+    'Traffic': 'Traffic_tertiles_encoded',
+    'Industrial': 'Industrial_tertiles_encoded',
+    'Building': 'Building_emissions_encoded',
+    'Cooking': 'cook_tertiles_encoded'
+}
+
+# Panel columns correlation_heatmap() reads
+HEATMAP_COLUMNS = ['year'] + [v[:-len('_encoded')] if v.endswith('_encoded') else v for v in HEATMAP_VARS.values()]
+
+
+def correlation_heatmap(df, output_file, year=2020):
+    """
+    Correlation heatmap of adult ED visits and environmental factors for one year.
+
+    Returns:
+        pd.DataFrame: The rows used for the heatmap.
+    """
+    viz_data = df[df['year'] == year].copy()
+
+    for var_col in CATEGORICAL_VARS.values():
+        viz_data[f'{var_col}_encoded'] = viz_data[var_col].apply(encode_tertile)
+
+    heatmap_df = viz_data[[col for col in HEATMAP_VARS.values() if col in viz_data.columns]].dropna()
+    heatmap_df.columns = [k for k, v in HEATMAP_VARS.items() if v in heatmap_df.columns]
+
+    corr_matrix = heatmap_df.corr()
+
+    plt.figure(figsize=(12, 10))
+    sns.heatmap(corr_matrix, annot=True, fmt='.2f', cmap='coolwarm', center=0,
+                square=True, linewidths=1, cbar_kws={"shrink": 0.8})
+    plt.title(f'Correlation Matrix: Asthma ED Visits & Environmental Factors ({year})',
+              fontsize=14, fontweight='bold', pad=20)
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=300, bbox_inches='tight')
+    plt.close()
+    return heatmap_df
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from nyc_asthma.geography import NTA_TO_UHF, UHF42_TO_UHF34, UHF_CENTROIDS, uhf34_members
+from nyc_asthma.paths import CACHE_DIR, NTA_SHAPEFILE, RAW_FILES, UHF34_SHAPEFILE
+
+# ============================================================================
+# Household-weighted poverty rollup: portal NTA rows -> UHF42 / UHF34 by year
+# ============================================================================
+#
+# The raw portal table has every 5-year ACS period (2007-11 ... 2017-21) at
+# NTA2010 (through 2015-19) or NTA2020 (2016-20 on) level, next to the
+# portal's own UHF42 rows. Here the NTA rows are rolled up:
+#
+#   households        = Number / (Percent / 100)
+#   uhf poverty_rate  = sum(Number) / sum(households) * 100
+#
+# so large NTAs weigh more than small ones. NTA -> UHF42 comes from a
+# crosswalk cached under DATA/CACHE/poverty_crosswalk:
+#
+#   NTA2020: portal GeoID (county FIPS + NTA digits, 50101 = BX0101)
+#            -> the NTA2020 polygon -> the UHF34 polygon holding most of its
+#            area. Where that UHF34 has several UHF42 members, NTA_TO_UHF
+#            picks the member if it lists one of them, else the member with
+#            the nearest centroid.
+#   NTA2010: no 2010 polygons are bundled, so names are matched to NTA2020
+#            names in the same borough (same words ignoring punctuation,
+#            alias, then best word overlap) and take that NTA2020's UHF42
+#
+# NTAs that match nothing are left out of the rollup and listed by
+# unmatched_ntas(). A period is labelled by its last year (2017-21 -> 2021).
+
+POVERTY_FILE = RAW_FILES['poverty']
+CROSSWALK_CACHE_DIR = os.path.join(CACHE_DIR, 'poverty_crosswalk')
+CROSSWALK_VERSION = 2
+
+NTA_GEO_TYPES = ['NTA2010', 'NTA2020']
+
+# Leading digits of portal NTA GeoIDs are the county FIPS code
+PORTAL_COUNTY_BOROUGH = {'5': 'BX', '47': 'BK', '61': 'MN', '81': 'QN', '85': 'SI'}
+
+# NTA2010 names with no word in common with the NTA2020 that replaced them
+NTA2010_NAME_ALIASES = {
+    'Bronxdale': 'Pelham Parkway-Van Nest',
+    'North Side-South Side': 'Williamsburg',
+    'Clinton': "Hell's Kitchen",
+}
+
+_NAME_STOPWORDS = {'east', 'west', 'north', 'south', 'park', 'village', 'the', 'and', 'of'}
+
+POVERTY_COLUMNS = ['geo_level', 'uhf_code', 'year', 'time_period', 'households_below_poverty',
+                   'households', 'poverty_rate', 'n_ntas', 'nta_vintage', 'portal_poverty_rate']
+
+
+def parse_counts(series):
+    """'23,752' / '1,234*' / '†' -> float (NaN when not a number), vectorized."""
+    cleaned = series.astype(str).str.replace(',', '', regex=False).str.strip(' *')
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def period_end_year(time_period):
+    """'2017-21' -> 2021 for a Series of 5-year ACS period labels."""
+    return pd.to_numeric(time_period.astype(str).str[:4]) + 4
+
+
+def load_poverty_table(path=POVERTY_FILE):
+    """
+    Raw portal poverty table with numeric counts, rates and household totals.
+
+    Returns:
+        pd.DataFrame: Raw columns plus year, households_below_poverty,
+        poverty_rate and households.
+    """
+    df = pd.read_csv(path)
+    df['year'] = period_end_year(df['TimePeriod'])
+    df['households_below_poverty'] = parse_counts(df['Number'])
+    df['poverty_rate'] = parse_counts(df['Percent'])
+    rate = df['poverty_rate'].where(df['poverty_rate'] > 0)
+    df['households'] = df['households_below_poverty'] / (rate / 100.0)
+    return df
+
+
+def _normalized(name):
+    return ' '.join(t for t in re.split(r'[^a-z]+', name.lower()) if t)
+
+
+def _name_tokens(name):
+    return {t for t in re.split(r'[^a-z]+', name.lower()) if t and t not in _NAME_STOPWORDS}
+
+
+def _portal_borough(geo_ids, digits):
+    """Borough prefix (BX, BK, ...) of portal GeoIDs with `digits` trailing NTA digits."""
+    return geo_ids.astype(str).str[:-digits].map(PORTAL_COUNTY_BOROUGH)
+
+
+def nta2020_reference(shapefile=NTA_SHAPEFILE, uhf34_shapefile=UHF34_SHAPEFILE):
+    """
+    NTA2020 code, name and UHF42 for every polygon in the NTA shapefile.
+
+    Returns:
+        pd.DataFrame: nta2020, nta_name, uhf42, method ('overlay' when the
+        UHF34 polygon settles it, 'overlay+crosswalk' / 'overlay+centroid'
+        when a member of a combined UHF34 had to be picked, 'centroid' for
+        NTAs outside every UHF34 polygon) and overlap (share of the NTA's
+        area in its UHF34).
+    """
+    import geopandas as gpd
+
+    from nyc_asthma.mold_ingest import assign_uhf
+
+    ntas = gpd.read_file(shapefile).to_crs(epsg=2263)
+    ntas['geometry'] = ntas.geometry.make_valid()
+    uhf34 = gpd.read_file(uhf34_shapefile).to_crs(epsg=2263)
+    uhf34 = uhf34[uhf34['UHF34_CODE'] > 0]
+    uhf34 = uhf34.assign(UHF34_CODE=uhf34['UHF34_CODE'].astype(int), geometry=uhf34.geometry.make_valid())
+
+    # UHF34 holding the largest share of each NTA's area
+    pieces = gpd.overlay(ntas[['NTA2020', 'geometry']], uhf34[['UHF34_CODE', 'geometry']],
+                         how='intersection', keep_geom_type=True)
+    pieces['area'] = pieces.area
+    pieces['overlap'] = pieces['area'] / pieces.groupby('NTA2020')['area'].transform('sum')
+    best = pieces.sort_values('area').drop_duplicates('NTA2020', keep='last')
+    reference = pd.DataFrame({'nta2020': ntas['NTA2020'], 'nta_name': ntas['NTAName']}).merge(
+        best[['NTA2020', 'UHF34_CODE', 'overlap']].rename(columns={'NTA2020': 'nta2020'}),
+        on='nta2020', how='left')
+
+    # A combined UHF34's member: NTA_TO_UHF's, else the nearest member centroid
+    points = ntas.to_crs(epsg=4326).representative_point()
+    lat, lon = points.y.to_numpy(), points.x.to_numpy()
+    candidates = reference[['nta2020', 'UHF34_CODE']].dropna().astype({'UHF34_CODE': int})
+    candidates = candidates.assign(uhf42=candidates['UHF34_CODE'].map(uhf34_members)).explode('uhf42')
+    candidates['uhf42'] = candidates['uhf42'].astype(int)
+    position = candidates.index.to_numpy()
+    centroids = np.array([UHF_CENTROIDS.get(code, (np.nan, np.nan)) for code in candidates['uhf42']])
+    candidates['distance'] = np.hypot(centroids[:, 0] - lat[position],
+                                      (centroids[:, 1] - lon[position]) * np.cos(np.radians(40.7)))
+    candidates['listed'] = candidates['nta2020'].map(NTA_TO_UHF) == candidates['uhf42']
+    single = candidates.groupby('nta2020')['uhf42'].transform('size') == 1
+    candidates['method'] = np.where(single, 'overlay',
+                                    np.where(candidates['listed'].groupby(candidates['nta2020']).transform('any'),
+                                             'overlay+crosswalk', 'overlay+centroid'))
+    chosen = candidates.sort_values(['listed', 'distance'], ascending=[False, True]).drop_duplicates('nta2020')
+    reference = reference.merge(chosen[['nta2020', 'uhf42', 'method']], on='nta2020', how='left')
+
+    outside = reference['uhf42'].isna().to_numpy()
+    reference.loc[outside, 'uhf42'] = assign_uhf(lat[outside], lon[outside])
+    reference.loc[outside, 'method'] = 'centroid'
+    reference['uhf42'] = reference['uhf42'].astype(int)
+    return reference[['nta2020', 'nta_name', 'uhf42', 'method', 'overlap']]
+
+
+def _match_nta2010(ntas, reference):
+    """
+    Best NTA2020 row for every NTA2010 name within its borough.
+
+    Args:
+        ntas (pd.DataFrame): GeoID, Geography of NTA2010 rows.
+        reference (pd.DataFrame): nta2020_reference() output.
+
+    Returns:
+        pd.DataFrame: GeoID, nta2020, uhf42, method ('name', 'words' or 'unmatched').
+    """
+    ntas = ntas.assign(borough=_portal_borough(ntas['GeoID'], 2).to_numpy(),
+                       key=ntas['Geography'].replace(NTA2010_NAME_ALIASES).map(_normalized).to_numpy())
+    reference = reference.assign(borough=reference['nta2020'].str[:2],
+                                 key=reference['nta_name'].map(_normalized))
+
+    exact = ntas.merge(reference[['borough', 'key', 'nta2020', 'uhf42']], on=['borough', 'key'])
+    exact = exact.drop_duplicates('GeoID').assign(method='name')
+
+    # Word overlap against every NTA2020 in the same borough
+    rest = ntas[~ntas['GeoID'].isin(exact['GeoID'])]
+    pairs = rest.merge(reference[['borough', 'nta_name', 'nta2020', 'uhf42']], on='borough')
+    tokens = pairs['Geography'].replace(NTA2010_NAME_ALIASES).map(_name_tokens)
+    other = pairs['nta_name'].map(_name_tokens)
+    pairs['score'] = [len(a & b) / max(1, len(a | b)) for a, b in zip(tokens, other)]
+    pairs = pairs[pairs['score'] > 0]
+    pairs = pairs[pairs['score'] == pairs.groupby('GeoID')['score'].transform('max')]
+    # Ties: take the UHF most of the tied NTAs fall in
+    votes = pairs.groupby(['GeoID', 'uhf42']).size().rename('votes').reset_index()
+    pairs = pairs.merge(votes, on=['GeoID', 'uhf42'])
+    words = pairs.sort_values(['votes', 'uhf42'], ascending=[False, True]).drop_duplicates('GeoID')
+    words = words.assign(method='words')
+
+    matched = pd.concat([exact, words])[['GeoID', 'nta2020', 'uhf42', 'method']]
+    out = ntas[['GeoID']].merge(matched, on='GeoID', how='left')
+    out['uhf42'] = out['uhf42'].fillna(-1).astype(int)
+    out['method'] = out['method'].fillna('unmatched')
+    return out
+
+
+def build_crosswalk(poverty, shapefile=NTA_SHAPEFILE, uhf34_shapefile=UHF34_SHAPEFILE):
+    """
+    NTA GeoID -> UHF42 for every NTA2010/NTA2020 row of the portal table.
+
+    Returns:
+        pd.DataFrame: GeoType, GeoID, Geography, nta2020, uhf42 (-1 when
+        unmatched), method.
+    """
+    reference = nta2020_reference(shapefile, uhf34_shapefile)
+    ntas = poverty.loc[poverty['GeoType'].isin(NTA_GEO_TYPES), ['GeoType', 'GeoID', 'Geography']]
+    ntas = ntas.drop_duplicates(['GeoType', 'GeoID']).reset_index(drop=True)
+
+    nta2020 = ntas[ntas['GeoType'] == 'NTA2020']
+    code = _portal_borough(nta2020['GeoID'], 4) + nta2020['GeoID'].astype(str).str[-4:]
+    by_code = nta2020[['GeoID']].assign(nta2020=code.to_numpy()).merge(
+        reference[['nta2020', 'uhf42', 'method']], on='nta2020', how='left')
+    by_code['uhf42'] = by_code['uhf42'].fillna(-1).astype(int)
+    by_code['nta2020'] = by_code['nta2020'].where(by_code['method'].notna())
+    by_code['method'] = by_code['method'].fillna('unmatched')
+    by_name = _match_nta2010(ntas.loc[ntas['GeoType'] == 'NTA2010', ['GeoID', 'Geography']], reference)
+
+    matched = pd.concat([by_code.assign(GeoType='NTA2020'), by_name.assign(GeoType='NTA2010')])
+    crosswalk = ntas.merge(matched, on=['GeoType', 'GeoID'], how='left')
+    return crosswalk[['GeoType', 'GeoID', 'Geography', 'nta2020', 'uhf42', 'method']]
+
+
+def unmatched_ntas(crosswalk):
+    """Crosswalk rows with no UHF42: left out of the rollup."""
+    return crosswalk[crosswalk['uhf42'] <= 0]
+
+
+def _crosswalk_cache_path(poverty, shapefile, uhf34_shapefile, cache_dir):
+    stats = [os.stat(path) for path in (shapefile, uhf34_shapefile)]
+    keys = poverty.loc[poverty['GeoType'].isin(NTA_GEO_TYPES), ['GeoType', 'GeoID', 'Geography']]
+    signature = json.dumps([CROSSWALK_VERSION, keys.drop_duplicates().astype(str).values.tolist(),
+                            sorted(NTA_TO_UHF.items()), NTA2010_NAME_ALIASES,
+                            [(stat.st_size, int(stat.st_mtime)) for stat in stats]])
+    return os.path.join(cache_dir, hashlib.sha1(signature.encode()).hexdigest()[:16] + '.csv')
+
+
+def nta_crosswalk(poverty, shapefile=NTA_SHAPEFILE, cache_dir=CROSSWALK_CACHE_DIR,
+                  uhf34_shapefile=UHF34_SHAPEFILE):
+    """build_crosswalk(), cached on disk until the NTA list, NTA_TO_UHF or shapefiles change."""
+    cache_file = _crosswalk_cache_path(poverty, shapefile, uhf34_shapefile, cache_dir)
+    if os.path.exists(cache_file):
+        return pd.read_csv(cache_file)
+    crosswalk = build_crosswalk(poverty, shapefile, uhf34_shapefile)
+    os.makedirs(cache_dir, exist_ok=True)
+    crosswalk.to_csv(cache_file, index=False)
+    return crosswalk
+
+
+def aggregate_poverty(poverty, crosswalk):
+    """
+    Household-weighted UHF42 and UHF34 poverty per period, in one groupby.
+
+    Each mapped NTA row appears once per level (UHF42 code, UHF34 code), so
+    both levels come out of a single grouped sum.
+
+    Returns:
+        pd.DataFrame: POVERTY_COLUMNS, one row per (geo_level, uhf_code, year).
+    """
+    ntas = poverty[poverty['GeoType'].isin(NTA_GEO_TYPES)].merge(
+        crosswalk[['GeoType', 'GeoID', 'uhf42']], on=['GeoType', 'GeoID'], how='left')
+    ntas = ntas[(ntas['uhf42'] > 0) & ntas['households'].notna()]
+
+    uhf42 = ntas['uhf42'].to_numpy()
+    uhf34 = ntas['uhf42'].map(UHF42_TO_UHF34).to_numpy()
+    n = len(ntas)
+    stacked = pd.DataFrame({
+        'geo_level': np.repeat(['UHF42', 'UHF34'], n),
+        'uhf_code': np.concatenate([uhf42, uhf34]),
+        'year': np.tile(ntas['year'].to_numpy(), 2),
+        'time_period': np.tile(ntas['TimePeriod'].to_numpy(), 2),
+        'nta_vintage': np.tile(ntas['GeoType'].to_numpy(), 2),
+        'households_below_poverty': np.tile(ntas['households_below_poverty'].to_numpy(), 2),
+        'households': np.tile(ntas['households'].to_numpy(), 2),
+    })
+
+    out = stacked.groupby(['geo_level', 'uhf_code', 'year', 'time_period', 'nta_vintage'],
+                          as_index=False).agg(households_below_poverty=('households_below_poverty', 'sum'),
+                                              households=('households', 'sum'),
+                                              n_ntas=('households', 'size'))
+    out['poverty_rate'] = 100.0 * out['households_below_poverty'] / out['households']
+    out['uhf_code'] = out['uhf_code'].astype(int)
+
+    # The portal's own UHF42 figure, for checking the rollup
+    portal = poverty.loc[poverty['GeoType'] == 'UHF42', ['GeoID', 'year', 'poverty_rate']]
+    portal = portal.rename(columns={'GeoID': 'uhf_code', 'poverty_rate': 'portal_poverty_rate'})
+    portal['geo_level'] = 'UHF42'
+    out = out.merge(portal, on=['geo_level', 'uhf_code', 'year'], how='left')
+
+    return out[POVERTY_COLUMNS].sort_values(['geo_level', 'year', 'uhf_code']).reset_index(drop=True)
+
+
+def poverty_by_uhf_year(path=POVERTY_FILE, shapefile=NTA_SHAPEFILE, cache_dir=CROSSWALK_CACHE_DIR):
+    """Load the raw portal table and roll every period up to UHF42 and UHF34."""
+    poverty = load_poverty_table(path)
+    return aggregate_poverty(poverty, nta_crosswalk(poverty, shapefile, cache_dir))
+
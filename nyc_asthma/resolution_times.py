@@ -0,0 +1,267 @@
+import numpy as np
+import pandas as pd
+
+from nyc_asthma.mold_ingest import MOLD_311_FILE, assign_uhf, iter_311_chunks, parse_311_dates
+
+# ============================================================================
+# Time-to-close of 311 mold complaints, summarized with KLL quantile sketches
+# ============================================================================
+#
+# Durations are computed chunk by chunk during the streaming read and pushed
+# into one sketch per (UHF, year). A sketch holds O(k log n) values no matter
+# how many complaints it has seen, and two sketches merge into one, so
+# per-UHF, per-year and citywide quantiles all come from the same state
+# without keeping or re-sorting the full history.
+
+RESOLUTION_COLUMNS = [
+    'Created Date', 'Closed Date', 'Status', 'Resolution Action Updated Date',
+    'Latitude', 'Longitude',
+]
+
+DEFAULT_SKETCH_K = 200
+
+
+class KLLSketch:
+    """
+    Mergeable streaming quantile sketch (Karnin-Lang-Liberty).
+
+    Level h stores items that each stand for 2**h observations. When a level
+    is over capacity it is sorted and every other item (random offset) is
+    promoted to the next level.
+    """
+
+    def __init__(self, k=DEFAULT_SKETCH_K, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                # An odd item out stays behind so no weight is lost
+                keep = items[:1] if len(items) % 2 else items[:0]
+                pairs = items[len(keep):]
+                promoted = pairs[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        """Add a batch of observations (NaN values are ignored)."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one (in place)."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """
+        Approximate quantile(s).
+
+        Args:
+            q (float or array-like): Quantiles in [0, 1].
+
+        Returns:
+            float or np.ndarray: NaN if the sketch is empty.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if self.n == 0:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lvl), 2.0 ** h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        cum = np.cumsum(weights[order])
+        pos = np.searchsorted(cum, q * cum[-1], side='left')
+        result = items[np.clip(pos, 0, len(items) - 1)]
+        return result if q.ndim else float(result)
+
+    def __len__(self):
+        return self.n
+
+
+def resolution_hours(created, closed, status, resolution_updated):
+    """
+    Hours from creation to closure for each complaint.
+
+    Closed complaints with a blank 'Closed Date' fall back to the resolution
+    update time. Open complaints, negative durations and closed complaints
+    with no closing time at all give NaN; the open mask tells them apart.
+
+    Args:
+        created, closed, resolution_updated (pd.Series): Raw 311 date strings.
+        status (pd.Series): 311 'Status' column.
+
+    Returns:
+        tuple: (float hours, boolean mask of complaints whose Status is not 'Closed').
+    """
+    created = parse_311_dates(created)
+    closed = parse_311_dates(closed)
+    closed = closed.fillna(parse_311_dates(resolution_updated).where(status == 'Closed'))
+
+    hours = (closed - created).dt.total_seconds().to_numpy() / 3600.0
+    hours[hours < 0] = np.nan
+    return hours, (status != 'Closed').to_numpy()
+
+
+class ResolutionSketches:
+    """
+    One KLL sketch of resolution hours per (uhf_code, year) cell.
+
+    Open complaints and closed ones without a valid duration (no closing
+    time, or closed before they were created) are counted, not sketched.
+    """
+
+    def __init__(self, k=DEFAULT_SKETCH_K):
+        self.k = k
+        self.sketches = {}
+        self.open_counts = {}
+        self.invalid_counts = {}
+
+    def _sketch(self, key):
+        if key not in self.sketches:
+            self.sketches[key] = KLLSketch(self.k)
+        return self.sketches[key]
+
+    def update(self, chunk):
+        """Compute durations for one 311 chunk and update the matching sketches."""
+        created = parse_311_dates(chunk['Created Date'])
+        hours, is_open = resolution_hours(chunk['Created Date'], chunk['Closed Date'],
+                                          chunk['Status'], chunk['Resolution Action Updated Date'])
+        uhf = assign_uhf(chunk['Latitude'], chunk['Longitude'])
+        year = created.dt.year.to_numpy()
+
+        ok = (uhf >= 0) & ~np.isnan(year)
+        cells = pd.DataFrame({'uhf_code': uhf[ok], 'year': year[ok].astype(int), 'hours': hours[ok],
+                              'open': is_open[ok]})
+
+        for (code, yr), group in cells.groupby(['uhf_code', 'year'], sort=False):
+            values = group['hours'].to_numpy()
+            still_open = group['open'].to_numpy()
+            invalid = ~still_open & np.isnan(values)
+            self._sketch((code, yr)).update(values[~still_open])
+            self.open_counts[(code, yr)] = self.open_counts.get((code, yr), 0) + int(still_open.sum())
+            self.invalid_counts[(code, yr)] = self.invalid_counts.get((code, yr), 0) + int(invalid.sum())
+        return self
+
+    def merge(self, other):
+        """Fold another set of sketches (e.g. from a parallel worker) into this one."""
+        for key, sketch in other.sketches.items():
+            self._sketch(key).merge(sketch)
+        for counts, other_counts in ((self.open_counts, other.open_counts),
+                                     (self.invalid_counts, other.invalid_counts)):
+            for key, count in other_counts.items():
+                counts[key] = counts.get(key, 0) + count
+        return self
+
+    def to_level(self, membership):
+        """
+        Sketches and counts merged into parent cells, e.g. UHF42 -> UHF34.
+
+        Args:
+            membership (dict): Child code -> parent code
+                (harmonize.uhf34_membership()); unlisted codes are dropped.
+        """
+        out = ResolutionSketches(self.k)
+        for (code, yr), sketch in self.sketches.items():
+            if code in membership:
+                out._sketch((membership[code], yr)).merge(sketch)
+        for counts, out_counts in ((self.open_counts, out.open_counts),
+                                   (self.invalid_counts, out.invalid_counts)):
+            for (code, yr), count in counts.items():
+                if code in membership:
+                    key = (membership[code], yr)
+                    out_counts[key] = out_counts.get(key, 0) + count
+        return out
+
+    def rollup(self, by='year'):
+        """Merge cell sketches along one axis ('year' or 'uhf_code')."""
+        position = 1 if by == 'year' else 0
+        merged = {}
+        for key, sketch in self.sketches.items():
+            merged.setdefault(key[position], KLLSketch(self.k)).merge(sketch)
+        return merged
+
+    def summary(self, quantiles=(0.5, 0.9)):
+        """
+        Quantiles of resolution time per UHF-year.
+
+        Returns:
+            pd.DataFrame: year, uhf_code, closed_complaints (with a valid
+                duration), open_complaints, invalid_complaints (closed without
+                one) and one 'p<q>_resolution_hours' column per quantile.
+        """
+        rows = []
+        for (code, yr), sketch in sorted(self.sketches.items(), key=lambda item: (item[0][1], item[0][0])):
+            row = {
+                'year': yr,
+                'uhf_code': code,
+                'closed_complaints': sketch.n,
+                'open_complaints': self.open_counts.get((code, yr), 0),
+                'invalid_complaints': self.invalid_counts.get((code, yr), 0),
+            }
+            for q, value in zip(quantiles, np.atleast_1d(sketch.quantile(quantiles))):
+                row[f'p{int(round(q * 100))}_resolution_hours'] = value
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def build_resolution_sketches(path=MOLD_311_FILE, chunksize=500_000, k=DEFAULT_SKETCH_K):
+    """Stream the 311 file once and return the per-UHF-year sketches."""
+    sketches = ResolutionSketches(k)
+    for chunk in iter_311_chunks(path, RESOLUTION_COLUMNS, chunksize):
+        sketches.update(chunk)
+    return sketches
+
+
+def correlate_with_asthma(summary, panel, outcomes, metric='p50_resolution_hours'):
+    """
+    Spearman correlation between a resolution-time metric and asthma outcomes.
+
+    Args:
+        summary (pd.DataFrame): Output of ResolutionSketches.summary(), at the
+            panel's level (see ResolutionSketches.to_level()).
+        panel (pd.DataFrame): Merged panel with year, uhf_code and outcome columns.
+        outcomes (list): Outcome columns in the panel.
+        metric (str): Resolution column to correlate.
+
+    Returns:
+        pd.DataFrame: Outcome, correlation and N per outcome.
+
+    Raises:
+        ValueError: When no uhf_code of the summary is in the panel.
+    """
+    if not summary['uhf_code'].isin(panel['uhf_code']).any():
+        raise ValueError("No resolution-time uhf_code is in the panel; aggregate the sketches to the "
+                         "panel's level first (ResolutionSketches.to_level)")
+    joined = panel.merge(summary[['year', 'uhf_code', metric]], on=['year', 'uhf_code'], how='inner')
+    rows = []
+    for outcome in outcomes:
+        valid = joined[[outcome, metric]].dropna()
+        rho = valid[outcome].corr(valid[metric], method='spearman') if len(valid) > 2 else np.nan
+        rows.append({'Asthma Outcome': outcome, 'Variable': metric, 'Correlation (rho)': rho, 'N': len(valid)})
+    return pd.DataFrame(rows)
@@ -0,0 +1,318 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from nyc_asthma.geography import NTA_TO_UHF, UHF42_TO_UHF34, UHF_BOROUGHS, uhf_borough
+from nyc_asthma.paths import CACHE_DIR
+
+# ============================================================================
+# Multi-resolution rollup: NTA -> UHF42 -> UHF34 -> borough -> citywide
+# ============================================================================
+#
+# The geography tree is held as one label array and one integer parent array
+# per level (GeoHierarchy). A rollup turns every requested statistic into
+# additive accumulators,
+#
+#   sums          x, present(x)
+#   weighted mean w * x, w            (only where x is present)
+#   rate          numerator, denominator
+#
+# reduces them into (period, unit) cells with one bincount per column, then
+# pushes the reduced cells through the parent array to the next level and
+# reduces again. Every level above the source comes out of the level below
+# it, so the whole tree costs one pass over the input rows plus a few hundred
+# cells per level. Results are cached per level under DATA/CACHE/rollup.
+
+LEVEL_ORDER = ('NTA', 'UHF42', 'UHF34', 'borough', 'citywide')
+CITYWIDE = 'New York City'
+ROLLUP_CACHE_DIR = os.path.join(CACHE_DIR, 'rollup')
+ROLLUP_VERSION = 1
+
+
+class GeoHierarchy:
+    """
+    Geography tree as label and integer parent arrays.
+
+    parents[level][i] is the position, in the next level's labels, of the
+    unit labels[level][i] belongs to (-1 if it belongs nowhere).
+    """
+
+    def __init__(self, labels, parents):
+        self.labels = {level: np.asarray(labels[level], dtype=object) for level in LEVEL_ORDER}
+        self.parents = {level: np.asarray(parents[level], dtype=np.int64) for level in LEVEL_ORDER[:-1]}
+        self._index = {level: pd.Index(self.labels[level]) for level in LEVEL_ORDER}
+
+    @classmethod
+    def from_mappings(cls, nta_to_uhf=NTA_TO_UHF, membership=None):
+        """
+        Build the tree from the NTA -> UHF42 crosswalk and UHF42 -> UHF34 membership.
+
+        Args:
+            nta_to_uhf (dict): NTA code -> UHF42 code.
+            membership (dict, optional): UHF42 -> UHF34 (default: geography.UHF42_TO_UHF34).
+        """
+        membership = UHF42_TO_UHF34 if membership is None else membership
+        labels = {
+            'NTA': sorted(nta_to_uhf),
+            'UHF42': sorted(set(membership) | set(nta_to_uhf.values())),
+            'UHF34': sorted(set(membership.values())),
+            'borough': list(UHF_BOROUGHS.values()),
+            'citywide': [CITYWIDE],
+        }
+        position = {level: {label: i for i, label in enumerate(values)} for level, values in labels.items()}
+        parents = {
+            'NTA': [position['UHF42'].get(nta_to_uhf[nta], -1) for nta in labels['NTA']],
+            'UHF42': [position['UHF34'].get(membership.get(code), -1) for code in labels['UHF42']],
+            'UHF34': [position['borough'].get(uhf_borough(code), -1) for code in labels['UHF34']],
+            'borough': [0] * len(labels['borough']),
+        }
+        return cls(labels, parents)
+
+    def encode(self, level, codes):
+        """Positions of `codes` in the level's labels (-1 for unknown codes)."""
+        return self._index[level].get_indexer(pd.Index(codes, dtype=object))
+
+    def signature(self):
+        """Short hash of the labels and parent arrays, for cache keys."""
+        payload = json.dumps([[str(v) for v in self.labels[level]] for level in LEVEL_ORDER]
+                             + [self.parents[level].tolist() for level in LEVEL_ORDER[:-1]])
+        return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+class MultiLevelRollup:
+    """
+    One indicator frame per level, from the source level up to citywide.
+
+    Every frame has the period column (when there is one), geo_code and the
+    indicator columns, so switching views is a dictionary lookup.
+    """
+
+    def __init__(self, levels):
+        self.levels = dict(levels)
+
+    def level(self, name):
+        if name not in self.levels:
+            raise ValueError(f"Level {name!r} not available (have: {', '.join(self.levels)})")
+        return self.levels[name]
+
+    def to_long(self):
+        """All levels stacked, with a geo_level column first."""
+        frames = [frame.assign(geo_level=level) for level, frame in self.levels.items()]
+        out = pd.concat(frames, ignore_index=True)
+        return out[['geo_level'] + [c for c in out.columns if c != 'geo_level']]
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for level, frame in self.levels.items():
+            frame.to_csv(os.path.join(directory, f'{level}.csv'), index=False)
+
+    @classmethod
+    def load(cls, directory):
+        return cls({level: pd.read_csv(os.path.join(directory, f'{level}.csv'))
+                    for level in LEVEL_ORDER if os.path.exists(os.path.join(directory, f'{level}.csv'))})
+
+
+def _accumulators(df, sums, means, rates):
+    """Additive columns for every statistic, NaNs contributing nothing."""
+    columns = []
+    for col in sums:
+        x = df[col].to_numpy(dtype=float)
+        present = ~np.isnan(x)
+        columns += [np.where(present, x, 0.0), present.astype(float)]
+    for col, weight in means.items():
+        x = df[col].to_numpy(dtype=float)
+        w = np.ones(len(df)) if weight is None else df[weight].to_numpy(dtype=float)
+        present = ~np.isnan(x) & ~np.isnan(w)
+        columns += [np.where(present, w * x, 0.0), np.where(present, w, 0.0)]
+    for num, den, _ in rates.values():
+        n = df[num].to_numpy(dtype=float)
+        d = df[den].to_numpy(dtype=float)
+        present = ~np.isnan(n) & ~np.isnan(d)
+        columns += [np.where(present, n, 0.0), np.where(present, d, 0.0)]
+    columns.append(np.ones(len(df)))
+    return np.column_stack(columns)
+
+
+def _reduce(cells, values, size):
+    """Sum the rows of `values` falling in each cell, one bincount per column."""
+    return np.column_stack([np.bincount(cells, weights=values[:, j], minlength=size)
+                            for j in range(values.shape[1])])
+
+
+def _finish(acc, periods, t, labels, sums, means, rates, by, count_col):
+    """Turn reduced accumulators back into indicator columns."""
+    out = {}
+    if by is not None:
+        out[by] = periods[t]
+    out['geo_code'] = pd.Series(labels, dtype=object).infer_objects().to_numpy()
+    j = 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for col in sums:
+            out[col] = np.where(acc[:, j + 1] > 0, acc[:, j], np.nan)
+            j += 2
+        for col in means:
+            out[col] = np.where(acc[:, j + 1] > 0, acc[:, j] / acc[:, j + 1], np.nan)
+            j += 2
+        for name, (_, _, per) in rates.items():
+            out[name] = np.where(acc[:, j + 1] > 0, acc[:, j] / acc[:, j + 1] * per, np.nan)
+            j += 2
+    out[count_col] = acc[:, j].astype(int)
+    return pd.DataFrame(out)
+
+
+def rollup(df, level, sums=(), means=None, rates=None, by='year', code_col='uhf_code',
+           count_col='n_units', hierarchy=None):
+    """
+    Aggregate a table from its own level to every coarser level in one pass.
+
+    Args:
+        df (pd.DataFrame): One row per (period, unit) at `level`.
+        level (str): Level of df's codes, one of LEVEL_ORDER.
+        sums (list): Columns to add up (NaN where no unit has a value).
+        means (dict): column -> weight column (None for an unweighted mean).
+        rates (dict): output column -> (numerator, denominator, per), e.g.
+            {'poverty_rate': ('households_below_poverty', 'households', 100)}.
+        by (str, optional): Period column; None for a single-period table.
+        code_col (str): Column holding the unit codes.
+        count_col (str): Output column counting the source rows pooled.
+        hierarchy (GeoHierarchy, optional): Default GeoHierarchy.from_mappings().
+
+    Returns:
+        MultiLevelRollup: Frames for `level` and every level above it.
+    """
+    hierarchy = GeoHierarchy.from_mappings() if hierarchy is None else hierarchy
+    sums, means, rates = list(sums), dict(means or {}), dict(rates or {})
+
+    unit = hierarchy.encode(level, df[code_col])
+    if by is None:
+        t, periods = np.zeros(len(df), dtype=np.int64), np.array([None])
+    else:
+        t, periods = pd.factorize(df[by], sort=True)
+        periods = np.asarray(periods)
+    keep = (unit >= 0) & (t >= 0)
+    acc, unit, t = _accumulators(df[keep], sums, means, rates), unit[keep], t[keep]
+
+    levels = {}
+    for current in LEVEL_ORDER[LEVEL_ORDER.index(level):]:
+        n_units = len(hierarchy.labels[current])
+        acc = _reduce(t * n_units + unit, acc, len(periods) * n_units)
+        filled = np.flatnonzero(acc[:, -1] > 0)
+        acc, t, unit = acc[filled], filled // n_units, filled % n_units
+        levels[current] = _finish(acc, periods, t, hierarchy.labels[current][unit],
+                                  sums, means, rates, by, count_col)
+        if current != 'citywide':
+            parent = hierarchy.parents[current][unit]
+            mapped = parent >= 0
+            acc, t, unit = acc[mapped], t[mapped], parent[mapped]
+    return MultiLevelRollup(levels)
+
+
+def _cache_key(df, level, spec, hierarchy):
+    digest = hashlib.sha1()
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    digest.update(json.dumps([ROLLUP_VERSION, level, list(df.columns), spec, hierarchy.signature()],
+                             default=str).encode())
+    return digest.hexdigest()[:16]
+
+
+def cached_rollup(df, level, sums=(), means=None, rates=None, by='year', code_col='uhf_code',
+                  count_col='n_units', hierarchy=None, cache_dir=ROLLUP_CACHE_DIR):
+    """rollup(), cached per level under cache_dir until the input or the hierarchy change."""
+    hierarchy = GeoHierarchy.from_mappings() if hierarchy is None else hierarchy
+    spec = [list(sums), means or {}, rates or {}, by, code_col, count_col]
+    directory = os.path.join(cache_dir, _cache_key(df, level, spec, hierarchy))
+    if os.path.exists(os.path.join(directory, 'citywide.csv')):
+        return MultiLevelRollup.load(directory)
+    result = rollup(df, level, sums, means, rates, by, code_col, count_col, hierarchy)
+    result.save(directory)
+    return result
+
+
+# ----------------------------------------------------------------------------
+# Standard indicators at every level
+# ----------------------------------------------------------------------------
+
+def _source_rollups(asthma, poverty, crosswalk, aqe, hierarchy, cache_dir):
+    """(name, MultiLevelRollup) for every source table, each from its own level."""
+    from nyc_asthma.harmonize import population_from_rate
+    from nyc_asthma.merge import ED_POPULATION_COLUMNS, ed_population
+
+    out = []
+    for key, (count_col, rate_col) in ED_POPULATION_COLUMNS.items():
+        table = asthma[key]
+        pop_col = key.replace('ed_', 'population_')
+        df = table[['year', 'uhf_code', count_col]].assign(**{pop_col: ed_population(table, key)['population']})
+        means = {}
+        if key == 'ed_adults':
+            df['age_adjusted_ed_rate_per_10k'] = table['age_adjusted_ed_rate_per_10k']
+            means = {'age_adjusted_ed_rate_per_10k': pop_col}
+        out.append((key, cached_rollup(df, 'UHF42', sums=[count_col, pop_col], means=means,
+                                       rates={rate_col: (count_col, pop_col, 10_000)},
+                                       count_col=f'n_{key}', hierarchy=hierarchy, cache_dir=cache_dir)))
+
+    adults = asthma['adults_with_asthma']
+    df = adults[['year', 'uhf_code', 'estimated_adults_with_asthma', 'age_adjusted_asthma_percent']].assign(
+        adult_population=population_from_rate(adults['estimated_adults_with_asthma'],
+                                              adults['asthma_percent'], per=100))
+    out.append(('adults_with_asthma', cached_rollup(
+        df, 'UHF34', sums=['estimated_adults_with_asthma', 'adult_population'],
+        means={'age_adjusted_asthma_percent': 'adult_population'},
+        rates={'asthma_percent': ('estimated_adults_with_asthma', 'adult_population', 100)},
+        count_col='n_adults_with_asthma', hierarchy=hierarchy, cache_dir=cache_dir)))
+
+    from nyc_asthma.poverty import NTA_GEO_TYPES
+
+    ntas = poverty[poverty['GeoType'].isin(NTA_GEO_TYPES)].merge(
+        crosswalk[['GeoType', 'GeoID', 'nta2020']], on=['GeoType', 'GeoID'], how='inner')
+    df = ntas[['year', 'nta2020', 'households_below_poverty', 'households']]
+    out.append(('poverty', cached_rollup(
+        df, 'NTA', sums=['households_below_poverty', 'households'],
+        rates={'poverty_rate': ('households_below_poverty', 'households', 100)},
+        code_col='nta2020', count_col='n_poverty_ntas', hierarchy=hierarchy, cache_dir=cache_dir)))
+
+    out.append(('aqe', cached_rollup(
+        aqe[['NTACODE', 'PM_Avg', 'NO2_Avg']], 'NTA', means={'PM_Avg': None, 'NO2_Avg': None},
+        by=None, code_col='NTACODE', count_col='n_aqe_ntas', hierarchy=hierarchy, cache_dir=cache_dir)))
+    return out
+
+
+def indicator_rollup(asthma, poverty, crosswalk, aqe, membership=None, cache_dir=ROLLUP_CACHE_DIR):
+    """
+    ED, prevalence, poverty and air quality indicators at every level.
+
+    ED and prevalence rates are recomputed from summed counts and
+    denominators at each level (age-adjusted rates are population-weighted
+    means), poverty from summed NTA households, and air quality is the plain
+    mean over NTAs, as in merge.aggregate_air_quality().
+
+    Args:
+        asthma (dict): merge.load_cleaned_asthma().
+        poverty (pd.DataFrame): poverty.load_poverty_table().
+        crosswalk (pd.DataFrame): poverty.nta_crosswalk() for that table.
+        aqe (pd.DataFrame): Cleaned AQE table.
+        membership (dict, optional): UHF42 -> UHF34 mapping.
+
+    Returns:
+        MultiLevelRollup: One frame per level with year, geo_code and all indicators.
+    """
+    # NTAs the crosswalk placed by centroid join the tree next to NTA_TO_UHF
+    matched = crosswalk[crosswalk['uhf42'] > 0].dropna(subset=['nta2020'])
+    nta_to_uhf = {**dict(zip(matched['nta2020'], matched['uhf42'].astype(int))), **NTA_TO_UHF}
+    hierarchy = GeoHierarchy.from_mappings(nta_to_uhf, membership)
+
+    sources = _source_rollups(asthma, poverty, crosswalk, aqe, hierarchy, cache_dir)
+    levels = {}
+    for level in LEVEL_ORDER:
+        frames = [r.levels[level] for _, r in sources if level in r.levels]
+        yearly = [f for f in frames if 'year' in f.columns]
+        static = [f for f in frames if 'year' not in f.columns]
+        combined = yearly[0]
+        for frame in yearly[1:]:
+            combined = combined.merge(frame, on=['year', 'geo_code'], how='outer')
+        for frame in static:
+            combined = combined.merge(frame, on='geo_code', how='left')
+        levels[level] = combined.sort_values(['year', 'geo_code']).reset_index(drop=True)
+    return MultiLevelRollup(levels)
@@ -0,0 +1,258 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from nyc_asthma import correlation
+from nyc_asthma.geography import NTA_DUPLICATE_RULES
+
+# ============================================================================
+# Sensitivity of the correlations to pipeline choices
+# ============================================================================
+#
+# Several steps of `geocode` make a choice another analyst could have made
+# differently. Each is an option here, with the pipeline's own choice first:
+#
+#   smoothing      ED rates correlated as empirical-Bayes smoothed (borough
+#                  or neighbors prior) or raw ('none')
+#   duplicates     which UHF an NTA listed twice in NTA_TO_UHF goes to when
+#                  air quality is aggregated ('last' as the dict literal does,
+#                  or 'first')
+#   geocoding      complaints to the nearest UHF42 centroid ('centroid') or
+#                  to the UHF34 polygon containing them ('polygon')
+#   mold_measure   complaint counts or complaints per 10k residents ('rate')
+#   years          every panel year or 2020 alone, the year of the heatmap
+#
+# A scenario is one value per option, and run_scenarios() takes the product
+# of the values asked for. Each pipeline stage depends on a few options
+# only (STAGES), so it runs once per distinct combination of those and its
+# output is shared by every scenario with that combination - 48 scenarios
+# need 3 asthma panels, 2 air quality tables and 2 mold aggregates. The
+# inputs every branch reads are loaded once and sent to each worker process
+# at startup; the distinct stages run in parallel, then every scenario
+# assembles its panel from them and computes its correlations.
+#
+# The result puts each correlation's r under every scenario side by side,
+# with its change from the baseline (every option at its first value).
+
+OPTIONS = {
+    'smoothing': ('borough', 'neighbors', 'none'),
+    'duplicates': NTA_DUPLICATE_RULES,
+    'geocoding': ('centroid', 'polygon'),
+    'mold_measure': ('count', 'rate'),
+    'years': ('all', '2020'),
+}
+BASELINE = {option: values[0] for option, values in OPTIONS.items()}
+
+# Stage -> options its output depends on
+STAGES = {
+    'asthma_panel': ('smoothing',),
+    'air_quality': ('duplicates',),
+    'mold': ('geocoding',),
+}
+
+RESULT_KEYS = ['Asthma Outcome', 'Variable', 'Type']
+
+# Shared inputs, in this process or a worker
+_inputs = {}
+
+
+def parse_grid(specs):
+    """
+    Option values to vary from 'option=value,value' strings.
+
+    Options not given keep their baseline value; no specs varies every option.
+
+    Returns:
+        dict: option -> tuple of values.
+    """
+    if not specs:
+        return dict(OPTIONS)
+    grid = {option: (value,) for option, value in BASELINE.items()}
+    for spec in specs:
+        option, _, values = spec.partition('=')
+        values = tuple(v for v in values.split(',') if v)
+        if option not in OPTIONS or not values or any(v not in OPTIONS[option] for v in values):
+            raise ValueError(f"Bad grid {spec!r}: use option=value[,value] with "
+                             + '; '.join(f"{o}: {'|'.join(v)}" for o, v in OPTIONS.items()))
+        grid[option] = values
+    return grid
+
+
+def scenario_grid(grid):
+    """Every combination of the grid's values, as option -> value dicts."""
+    options = list(OPTIONS)
+    return [dict(zip(options, values)) for values in itertools.product(*(grid[o] for o in options))]
+
+
+def scenario_label(scenario):
+    """'baseline', or the options that differ from it, e.g. 'geocoding=polygon,years=2020'."""
+    changed = [f'{o}={v}' for o, v in scenario.items() if v != BASELINE[o]]
+    return ','.join(changed) or 'baseline'
+
+
+def load_inputs(alignment=None):
+    """
+    Every input the scenarios read, loaded once.
+
+    Args:
+        alignment (dict, optional): temporal.parse_alignment() output.
+
+    Returns:
+        dict: asthma tables, membership, alignment, poverty, aqe, dated mold
+        locations and residents per UHF34-year.
+    """
+    from nyc_asthma import geocode, merge
+    from nyc_asthma.harmonize import uhf34_membership
+    from nyc_asthma.paths import CLEANED_FILES
+    from nyc_asthma.poverty import poverty_by_uhf_year
+    from nyc_asthma.temporal import PANEL_ALIGNMENT
+
+    asthma = merge.load_cleaned_asthma()
+    membership = uhf34_membership()
+    return {
+        'asthma': asthma,
+        'membership': membership,
+        'alignment': alignment or PANEL_ALIGNMENT,
+        'poverty': poverty_by_uhf_year(),
+        'aqe': pd.read_csv(CLEANED_FILES['aqe']),
+        # Years come from row order, so they are the same whichever way rows are geocoded
+        'mold': geocode.estimate_years(geocode.load_mold_locations()),
+        'population': merge.residents(asthma, 'UHF34', membership),
+    }
+
+
+def _set_inputs(inputs):
+    """Worker initializer."""
+    _inputs.update(inputs)
+
+
+def _stage_key(stage, scenario):
+    return (stage,) + tuple(scenario[o] for o in STAGES[stage])
+
+
+def _run_stage(key):
+    """Output of one pipeline stage for one combination of its options."""
+    from nyc_asthma import geocode, merge
+    from nyc_asthma.temporal import fill_panel
+
+    stage, *values = key
+    membership = _inputs['membership']
+    if stage == 'asthma_panel':
+        (smoothing,) = values
+        asthma = _inputs['asthma']
+        if smoothing != 'none':
+            from nyc_asthma.smoothing import smooth_ed_tables
+
+            asthma, _ = smooth_ed_tables(asthma, smoothing)
+        panel = merge.merge_asthma(asthma, 'UHF34', membership)
+        rule = _inputs['alignment']['adults_with_asthma']
+        panel = fill_panel(panel, merge.ADULTS_RATE_COLUMNS + merge.ADULTS_COUNT_COLUMNS, rule['method'],
+                           rule['max_gap'], mask_col='adult_asthma_imputed')
+        rule = _inputs['alignment']['poverty']
+        return merge.add_poverty(panel, _inputs['poverty'], 'UHF34', rule['method'], rule['max_gap'])
+    if stage == 'air_quality':
+        (duplicates,) = values
+        return merge.aggregate_air_quality(_inputs['aqe'], merge.nta_to_level('UHF34', membership, duplicates))
+    if stage == 'mold':
+        (geocoding,) = values
+        if geocoding == 'polygon':
+            return geocode.aggregate_mold(geocode.geocode_mold_polygons(_inputs['mold']))
+        return geocode.aggregate_mold(geocode.geocode_mold(_inputs['mold']), membership)
+    raise ValueError(f"Unknown stage {stage!r}")
+
+
+def assemble_panel(scenario, stages):
+    """
+    The final panel of one scenario from its stage outputs.
+
+    Args:
+        scenario (dict): option -> value.
+        stages (dict): Stage key -> output, covering the scenario's keys.
+    """
+    from nyc_asthma import geocode, merge
+
+    panel = stages[_stage_key('asthma_panel', scenario)]
+    panel = merge.add_air_quality(panel, stages[_stage_key('air_quality', scenario)], merge.AQE_REFERENCE_YEAR)
+    panel = geocode.add_mold(panel, stages[_stage_key('mold', scenario)])
+    if scenario['mold_measure'] == 'rate':
+        population = panel[['year', 'uhf_code']].merge(_inputs['population'], how='left')['population']
+        panel['mold_complaints'] = panel['mold_complaints'] / population.to_numpy() * 10_000
+    if scenario['years'] != 'all':
+        panel = panel[panel['year'] == int(scenario['years'])]
+    return geocode.organize_final(panel)
+
+
+def _run_scenario(task):
+    """Correlations of one scenario's panel."""
+    scenario, stages = task
+    df = correlation.add_borough(assemble_panel(scenario, stages))
+    df, _ = correlation.use_smoothed_rates(df)
+    results = (correlation.continuous_correlations(df, verbose=False)
+               + correlation.categorical_correlations(df, verbose=False)
+               + correlation.borough_mold_correlations(df, verbose=False))
+    return pd.DataFrame(results).assign(scenario=scenario_label(scenario), **scenario)
+
+
+def run_scenarios(grid=None, alignment=None, workers=None, inputs=None, verbose=True):
+    """
+    Correlations under every scenario of a grid.
+
+    Args:
+        grid (dict, optional): option -> values (default: every value of
+            every option); see parse_grid().
+        alignment (dict, optional): Temporal alignment, as for `geocode --align`.
+        workers (int, optional): Processes (default: CPU count; 1 runs in
+            this process).
+        inputs (dict, optional): load_inputs() output, to reuse.
+
+    Returns:
+        pd.DataFrame: One row per scenario and correlation, with the
+        scenario's label and options next to correlation._result() columns.
+    """
+    scenarios = scenario_grid(grid or OPTIONS)
+    keys = sorted({_stage_key(stage, s) for s in scenarios for stage in STAGES})
+    inputs = inputs or load_inputs(alignment)
+    if verbose:
+        print(f"  ✓ {len(scenarios)} scenarios share {len(keys)} pipeline stages")
+
+    workers = min(workers or os.cpu_count() or 1, len(scenarios))
+    if workers <= 1:
+        _set_inputs(inputs)
+        try:
+            stages = dict(zip(keys, map(_run_stage, keys)))
+            frames = [_run_scenario((s, stages)) for s in scenarios]
+        finally:
+            _inputs.clear()
+    else:
+        with ProcessPoolExecutor(workers, initializer=_set_inputs, initargs=(inputs,)) as pool:
+            stages = dict(zip(keys, pool.map(_run_stage, keys)))
+            tasks = [(s, {key: stages[key] for key in (_stage_key(stage, s) for stage in STAGES)})
+                     for s in scenarios]
+            frames = list(pool.map(_run_scenario, tasks))
+    return pd.concat(frames, ignore_index=True)
+
+
+def compare(results):
+    """
+    Side-by-side table: r per scenario, and its change from the baseline.
+
+    Returns:
+        pd.DataFrame: One row per (outcome, variable, type), a column per
+        scenario label and a 'Δ <label>' column per non-baseline scenario,
+        sorted by the largest absolute change.
+    """
+    labels = list(dict.fromkeys(results['scenario']))
+    table = results.pivot_table(index=RESULT_KEYS, columns='scenario', values='Correlation (r)', sort=False)
+    table = table.reindex(columns=labels)
+    if 'baseline' in table.columns:
+        for label in labels:
+            if label != 'baseline':
+                table[f'Δ {label}'] = table[label] - table['baseline']
+        deltas = table.filter(like='Δ ')
+        if deltas.shape[1]:
+            table['max |Δ|'] = deltas.abs().max(axis=1)
+            table = table.sort_values('max |Δ|', ascending=False)
+    table.columns.name = None
+    return table.reset_index()
@@ -0,0 +1,420 @@
+import asyncio
+import collections
+import hashlib
+import json
+import math
+import os
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from nyc_asthma.paths import CORRELATION_RESULTS, FINAL_STORE
+
+# ============================================================================
+# Local indicator service (asyncio HTTP + ASGI) over the precomputed panel
+# ============================================================================
+#
+# Routes (GET only, JSON responses):
+#
+#   /health                        status + dataset version + cache stats
+#   /indicators                    variables, years and uhf codes available
+#   /indicators/<variable>?year=Y  one value per uhf_code (default: latest year)
+#   /uhf                           uhf codes with neighborhood names
+#   /uhf/<code>?variables=a,b      time series for one neighborhood
+#   /correlations?outcome=..&variable=..&significant=1&limit=N
+#
+# Data comes from the memory-mapped panel store (FINAL_MERGED_DATASET.store)
+# and correlation_results.csv. The dataset version is a hash of those files'
+# size/mtime; when it changes, the data is reloaded and the response cache is
+# dropped. Responses are cached as ready-to-send JSON bytes, and the hottest
+# ones (/indicators, /uhf, /uhf/<code>, /correlations) are serialized up front
+# on every (re)load.
+#
+# `IndicatorService` is an ASGI app, so any ASGI server can host it; serve()
+# runs it on a small built-in asyncio HTTP/1.1 server with keep-alive.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 4096
+VERSION_CHECK_SECONDS = 1.0
+
+_STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _file_signature(path):
+    """(size, mtime_ns) of a file, or of every file in a store directory."""
+    if not os.path.exists(path):
+        return None
+    if os.path.isdir(path):
+        return sorted((name, _file_signature(os.path.join(path, name))) for name in os.listdir(path))
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def dataset_version(store_path=FINAL_STORE, correlations_path=CORRELATION_RESULTS):
+    """Short hash that changes whenever the store or correlation results change."""
+    signature = json.dumps([_file_signature(store_path), _file_signature(correlations_path)])
+    return hashlib.sha1(signature.encode()).hexdigest()[:12]
+
+
+def _plain(value):
+    """numpy scalars -> python values, NaN/NA -> None (valid JSON)."""
+    if value is None:
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    try:
+        if value != value:  # pd.NA and friends
+            return None
+    except TypeError:
+        return None
+    return value
+
+
+def _dumps(payload):
+    return json.dumps(payload, separators=(',', ':'), allow_nan=False).encode()
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        return {'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+class IndicatorData:
+    """
+    In-memory snapshot of the panel store and correlation results.
+
+    Values are kept as plain python lists (one per variable, indexed by year
+    position) so request handling never touches pandas.
+    """
+
+    def __init__(self, store_path=FINAL_STORE, correlations_path=CORRELATION_RESULTS):
+        import pandas as pd
+
+        from nyc_asthma.panel_store import open_panel_store
+
+        self.version = dataset_version(store_path, correlations_path)
+        store = open_panel_store(store_path)
+        panel = store.load()
+
+        self.years = [_plain(y) for y in store.time_labels]
+        self.uhf_codes = [_plain(g) for g in store.geo_labels]
+        self.variables = [v for v in store.variables if v != 'neighborhood']
+
+        year_pos = {y: i for i, y in enumerate(self.years)}
+        self.neighborhoods = {}
+        self.series = {code: {v: [None] * len(self.years) for v in self.variables} for code in self.uhf_codes}
+        columns = {v: [_plain(x) for x in panel[v]] for v in self.variables}
+        for row, (yr, code) in enumerate(zip(panel[store.time_name], panel[store.geo_name])):
+            yr, code = _plain(yr), _plain(code)
+            if 'neighborhood' in panel.columns:
+                self.neighborhoods[code] = panel['neighborhood'].iloc[row]
+            for v in self.variables:
+                self.series[code][v][year_pos[yr]] = columns[v][row]
+
+        self.correlations = []
+        if os.path.exists(correlations_path):
+            corr = pd.read_csv(correlations_path)
+            self.correlations = [{k: _plain(v) for k, v in rec.items()} for rec in corr.to_dict('records')]
+
+
+class IndicatorService:
+    """
+    ASGI application serving indicator lookups from an IndicatorData snapshot.
+
+    Args:
+        store_path (str): Panel store directory (or its .csv name).
+        correlations_path (str): correlation_results.csv.
+        cache_size (int): Maximum number of cached responses.
+        version_check_seconds (float): How often to re-check the dataset version.
+    """
+
+    def __init__(self, store_path=FINAL_STORE, correlations_path=CORRELATION_RESULTS,
+                 cache_size=DEFAULT_CACHE_SIZE, version_check_seconds=VERSION_CHECK_SECONDS):
+        if store_path.endswith('.csv'):
+            store_path = store_path[:-len('.csv')] + '.store'
+        self.store_path = store_path
+        self.correlations_path = correlations_path
+        self.cache = LRUCache(cache_size)
+        self.version_check_seconds = version_check_seconds
+        self.data = None
+        self._hot = {}
+        self._checked_at = 0.0
+        self.reload()
+
+    # -- data / cache lifecycle ---------------------------------------------
+
+    def reload(self):
+        """Load a fresh snapshot, drop cached responses and pre-serialize hot ones."""
+        self.data = IndicatorData(self.store_path, self.correlations_path)
+        self.cache.clear()
+        self._hot = {
+            '/indicators': self._indicators(),
+            '/uhf': self._uhf_list(),
+            '/correlations': self._correlations({}),
+        }
+        for code in self.data.uhf_codes:
+            self._hot[f'/uhf/{code}'] = self._uhf_series(code, {})
+        self._hot = {path: _dumps(payload) for path, payload in self._hot.items()}
+        self._checked_at = time.monotonic()
+
+    def _ensure_current(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.version_check_seconds:
+            return
+        self._checked_at = now
+        if dataset_version(self.store_path, self.correlations_path) != self.data.version:
+            self.reload()
+
+    # -- route handlers (return JSON-serializable payloads) -----------------
+
+    def _indicators(self):
+        return {'version': self.data.version, 'variables': self.data.variables,
+                'years': self.data.years, 'uhf_codes': self.data.uhf_codes}
+
+    def _uhf_list(self):
+        return {'version': self.data.version,
+                'uhf': [{'uhf_code': code, 'neighborhood': self.data.neighborhoods.get(code)}
+                        for code in self.data.uhf_codes]}
+
+    def _indicator(self, variable, params):
+        if variable not in self.data.variables:
+            raise ServiceError(404, f"Unknown variable: {variable}")
+        year = params.get('year', [self.data.years[-1]])[0]
+        try:
+            pos = self.data.years.index(int(year))
+        except ValueError:
+            raise ServiceError(404, f"Year not in dataset: {year}")
+        values = {str(code): self.data.series[code][variable][pos] for code in self.data.uhf_codes}
+        return {'version': self.data.version, 'variable': variable, 'year': self.data.years[pos],
+                'values': values}
+
+    def _uhf_series(self, code, params):
+        try:
+            code = int(code)
+        except ValueError:
+            raise ServiceError(400, f"uhf_code must be an integer: {code}")
+        if code not in self.data.series:
+            raise ServiceError(404, f"Unknown uhf_code: {code}")
+        variables = self.data.variables
+        if 'variables' in params:
+            variables = [v for part in params['variables'] for v in part.split(',') if v]
+            unknown = [v for v in variables if v not in self.data.variables]
+            if unknown:
+                raise ServiceError(404, f"Unknown variable(s): {', '.join(unknown)}")
+        return {'version': self.data.version, 'uhf_code': code,
+                'neighborhood': self.data.neighborhoods.get(code), 'years': self.data.years,
+                'series': {v: self.data.series[code][v] for v in variables}}
+
+    def _correlations(self, params):
+        rows = self.data.correlations
+        if 'outcome' in params:
+            rows = [r for r in rows if r['Asthma Outcome'] == params['outcome'][0]]
+        if 'variable' in params:
+            rows = [r for r in rows if r['Variable'] == params['variable'][0]]
+        if params.get('significant', ['0'])[0] in ('1', 'true', 'yes'):
+            rows = [r for r in rows if r['Significance'] == 'Yes']
+        if 'limit' in params:
+            try:
+                rows = rows[:int(params['limit'][0])]
+            except ValueError:
+                raise ServiceError(400, f"limit must be an integer: {params['limit'][0]}")
+        return {'version': self.data.version, 'results': rows}
+
+    def _route(self, path, params):
+        parts = [p for p in path.split('/') if p]
+        if parts == ['health']:
+            return {'status': 'ok', 'version': self.data.version, 'cache': self.cache.stats()}
+        if parts == ['indicators']:
+            return self._indicators()
+        if len(parts) == 2 and parts[0] == 'indicators':
+            return self._indicator(parts[1], params)
+        if parts == ['uhf']:
+            return self._uhf_list()
+        if len(parts) == 2 and parts[0] == 'uhf':
+            return self._uhf_series(parts[1], params)
+        if parts == ['correlations']:
+            return self._correlations(params)
+        raise ServiceError(404, f"No route for {path}")
+
+    def respond(self, method, target):
+        """
+        Resolve one request to (status, JSON bytes).
+
+        Args:
+            method (str): HTTP method.
+            target (str): Request path including the query string.
+        """
+        if method not in ('GET', 'HEAD'):
+            return 405, _dumps({'error': f"Method {method} not allowed"})
+        try:
+            self._ensure_current()
+        except Exception as e:  # keep serving the previous snapshot
+            return 503, _dumps({'error': f"Dataset reload failed: {e}"})
+
+        try:
+            url = urlsplit(target)
+        except ValueError as e:
+            return 400, _dumps({'error': f"Malformed request target: {e}"})
+        path = unquote(url.path).rstrip('/') or '/'
+        if not url.query and path in self._hot:
+            return 200, self._hot[path]
+
+        key = (path, url.query)
+        body = self.cache.get(key)
+        if body is not None:
+            return 200, body
+        try:
+            body = _dumps(self._route(path, {} if path == '/health' else parse_qs(url.query)))
+        except ServiceError as e:
+            return e.status, _dumps({'error': str(e)})
+        except Exception as e:  # a bug in one route must not take the connection down
+            return 500, _dumps({'error': f"Internal error: {type(e).__name__}: {e}"})
+        if path != '/health':
+            self.cache.put(key, body)
+        return 200, body
+
+    # -- ASGI entry point ---------------------------------------------------
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        target = scope['path']
+        if scope.get('query_string'):
+            target += '?' + scope['query_string'].decode('latin-1')
+        status, body = self.respond(scope['method'], target)
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json'),
+                                (b'content-length', str(len(body)).encode())]})
+        await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+
+
+# ----------------------------------------------------------------------------
+# built-in HTTP/1.1 server
+# ----------------------------------------------------------------------------
+
+async def _write_response(writer, status, body, keep_alive=True, head_only=False):
+    head = (f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode('latin-1')
+    writer.write(head if head_only else head + body)
+    await writer.drain()
+
+
+async def _handle_connection(service, reader, writer):
+    """
+    Serve requests on one connection until it closes.
+
+    A malformed request line or header gets a 400 and the connection is
+    closed, since the rest of the stream can no longer be framed.
+    """
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode('latin-1').split()
+            except ValueError:
+                await _write_response(writer, 400, _dumps({'error': "Malformed request line"}), False)
+                break
+
+            keep_alive = version == 'HTTP/1.1'
+            content_length = 0
+            error = None
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                name, value = name.strip().lower(), value.strip().lower()
+                if name == 'connection':
+                    keep_alive = value == 'keep-alive' if version != 'HTTP/1.1' else value != 'close'
+                elif name == 'content-length':
+                    if not value.isdigit():
+                        error = f"Invalid Content-Length: {value!r}"
+                    else:
+                        content_length = int(value)
+            if error:
+                await _write_response(writer, 400, _dumps({'error': error}), False)
+                break
+            if content_length:
+                await reader.readexactly(content_length)
+
+            try:
+                status, body = service.respond(method, target)
+            except Exception as e:
+                status, body = 500, _dumps({'error': f"Internal error: {type(e).__name__}: {e}"})
+            await _write_response(writer, status, body, keep_alive, method == 'HEAD')
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Start the built-in server on the running loop; port=0 picks a free port."""
+    return await asyncio.start_server(lambda r, w: _handle_connection(service, r, w), host, port)
+
+
+def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Run the built-in server until interrupted."""
+    async def _main():
+        server = await start_server(service, host, port)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
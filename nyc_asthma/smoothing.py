@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from nyc_asthma.geography import uhf_borough
+
+# ============================================================================
+# Empirical-Bayes (Poisson-gamma) smoothing of small-area ED rates
+# ============================================================================
+#
+# Visits y_i in neighborhood i with population n_i are Poisson(n_i * theta_i)
+# and the true rates theta_i share a gamma prior per reference set (the
+# neighborhood's borough, or the neighborhood and the ones it touches).
+# Marshall's moment estimates give the prior in closed form,
+#
+#   m   = sum(y) / sum(n)                        prior mean
+#   s^2 = sum(n (r - m)^2) / sum(n)              = sum(y^2 / n) / sum(n) - m^2
+#   A   = max(s^2 - m / mean(n), 0)              prior variance
+#   w_i = A / (A + m / n_i)                      weight on the area's own rate
+#
+#   smoothed_i = m + w_i (r_i - m)               (the gamma posterior mean)
+#
+# Every sum over a reference set is one sparse product R @ X, with areas as
+# rows and every (age group, year) as a column, so all UHF-years and age
+# groups are smoothed in a single pass. Small populations get small w and
+# are pulled toward their reference mean; large ones barely move.
+
+SMOOTHED_SUFFIX = '_eb'
+PRIORS = ('borough', 'neighbors')
+
+# ED table -> (visits, crude rate per 10k, rate analyzed downstream)
+ED_SMOOTHING_COLUMNS = {
+    'ed_adults': ('estimated_annual_ed_visits', 'estimated_annual_ed_rate_per_10k', 'age_adjusted_ed_rate_per_10k'),
+    'ed_age_0_4': ('estimated_annual_ed_visits_age_0_4', 'ed_rate_per_10k_age_0_4', 'ed_rate_per_10k_age_0_4'),
+    'ed_age_5_17': ('estimated_annual_ed_visits_age_5_17', 'ed_rate_per_10k_age_5_17', 'ed_rate_per_10k_age_5_17'),
+}
+
+
+def reference_matrix(codes, prior='borough', **adjacency_kwargs):
+    """
+    0/1 sparse matrix whose row i marks the areas in area i's reference set.
+
+    Args:
+        codes (list): UHF codes (row / column order).
+        prior (str): 'borough' (same borough) or 'neighbors' (itself plus
+            touching neighborhoods, see adjacency.py).
+    """
+    if prior == 'borough':
+        groups, _ = pd.factorize(pd.Series([uhf_borough(c) for c in codes]))
+        member = sparse.csr_matrix((np.ones(len(codes)), (np.arange(len(codes)), groups)))
+        return (member @ member.T).tocsr()
+    if prior == 'neighbors':
+        from nyc_asthma.adjacency import adjacency_matrix
+
+        return adjacency_matrix(codes, include_self=True, **adjacency_kwargs)
+    raise ValueError(f"Unknown prior {prior!r} (choose from {', '.join(PRIORS)})")
+
+
+def eb_smooth(counts, population, reference, per=10_000):
+    """
+    Poisson-gamma smoothed rates for an [area, cell] grid.
+
+    Args:
+        counts, population (np.ndarray): [n_areas, n_cells], NaN where missing.
+        reference (sparse matrix): [n_areas, n_areas] from reference_matrix().
+        per (float): Rates are per `per` people.
+
+    Returns:
+        tuple: (smoothed rates, shrinkage weights w, prior means), each
+        [n_areas, n_cells] and NaN where the input is missing.
+    """
+    present = ~np.isnan(counts) & ~np.isnan(population) & (population > 0)
+    y = np.where(present, counts, 0.0)
+    n = np.where(present, population, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y2_over_n = np.where(present, y ** 2 / n, 0.0)
+        sum_y, sum_n = reference @ y, reference @ n
+        k, sum_y2n = reference @ present.astype(float), reference @ y2_over_n
+
+        m = sum_y / sum_n
+        prior_var = np.maximum(sum_y2n / sum_n - m ** 2 - m / (sum_n / k), 0.0)
+        noise = m / n
+        weight = np.where(prior_var + noise > 0, prior_var / (prior_var + noise), 1.0)
+        rate = y / n
+    smoothed = m + weight * (rate - m)
+    return (np.where(present, smoothed * per, np.nan), np.where(present, weight, np.nan),
+            np.where(present, m * per, np.nan))
+
+
+def shrink(values, weights, population, reference):
+    """
+    Pull another rate (e.g. age-adjusted) toward its population-weighted
+    reference mean with weights from eb_smooth().
+    """
+    present = ~np.isnan(values) & ~np.isnan(weights) & ~np.isnan(population)
+    n = np.where(present, population, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = (reference @ (n * np.where(present, values, 0.0))) / (reference @ n)
+    return np.where(present, mean + weights * (values - mean), np.nan)
+
+
+def _grid(table, column, codes, years):
+    """[code, year] array of a column (NaN for missing pairs)."""
+    return (table.pivot_table(index='uhf_code', columns='year', values=column, aggfunc='first', dropna=False)
+            .reindex(index=codes, columns=years).to_numpy(dtype=float))
+
+
+def smooth_ed_tables(asthma, prior='borough', **adjacency_kwargs):
+    """
+    Add '<rate>_eb' columns to the three ED tables, smoothed together.
+
+    Args:
+        asthma (dict): merge.load_cleaned_asthma().
+        prior (str): 'borough' or 'neighbors'.
+
+    Returns:
+        tuple: (asthma dict with the ED tables extended, long diagnostics
+        frame with one row per age group, year and UHF).
+    """
+    from nyc_asthma.harmonize import population_from_rate
+
+    keys = list(ED_SMOOTHING_COLUMNS)
+    codes = sorted(set().union(*(asthma[k]['uhf_code'] for k in keys)))
+    years = sorted(set().union(*(asthma[k]['year'] for k in keys)))
+    reference = reference_matrix(codes, prior, **adjacency_kwargs)
+
+    counts, population, analyzed = [], [], []
+    for key in keys:
+        table = asthma[key]
+        count_col, crude_col, rate_col = ED_SMOOTHING_COLUMNS[key]
+        table = table.assign(_population=population_from_rate(table[count_col], table[crude_col]))
+        counts.append(_grid(table, count_col, codes, years))
+        population.append(_grid(table, '_population', codes, years))
+        analyzed.append(_grid(table, rate_col, codes, years))
+
+    # One [code, (age group, year)] grid for everything
+    counts, population, analyzed = (np.hstack(a) for a in (counts, population, analyzed))
+    smoothed, weights, prior_mean = eb_smooth(counts, population, reference)
+    smoothed_analyzed = shrink(analyzed, weights, population, reference)
+
+    out, diagnostics = dict(asthma), []
+    n_years = len(years)
+    for g, key in enumerate(keys):
+        block = slice(g * n_years, (g + 1) * n_years)
+        _, crude_col, rate_col = ED_SMOOTHING_COLUMNS[key]
+        long = pd.DataFrame({
+            'age_group': key,
+            'year': np.tile(years, len(codes)),
+            'uhf_code': np.repeat(codes, n_years),
+            'visits': counts[:, block].ravel(),
+            'population': population[:, block].ravel(),
+            'rate': analyzed[:, block].ravel(),
+            'rate_eb': smoothed_analyzed[:, block].ravel(),
+            'crude_rate_eb': smoothed[:, block].ravel(),
+            'prior_mean': prior_mean[:, block].ravel(),
+            'weight': weights[:, block].ravel(),
+        }).dropna(subset=['rate'])
+        table = asthma[key]
+        if 'unstable_estimate' in table:
+            long = long.merge(table[['year', 'uhf_code', 'unstable_estimate']], on=['year', 'uhf_code'], how='left')
+        else:
+            long['unstable_estimate'] = False
+        diagnostics.append(long)
+
+        out[key] = table.merge(long[['year', 'uhf_code', 'rate_eb']].rename(
+            columns={'rate_eb': rate_col + SMOOTHED_SUFFIX}), on=['year', 'uhf_code'], how='left')
+    return out, pd.concat(diagnostics, ignore_index=True)
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import urllib.error
+import urllib.request
+
+from nyc_asthma.paths import CACHE_DIR, DATA_DIR, RAW_FILES
+
+# ============================================================================
+# Content-addressed local cache of the raw source files
+# ============================================================================
+#
+# Every raw dataset has a name (the keys of paths.RAW_FILES) and a path
+# relative to an origin: a local directory (default: DATA_DIR) or a base
+# URL, e.g. ORIGINS['github'], the raw.githubusercontent.com folder the
+# cleaning notebook reads from. ASTHMA_SOURCE_ORIGIN overrides the origin.
+#
+# source_path(name) returns a file under DATA/CACHE/sources/objects named by
+# the SHA-256 of its content. manifest.json maps each name to that hash,
+# its size, and the origin's validator (HTTP ETag / Last-Modified, or size
+# and mtime of a local file):
+#
+#   cached, refresh=False   the cached file, without contacting the origin
+#   cached, refresh=True    a conditional request; 304 / same validator
+#                           keeps the cached file, anything else is
+#                           downloaded, hashed while streaming and stored
+#   not cached              downloaded as above
+#   offline                 the cached file, or FileNotFoundError - the
+#                           origin is never contacted (ASTHMA_OFFLINE=1)
+#
+# Because object names are content hashes, anything parsed from an object
+# can be cached under its name: iter_311_chunks() keeps the parsed column
+# chunks of the 311 export, so an unchanged multi-GB file is neither
+# downloaded nor parsed again.
+
+SOURCE_CACHE_DIR = os.path.join(CACHE_DIR, 'sources')
+# Part of every parsed/ key; prune() drops parsed caches of other versions
+PARSED_VERSION = 2
+
+ORIGINS = {
+    'local': DATA_DIR,
+    'github': 'https://raw.githubusercontent.com/jung8027/DataSciProject/refs/heads/main/DATA',
+}
+DEFAULT_ORIGIN = os.environ.get('ASTHMA_SOURCE_ORIGIN', ORIGINS['local'])
+
+# Dataset name -> path relative to the origin
+SOURCES = {name: os.path.relpath(path, DATA_DIR).replace(os.sep, '/') for name, path in RAW_FILES.items()}
+
+BLOCK_SIZE = 1 << 20
+
+
+def offline_mode():
+    """True when ASTHMA_OFFLINE is set: sources come from the cache only."""
+    return os.environ.get('ASTHMA_OFFLINE', '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _is_url(origin):
+    return origin.startswith(('http://', 'https://'))
+
+
+def _manifest_path(cache_dir):
+    return os.path.join(cache_dir, 'manifest.json')
+
+
+def load_manifest(cache_dir=SOURCE_CACHE_DIR):
+    """name -> {sha256, size, etag, last_modified, origin, url, checked}."""
+    path = _manifest_path(cache_dir)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest, cache_dir):
+    path = _manifest_path(cache_dir)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def object_path(sha256, cache_dir=SOURCE_CACHE_DIR):
+    return os.path.join(cache_dir, 'objects', sha256)
+
+
+def content_hash(path, cache_dir=SOURCE_CACHE_DIR):
+    """SHA-256 of a cached object from its name, or None for files outside the cache."""
+    objects = os.path.abspath(os.path.join(cache_dir, 'objects'))
+    if os.path.dirname(os.path.abspath(path)) == objects:
+        return os.path.basename(path)
+    return None
+
+
+def _store(stream, cache_dir):
+    """Copy a binary stream into the object store; returns (sha256, size)."""
+    os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+    digest, size = hashlib.sha256(), 0
+    tmp_path = os.path.join(cache_dir, 'objects', f'.tmp-{os.getpid()}')
+    with open(tmp_path, 'wb') as out:
+        for block in iter(lambda: stream.read(BLOCK_SIZE), b''):
+            digest.update(block)
+            out.write(block)
+            size += len(block)
+    sha256 = digest.hexdigest()
+    os.replace(tmp_path, object_path(sha256, cache_dir))
+    return sha256, size
+
+
+def _fetch_local(location, entry, cache_dir):
+    """(sha256, size, validators) or None when the file matches `entry`."""
+    stat = os.stat(location)
+    validator = f'{stat.st_size}-{stat.st_mtime_ns}'
+    if entry and entry.get('etag') == validator:
+        return None
+    with open(location, 'rb') as f:
+        sha256, size = _store(f, cache_dir)
+    return sha256, size, {'etag': validator, 'last_modified': None}
+
+
+def _fetch_url(location, entry, cache_dir, timeout):
+    """(sha256, size, validators) or None on 304 Not Modified."""
+    request = urllib.request.Request(location)
+    if entry:
+        if entry.get('etag'):
+            request.add_header('If-None-Match', entry['etag'])
+        if entry.get('last_modified'):
+            request.add_header('If-Modified-Since', entry['last_modified'])
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            sha256, size = _store(response, cache_dir)
+            validators = {'etag': response.headers.get('ETag'),
+                          'last_modified': response.headers.get('Last-Modified')}
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and entry:
+            return None
+        raise
+    return sha256, size, validators
+
+
+def fetch(name, refresh=False, origin=None, offline=None, cache_dir=SOURCE_CACHE_DIR, timeout=60):
+    """
+    Make sure a source is in the cache.
+
+    Args:
+        name (str): Key of SOURCES.
+        refresh (bool): Ask the origin whether the cached copy is current.
+        origin (str, optional): Local directory or base URL (default:
+            DEFAULT_ORIGIN).
+        offline (bool, optional): Never contact the origin (default:
+            ASTHMA_OFFLINE).
+
+    Returns:
+        tuple: (manifest entry, status) with status 'cached', 'unchanged',
+        'updated' or 'fetched'.
+    """
+    if name not in SOURCES:
+        raise ValueError(f"Unknown source {name!r} (choose from {', '.join(SOURCES)})")
+    origin = origin or DEFAULT_ORIGIN
+    offline = offline_mode() if offline is None else offline
+    manifest = load_manifest(cache_dir)
+    entry = manifest.get(name)
+    if entry and not os.path.exists(object_path(entry['sha256'], cache_dir)):
+        entry = None
+
+    if offline:
+        if entry is None:
+            raise FileNotFoundError(f"Source {name!r} is not cached and offline mode is on")
+        return entry, 'cached'
+    if entry and not refresh:
+        return entry, 'cached'
+
+    # Validators only apply to the origin they came from
+    known = entry if entry and entry.get('origin') == origin else None
+    if _is_url(origin):
+        location = origin.rstrip('/') + '/' + urllib.request.pathname2url(SOURCES[name])
+        fetched = _fetch_url(location, known, cache_dir, timeout)
+    else:
+        location = os.path.join(origin, *SOURCES[name].split('/'))
+        fetched = _fetch_local(location, known, cache_dir)
+
+    if fetched is None:
+        status = 'unchanged'
+    else:
+        sha256, size, validators = fetched
+        status = 'fetched' if entry is None else 'unchanged' if entry['sha256'] == sha256 else 'updated'
+        entry = {'sha256': sha256, 'size': size, **validators, 'origin': origin, 'url': location}
+    entry['checked'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    manifest[name] = entry
+    _save_manifest(manifest, cache_dir)
+    return entry, status
+
+
+def source_path(name, refresh=False, origin=None, offline=None, cache_dir=SOURCE_CACHE_DIR):
+    """Local path of a source's cached content (see fetch())."""
+    entry, _ = fetch(name, refresh, origin, offline, cache_dir)
+    return object_path(entry['sha256'], cache_dir)
+
+
+def prune(cache_dir=SOURCE_CACHE_DIR):
+    """Delete objects (and their parsed caches) no manifest entry points to; returns bytes freed."""
+    keep = {entry['sha256'] for entry in load_manifest(cache_dir).values()}
+    freed = 0
+    objects = os.path.join(cache_dir, 'objects')
+    for sha256 in os.listdir(objects) if os.path.isdir(objects) else []:
+        if sha256 not in keep:
+            freed += os.path.getsize(os.path.join(objects, sha256))
+            os.remove(os.path.join(objects, sha256))
+    parsed = os.path.join(cache_dir, 'parsed')
+    for key in os.listdir(parsed) if os.path.isdir(parsed) else []:
+        sha256, _, rest = key.partition('-')
+        if sha256 not in keep or not rest.startswith(f'v{PARSED_VERSION}-'):
+            shutil.rmtree(os.path.join(parsed, key))
+    return freed
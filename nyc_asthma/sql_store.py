@@ -0,0 +1,292 @@
+import datetime
+import json
+import os
+import sqlite3
+
+import pandas as pd
+
+from nyc_asthma.geography import NTA_TO_UHF, uhf_borough
+from nyc_asthma.paths import (CLEANED_FILES, FINAL_DATASET, INDICATORS_BY_LEVEL, MERGED_ASTHMA_POVERTY,
+                              POVERTY_BY_UHF, SQL_STORE)
+
+# ============================================================================
+# Embedded SQL store (SQLite) over the cleaned tables and merged panels
+# ============================================================================
+#
+# Every cleaned CSV becomes a table, indexed on (year, uhf_code) or on the NTA
+# code, plus two small lookup tables:
+#
+#   uhf       uhf_code -> neighborhood, borough
+#   nta_uhf   NTA code -> UHF42 code (geography.NTA_TO_UHF)
+#
+# The standard summaries printed by the cleaners and merge scripts are kept as
+# views (see SQL_VIEWS), so they can be queried and filtered instead of
+# re-running the scripts. The store records the size/mtime of every source
+# file and is rebuilt by open_sql_store() when any of them changes.
+
+SQL_STORE_VERSION = 1
+
+# table -> (source CSV, indexes). Each index is a tuple of columns.
+SQL_TABLES = {
+    'adults_with_asthma': (CLEANED_FILES['adults_with_asthma'], [('year', 'uhf_code')]),
+    'ed_adults': (CLEANED_FILES['ed_adults'], [('year', 'uhf_code')]),
+    'ed_age_0_4': (CLEANED_FILES['ed_age_0_4'], [('year', 'uhf_code')]),
+    'ed_age_5_17': (CLEANED_FILES['ed_age_5_17'], [('year', 'uhf_code')]),
+    'poverty': (CLEANED_FILES['poverty'], [('NTA_CODE',)]),
+    'aqe': (CLEANED_FILES['aqe'], [('NTACODE',)]),
+    'poverty_by_uhf': (POVERTY_BY_UHF, [('geo_level', 'year', 'uhf_code')]),
+    'indicators_by_level': (INDICATORS_BY_LEVEL, [('geo_level', 'year', 'geo_code')]),
+    'merged_asthma_poverty': (MERGED_ASTHMA_POVERTY, [('year', 'uhf_code')]),
+    'final_panel': (FINAL_DATASET, [('year', 'uhf_code')]),
+}
+
+SQL_VIEWS = {
+    # ED visit rates of all three age groups side by side
+    'ed_rates': """
+        SELECT a.year, a.uhf_code, u.neighborhood, u.borough,
+               a.age_adjusted_ed_rate_per_10k AS ed_rate_adults,
+               c.ed_rate_per_10k_age_0_4 AS ed_rate_age_0_4,
+               t.ed_rate_per_10k_age_5_17 AS ed_rate_age_5_17
+        FROM ed_adults a
+        JOIN uhf u ON u.uhf_code = a.uhf_code
+        LEFT JOIN ed_age_0_4 c ON c.year = a.year AND c.uhf_code = a.uhf_code
+        LEFT JOIN ed_age_5_17 t ON t.year = a.year AND t.uhf_code = a.uhf_code
+    """,
+    # Unweighted mean of neighborhood rates per borough and year
+    'ed_rates_by_borough': """
+        SELECT borough, year,
+               COUNT(*) AS neighborhoods,
+               AVG(ed_rate_adults) AS ed_rate_adults,
+               AVG(ed_rate_age_0_4) AS ed_rate_age_0_4,
+               AVG(ed_rate_age_5_17) AS ed_rate_age_5_17
+        FROM ed_rates
+        GROUP BY borough, year
+    """,
+    # Citywide "key statistics" block of the ED cleaners
+    'ed_rates_by_year': """
+        SELECT year,
+               COUNT(*) AS neighborhoods,
+               AVG(ed_rate_adults) AS mean_ed_rate_adults,
+               MIN(ed_rate_adults) AS min_ed_rate_adults,
+               MAX(ed_rate_adults) AS max_ed_rate_adults,
+               AVG(ed_rate_age_0_4) AS mean_ed_rate_age_0_4,
+               AVG(ed_rate_age_5_17) AS mean_ed_rate_age_5_17
+        FROM ed_rates
+        GROUP BY year
+    """,
+    # 2019 (pre-pandemic) vs 2023, per neighborhood
+    'pandemic_comparison': """
+        SELECT pre.uhf_code, pre.neighborhood, pre.borough,
+               pre.ed_rate_adults AS ed_rate_adults_2019,
+               post.ed_rate_adults AS ed_rate_adults_2023,
+               100.0 * (post.ed_rate_adults - pre.ed_rate_adults) / pre.ed_rate_adults
+                   AS pct_change_adults,
+               pre.ed_rate_age_0_4 AS ed_rate_age_0_4_2019,
+               post.ed_rate_age_0_4 AS ed_rate_age_0_4_2023,
+               pre.ed_rate_age_5_17 AS ed_rate_age_5_17_2019,
+               post.ed_rate_age_5_17 AS ed_rate_age_5_17_2023
+        FROM ed_rates pre
+        JOIN ed_rates post ON post.uhf_code = pre.uhf_code AND post.year = 2023
+        WHERE pre.year = 2019
+    """,
+    # Records flagged with '*' in the portal tables
+    'unstable_estimates': """
+        SELECT 'ed_age_0_4' AS source, year,
+               SUM(unstable_estimate) AS unstable, COUNT(*) AS records
+        FROM ed_age_0_4 GROUP BY year
+        UNION ALL
+        SELECT 'ed_age_5_17', year, SUM(unstable_estimate), COUNT(*)
+        FROM ed_age_5_17 GROUP BY year
+        UNION ALL
+        SELECT 'adults_with_asthma', year, SUM(statistically_significant), COUNT(*)
+        FROM adults_with_asthma GROUP BY year
+    """,
+    # UHF rows of the poverty table (3-digit codes)
+    'uhf_poverty': """
+        SELECT p.NTA_CODE AS uhf_code, p.NTA_NAME AS neighborhood, u.borough,
+               p.Households_Below_Poverty AS households_below_poverty,
+               p.Poverty_percent AS poverty_rate
+        FROM poverty p
+        LEFT JOIN uhf u ON u.uhf_code = p.NTA_CODE
+        WHERE p.NTA_CODE BETWEEN 100 AND 999
+    """,
+    # NTA air quality averaged to UHF42
+    'aqe_by_uhf': """
+        SELECT x.uhf_code, u.neighborhood, u.borough,
+               COUNT(*) AS ntas, AVG(q.PM_Avg) AS PM_Avg, AVG(q.NO2_Avg) AS NO2_Avg
+        FROM aqe q
+        JOIN nta_uhf x ON x.nta_code = q.NTACODE
+        LEFT JOIN uhf u ON u.uhf_code = x.uhf_code
+        GROUP BY x.uhf_code
+    """,
+}
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _prepare(table, df):
+    """Per-table fixes so columns are queryable as numbers."""
+    if table == 'poverty':
+        df = df.copy()
+        df['Households_Below_Poverty'] = pd.to_numeric(
+            df['Households_Below_Poverty'].astype(str).str.replace(',', ''), errors='coerce')
+    return df
+
+
+def _uhf_table(frames):
+    """One row per uhf_code seen in any table with a neighborhood column."""
+    parts = [df[['uhf_code', 'neighborhood']] for df in frames.values()
+             if {'uhf_code', 'neighborhood'} <= set(df.columns)]
+    uhf = pd.concat(parts).dropna().drop_duplicates('uhf_code').sort_values('uhf_code')
+    uhf['uhf_code'] = uhf['uhf_code'].astype('int64')
+    uhf['borough'] = uhf['uhf_code'].map(uhf_borough)
+    return uhf.reset_index(drop=True)
+
+
+def build_sql_store(path=SQL_STORE, tables=SQL_TABLES):
+    """
+    Load the cleaned tables into a fresh SQLite file with indexes and views.
+
+    Tables whose source CSV does not exist yet are skipped. The database is
+    written to a temporary file and moved into place at the end, so readers
+    never see a half-built store.
+
+    Args:
+        path (str): Output .sqlite file.
+        tables (dict): table -> (source CSV, indexes), like SQL_TABLES.
+
+    Returns:
+        str: The store path.
+    """
+    frames, sources = {}, {}
+    for table, (source, _) in tables.items():
+        if os.path.exists(source):
+            frames[table] = _prepare(table, pd.read_csv(source))
+            sources[table] = dict(path=source, **_source_signature(source))
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    con = sqlite3.connect(tmp_path)
+    try:
+        for table, df in frames.items():
+            df.to_sql(table, con, index=False)
+            for columns in tables[table][1]:
+                con.execute(f"CREATE INDEX idx_{table}_{'_'.join(columns)} ON {table} ({', '.join(columns)})")
+
+        _uhf_table(frames).to_sql('uhf', con, index=False)
+        con.execute("CREATE UNIQUE INDEX idx_uhf_uhf_code ON uhf (uhf_code)")
+        nta_uhf = pd.DataFrame(list(NTA_TO_UHF.items()), columns=['nta_code', 'uhf_code'])
+        nta_uhf.to_sql('nta_uhf', con, index=False)
+        con.execute("CREATE UNIQUE INDEX idx_nta_uhf_nta_code ON nta_uhf (nta_code)")
+
+        for view, sql in SQL_VIEWS.items():
+            if _view_tables_present(sql, tables, frames):
+                con.execute(f"CREATE VIEW {view} AS {sql}")
+
+        meta = {
+            'version': SQL_STORE_VERSION,
+            'built_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'sources': sources,
+        }
+        con.execute("CREATE TABLE _store_meta (key TEXT PRIMARY KEY, value TEXT)")
+        con.executemany("INSERT INTO _store_meta VALUES (?, ?)",
+                        [(k, json.dumps(v)) for k, v in meta.items()])
+        con.execute("ANALYZE")
+        con.commit()
+    finally:
+        con.close()
+
+    os.replace(tmp_path, path)
+    return path
+
+
+def _view_tables_present(sql, tables, frames):
+    """Skip views over source tables that were not built (e.g. no final panel yet)."""
+    words = set(sql.replace(',', ' ').split())
+    return all(table in frames for table in tables if table in words)
+
+
+class SQLStore:
+    """
+    Read-only handle on a store built by build_sql_store().
+
+    Example:
+        with open_sql_store() as db:
+            db.query("SELECT * FROM ed_rates_by_borough WHERE year IN (2019, 2023)")
+    """
+
+    def __init__(self, path=SQL_STORE):
+        self.path = path
+        self.con = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self.meta = {k: json.loads(v) for k, v in self.con.execute("SELECT key, value FROM _store_meta")}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.con.close()
+
+    def _names(self, kind):
+        rows = self.con.execute(
+            "SELECT name FROM sqlite_master WHERE type = ? AND name NOT LIKE '\\_%' ESCAPE '\\' "
+            "AND name NOT LIKE 'sqlite_%' ORDER BY name",
+            (kind,))
+        return [name for (name,) in rows]
+
+    @property
+    def tables(self):
+        return self._names('table')
+
+    @property
+    def views(self):
+        return self._names('view')
+
+    def query(self, sql, params=()):
+        """Run a SELECT and return the result as a DataFrame."""
+        return pd.read_sql_query(sql, self.con, params=params)
+
+    def explain(self, sql, params=()):
+        """SQLite query plan, e.g. to check that an index is used."""
+        plan = self.con.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        return [row[-1] for row in plan]
+
+    def ed_rate_by_borough(self, years):
+        """Mean ED rates per borough for the given years, one row per (borough, year)."""
+        years = [int(y) for y in years]
+        placeholders = ', '.join('?' * len(years))
+        return self.query(
+            f"SELECT * FROM ed_rates_by_borough WHERE year IN ({placeholders}) ORDER BY borough, year",
+            years)
+
+    def is_stale(self):
+        """True if any source CSV changed (or appeared/disappeared) since the build."""
+        if self.meta.get('version') != SQL_STORE_VERSION:
+            return True
+        built = self.meta.get('sources', {})
+        for table, (source, _) in SQL_TABLES.items():
+            exists = os.path.exists(source)
+            if exists != (table in built):
+                return True
+            if exists and _source_signature(source) != {k: built[table][k] for k in ('size', 'mtime_ns')}:
+                return True
+        return False
+
+
+def open_sql_store(path=SQL_STORE, rebuild=False):
+    """Open the store, (re)building it first if missing, stale or asked to."""
+    if not rebuild and os.path.exists(path):
+        store = SQLStore(path)
+        if not store.is_stale():
+            return store
+        store.close()
+    build_sql_store(path)
+    return SQLStore(path)
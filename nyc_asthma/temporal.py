@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# Temporal alignment of sources onto a common yearly / monthly axis
+# ============================================================================
+#
+# Sources arrive on different time bases: ED visits every year, adult
+# prevalence for survey years only, poverty per 5-year ACS period (labelled
+# by its last year) and air quality as a single static snapshot. align()
+# puts a (unit, time) table on a target axis for all units and columns at
+# once: the observations go into a [unit, time, column] cube over the union
+# of observed and target times, the previous / next observed position of
+# every cell comes from one running max / min along the time axis, and each
+# method is a gather plus a mask:
+#
+#   exact          observed values only
+#   carry_forward  last observation at or before t
+#   nearest        closest observation (earlier one on ties)
+#   interpolate    linear between the observations around t, no extrapolation
+#   covering       latest observation in [t, t + max_gap]: the last period
+#                  whose window (labelled by its end) contains t
+#
+# max_gap (in axis units) bounds how far a value may travel; for
+# interpolate it bounds the span between the two observations, and for
+# covering it is the window length minus one. Every output value that was
+# not observed at exactly that time is flagged as imputed, so analyses can
+# tell measured cells from filled ones.
+#
+# Monthly axes use integer month indexes (year * 12 + month - 1) so the same
+# arithmetic applies.
+
+ALIGN_METHODS = ('exact', 'carry_forward', 'nearest', 'interpolate', 'covering')
+
+# Defaults for the final panel: source -> method and max_gap (years)
+PANEL_ALIGNMENT = {
+    'adults_with_asthma': {'method': 'exact', 'max_gap': None},
+    # 5-year ACS periods labelled by their last year
+    'poverty': {'method': 'covering', 'max_gap': 4},
+}
+
+
+def yearly_axis(first_year, last_year):
+    return np.arange(first_year, last_year + 1)
+
+
+def month_index(year, month):
+    """Integer month index: year * 12 + month - 1 (vectorized)."""
+    return np.asarray(year) * 12 + np.asarray(month) - 1
+
+
+def monthly_axis(first_year, last_year):
+    return np.arange(month_index(first_year, 1), month_index(last_year, 12) + 1)
+
+
+def month_labels(index):
+    """(year, month) arrays for integer month indexes."""
+    index = np.asarray(index)
+    return index // 12, index % 12 + 1
+
+
+def _fill_positions(valid):
+    """Previous / next valid position along axis 1 (-1 / n where there is none)."""
+    n = valid.shape[1]
+    pos = np.arange(n).reshape(1, n, 1)
+    prev = np.maximum.accumulate(np.where(valid, pos, -1), axis=1)
+    nxt = np.minimum.accumulate(np.where(valid, pos, n)[:, ::-1], axis=1)[:, ::-1]
+    return prev, nxt
+
+
+def align(df, value_cols, axis, method='carry_forward', max_gap=None, time='year', key='uhf_code',
+          mask_col=None):
+    """
+    Put a (unit, time) table on a common time axis.
+
+    Args:
+        df (pd.DataFrame): One row per (key, time) with the value columns.
+        value_cols (list): Numeric columns to align.
+        axis (array-like): Target times (years, or month indexes).
+        method (str): One of ALIGN_METHODS.
+        max_gap (float, optional): Largest distance a value may be moved.
+        time, key (str): Time and unit columns.
+        mask_col (str, optional): Write one mask (any column imputed) under
+            this name instead of a '<column>_imputed' mask per column.
+
+    Returns:
+        pd.DataFrame: key, time, the value columns and imputed mask(s), one
+        row per unit and axis time.
+    """
+    if method not in ALIGN_METHODS:
+        raise ValueError(f"Unknown alignment method {method!r} (choose from {', '.join(ALIGN_METHODS)})")
+    if df.duplicated([key, time]).any():
+        raise ValueError(f"Duplicate ({key}, {time}) rows; cannot align")
+    value_cols = list(value_cols)
+    axis = np.asarray(axis)
+
+    units, unit_labels = pd.factorize(df[key], sort=True)
+    grid = np.union1d(df[time].to_numpy(), axis)
+    n = len(grid)
+    cube = np.full((len(unit_labels), n, len(value_cols)), np.nan)
+    cube[units, np.searchsorted(grid, df[time].to_numpy())] = df[value_cols].to_numpy(dtype=float)
+
+    valid = ~np.isnan(cube)
+    prev, nxt = _fill_positions(valid)
+    source = None
+    if method == 'covering':
+        # Last observation at or before t + max_gap, kept if it is not before t
+        times = grid.astype(float)
+        end = (np.full(n, n - 1) if max_gap is None
+               else np.searchsorted(grid, times + max_gap, side='right') - 1)
+        source = prev[:, end]
+        found = (source >= 0) & (times[np.clip(source, 0, n - 1)] >= times.reshape(1, n, 1))
+        source = np.where(found, source, -1)
+    has_prev, has_next = prev >= 0, nxt < n
+    prev, nxt = np.clip(prev, 0, n - 1), np.clip(nxt, 0, n - 1)
+    prev_val = np.take_along_axis(cube, prev, axis=1)
+    next_val = np.take_along_axis(cube, nxt, axis=1)
+    times = grid.astype(float)
+    t = times.reshape(1, n, 1)
+    gap_prev, gap_next = t - times[prev], times[nxt] - t
+
+    if method == 'covering':
+        values = np.where(source >= 0, np.take_along_axis(cube, np.clip(source, 0, n - 1), axis=1), np.nan)
+    elif method == 'interpolate':
+        span = times[nxt] - times[prev]
+        both = has_prev & has_next & (True if max_gap is None else span <= max_gap)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frac = np.where(span > 0, gap_prev / span, 0.0)
+        values = np.where(both, prev_val + frac * (next_val - prev_val), np.nan)
+    else:
+        if max_gap is not None:
+            has_prev &= gap_prev <= max_gap
+            has_next &= gap_next <= max_gap
+        if method == 'exact':
+            values = np.where(valid, cube, np.nan)
+        elif method == 'carry_forward':
+            values = np.where(has_prev, prev_val, np.nan)
+        else:
+            use_prev = has_prev & (~has_next | (gap_prev <= gap_next))
+            values = np.where(use_prev, prev_val, np.where(has_next, next_val, np.nan))
+    imputed = ~np.isnan(values) & ~valid
+    if source is not None:
+        imputed = ~np.isnan(values) & (source != np.arange(n).reshape(1, n, 1))
+
+    cols = np.searchsorted(grid, axis)
+    values, imputed = values[:, cols], imputed[:, cols]
+    out = pd.DataFrame({
+        key: np.repeat(np.asarray(unit_labels), len(axis)),
+        time: np.tile(axis, len(unit_labels)),
+    })
+    for j, col in enumerate(value_cols):
+        out[col] = values[:, :, j].ravel()
+        if mask_col is None:
+            out[f'{col}_imputed'] = imputed[:, :, j].ravel()
+    if mask_col is not None:
+        out[mask_col] = imputed.any(axis=2).ravel()
+    return out
+
+
+def fill_panel(panel, value_cols, method='carry_forward', max_gap=None, mask_col=None,
+               time='year', key='uhf_code'):
+    """
+    Fill gaps in columns already in a panel from other times of the same unit.
+
+    Returns:
+        pd.DataFrame: panel with the columns aligned and the mask column(s) added.
+    """
+    aligned = align(panel[[key, time] + list(value_cols)], value_cols, np.unique(panel[time]),
+                    method, max_gap, time, key, mask_col)
+    return panel.drop(columns=list(value_cols)).merge(aligned, on=[key, time], how='left')[
+        list(panel.columns) + [c for c in aligned.columns if c not in panel.columns]]
+
+
+def parse_alignment(specs, defaults=PANEL_ALIGNMENT):
+    """
+    Override alignment defaults from 'source=method[:max_gap]' strings.
+
+    Returns:
+        dict: source -> {'method', 'max_gap'}.
+    """
+    alignment = {source: dict(spec) for source, spec in defaults.items()}
+    for spec in specs or []:
+        source, _, rule = spec.partition('=')
+        method, _, gap = rule.partition(':')
+        if source not in alignment or method not in ALIGN_METHODS:
+            raise ValueError(f"Bad alignment {spec!r}: use one of {', '.join(alignment)} = "
+                             f"{'|'.join(ALIGN_METHODS)}[:max_gap]")
+        alignment[source] = {'method': method, 'max_gap': float(gap) if gap else None}
+    return alignment
@@ -0,0 +1,336 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# ============================================================================
+# Histogram tree ensembles (gradient boosting and random forest)
+# ============================================================================
+#
+# Features are cut into at most max_bins quantile bins (NaN gets a bin of
+# its own), so a tree only ever sees small integers. Trees are grown level
+# by level to a fixed depth: one bincount per level gives the gradient and
+# weight histogram of every (node, feature, bin), cumulative sums over the
+# bins give the gain of every threshold, and each node takes its best
+# split. A node with no useful split sends all its rows left, so every tree
+# is a complete binary tree of the same shape and a whole ensemble is three
+# [n_trees, n_nodes] arrays; prediction walks all trees for all rows one
+# level at a time.
+#
+#   GradientBoosting  squared-error boosting on residuals, row subsampling,
+#                     L2-regularized leaf values
+#   RandomForest      bootstrap weights, a random share of features per node,
+#                     trees fitted in parallel processes
+#
+# contributions() splits each prediction into per-feature parts by following
+# the decision path (the change in node value at every split goes to the
+# split's feature; Saabas' attribution, the path-based approximation of
+# TreeSHAP). Parts plus the bias add up to the prediction exactly.
+
+DEFAULT_MAX_BINS = 32
+
+
+def bin_edges(X, max_bins=DEFAULT_MAX_BINS):
+    """Quantile cut points of every column (NaNs ignored)."""
+    quantiles = np.linspace(0, 1, max_bins + 1)[1:-1]
+    edges = []
+    for col in X.T:
+        col = col[~np.isnan(col)]
+        edges.append(np.unique(np.quantile(col, quantiles)) if len(col) else np.zeros(0))
+    return edges
+
+
+def apply_bins(X, edges, max_bins=DEFAULT_MAX_BINS):
+    """uint8 bin of every value; NaN goes to bin max_bins."""
+    out = np.empty(X.shape, dtype=np.uint8)
+    for j, cuts in enumerate(edges):
+        out[:, j] = np.searchsorted(cuts, X[:, j], side='right')
+        out[np.isnan(X[:, j]), j] = max_bins
+    return out
+
+
+def _node_values(node, grad, weight, n_nodes, l2):
+    g = np.bincount(node, weights=grad * weight, minlength=n_nodes)
+    h = np.bincount(node, weights=weight, minlength=n_nodes)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(h + l2 > 0, g / (h + l2), 0.0)
+
+
+def grow_tree(Xb, grad, weight, n_bins, max_depth=3, min_samples_leaf=5, l2=0.0, max_features=1.0, rng=None):
+    """
+    Fit one depth-limited regression tree to `grad` on binned features.
+
+    Args:
+        Xb (np.ndarray): [n, n_features] bins from apply_bins().
+        grad (np.ndarray): Targets (residuals when boosting).
+        weight (np.ndarray): Row weights (bootstrap counts, 0/1 subsample).
+        n_bins (int): Number of bins including the NaN bin.
+        max_features (float): Share of features each node may split on.
+
+    Returns:
+        tuple: (feature, threshold, value) arrays in breadth-first order;
+        node k's children are 2k+1 (bin <= threshold) and 2k+2.
+    """
+    n, n_features = Xb.shape
+    n_internal = 2 ** max_depth - 1
+    feature = np.zeros(n_internal, dtype=np.int64)
+    threshold = np.full(n_internal, n_bins, dtype=np.int64)
+    value = np.zeros(2 * n_internal + 1)
+    node = np.zeros(n, dtype=np.int64)
+    rows = np.arange(n)
+    n_allowed = max(1, int(round(max_features * n_features)))
+
+    for depth in range(max_depth + 1):
+        n_level, offset = 2 ** depth, 2 ** depth - 1
+        value[offset:offset + n_level] = _node_values(node, grad, weight, n_level, l2)
+        if depth == max_depth:
+            break
+
+        cell = ((node[:, None] * n_features + np.arange(n_features)) * n_bins + Xb).ravel()
+        size = n_level * n_features * n_bins
+        G = np.bincount(cell, weights=np.repeat(grad * weight, n_features), minlength=size)
+        H = np.bincount(cell, weights=np.repeat(weight, n_features), minlength=size)
+        G, H = G.reshape(n_level, n_features, n_bins), H.reshape(n_level, n_features, n_bins)
+        GL, HL = np.cumsum(G, axis=2)[:, :, :-1], np.cumsum(H, axis=2)[:, :, :-1]
+        Gt, Ht = G.sum(axis=2, keepdims=True), H.sum(axis=2, keepdims=True)
+        GR, HR = Gt - GL, Ht - HL
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gain = GL ** 2 / (HL + l2) + GR ** 2 / (HR + l2) - Gt ** 2 / (Ht + l2)
+        ok = (HL >= min_samples_leaf) & (HR >= min_samples_leaf)
+        if n_allowed < n_features:
+            draw = rng.random((n_level, n_features))
+            ok &= (draw <= np.sort(draw, axis=1)[:, n_allowed - 1:n_allowed])[:, :, None]
+        gain = np.where(ok & np.isfinite(gain), gain, -np.inf).reshape(n_level, -1)
+
+        best = np.argmax(gain, axis=1)
+        split = gain[np.arange(n_level), best] > 1e-12
+        level_feature = np.where(split, best // (n_bins - 1), 0)
+        level_threshold = np.where(split, best % (n_bins - 1), n_bins)
+        feature[offset:offset + n_level] = level_feature
+        threshold[offset:offset + n_level] = level_threshold
+        node = 2 * node + (Xb[rows, level_feature[node]] > level_threshold[node])
+    return feature, threshold, value
+
+
+class TreeEnsemble:
+    """Shared prediction, attribution and storage for the ensembles below."""
+
+    kind = None
+
+    def _set_trees(self, trees, scale):
+        self.feature_ = np.stack([t[0] for t in trees])
+        self.threshold_ = np.stack([t[1] for t in trees])
+        self.value_ = np.stack([t[2] for t in trees]) * scale
+        return self
+
+    def _paths(self, X, trees=None):
+        """Node index of every tree (or the selected trees) and row at each depth: [depth + 1, n_trees, n]."""
+        Xb = apply_bins(np.asarray(X, dtype=float), self.edges_, self.max_bins)
+        n, n_features = Xb.shape
+        feature_, threshold_ = (self.feature_, self.threshold_) if trees is None else \
+            (self.feature_[trees], self.threshold_[trees])
+        n_trees, n_internal = feature_.shape
+        depth = int(np.log2(n_internal + 1))
+        # Flat gathers with int32 offsets are much faster than 2-D fancy indexing
+        bins = Xb.ravel()
+        feature = feature_.astype(np.int32).ravel()
+        threshold = threshold_.astype(np.int32).ravel()
+        tree_offset = (np.arange(n_trees, dtype=np.int32) * n_internal)[:, None]
+        row_offset = (np.arange(n, dtype=np.int32) * n_features)[None, :]
+        k = np.zeros((n_trees, n), dtype=np.int32)
+        path = [k]
+        for _ in range(depth):
+            node = tree_offset + k
+            right = np.take(bins, row_offset + np.take(feature, node)) > np.take(threshold, node)
+            k = 2 * k + 1 + right
+            path.append(k)
+        return path
+
+    def leaf_values(self, X, trees=None):
+        """[n_trees, n] leaf value of every (selected) tree for every row."""
+        value = self.value_ if trees is None else self.value_[trees]
+        return np.take_along_axis(value, self._paths(X, trees)[-1], axis=1)
+
+    def predict(self, X):
+        return self.base_ + self.leaf_values(X).sum(axis=0)
+
+    def trees_using(self, j):
+        """Indexes of the trees with at least one split on feature j."""
+        n_bins = self.max_bins + 1
+        return np.flatnonzero(((self.feature_ == j) & (self.threshold_ < n_bins)).any(axis=1))
+
+    def contributions(self, X):
+        """
+        Per-feature parts of each prediction.
+
+        Returns:
+            tuple: (bias, [n, n_features] contributions); bias + row sum = predict(X).
+        """
+        path = self._paths(X)
+        n, n_features = len(path[0][0]), len(self.edges_)
+        trees = np.arange(self.feature_.shape[0])[:, None]
+        out = np.zeros(n * n_features)
+        for parent, child in zip(path[:-1], path[1:]):
+            delta = np.take_along_axis(self.value_, child, axis=1) - np.take_along_axis(self.value_, parent, axis=1)
+            cell = np.arange(n)[None, :] * n_features + self.feature_[trees, parent]
+            out += np.bincount(cell.ravel(), weights=delta.ravel(), minlength=n * n_features)
+        bias = self.base_ + self.value_[:, 0].sum()
+        return bias, out.reshape(n, n_features)
+
+    def to_arrays(self):
+        """Arrays and JSON metadata for save_model()."""
+        arrays = {'feature': self.feature_, 'threshold': self.threshold_, 'value': self.value_}
+        arrays.update({f'edges_{j}': e for j, e in enumerate(self.edges_)})
+        meta = {'kind': self.kind, 'params': self.get_params(), 'base': float(self.base_),
+                'n_features': len(self.edges_)}
+        return arrays, meta
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        model = cls(**meta['params'])
+        model.feature_, model.threshold_, model.value_ = arrays['feature'], arrays['threshold'], arrays['value']
+        model.edges_ = [arrays[f'edges_{j}'] for j in range(meta['n_features'])]
+        model.base_ = meta['base']
+        return model
+
+
+class GradientBoosting(TreeEnsemble):
+    """Least-squares gradient boosting of shallow histogram trees."""
+
+    kind = 'boosting'
+
+    def __init__(self, n_estimators=300, learning_rate=0.05, max_depth=3, min_samples_leaf=10,
+                 subsample=0.8, l2=1.0, max_bins=DEFAULT_MAX_BINS, seed=0):
+        self.n_estimators = n_estimators
+        self.learning_rate = learning_rate
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.subsample = subsample
+        self.l2 = l2
+        self.max_bins = max_bins
+        self.seed = seed
+
+    def get_params(self):
+        return {name: getattr(self, name) for name in (
+            'n_estimators', 'learning_rate', 'max_depth', 'min_samples_leaf', 'subsample', 'l2', 'max_bins', 'seed')}
+
+    def fit(self, X, y):
+        X, y = np.asarray(X, dtype=float), np.asarray(y, dtype=float)
+        self.edges_ = bin_edges(X, self.max_bins)
+        Xb = apply_bins(X, self.edges_, self.max_bins)
+        rng = np.random.default_rng(self.seed)
+        self.base_ = float(y.mean())
+        pred, trees = np.full(len(y), self.base_), []
+        rows = np.arange(len(y))
+        for _ in range(self.n_estimators):
+            weight = (rng.random(len(y)) < self.subsample).astype(float)
+            tree = grow_tree(Xb, y - pred, weight, self.max_bins + 1, self.max_depth,
+                             self.min_samples_leaf, self.l2, rng=rng)
+            trees.append(tree)
+            k = np.zeros(len(y), dtype=np.int64)
+            for _ in range(self.max_depth):
+                k = 2 * k + 1 + (Xb[rows, tree[0][k]] > tree[1][k])
+            pred += self.learning_rate * tree[2][k]
+        return self._set_trees(trees, self.learning_rate)
+
+
+def _grow_forest(args):
+    """Grow a chunk of forest trees (runs in a worker process)."""
+    Xb, y, seeds, n_bins, params = args
+    trees = []
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        weight = rng.multinomial(len(y), np.full(len(y), 1.0 / len(y))).astype(float)
+        trees.append(grow_tree(Xb, y, weight, n_bins, rng=rng, **params))
+    return trees
+
+
+class RandomForest(TreeEnsemble):
+    """Bagged histogram trees with per-node feature subsampling."""
+
+    kind = 'forest'
+
+    def __init__(self, n_estimators=200, max_depth=6, min_samples_leaf=5, max_features=0.5,
+                 max_bins=DEFAULT_MAX_BINS, seed=0, n_jobs=1):
+        self.n_estimators = n_estimators
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.max_features = max_features
+        self.max_bins = max_bins
+        self.seed = seed
+        self.n_jobs = n_jobs
+
+    def get_params(self):
+        return {name: getattr(self, name) for name in (
+            'n_estimators', 'max_depth', 'min_samples_leaf', 'max_features', 'max_bins', 'seed', 'n_jobs')}
+
+    def fit(self, X, y):
+        X, y = np.asarray(X, dtype=float), np.asarray(y, dtype=float)
+        self.edges_ = bin_edges(X, self.max_bins)
+        Xb = apply_bins(X, self.edges_, self.max_bins)
+        self.base_ = 0.0
+        seeds = np.random.SeedSequence(self.seed).spawn(self.n_estimators)
+        params = {'max_depth': self.max_depth, 'min_samples_leaf': self.min_samples_leaf,
+                  'max_features': self.max_features}
+        chunks = [(Xb, y, part, self.max_bins + 1, params)
+                  for part in np.array_split(np.array(seeds, dtype=object), max(1, self.n_jobs)) if len(part)]
+        if len(chunks) > 1:
+            with ProcessPoolExecutor(len(chunks)) as pool:
+                trees = [t for chunk in pool.map(_grow_forest, chunks) for t in chunk]
+        else:
+            trees = _grow_forest(chunks[0])
+        return self._set_trees(trees, 1.0 / self.n_estimators)
+
+
+ENSEMBLES = {cls.kind: cls for cls in (GradientBoosting, RandomForest)}
+
+
+def save_model(model, path, **extra):
+    """Write a fitted ensemble (and extra JSON-able metadata) to one .npz file."""
+    arrays, meta = model.to_arrays()
+    meta.update(extra)
+    np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+
+
+def load_model(path):
+    """
+    Read a model written by save_model().
+
+    Returns:
+        tuple: (model, metadata dict)
+    """
+    with np.load(path) as data:
+        meta = json.loads(str(data['meta']))
+        arrays = {name: data[name] for name in data.files if name != 'meta'}
+    return ENSEMBLES[meta['kind']].from_arrays(arrays, meta), meta
+
+
+def permutation_importance(model, X, y, repeats=10, seed=0):
+    """
+    Increase in mean squared error when each feature is shuffled.
+
+    Shuffling feature j only changes the trees that split on j, so only
+    those are re-evaluated, for all repeats in one batch.
+
+    Returns:
+        tuple: (mean increase, sd over repeats), each [n_features].
+    """
+    X, y = np.asarray(X, dtype=float), np.asarray(y, dtype=float)
+    n, n_features = X.shape
+    rng = np.random.default_rng(seed)
+    order = np.argsort(rng.random((repeats, n)), axis=1)
+    leaves = model.leaf_values(X)
+    pred = model.base_ + leaves.sum(axis=0)
+    baseline = np.mean((pred - y) ** 2)
+
+    increase = np.zeros((n_features, repeats))
+    for j in range(n_features):
+        trees = model.trees_using(j)
+        if not len(trees):
+            continue
+        batch = np.broadcast_to(X, (repeats, n, n_features)).copy()
+        batch[:, :, j] = X[order, j]
+        changed = model.leaf_values(batch.reshape(-1, n_features), trees).sum(axis=0).reshape(repeats, n)
+        shuffled = pred - leaves[trees].sum(axis=0) + changed
+        increase[j] = ((shuffled - y) ** 2).mean(axis=1) - baseline
+    return increase.mean(axis=1), increase.std(axis=1)
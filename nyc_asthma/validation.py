@@ -0,0 +1,243 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from scipy.sparse.csgraph import shortest_path
+
+from nyc_asthma.geography import uhf_borough
+from nyc_asthma.models import PARAM_GRIDS, expand_grid, make_model
+
+# ============================================================================
+# Spatially / temporally blocked cross-validation
+# ============================================================================
+#
+# Rows of the panel are neighborhood-years, so a random split puts other
+# years of the same neighborhood (and of the ones next to it) in training.
+# Folds here hold out whole units instead:
+#
+#   borough    one fold per borough
+#   cluster    contiguous groups of neighborhoods: seeds spread out by
+#              farthest-point sampling on the adjacency graph (adjacency.py),
+#              every neighborhood joins its nearest seed in graph hops
+#   temporal   forward chaining: train on the years before a block, test on it
+#   random     row-level K-fold, only as the leaky baseline
+#
+# With buffer=True, neighborhoods touching a held-out one are dropped from
+# that fold's training set as well.
+#
+# Every (hyperparameters, fold) pair is one task. X and y are copied once
+# into shared memory; worker processes map them read-only and receive only
+# the fold's row indexes, so a full grid runs across the pool without
+# pickling the data for every task.
+
+SCHEMES = ('borough', 'cluster', 'temporal', 'random')
+DEFAULT_FOLDS = 5
+
+# Arrays of the current cross_validate() call, in this process or a worker
+_shared = {}
+_handles = []
+
+
+def borough_assignment(codes):
+    """Fold number per code: one fold per borough."""
+    folds, _ = pd.factorize(pd.Series([uhf_borough(c) for c in codes]), sort=True)
+    return folds
+
+
+def cluster_assignment(codes, n_folds=DEFAULT_FOLDS, level='UHF34'):
+    """
+    Fold number per code: n_folds contiguous clusters of neighborhoods.
+
+    Returns:
+        np.ndarray: Cluster index for every code.
+    """
+    from nyc_asthma.imputation import spatial_neighbors
+
+    hops = shortest_path(spatial_neighbors(codes, level), unweighted=True, directed=False)
+    seeds = [int(np.argmax(np.where(np.isinf(hops), -1, hops).sum(axis=1)))]
+    while len(seeds) < min(n_folds, len(codes)):
+        seeds.append(int(np.argmax(hops[seeds].min(axis=0))))
+    return np.argmin(hops[seeds], axis=0)
+
+
+def unit_splits(codes, assignment, row_codes, neighbors=None):
+    """
+    (train rows, test rows) per fold, holding out every row of a fold's units.
+
+    Args:
+        codes (array-like): Unit codes, aligned with `assignment`.
+        assignment (np.ndarray): Fold number per code.
+        row_codes (array-like): Unit code of every row.
+        neighbors (sparse matrix, optional): Unit adjacency; touching units
+            are left out of training (buffer).
+    """
+    position = pd.Index(codes).get_indexer(np.asarray(row_codes))
+    row_fold = assignment[position]
+    splits = []
+    for fold in np.unique(assignment):
+        held = assignment == fold
+        excluded = held.copy()
+        if neighbors is not None:
+            excluded |= (neighbors @ held.astype(float)) > 0
+        test = np.flatnonzero(row_fold == fold)
+        train = np.flatnonzero(~excluded[position])
+        splits.append((train, test))
+    return splits
+
+
+def temporal_splits(row_years, n_folds=DEFAULT_FOLDS):
+    """Forward-chaining (train rows, test rows): test each later block of years on the ones before."""
+    years = np.unique(row_years)
+    blocks = np.array_split(years, n_folds + 1)
+    return [(np.flatnonzero(np.asarray(row_years) < block[0]), np.flatnonzero(np.isin(row_years, block)))
+            for block in blocks[1:] if len(block)]
+
+
+def random_splits(n_rows, n_folds=DEFAULT_FOLDS, seed=0):
+    """Row-level K-fold (train rows, test rows)."""
+    fold = np.random.default_rng(seed).permutation(n_rows) % n_folds
+    return [(np.flatnonzero(fold != k), np.flatnonzero(fold == k)) for k in range(n_folds)]
+
+
+def make_splits(rows, scheme, n_folds=DEFAULT_FOLDS, buffer=False, level='UHF34', seed=0):
+    """
+    Folds of one scheme over the rows of a design matrix.
+
+    Args:
+        rows (pd.DataFrame): Rows used for modelling (year, uhf_code).
+        scheme (str): One of SCHEMES.
+        buffer (bool): Also drop held-out units' neighbors from training
+            (spatial schemes only).
+    """
+    if scheme == 'temporal':
+        return temporal_splits(rows['year'].to_numpy(), n_folds)
+    if scheme == 'random':
+        return random_splits(len(rows), n_folds, seed)
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown scheme {scheme!r} (choose from {', '.join(SCHEMES)})")
+
+    from nyc_asthma.imputation import spatial_neighbors
+
+    codes = np.sort(rows['uhf_code'].unique())
+    assignment = borough_assignment(codes) if scheme == 'borough' else cluster_assignment(codes, n_folds, level)
+    neighbors = spatial_neighbors(codes, level) if buffer else None
+    return unit_splits(codes, assignment, rows['uhf_code'].to_numpy(), neighbors)
+
+
+@contextmanager
+def shared_arrays(arrays):
+    """
+    Copy arrays into shared memory for the length of the block.
+
+    Yields:
+        dict: name -> (shared memory name, shape, dtype), for _attach().
+    """
+    blocks, specs = [], {}
+    try:
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(shm)
+            np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+            specs[name] = (shm.name, array.shape, array.dtype.str)
+        yield specs
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+
+def _attach(specs):
+    """Worker initializer: map the shared arrays."""
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _handles.append(shm)
+        _shared[name] = np.ndarray(shape, np.dtype(dtype), buffer=shm.buf)
+
+
+def _run_fold(task):
+    """Fit one (model, params) on one fold's training rows and predict its test rows."""
+    model_name, params, train, test = task
+    X, y = _shared['X'], _shared['y']
+    model = make_model(model_name, **params).fit(X[train], y[train])
+    return model.predict(X[test])
+
+
+def _scores(y_true, y_pred):
+    resid = y_true - y_pred
+    total = ((y_true - y_true.mean()) ** 2).sum()
+    return {
+        'rmse': float(np.sqrt(np.mean(resid ** 2))),
+        'mae': float(np.mean(np.abs(resid))),
+        'r2': float(1 - (resid ** 2).sum() / total) if total > 0 else np.nan,
+    }
+
+
+def cross_validate(X, y, splits, model='ridge', grid=None, workers=None):
+    """
+    Score every hyperparameter setting on every fold.
+
+    Args:
+        X (np.ndarray): [n_rows, n_features].
+        y (np.ndarray): [n_rows].
+        splits (list): (train rows, test rows) pairs from make_splits().
+        model (str): Name in models.MODELS.
+        grid (dict, optional): Hyperparameter lists (default: models.PARAM_GRIDS).
+        workers (int, optional): Processes (default: CPU count; 1 runs in
+            this process).
+
+    Returns:
+        tuple: (per-fold scores frame, summary frame with one row per
+        setting sorted by mean RMSE, out-of-fold predictions [n_settings, n_rows])
+    """
+    settings = expand_grid(grid if grid is not None else PARAM_GRIDS[model])
+    tasks = [(model, params, train, test) for params in settings for train, test in splits]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+
+    if workers <= 1:
+        _shared.update(X=X, y=y)
+        try:
+            predictions = [_run_fold(task) for task in tasks]
+        finally:
+            _shared.clear()
+    else:
+        with shared_arrays({'X': X.astype(float), 'y': y.astype(float)}) as specs:
+            with ProcessPoolExecutor(workers, initializer=_attach, initargs=(specs,)) as pool:
+                predictions = list(pool.map(_run_fold, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+
+    folds, oof = [], np.full((len(settings), len(y)), np.nan)
+    for t, ((_, params, train, test), pred) in enumerate(zip(tasks, predictions)):
+        s, fold = divmod(t, len(splits))
+        oof[s, test] = pred
+        folds.append({'setting': s, 'params': repr(params), 'fold': fold, 'n_train': len(train),
+                      'n_test': len(test), **_scores(y[test], pred)})
+    folds = pd.DataFrame(folds)
+
+    summary = folds.groupby(['setting', 'params'], sort=False).agg(
+        rmse=('rmse', 'mean'), rmse_sd=('rmse', 'std'), mae=('mae', 'mean'), r2=('r2', 'mean')).reset_index()
+    tested = ~np.isnan(oof[0])
+    summary['oof_r2'] = [_scores(y[tested], oof[s, tested])['r2'] for s in range(len(settings))]
+    return folds, summary.sort_values('rmse').reset_index(drop=True), oof
+
+
+def evaluate_schemes(panel, schemes=SCHEMES, features=None, target=None, model='ridge', grid=None,
+                     n_folds=DEFAULT_FOLDS, buffer=False, workers=None, seed=0):
+    """
+    cross_validate() under several fold schemes, best setting of each.
+
+    Returns:
+        tuple: (one summary row per scheme, all per-fold scores)
+    """
+    from nyc_asthma.models import DEFAULT_FEATURES, DEFAULT_TARGET, design_matrix
+
+    rows, X, y = design_matrix(panel, features or DEFAULT_FEATURES, target or DEFAULT_TARGET)
+    best, all_folds = [], []
+    for scheme in schemes:
+        splits = make_splits(rows, scheme, n_folds, buffer, seed=seed)
+        folds, summary, _ = cross_validate(X, y, splits, model, grid, workers)
+        best.append({'scheme': scheme, 'folds': len(splits), 'rows': len(y), **summary.iloc[0].to_dict()})
+        all_folds.append(folds.assign(scheme=scheme))
+    return pd.DataFrame(best), pd.concat(all_folds, ignore_index=True)
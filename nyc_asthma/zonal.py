@@ -0,0 +1,297 @@
+import os
+from collections import namedtuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from scipy import sparse
+
+from nyc_asthma.paths import CACHE_DIR, NTA_SHAPEFILE, UHF34_SHAPEFILE
+
+# ============================================================================
+# Zonal statistics of gridded rasters over UHF / NTA polygons
+# ============================================================================
+#
+# Exposures such as humidity, pollen or modelled air quality come as grids,
+# one layer per day or month. Averaging a layer over a polygon is a weighted
+# sum over the cells it overlaps, so every polygon/grid pair gets a sparse
+# coverage matrix once:
+#
+#   W[zone, cell] = (fraction of the cell inside the zone) x (cell area)
+#
+# Cells wholly inside a polygon get fraction 1 without any geometry
+# arithmetic; only the boundary cells are intersected. W is cached on disk
+# per shapefile and grid, like the label grids of mold_density.py. After
+# that, each time step costs one sparse matrix-vector product:
+#
+#   mean[zone, t]     = W @ v_t / W @ valid_t        (missing cells skipped)
+#   coverage[zone, t] = W @ valid_t / W @ 1          (share of the zone with data)
+#   max[zone, t]      = max of v_t over the cells W touches
+#
+# The whole stack is one sparse x dense product, processed in batches of
+# time steps to bound memory. On a geographic (lon/lat) grid cell areas
+# shrink with cos(latitude) and W accounts for it.
+#
+# Rasters are read from NumPy (.npy with an explicit grid, or .npz with the
+# grid stored next to the data), GeoTIFF (rasterio, one band per time step)
+# or NetCDF (xarray); the last two are only imported when used.
+
+RasterGrid = namedtuple('RasterGrid', ['x0', 'y0', 'dx', 'dy', 'nx', 'ny', 'crs'])
+RasterGrid.__doc__ = """
+Regular grid: cell (row i, column j) spans x0 + j*dx .. x0 + (j+1)*dx and
+y0 + i*dy .. y0 + (i+1)*dy. North-up rasters have y0 at the top and dy < 0.
+"""
+
+COVERAGE_CACHE_DIR = os.path.join(CACHE_DIR, 'zonal_coverage')
+COVERAGE_VERSION = 2
+ZONE_LAYERS = {
+    'uhf34': (UHF34_SHAPEFILE, 'UHF34_CODE'),
+    'nta': (NTA_SHAPEFILE, 'NTA2020'),
+}
+STATISTICS = ('mean', 'max', 'coverage')
+DEFAULT_BATCH = 256
+
+
+def cell_edges(grid):
+    """(x edges [nx + 1], y edges [ny + 1]) in the grid's own order."""
+    return grid.x0 + np.arange(grid.nx + 1) * grid.dx, grid.y0 + np.arange(grid.ny + 1) * grid.dy
+
+
+def cell_areas(grid):
+    """Area of every row's cells [ny]; relative to the equator on geographic grids."""
+    from pyproj import CRS
+
+    area = np.full(grid.ny, abs(grid.dx * grid.dy))
+    if CRS(grid.crs).is_geographic:
+        _, ys = cell_edges(grid)
+        area *= np.cos(np.radians((ys[:-1] + ys[1:]) / 2))
+    return area
+
+
+def _index_range(edges, low, high):
+    """Cells whose span overlaps [low, high] along one axis, for ascending or descending edges."""
+    lo_edges, hi_edges = np.minimum(edges[:-1], edges[1:]), np.maximum(edges[:-1], edges[1:])
+    return np.flatnonzero((hi_edges > low) & (lo_edges < high))
+
+
+def _cache_path(shapefile, code_col, grid, cache_dir):
+    stat = os.stat(shapefile)
+    name = os.path.splitext(os.path.basename(shapefile))[0]
+    crs = ''.join(c if c.isalnum() else '_' for c in str(grid.crs))
+    key = (f"{name}_{code_col}_{grid.x0:g}_{grid.y0:g}_{grid.dx:g}_{grid.dy:g}_{grid.nx}x{grid.ny}_{crs}_"
+           f"{stat.st_size}_{int(stat.st_mtime)}_v{COVERAGE_VERSION}")
+    return os.path.join(cache_dir, key + '.npz')
+
+
+def coverage_matrix(grid, shapefile=UHF34_SHAPEFILE, code_col='UHF34_CODE', cache_dir=COVERAGE_CACHE_DIR):
+    """
+    Area-weighted polygon x cell coverage, cached on disk.
+
+    Args:
+        grid (RasterGrid): Raster grid; polygons are projected to its CRS.
+        shapefile (str): Polygon layer (UHF34 or NTA2020).
+        code_col (str): Column holding the polygon code.
+
+    Returns:
+        tuple: (CSR matrix [n_zones, ny * nx] of covered area per cell,
+        zone codes)
+    """
+    cache_file = _cache_path(shapefile, code_col, grid, cache_dir)
+    if os.path.exists(cache_file):
+        cached = np.load(cache_file, allow_pickle=False)
+        matrix = sparse.csr_matrix((cached['data'], cached['indices'], cached['indptr']),
+                                   shape=tuple(cached['shape']))
+        return matrix, cached['codes']
+
+    polygons = gpd.read_file(shapefile).to_crs(grid.crs)
+    codes = polygons[code_col].to_numpy()
+    if codes.dtype == object:
+        # Text codes (NTA2020) as a fixed-width array, so the cache loads without pickle
+        codes = codes.astype(str)
+    x_edges, y_edges = cell_edges(grid)
+    row_area = cell_areas(grid)
+
+    zones, cells, weights = [], [], []
+    for z, geom in enumerate(polygons.geometry):
+        if geom is None or geom.is_empty:
+            continue
+        minx, miny, maxx, maxy = geom.bounds
+        cols, rows = _index_range(x_edges, minx, maxx), _index_range(y_edges, miny, maxy)
+        if len(cols) == 0 or len(rows) == 0:
+            continue
+        r, c = (a.ravel() for a in np.meshgrid(rows, cols, indexing='ij'))
+        boxes = shapely.box(np.minimum(x_edges[c], x_edges[c + 1]), np.minimum(y_edges[r], y_edges[r + 1]),
+                            np.maximum(x_edges[c], x_edges[c + 1]), np.maximum(y_edges[r], y_edges[r + 1]))
+        shapely.prepare(geom)
+        inside = shapely.contains_properly(geom, boxes)
+        edge = ~inside & shapely.intersects(geom, boxes)
+        fraction = inside.astype(float)
+        fraction[edge] = shapely.area(shapely.intersection(geom, boxes[edge])) / shapely.area(boxes[edge])
+        keep = fraction > 0
+        if not keep.any():
+            continue
+        zones.append(np.full(keep.sum(), z))
+        cells.append(r[keep] * grid.nx + c[keep])
+        weights.append(fraction[keep] * row_area[r[keep]])
+
+    if not weights:
+        raise ValueError(f"The raster grid does not overlap any polygon of {shapefile}")
+    matrix = sparse.csr_matrix((np.concatenate(weights), (np.concatenate(zones), np.concatenate(cells))),
+                               shape=(len(codes), grid.ny * grid.nx))
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez_compressed(cache_file, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+                        shape=np.array(matrix.shape), codes=codes)
+    return matrix, codes
+
+
+def _zone_max(values, matrix):
+    """Max over every zone's cells for [n_steps, n_cells] values (NaN cells skipped)."""
+    out = np.full((values.shape[0], matrix.shape[0]), np.nan)
+    filled = np.flatnonzero(np.diff(matrix.indptr) > 0)
+    if len(filled):
+        gathered = np.where(np.isnan(values), -np.inf, values)[:, matrix.indices]
+        peaks = np.maximum.reduceat(gathered, matrix.indptr[filled], axis=1)
+        out[:, filled] = np.where(np.isinf(peaks), np.nan, peaks)
+    return out
+
+
+def zonal_statistics(stack, matrix, statistics=STATISTICS, batch=DEFAULT_BATCH):
+    """
+    Statistics of every layer of a raster stack over every zone.
+
+    Args:
+        stack (np.ndarray): [n_steps, ny, nx] values, NaN where missing.
+        matrix (sparse matrix): coverage_matrix() for the stack's grid.
+        statistics (tuple): Any of STATISTICS.
+        batch (int): Time steps per sparse product.
+
+    Returns:
+        dict: statistic -> [n_steps, n_zones].
+    """
+    unknown = set(statistics) - set(STATISTICS)
+    if unknown:
+        raise ValueError(f"Unknown statistics {sorted(unknown)} (choose from {', '.join(STATISTICS)})")
+    flat = stack.reshape(stack.shape[0], -1)
+    total = np.asarray(matrix.sum(axis=1)).ravel()
+    out = {name: np.empty((flat.shape[0], matrix.shape[0])) for name in statistics}
+    for start in range(0, flat.shape[0], batch):
+        values = np.asarray(flat[start:start + batch], dtype=float)
+        valid = ~np.isnan(values)
+        # [zones, cells] @ [cells, steps]: one sparse product per time step
+        weighted = (matrix @ np.where(valid, values, 0.0).T).T
+        covered = (matrix @ valid.T.astype(float)).T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if 'mean' in out:
+                out['mean'][start:start + batch] = np.where(covered > 0, weighted / covered, np.nan)
+            if 'coverage' in out:
+                out['coverage'][start:start + batch] = covered / total
+        if 'max' in out:
+            out['max'][start:start + batch] = _zone_max(values, matrix)
+    return out
+
+
+def read_raster(path, variable=None, grid=None):
+    """
+    A raster stack and its grid.
+
+    Args:
+        path (str): .npy (needs `grid`), .npz (arrays 'data' [steps, ny, nx]
+            or [ny, nx], 'x0', 'y0', 'dx', 'dy', 'crs' and optionally 'times'),
+            .tif/.tiff (one band per step) or .nc (dims time, y/lat, x/lon).
+        variable (str, optional): NetCDF variable (default: the first with
+            two spatial dimensions).
+        grid (RasterGrid, optional): Grid of a .npy stack (nx, ny may be 0).
+
+    Returns:
+        tuple: (stack [n_steps, ny, nx] float, RasterGrid, time labels)
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npy':
+        if grid is None:
+            raise ValueError(".npy rasters need a grid (x0, y0, dx, dy, crs)")
+        data = np.load(path)
+        times = None
+    elif ext == '.npz':
+        stored = np.load(path, allow_pickle=False)
+        data = stored['data']
+        grid = RasterGrid(float(stored['x0']), float(stored['y0']), float(stored['dx']), float(stored['dy']),
+                          0, 0, str(stored['crs']))
+        times = stored['times'] if 'times' in stored else None
+    elif ext in ('.tif', '.tiff'):
+        data, grid, times = _read_geotiff(path)
+    elif ext in ('.nc', '.nc4', '.cdf'):
+        data, grid, times = _read_netcdf(path, variable)
+    else:
+        raise ValueError(f"Unsupported raster format {ext!r} (use .npy, .npz, .tif or .nc)")
+
+    data = np.asarray(data, dtype=float)
+    if data.ndim == 2:
+        data = data[np.newaxis]
+    grid = grid._replace(ny=data.shape[1], nx=data.shape[2])
+    times = np.arange(len(data)) if times is None else np.asarray(times)
+    return data, grid, times
+
+
+def _read_geotiff(path):
+    try:
+        import rasterio
+    except ImportError as e:
+        raise ImportError("Reading GeoTIFF rasters needs rasterio (pip install rasterio)") from e
+
+    with rasterio.open(path) as src:
+        data = src.read(masked=True).filled(np.nan).astype(float)
+        t = src.transform
+        if t.b or t.d:
+            raise ValueError(f"{path}: rotated rasters are not supported")
+        grid = RasterGrid(t.c, t.f, t.a, t.e, src.width, src.height, src.crs.to_string())
+        times = [d or i for i, d in enumerate(src.descriptions)]
+    return data, grid, times
+
+
+def _read_netcdf(path, variable=None):
+    try:
+        import xarray as xr
+    except ImportError as e:
+        raise ImportError("Reading NetCDF rasters needs xarray and a NetCDF backend "
+                          "(pip install xarray netCDF4)") from e
+
+    with xr.open_dataset(path) as ds:
+        if variable is None:
+            variable = next(name for name, v in ds.data_vars.items() if v.ndim >= 2)
+        da = ds[variable]
+        y_dim = next(d for d in da.dims if d in ('y', 'lat', 'latitude'))
+        x_dim = next(d for d in da.dims if d in ('x', 'lon', 'longitude'))
+        time_dims = [d for d in da.dims if d not in (y_dim, x_dim)]
+        da = da.transpose(*time_dims, y_dim, x_dim)
+        xs, ys = da[x_dim].to_numpy(), da[y_dim].to_numpy()
+        dx, dy = float(xs[1] - xs[0]), float(ys[1] - ys[0])
+        crs = da.rio.crs.to_string() if hasattr(da, 'rio') and da.rio.crs else 'EPSG:4326'
+        grid = RasterGrid(float(xs[0]) - dx / 2, float(ys[0]) - dy / 2, dx, dy, len(xs), len(ys), crs)
+        times = da[time_dims[0]].to_numpy() if time_dims else None
+        data = da.to_numpy().astype(float)
+    return data, grid, times
+
+
+def zonal_table(path, zones='uhf34', variable=None, grid=None, statistics=STATISTICS, batch=DEFAULT_BATCH):
+    """
+    Zonal statistics of a raster file over UHF34 or NTA polygons.
+
+    Args:
+        path (str): Raster file (see read_raster()).
+        zones (str): 'uhf34' or 'nta'.
+
+    Returns:
+        pd.DataFrame: time, zone code column and one column per statistic.
+    """
+    shapefile, code_col = ZONE_LAYERS[zones]
+    stack, grid, times = read_raster(path, variable, grid)
+    matrix, codes = coverage_matrix(grid, shapefile, code_col)
+    stats = zonal_statistics(stack, matrix, statistics, batch)
+    out = pd.DataFrame({
+        'time': np.repeat(times, len(codes)),
+        code_col: np.tile(codes, len(times)),
+    })
+    for name, values in stats.items():
+        out[name] = values.ravel()
+    return out
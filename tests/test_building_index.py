@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from nyc_asthma.building_index import BuildingIndex, build_building_index, write_building_index
+from nyc_asthma.geography import UHF_CENTROIDS
+
+
+@pytest.fixture
+def index(tmp_path):
+    """Three buildings in UHF 101 and one in 102, split over several chunks."""
+    rows = [
+        (1000010001, 101, '01/05/2020 09:00:00 AM', 'Loft Building', 'Commercial Building'),
+        (1000010001, 101, '03/05/2021 09:00:00 AM', 'Workplace - 10 or Less Staff', 'Commercial Building'),
+        (1000010001, 101, '07/01/2022 09:00:00 AM', 'Loft Building', 'Loft Residence'),
+        (1000020002, 101, '02/01/2021 10:00:00 AM', 'Loft Building', None),
+        (1000020002, 101, '02/02/2021 10:00:00 AM', None, None),
+        (1000030003, 101, '06/01/2019 11:00:00 AM', 'Loft Building', 'Commercial Building'),
+        (2000040004, 102, '08/15/2023 01:30:00 PM', 'Loft Building', 'Commercial Building'),
+    ]
+    frame = pd.DataFrame([{
+        'Created Date': created, 'BBL': float(bbl), 'Descriptor': descriptor, 'Location Type': location,
+        'Latitude': UHF_CENTROIDS[uhf][0], 'Longitude': UHF_CENTROIDS[uhf][1],
+    } for bbl, uhf, created, descriptor, location in rows])
+    csv_path = tmp_path / 'mold.csv'
+    frame.to_csv(csv_path, index=False)
+
+    table, descriptors, location_types = build_building_index(str(csv_path), chunksize=2)
+    return BuildingIndex(write_building_index(table, descriptors, location_types, str(tmp_path / 'index')))
+
+
+def test_top_buildings_are_ordered_by_complaints(index):
+    top = index.top_buildings(101, k=2)
+
+    assert top['bbl'].tolist() == [1000010001, 1000020002]
+    assert top['complaints'].tolist() == [3, 2]
+    assert len(index) == 4
+    assert index.top_buildings(999).empty
+
+
+def test_lookup_merges_a_building_across_chunks(index):
+    row = index.lookup(1000010001).iloc[0]
+
+    assert row['complaints'] == 3
+    assert row['first_seen'] == pd.Timestamp('2020-01-05 09:00:00')
+    assert row['last_seen'] == pd.Timestamp('2022-07-01 09:00:00')
+    assert set(row['descriptors'].split('; ')) == {'Loft Building', 'Workplace - 10 or Less Staff'}
+    assert row['location_type'] == 'Loft Residence'
+    assert row['uhf_code'] == 101
+
+
+def test_lookup_of_an_unknown_bbl_is_empty(index):
+    assert index.lookup(1000010002).empty
+    assert index.lookup(1).empty
+    assert index.lookup(9999999999).empty
+    assert index.lookup(2000040004)['uhf_code'].tolist() == [102]
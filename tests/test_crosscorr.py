@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from nyc_asthma.crosscorr import lagged_sums
+
+
+def _direct(x, y, max_lag):
+    """sum over t with x(t) and y(t + k) both observed, one lag at a time."""
+    n_time = x.shape[-1]
+    out = {name: np.zeros(x.shape[:-1] + (2 * max_lag + 1,)) for name in ('xy', 'xx', 'yy', 'n')}
+    for j, k in enumerate(range(-max_lag, max_lag + 1)):
+        for t in range(n_time):
+            if not 0 <= t + k < n_time:
+                continue
+            a, b = x[..., t], y[..., t + k]
+            both = ~np.isnan(a) & ~np.isnan(b)
+            out['xy'][..., j] += np.where(both, a * b, 0.0)
+            out['xx'][..., j] += np.where(both, a ** 2, 0.0)
+            out['yy'][..., j] += np.where(both, b ** 2, 0.0)
+            out['n'][..., j] += both
+    return out
+
+
+@pytest.mark.parametrize('max_lag', [0, 6, 29])
+def test_fft_sums_match_a_direct_loop(max_lag):
+    rng = np.random.default_rng(0)
+    x = rng.poisson(3.0, (4, 30)).astype(float) - 3.0
+    y = rng.normal(40.0, 5.0, (4, 30))
+    x[rng.random(x.shape) < 0.1] = np.nan
+    y[rng.random(y.shape) < 0.2] = np.nan
+    y[2] = np.nan
+
+    fast, slow = lagged_sums(x, y, max_lag), _direct(x, y, max_lag)
+
+    for name in ('xy', 'xx', 'yy'):
+        assert fast[name] == pytest.approx(slow[name], abs=1e-8)
+    assert np.array_equal(fast['n'], slow['n'])
+    assert not fast['n'][2].any()
+
+
+def test_positive_lag_means_x_leads_y():
+    x = np.zeros((1, 20))
+    x[0, 5] = 1.0
+    y = np.roll(x, 3)
+
+    sums = lagged_sums(x, y, max_lag=5)
+    assert np.argmax(sums['xy'][0]) - 5 == 3
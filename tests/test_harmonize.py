@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from nyc_asthma import harmonize
+
+# Two UHF34 parents: 101102 = 101 + 102, and 103 on its own
+MEMBERSHIP = {101: 101102, 102: 101102, 103: 103}
+CODES = np.array([101, 102, 103])
+
+
+def _weights(year):
+    population = pd.DataFrame({'year': year, 'uhf_code': CODES, 'population': [1.0, 2.0, 3.0]})
+    years = np.full(len(CODES), year)
+    harmonize.weight_matrix(years, CODES, 'UHF42', 'UHF34', population=population, membership=MEMBERSHIP)
+    return harmonize._weight_key(years, CODES, 'UHF42', 'UHF34', 'rate', population, MEMBERSHIP)
+
+
+def test_weight_cache_keeps_the_most_recently_used_matrices(monkeypatch):
+    monkeypatch.setattr(harmonize, 'WEIGHT_CACHE_SIZE', 2)
+    monkeypatch.setattr(harmonize, '_weight_cache', type(harmonize._weight_cache)())
+
+    k2018, k2019 = _weights(2018), _weights(2019)
+    _weights(2018)
+    k2020 = _weights(2020)
+
+    assert list(harmonize._weight_cache) == [k2018, k2020]
+    assert k2019 not in harmonize._weight_cache
+
+
+def _ed_counts():
+    return pd.DataFrame({
+        'year': [2019, 2019, 2019, 2020, 2020, 2020],
+        'uhf_code': [101, 102, 103, 101, 102, 103],
+        'visits': [10.0, 30.0, 5.0, 12.0, 28.0, 7.0],
+        'rate': [4.0, 8.0, 2.0, 5.0, 6.0, 3.0],
+    })
+
+
+def _population():
+    return pd.DataFrame({'year': 2019, 'uhf_code': CODES, 'population': [100.0, 300.0, 50.0]})
+
+
+def test_counts_keep_their_totals_both_ways():
+    fine = _ed_counts()
+    coarse = harmonize.harmonize(fine, ['visits'], 'UHF42', 'UHF34', kind='count', membership=MEMBERSHIP)
+    back = harmonize.harmonize(coarse, ['visits'], 'UHF34', 'UHF42', kind='count', population=_population(),
+                               membership=MEMBERSHIP)
+
+    assert coarse.set_index(['year', 'uhf_code'])['visits'].to_dict() == {
+        (2019, 103): 5.0, (2019, 101102): 40.0, (2020, 103): 7.0, (2020, 101102): 40.0}
+    for frame in (coarse, back):
+        assert frame.groupby('year')['visits'].sum().to_dict() == {2019: 45.0, 2020: 47.0}
+    # Split by population share: 101 holds a quarter of 101102
+    assert back.set_index(['year', 'uhf_code']).loc[(2020, 101), 'visits'] == pytest.approx(10.0)
+
+
+def test_population_weighted_rates_keep_the_population_total():
+    fine = _ed_counts()
+    coarse = harmonize.harmonize(fine, ['rate'], 'UHF42', 'UHF34', population=_population(),
+                                 membership=MEMBERSHIP)
+
+    parent = coarse.set_index(['year', 'uhf_code'])['rate']
+    assert parent[(2019, 101102)] == pytest.approx((4.0 * 100 + 8.0 * 300) / 400)
+    # rate x population summed over members == parent rate x parent population
+    events = (fine[fine['year'] == 2019]['rate'].to_numpy() * [100.0, 300.0, 50.0]).sum()
+    assert parent[(2019, 101102)] * 400 + parent[(2019, 103)] * 50 == pytest.approx(events)
+
+
+def test_a_missing_member_leaves_the_summed_count_empty():
+    fine = _ed_counts()
+    fine.loc[1, 'visits'] = np.nan
+    coarse = harmonize.harmonize(fine, ['visits'], 'UHF42', 'UHF34', kind='count', membership=MEMBERSHIP)
+
+    assert np.isnan(coarse.set_index(['year', 'uhf_code']).loc[(2019, 101102), 'visits'])
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse, stats
+
+from nyc_asthma.correlation import pooled_correlations
+from nyc_asthma.imputation import impute_grid, spacetime_operator
+
+
+def _chain(n_units, n_years):
+    spatial = sparse.diags([np.ones(n_units - 1), np.ones(n_units - 1)], [-1, 1], format='csr')
+    return spacetime_operator(spatial, n_years)
+
+
+def test_draw_variance_is_the_residual_variance():
+    rng = np.random.default_rng(1)
+    n_units, n_years = 20, 10
+    values = rng.normal(size=(n_units * n_years, 1))
+    # A block of gaps whose neighbors are mostly gaps too
+    values.reshape(n_units, n_years)[5:15, 2:8] = np.nan
+
+    result = impute_grid(values, _chain(n_units, n_years), draws=4000, seed=3)
+
+    filled = np.isnan(values[:, 0])
+    draws = result['draws'][:, :, 0]
+    assert np.array_equal(draws[:, ~filled], np.broadcast_to(values[~filled, 0], draws[:, ~filled].shape))
+    # Noise is added once after convergence, not fed back through the neighbors
+    between = draws[:, filled].var(axis=0, ddof=1)
+    assert np.allclose(between, result['residual_sd'][0] ** 2, rtol=0.1)
+    assert np.allclose(draws[:, filled].mean(axis=0), result['point'][filled, 0], atol=0.1)
+
+
+def _completed(rng, n=40):
+    ed = rng.normal(50, 10, n)
+    completed = pd.DataFrame({'year': 2020, 'uhf_code': np.arange(n), 'age_adjusted_ed_rate_per_10k': ed,
+                              'poverty_rate': 0.5 * ed + rng.normal(0, 8, n)})
+    completed['poverty_rate_filled'] = np.arange(n) < 6
+    # The other outcomes are unobserved, so only adult ED visits is pooled
+    for col in ('age_adjusted_asthma_percent', 'ed_rate_per_10k_age_0_4', 'ed_rate_per_10k_age_5_17'):
+        completed[col] = np.nan
+    return completed
+
+
+def _pooled(completed, draws):
+    results = pooled_correlations(completed, draws, verbose=False)
+    return next(r for r in results if r['Asthma Outcome'] == 'Adult ED Visits')
+
+
+def test_rubin_pooling_of_fisher_z_over_draws():
+    rng = np.random.default_rng(0)
+    completed = _completed(rng)
+    draws = []
+    for _ in range(5):
+        draw = completed.copy()
+        draw.loc[:5, 'poverty_rate'] += rng.normal(0, 15, 6)
+        draws.append(draw)
+
+    result = _pooled(completed, draws)
+
+    z = np.arctanh([np.corrcoef(d['age_adjusted_ed_rate_per_10k'], d['poverty_rate'])[0, 1] for d in draws])
+    m, within, between = 5, 1 / (40 - 3), z.var(ddof=1)
+    total = within + (1 + 1 / m) * between
+    dof = (m - 1) * (1 + within / ((1 + 1 / m) * between)) ** 2
+    assert result['Correlation (r)'] == pytest.approx(np.tanh(z.mean()))
+    assert result['P-value'] == pytest.approx(2 * stats.t.sf(abs(z.mean()) / np.sqrt(total), dof))
+    assert result['N'] == 40 and result['N Imputed'] == 6
+
+
+def test_identical_draws_reduce_to_the_fisher_z_test():
+    completed = _completed(np.random.default_rng(1))
+
+    result = _pooled(completed, [completed, completed.copy()])
+
+    r = np.corrcoef(completed['age_adjusted_ed_rate_per_10k'], completed['poverty_rate'])[0, 1]
+    assert result['Correlation (r)'] == pytest.approx(r)
+    assert result['P-value'] == pytest.approx(2 * stats.norm.sf(abs(np.arctanh(r)) * np.sqrt(40 - 3)))
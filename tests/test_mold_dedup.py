@@ -0,0 +1,51 @@
+import numpy as np
+
+from nyc_asthma.mold_dedup import complaint_keys, episode_starts
+
+DAY = 86400
+
+
+def _loop_starts(keys, times, window_days):
+    """Reference: walk each key's complaints in time order."""
+    starts = np.zeros(len(keys), dtype=bool)
+    episode = {}
+    for i in np.lexsort((times, keys)):
+        key = keys[i]
+        if key == 0 or key not in episode or times[i] > episode[key] + window_days * DAY:
+            starts[i] = True
+            episode[key] = times[i]
+    return starts
+
+
+def test_window_is_anchored_at_the_episode_start():
+    # Every 20 days: with a 30-day window, day 20 repeats day 0, day 40 opens
+    # a new episode even though it is within 30 days of day 20
+    keys = np.full(6, 7, dtype=np.int64)
+    times = np.arange(6, dtype=np.int64) * 20 * DAY
+
+    assert episode_starts(keys, times, 30).tolist() == [True, False, True, False, True, False]
+
+
+def test_keys_are_deduplicated_separately_and_unknown_keys_never_merge():
+    keys = np.array([5, 0, 5, 6, 0], dtype=np.int64)
+    times = np.array([0, 0, 1, 1, 1], dtype=np.int64) * DAY
+
+    assert episode_starts(keys, times, 30).tolist() == [True, True, False, True, True]
+
+
+def test_matches_a_direct_loop_in_any_input_order():
+    rng = np.random.default_rng(0)
+    keys = rng.integers(0, 40, 2000).astype(np.int64)
+    times = rng.integers(0, 3 * 365, 2000).astype(np.int64) * DAY + rng.integers(0, DAY, 2000)
+
+    for window_days in (0, 7, 30, 400):
+        assert np.array_equal(episode_starts(keys, times, window_days), _loop_starts(keys, times, window_days))
+
+
+def test_bbl_and_snapped_coordinate_keys_do_not_collide():
+    keys = complaint_keys([3012340001.0, np.nan, np.nan, 0.0], [40.7, 40.70001, np.nan, 40.8],
+                          [-73.9, -73.90001, np.nan, -73.95])
+
+    assert keys[0] == 3012340001
+    assert keys[1] < 0 and keys[3] < 0 and keys[1] != keys[3]
+    assert keys[2] == 0
@@ -0,0 +1,20 @@
+import geopandas as gpd
+import shapely
+
+from nyc_asthma.mold_density import Grid, polygon_cell_labels
+
+
+def test_text_codes_survive_the_label_cache(tmp_path):
+    polygons = gpd.GeoDataFrame({'NTA2020': ['BK0101', 'BK0102']},
+                                geometry=[shapely.box(0, 0, 10, 10), shapely.box(10, 0, 20, 10)],
+                                crs='EPSG:2263')
+    shapefile = str(tmp_path / 'zones.shp')
+    polygons.to_file(shapefile)
+    grid = Grid(0.0, 0.0, 5.0, 4, 2)
+
+    built, codes = polygon_cell_labels(shapefile, 'NTA2020', grid, cache_dir=str(tmp_path / 'cache'))
+    cached, cached_codes = polygon_cell_labels(shapefile, 'NTA2020', grid, cache_dir=str(tmp_path / 'cache'))
+
+    assert list(codes) == list(cached_codes) == ['BK0101', 'BK0102']
+    assert (built == cached).all()
+    assert built.tolist() == [[0, 0, 1, 1], [0, 0, 1, 1]]
@@ -0,0 +1,49 @@
+import os
+
+import pandas as pd
+
+from nyc_asthma.panel_store import open_panel_store, read_panel, write_panel_store
+
+
+def _panel():
+    return pd.DataFrame({
+        'year': [2020, 2020, 2021],
+        'uhf_code': [101, 102, 101],
+        'a b': [1.0, 2.0, 3.0],
+        'a_b': [10.0, 20.0, 30.0],
+        'flag': pd.array([True, None, False], dtype='boolean'),
+    })
+
+
+def test_names_that_sanitize_alike_keep_their_own_values(tmp_path):
+    store = open_panel_store(write_panel_store(_panel(), str(tmp_path / 'panel.store')))
+
+    loaded = store.load(['a b', 'a_b'])
+    assert loaded['a b'].tolist() == [1.0, 2.0, 3.0]
+    assert loaded['a_b'].tolist() == [10.0, 20.0, 30.0]
+
+
+def test_missing_booleans_round_trip(tmp_path):
+    store = open_panel_store(write_panel_store(_panel(), str(tmp_path / 'panel.store')))
+
+    flags = store.load('flag')['flag']
+    assert flags.isna().tolist() == [False, True, False]
+    assert flags.dropna().tolist() == [True, False]
+
+
+def test_read_panel_uses_the_store_unless_the_csv_is_newer(tmp_path):
+    csv_path = str(tmp_path / 'panel.csv')
+    _panel().assign(**{'a b': [7.0, 8.0, 9.0]}).to_csv(csv_path, index=False)
+    write_panel_store(_panel(), str(tmp_path / 'panel.store'))
+    columns = lambda available: ['year', 'uhf_code', 'a b']  # noqa: E731
+
+    df, source = read_panel(csv_path, columns)
+    assert source == str(tmp_path / 'panel.store')
+    assert df.columns.tolist() == ['year', 'uhf_code', 'a b']
+    assert df['a b'].tolist() == [1.0, 2.0, 3.0]
+
+    meta = str(tmp_path / 'panel.store' / 'meta.json')
+    os.utime(meta, (os.path.getmtime(csv_path) - 10,) * 2)
+    df, source = read_panel(csv_path, columns)
+    assert source == csv_path
+    assert df['a b'].tolist() == [7.0, 8.0, 9.0]
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from nyc_asthma.resolution_times import KLLSketch, ResolutionSketches, correlate_with_asthma
+
+
+def _sketches():
+    sketches = ResolutionSketches(k=50)
+    for code, values in ((305, [1.0, 2.0]), (307, [3.0]), (101, [10.0, 20.0])):
+        sketches.sketches[(code, 2020)] = KLLSketch(50).update(values)
+        sketches.open_counts[(code, 2020)] = 1
+    return sketches
+
+
+def test_to_level_merges_members_into_their_parent():
+    summary = _sketches().to_level({305: 305307, 307: 305307, 101: 101}).summary()
+
+    assert summary.set_index('uhf_code')['closed_complaints'].to_dict() == {101: 2, 305307: 3}
+    assert summary.set_index('uhf_code')['open_complaints'].to_dict() == {101: 1, 305307: 2}
+
+
+def test_correlation_needs_the_panel_level():
+    summary = _sketches().summary()
+    panel = pd.DataFrame({'year': [2020], 'uhf_code': [305307], 'rate': [np.nan]})
+    with pytest.raises(ValueError, match='to_level'):
+        correlate_with_asthma(summary, panel, ['rate'])
+
+
+def _rank_errors(sketch, data, qs):
+    ranks = np.searchsorted(np.sort(data), sketch.quantile(qs), side='right') / len(data)
+    return np.abs(ranks - qs)
+
+
+def test_kll_rank_error_is_small_and_weight_is_kept():
+    rng = np.random.default_rng(0)
+    data = rng.lognormal(3.0, 1.5, 200_000)
+    qs = np.linspace(0.01, 0.99, 99)
+
+    whole = KLLSketch(200, seed=1)
+    for batch in np.array_split(data, 40):
+        whole.update(batch)
+    merged = KLLSketch(200, seed=2)
+    for part in np.array_split(data, 8):
+        merged.merge(KLLSketch(200, seed=3).update(part))
+
+    for sketch in (whole, merged):
+        assert len(sketch) == len(data)
+        assert sum(len(lvl) * 2 ** h for h, lvl in enumerate(sketch.levels)) == len(data)
+        assert sum(len(lvl) for lvl in sketch.levels) < 1000
+        assert _rank_errors(sketch, data, qs).max() < 0.02
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from nyc_asthma.smoothing import eb_smooth
+
+
+def _marshall(y, n, per=10_000):
+    """Marshall's global estimator written out for one reference set."""
+    m = y.sum() / n.sum()
+    s2 = (n * (y / n - m) ** 2).sum() / n.sum()
+    prior_var = max(s2 - m / n.mean(), 0.0)
+    w = prior_var / (prior_var + m / n)
+    return (m + w * (y / n - m)) * per, w, m * per
+
+
+def test_small_areas_are_shrunk_harder_toward_the_prior_mean():
+    # Two columns (e.g. two years), one reference set holding every area
+    counts = np.array([[2.0, 40.0], [30.0, 45.0], [300.0, 260.0], [900.0, 1100.0]])
+    population = np.array([[500.0, 20_000.0], [20_000.0, 20_000.0], [50_000.0, 50_000.0], [200_000.0, 200_000.0]])
+    reference = sparse.csr_matrix(np.ones((4, 4)))
+
+    smoothed, weight, prior_mean = eb_smooth(counts, population, reference)
+
+    for j in range(2):
+        expected = _marshall(counts[:, j], population[:, j])
+        assert smoothed[:, j] == pytest.approx(expected[0])
+        assert weight[:, j] == pytest.approx(expected[1])
+        assert prior_mean[:, j] == pytest.approx(np.full(4, expected[2]))
+
+    raw = counts / population * 10_000
+    # Every smoothed rate lies between the raw rate and the prior mean
+    assert np.all(np.abs(smoothed - prior_mean) <= np.abs(raw - prior_mean) + 1e-9)
+    assert np.all(np.sign(smoothed - prior_mean) == np.sign(raw - prior_mean))
+    # Weight on the area's own rate grows with its population
+    assert np.all(np.diff(weight[:, 0]) > 0)
+
+
+def test_no_spread_beyond_poisson_noise_pools_everything():
+    population = np.array([[10_000.0], [20_000.0], [40_000.0]])
+    counts = population * 0.01
+    smoothed, weight, prior_mean = eb_smooth(counts, population, sparse.csr_matrix(np.ones((3, 3))))
+
+    assert weight.ravel() == pytest.approx([0.0, 0.0, 0.0])
+    assert smoothed.ravel() == pytest.approx(prior_mean.ravel())
+
+
+def test_missing_cells_stay_missing_and_reference_sets_are_separate():
+    counts = np.array([[10.0], [np.nan], [5.0], [50.0]])
+    population = np.array([[1_000.0], [1_000.0], [10_000.0], [10_000.0]])
+    # Areas 0-1 and 2-3 form two reference sets
+    reference = sparse.csr_matrix(np.kron(np.eye(2), np.ones((2, 2))))
+
+    smoothed, weight, prior_mean = eb_smooth(counts, population, reference)
+
+    assert np.isnan(smoothed[1, 0]) and np.isnan(weight[1, 0])
+    assert prior_mean[0, 0] == pytest.approx(100.0)
+    assert prior_mean[2:, 0] == pytest.approx([27.5, 27.5])
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from synthetic_data import UHF34_CODES, UHF42_CODES, portal_frame, write_portal_csv  # noqa: E402
+
+
+@pytest.mark.parametrize('kind, codes', [('ed', UHF42_CODES), ('adults', UHF34_CODES)])
+def test_chunked_csv_continues_the_year_code_sequence(tmp_path, kind, codes):
+    n_rows = 5 * len(codes) + 7
+    path = write_portal_csv(str(tmp_path / f'{kind}.csv'), n_rows, kind, chunk_rows=31)
+    chunked = pd.read_csv(path)
+    whole = portal_frame(n_rows, kind)
+
+    assert len(chunked) == n_rows
+    assert chunked.columns.tolist() == whole.columns.tolist()
+    assert chunked[['TimePeriod', 'GeoID']].equals(whole[['TimePeriod', 'GeoID']])
+    assert not chunked.duplicated(['TimePeriod', 'GeoID']).any()
+    assert set(chunked['GeoID']) == set(codes)
+
+
+def test_offset_frames_concatenate_to_one_frame():
+    whole = portal_frame(100, 'ed')
+    parts = pd.concat([portal_frame(40, 'ed'), portal_frame(60, 'ed', offset=40)], ignore_index=True)
+
+    assert parts[['TimePeriod', 'GeoType', 'GeoID', 'Geography']].equals(
+        whole[['TimePeriod', 'GeoType', 'GeoID', 'Geography']])
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from nyc_asthma.temporal import align, yearly_axis
+
+AXIS = yearly_axis(2010, 2021)
+
+
+def _series():
+    """Unit 1 observed in 2015 and 2019, unit 2 only in 2013."""
+    return pd.DataFrame({'uhf_code': [1, 1, 2], 'year': [2015, 2019, 2013], 'value': [10.0, 30.0, 5.0]})
+
+
+def _aligned(method, max_gap=None, code=1):
+    out = align(_series(), ['value'], AXIS, method, max_gap)
+    out = out[out['uhf_code'] == code].set_index('year')
+    return out['value'].to_dict(), out['value_imputed'].to_dict()
+
+
+def _expected(pairs):
+    return {year: pairs.get(year, np.nan) for year in AXIS}
+
+
+def _assert_values(actual, expected):
+    assert list(actual) == list(expected)
+    np.testing.assert_array_equal(np.array(list(actual.values())), np.array(list(expected.values())))
+
+
+def test_covering_takes_the_latest_period_containing_each_year():
+    values, imputed = _aligned('covering', 4)
+
+    _assert_values(values, _expected({2011: 10.0, 2012: 10.0, 2013: 10.0, 2014: 10.0,
+                                      2015: 30.0, 2016: 30.0, 2017: 30.0, 2018: 30.0, 2019: 30.0}))
+    # 2015 is observed but reported from the later period, so it counts as imputed
+    assert [year for year, flag in imputed.items() if not flag] == [2010, 2019, 2020, 2021]
+
+
+def test_nearest_prefers_the_earlier_observation_on_ties():
+    values, imputed = _aligned('nearest')
+
+    _assert_values(values, _expected({**{year: 10.0 for year in range(2010, 2018)},
+                                      **{year: 30.0 for year in range(2018, 2022)}}))
+    assert [year for year, flag in imputed.items() if not flag] == [2015, 2019]
+
+    values, _ = _aligned('nearest', max_gap=1)
+    _assert_values(values, _expected({2014: 10.0, 2015: 10.0, 2016: 10.0, 2018: 30.0, 2019: 30.0, 2020: 30.0}))
+
+
+def test_interpolate_is_linear_between_observations_and_never_extrapolates():
+    values, imputed = _aligned('interpolate')
+
+    _assert_values(values, _expected({2015: 10.0, 2016: 15.0, 2017: 20.0, 2018: 25.0, 2019: 30.0}))
+    assert [year for year, flag in imputed.items() if flag] == [2016, 2017, 2018]
+
+    values, _ = _aligned('interpolate', max_gap=3)
+    _assert_values(values, _expected({2015: 10.0, 2019: 30.0}))
+    values, _ = _aligned('interpolate', code=2)
+    _assert_values(values, _expected({2013: 5.0}))
+
+
+def test_unknown_method_and_duplicate_rows_are_errors():
+    with pytest.raises(ValueError, match='Unknown alignment method'):
+        align(_series(), ['value'], AXIS, 'linear')
+    with pytest.raises(ValueError, match='Duplicate'):
+        align(pd.concat([_series(), _series()]), ['value'], AXIS)
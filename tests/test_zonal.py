@@ -0,0 +1,34 @@
+import numpy as np
+import geopandas as gpd
+import pytest
+import shapely
+
+from nyc_asthma.zonal import RasterGrid, coverage_matrix, zonal_statistics
+
+
+@pytest.fixture
+def nta_layer(tmp_path):
+    """Two adjacent squares with text codes, like nynta2020.shp."""
+    polygons = gpd.GeoDataFrame({'NTA2020': ['BK0101', 'BK0102']},
+                                geometry=[shapely.box(0, 0, 10, 10), shapely.box(10, 0, 20, 10)],
+                                crs='EPSG:2263')
+    path = tmp_path / 'zones.shp'
+    polygons.to_file(path)
+    return str(path)
+
+
+def test_text_codes_survive_the_cache(nta_layer, tmp_path):
+    grid = RasterGrid(0.0, 10.0, 5.0, -5.0, 4, 2, 'EPSG:2263')
+    built, codes = coverage_matrix(grid, nta_layer, 'NTA2020', cache_dir=str(tmp_path / 'cache'))
+    cached, cached_codes = coverage_matrix(grid, nta_layer, 'NTA2020', cache_dir=str(tmp_path / 'cache'))
+
+    assert list(codes) == list(cached_codes) == ['BK0101', 'BK0102']
+    assert (built != cached).nnz == 0
+    stack = np.arange(8, dtype=float).reshape(1, 2, 4)
+    assert np.allclose(zonal_statistics(stack, cached, ('mean',))['mean'], [[2.5, 4.5]])
+
+
+def test_grid_outside_every_polygon_is_an_error(nta_layer, tmp_path):
+    grid = RasterGrid(1000.0, 1000.0, 5.0, 5.0, 4, 4, 'EPSG:2263')
+    with pytest.raises(ValueError, match='does not overlap'):
+        coverage_matrix(grid, nta_layer, 'NTA2020', cache_dir=str(tmp_path / 'cache'))